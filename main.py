@@ -1,14 +1,13 @@
 import os, sys
-import pandas as pd
-import numpy as np
 from tourism.constant.training_pipeline import *
 from tourism.logger import logging
 from tourism.exception import CustomException
 from tourism.pipeline.training_pipeline import Pipeline
+from tourism.configuration.configuration_file import Configuration
 
 def main():
     try:
-        pipeline = TrainingPipeline()
+        pipeline = Pipeline(config=Configuration())
         pipeline.run_pipeline()
     except Exception as e:
         logging.error(f"{e}")
@@ -24,5 +24,8 @@ setup(
     author = "Harshal Kumre",
     author_email = "kumreharshalkumar@gmail.com",
     packages = find_packages(),
-    install_requires = get_requirements("requirements.txt")
+    install_requires = get_requirements("requirements.txt"),
+    entry_points = {
+        "console_scripts": ["tourism=tourism.pipeline.stage_cli:main"]
+    }
 )
\ No newline at end of file
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from tourism.cloud_storage.aws_operations import ArtifactSync
+from tourism.utils.s3_operation import get_object_store
+
+
+@pytest.fixture
+def synced_dir(tmp_path):
+    """
+    return: (object store, run dir pushed from the trainer root)
+    """
+    object_store = get_object_store(f"file://{tmp_path / 'bucket'}")
+    run_dir = tmp_path / "trainer" / "artifacts" / "run"
+    run_dir.mkdir(parents=True)
+    (run_dir / "model.pkl").write_bytes(b"model" * 100)
+    (run_dir / "schema.yaml").write_text("columns: []\n")
+
+    artifact_sync = ArtifactSync(object_store, prefix="tourism", local_root=str(tmp_path / "trainer"))
+    sync_result = artifact_sync.push_dir(str(run_dir))
+    artifact_sync.close()
+    assert sync_result.files == 2 and sync_result.uploaded == 2
+    return object_store, tmp_path
+
+
+def test_pull_downloads_missing_files(synced_dir):
+    object_store, tmp_path = synced_dir
+    artifact_sync = ArtifactSync(object_store, prefix="tourism", local_root=str(tmp_path / "node"))
+
+    local_paths = artifact_sync.pull("artifacts/run")
+
+    assert [os.path.basename(path) for path in local_paths] == ["model.pkl", "schema.yaml"]
+    with open(local_paths[0], "rb") as model_file:
+        assert model_file.read() == b"model" * 100
+
+
+def test_pull_replaces_corrupted_file_of_same_size(synced_dir):
+    object_store, tmp_path = synced_dir
+    artifact_sync = ArtifactSync(object_store, prefix="tourism", local_root=str(tmp_path / "node"))
+    model_path = artifact_sync.pull("artifacts/run", ["model.pkl"])[0]
+    with open(model_path, "wb") as model_file:
+        model_file.write(b"stale" * 100)
+
+    artifact_sync.pull("artifacts/run", ["model.pkl"])
+
+    with open(model_path, "rb") as model_file:
+        assert model_file.read() == b"model" * 100
+
+
+def test_lazy_dir_reuses_intact_file(synced_dir):
+    object_store, tmp_path = synced_dir
+    artifact_sync = ArtifactSync(object_store, prefix="tourism", local_root=str(tmp_path / "node"))
+    lazy_dir = artifact_sync.open_lazy("artifacts/run")
+    model_path = lazy_dir.get_path("model.pkl")
+    inode = os.stat(model_path).st_ino
+
+    assert lazy_dir.get_path("model.pkl") == model_path
+    assert os.stat(model_path).st_ino == inode
+    with pytest.raises(Exception):
+        lazy_dir.get_path("missing.pkl")
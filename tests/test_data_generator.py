@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from tourism.utils.data_generator import SyntheticDataGenerator
+
+
+def test_parquet_parts_with_all_missing_category_chunks(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    generator = SyntheticDataGenerator(random_state=0)
+    output_file_path = str(tmp_path / "travel_data.parquet")
+
+    # one row chunks: some Gender chunks are all None, which alone would infer the arrow null type
+    generator.write(output_file_path, n_rows=20, chunk_size=1, drift={"Gender": {"missing_rate": 0.5}})
+
+    schema = pq.read_schema(output_file_path)
+    assert str(schema.field("Gender").type) == "string"
+    assert str(schema.field("CustomerID").type) == "int64"
+    assert str(schema.field("MonthlyIncome").type) == "double"
+    assert pq.ParquetFile(output_file_path).metadata.num_row_groups == 20
+
+    data_frame = pd.read_parquet(output_file_path)
+    assert len(data_frame) == 20
+    assert data_frame["Gender"].isna().any() and data_frame["Gender"].notna().any()
+    assert data_frame["CustomerID"].tolist() == list(range(20))
+
+
+def test_csv_parts_match_in_memory_chunks(tmp_path):
+    generator = SyntheticDataGenerator(random_state=0)
+    output_file_path = str(tmp_path / "travel_data.csv")
+
+    generator.write(output_file_path, n_rows=250, chunk_size=100, n_jobs=2)
+
+    data_frame = pd.read_csv(output_file_path)
+    expected = pd.concat(list(generator.iter_chunks(250, chunk_size=100)), ignore_index=True)
+    assert len(data_frame) == 250
+    assert data_frame["CustomerID"].tolist() == expected["CustomerID"].tolist()
+    assert data_frame["ProdTaken"].tolist() == expected["ProdTaken"].tolist()
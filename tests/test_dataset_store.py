@@ -0,0 +1,86 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tourism.entity.dataset_store import DatasetStore
+
+
+def get_chunk_files(store: DatasetStore) -> set:
+    return set(glob.glob(os.path.join(store.store_dir, "chunks", "*", "*.csv")))
+
+
+@pytest.fixture
+def data_frame():
+    random = np.random.default_rng(0)
+    return pd.DataFrame({"CustomerID": np.arange(200000, 202000),
+                         "Age": random.integers(18, 60, 2000).astype(float),
+                         "MonthlyIncome": random.normal(20000, 5000, 2000).round(2),
+                         "Gender": random.choice(["Male", "Female"], 2000)})
+
+
+def test_commit_writes_only_the_changed_chunks(tmp_path, data_frame):
+    store = DatasetStore(str(tmp_path / "store"), chunk_rows=50)
+    first_version = store.commit(data_frame, ref="run-1")
+    first_chunk_files = get_chunk_files(store)
+    assert first_version.new_chunks == len(first_version.chunks) == len(first_chunk_files) > 10
+    assert first_version.new_rows == first_version.rows == 2000
+
+    same_version = store.commit(data_frame.copy())
+    assert same_version.version_id == first_version.version_id
+    assert (same_version.new_chunks, same_version.new_rows) == (0, 0)
+    assert get_chunk_files(store) == first_chunk_files
+
+    changed_df = data_frame.copy()
+    changed_df.loc[1000, "MonthlyIncome"] += 1
+    changed_version = store.commit(changed_df, ref="run-2")
+    changed_chunk = next(chunk for chunk, first_chunk in zip(changed_version.chunks, first_version.chunks)
+                         if chunk != first_chunk)
+    assert changed_version.version_id != first_version.version_id
+    assert (changed_version.new_chunks, changed_version.new_rows) == (1, changed_chunk.rows)
+    assert get_chunk_files(store) - first_chunk_files == {store.get_chunk_file_path(changed_chunk.chunk_id)}
+
+    # an inserted row only changes the group it falls in, the following groups keep their ids
+    inserted_df = pd.concat([data_frame.iloc[:500], data_frame.iloc[[10]], data_frame.iloc[500:]],
+                            ignore_index=True)
+    inserted_version = store.commit(inserted_df)
+    assert 1 <= inserted_version.new_chunks <= 2
+    assert inserted_version.new_rows <= 2 * store.max_chunk_rows
+
+
+def test_null_in_int_column_keeps_the_other_chunks(tmp_path, data_frame):
+    store = DatasetStore(str(tmp_path / "store"), chunk_rows=50)
+    int_df = data_frame.assign(Age=data_frame["Age"].astype(np.int64))
+    first_version = store.commit(int_df)
+
+    # the null turns Age into float64, the other rows are written and hashed alike
+    null_df = data_frame.copy()
+    null_df.loc[1500, "Age"] = np.nan
+    null_version = store.commit(null_df)
+
+    assert null_version.new_chunks == 1
+    assert len(set(null_version.chunks) - set(first_version.chunks)) == 1
+
+
+def test_versions_read_back_and_splits_follow_the_row_content(tmp_path, data_frame):
+    store = DatasetStore(str(tmp_path / "store"), chunk_rows=50)
+    store.commit(data_frame, ref="run-1")
+    changed_df = data_frame.copy()
+    changed_df.loc[0, "Gender"] = "Other"
+    store.commit(changed_df, ref="run-2")
+
+    pd.testing.assert_frame_equal(store.read_version("run-1"), data_frame.assign(Age=data_frame["Age"].astype(int)))
+    assert store.read_version("run-2").loc[0, "Gender"] == "Other"
+
+    first_test = store.read_version("run-1", split="test", test_size=0.2)
+    second_test = store.read_version("run-2", split="test", test_size=0.2)
+    assert 300 < len(first_test) < 500
+    unchanged_ids = set(data_frame["CustomerID"].iloc[1:])
+    assert set(first_test["CustomerID"]) & unchanged_ids == set(second_test["CustomerID"]) & unchanged_ids
+    train_file_path, test_file_path = store.materialize_splits("run-1", test_size=0.2)
+    assert len(pd.read_csv(train_file_path)) + len(pd.read_csv(test_file_path)) == 2000
+
+    with pytest.raises(Exception, match="No dataset version"):
+        store.read_version("run-3")
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from tourism.entity.distributed_search import (DistributedSearch, SearchTaskQueue, DONE, FAILED, PENDING, RUNNING)
+
+
+@pytest.fixture
+def task_queue(tmp_path):
+    return SearchTaskQueue(str(tmp_path / "search_queue.db"))
+
+
+def submit(task_queue: SearchTaskQueue, n_tasks: int = 2, max_attempts: int = 2, search_id: str = "search"):
+    task_queue.submit(search_id, [{"candidate": index} for index in range(n_tasks)], data_path="x.npy",
+                      target_path="y.npy", splits_path="folds.npz", n_splits=3, scoring="accuracy",
+                      max_attempts=max_attempts)
+
+
+def get_statuses(task_queue: SearchTaskQueue, search_id: str = "search"):
+    return [task_result.status for task_result in task_queue.get_results(search_id)]
+
+
+def test_claim_complete(task_queue):
+    submit(task_queue)
+
+    first = task_queue.claim("worker-1", lease_seconds=60)
+    second = task_queue.claim("worker-2", lease_seconds=60)
+
+    assert (first.candidate_index, second.candidate_index) == (0, 1)
+    assert first.attempts == 1
+    assert task_queue.claim("worker-3", lease_seconds=60) is None
+    assert get_statuses(task_queue) == [RUNNING, RUNNING]
+
+    task_queue.complete(first.task_id, "worker-1", fold_scores=[0.5, 0.75, 1.0], fit_seconds=2.0)
+    task_queue.complete(second.task_id, "worker-2", fold_scores=[0.25, 0.5, 0.75], fit_seconds=1.0)
+
+    results = task_queue.get_results("search")
+    assert [task_result.status for task_result in results] == [DONE, DONE]
+    assert results[0].fold_scores == [0.5, 0.75, 1.0]
+    assert not task_queue.has_open_tasks("search")
+
+
+def test_expired_lease_is_requeued_then_failed(task_queue):
+    submit(task_queue, n_tasks=1, max_attempts=2)
+
+    task = task_queue.claim("worker-1", lease_seconds=0.01)
+    time.sleep(0.05)
+    assert task_queue.requeue_expired("search") == 1
+    assert get_statuses(task_queue) == [PENDING]
+    # the lost worker can neither renew nor complete the task any more
+    assert not task_queue.renew_lease(task.task_id, "worker-1", lease_seconds=60)
+
+    retried = task_queue.claim("worker-2", lease_seconds=0.01)
+    assert retried.attempts == 2
+    time.sleep(0.05)
+    task_queue.requeue_expired("search")
+
+    results = task_queue.get_results("search")
+    assert [task_result.status for task_result in results] == [FAILED]
+    assert results[0].error == "lease expired on worker-2"
+    assert task_queue.claim("worker-3", lease_seconds=60) is None
+
+
+def test_renewed_lease_is_kept(task_queue):
+    submit(task_queue, n_tasks=1)
+
+    task = task_queue.claim("worker-1", lease_seconds=0.05)
+    assert task_queue.renew_lease(task.task_id, "worker-1", lease_seconds=60)
+    time.sleep(0.1)
+
+    assert task_queue.requeue_expired("search") == 0
+    assert get_statuses(task_queue) == [RUNNING]
+
+
+def test_failed_attempts(task_queue):
+    submit(task_queue, n_tasks=1, max_attempts=2)
+
+    task = task_queue.claim("worker-1", lease_seconds=60)
+    task_queue.fail(task.task_id, "worker-1", error="ValueError: boom")
+    assert get_statuses(task_queue) == [PENDING]
+
+    task = task_queue.claim("worker-1", lease_seconds=60)
+    task_queue.fail(task.task_id, "worker-1", error="ValueError: boom")
+    assert get_statuses(task_queue) == [FAILED]
+
+
+def test_searches_are_isolated(task_queue):
+    submit(task_queue, n_tasks=1, search_id="first")
+    submit(task_queue, n_tasks=1, search_id="second")
+
+    task = task_queue.claim("worker-1", lease_seconds=60, search_id="second")
+
+    assert task.search_id == "second"
+    task_queue.purge("second")
+    assert get_statuses(task_queue, "second") == []
+    assert get_statuses(task_queue, "first") == [PENDING]
+
+
+def test_timed_out_search_removes_its_tasks(tmp_path):
+    distributed_search = DistributedSearch(str(tmp_path / "search_queue.db"), local_workers=0, timeout=0.1,
+                                           poll_interval=0.02)
+
+    with pytest.raises(Exception, match="timed out"):
+        distributed_search.score_candidates([{"candidate": 0}, {"candidate": 1}], data_path="x.npy",
+                                            target_path="y.npy", splits_path="folds.npz", n_splits=3)
+
+    assert not distributed_search.task_queue.has_open_tasks()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from tourism.entity.flat_ensemble import FlatTreeEnsemble, flatten_tree_ensemble, verify_flat_ensemble
+
+xgboost = pytest.importorskip("xgboost")
+
+
+def get_dataset(n_classes: int = 2, missing_rate: float = 0.0):
+    X, y = make_classification(n_samples=600, n_features=8, n_informative=5, n_classes=n_classes,
+                               random_state=0)
+    if missing_rate:
+        X[np.random.default_rng(0).random(X.shape) < missing_rate] = np.nan
+    return X, y
+
+
+def assert_same_predictions(flat_ensemble: FlatTreeEnsemble, model, X):
+    np.testing.assert_array_equal(flat_ensemble.predict(X), model.predict(X))
+    np.testing.assert_allclose(flat_ensemble.predict_proba(X), model.predict_proba(X), atol=1e-5)
+    assert verify_flat_ensemble(flat_ensemble, model, X)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_random_forest(n_classes):
+    X, y = get_dataset(n_classes)
+    model = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(X, y)
+
+    flat_ensemble = flatten_tree_ensemble(model)
+
+    assert flat_ensemble.n_trees == 15
+    assert_same_predictions(flat_ensemble, model, X)
+    np.testing.assert_array_equal(flat_ensemble.feature_importances_, model.feature_importances_)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("missing_rate", [0.0, 0.1])
+def test_xgboost(n_classes, missing_rate):
+    X, y = get_dataset(n_classes, missing_rate)
+    model = xgboost.XGBClassifier(n_estimators=20, max_depth=4, n_jobs=1).fit(X, y)
+
+    assert_same_predictions(flatten_tree_ensemble(model), model, X)
+
+
+def test_xgboost_early_stopped():
+    X, y = get_dataset()
+    model = xgboost.XGBClassifier(n_estimators=200, max_depth=4, early_stopping_rounds=5, n_jobs=1)
+    model.fit(X[:400], y[:400], eval_set=[(X[400:], y[400:])], verbose=False)
+
+    flat_ensemble = flatten_tree_ensemble(model)
+
+    assert flat_ensemble.n_trees == model.best_iteration + 1
+    assert_same_predictions(flat_ensemble, model, X)
+
+
+def test_predict_proba_in_chunks():
+    X, y = get_dataset()
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    flat_ensemble = flatten_tree_ensemble(model)
+
+    np.testing.assert_allclose(flat_ensemble.predict_proba(X, n_jobs=4), flat_ensemble.predict_proba(X, n_jobs=1))
+
+
+def test_other_estimators_are_not_flattened():
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = get_dataset()
+    assert flatten_tree_ensemble(LogisticRegression().fit(X, y)) is None
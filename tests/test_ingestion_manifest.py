@@ -0,0 +1,84 @@
+import os
+
+import pandas as pd
+import pytest
+
+from tourism.components.data_ingestion import DataIngestion
+from tourism.entity.ingestion_manifest import IngestionManifest
+from tourism.utils.s3_operation import ObjectInfo
+
+
+def ingest(manifest: IngestionManifest, object_info: ObjectInfo, n_rows: int):
+    data_frame = pd.DataFrame({"CustomerID": range(n_rows), "Age": [30.0] * n_rows})
+    DataIngestion.append_rows(data_frame.iloc[:-1], manifest.train_file_path)
+    DataIngestion.append_rows(data_frame.iloc[-1:], manifest.test_file_path)
+    manifest.add_partition(object_info, train_rows=n_rows - 1, test_rows=1)
+
+
+@pytest.fixture
+def manifest_paths(tmp_path):
+    return dict(manifest_file_path=str(tmp_path / "manifest.yaml"),
+                train_file_path=str(tmp_path / "train" / "travel.csv"),
+                test_file_path=str(tmp_path / "test" / "travel.csv"))
+
+
+def test_interrupted_append_is_truncated(manifest_paths):
+    manifest = IngestionManifest(**manifest_paths)
+    ingest(manifest, ObjectInfo(key="part-0", etag="a", size=1), n_rows=5)
+    train_file_size = os.path.getsize(manifest.train_file_path)
+    # rows of a partition appended by a run which died before updating the manifest
+    with open(manifest.train_file_path, "a") as train_file:
+        train_file.write("7,31.0\n8,32.0\n")
+
+    manifest = IngestionManifest(**manifest_paths)
+    manifest.recover()
+
+    assert os.path.getsize(manifest.train_file_path) == train_file_size
+    assert len(pd.read_csv(manifest.train_file_path)) == 4
+    new_objects = manifest.get_new_partitions([ObjectInfo(key="part-0", etag="a", size=1),
+                                               ObjectInfo(key="part-1", etag="b", size=1),
+                                               ObjectInfo(key="part-0-rewritten", etag="c", size=1)])
+    assert [object_info.key for object_info in new_objects] == ["part-1", "part-0-rewritten"]
+    assert manifest.get_new_partitions([ObjectInfo(key="part-0", etag="changed", size=1)]) == []
+
+
+def test_missing_split_bytes_are_reported(manifest_paths):
+    manifest = IngestionManifest(**manifest_paths)
+    ingest(manifest, ObjectInfo(key="part-0", etag="a", size=1), n_rows=5)
+    os.truncate(manifest.test_file_path, 3)
+
+    with pytest.raises(Exception, match="remove"):
+        IngestionManifest(**manifest_paths).recover()
+
+
+def test_truncated_manifest_is_recovered(manifest_paths):
+    manifest = IngestionManifest(**manifest_paths)
+    for number in range(3):
+        ingest(manifest, ObjectInfo(key=f"part-{number}", etag=str(number), size=1), n_rows=4)
+    with open(manifest.manifest_file_path, "rb") as manifest_file:
+        content = manifest_file.read()
+    split_files = {}
+    for file_path in (manifest.train_file_path, manifest.test_file_path):
+        with open(file_path, "rb") as split_file:
+            split_files[file_path] = split_file.read()
+
+    for size in range(len(content)):
+        with open(manifest.manifest_file_path, "wb") as manifest_file:
+            manifest_file.write(content[:size])
+        for file_path, split_content in split_files.items():
+            with open(file_path, "wb") as split_file:
+                split_file.write(split_content)
+
+        truncated_manifest = IngestionManifest(**manifest_paths)
+        truncated_manifest.recover()
+
+        # nothing is trusted: the splits are emptied and every partition is ingested again, exactly once
+        assert truncated_manifest.partitions == {}
+        assert os.path.getsize(manifest.train_file_path) == 0
+        assert os.path.getsize(manifest.test_file_path) == 0
+        ingest(truncated_manifest, ObjectInfo(key="part-0", etag="0", size=1), n_rows=4)
+        assert len(pd.read_csv(manifest.train_file_path)) == 3
+
+    with open(manifest.manifest_file_path, "wb") as manifest_file:
+        manifest_file.write(content)
+    assert IngestionManifest(**manifest_paths).partitions == manifest.partitions
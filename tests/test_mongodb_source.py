@@ -0,0 +1,45 @@
+import pytest
+import yaml
+
+from tourism.data_access.mongodb_source import MongoDBSource
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def schema_file_path(tmp_path):
+    file_path = tmp_path / "schema.yaml"
+    file_path.write_text(yaml.safe_dump({"ColumnNames": {"Age": "float", "CityTier": "int", "Gender": "category"}}))
+    return str(file_path)
+
+
+@pytest.fixture
+def client():
+    client = mongomock.MongoClient()
+    client["tourism"]["travel_data"].insert_many(
+        [{"row": row, "Age": row / 2, "CityTier": row % 3, "Gender": "Male" if row % 2 else "Female"}
+         for row in range(20000)])
+    return client
+
+
+@pytest.mark.parametrize("n_partitions", [1, 4, 8])
+def test_read_data_frame_partitions(client, schema_file_path, n_partitions):
+    source = MongoDBSource("tourism", "travel_data", schema_file_path, client=client, batch_size=10,
+                           n_partitions=n_partitions, partition_field="row")
+    data_frame = source.read_data_frame()
+
+    assert list(data_frame.columns) == ["Age", "CityTier", "Gender"]
+    assert len(data_frame) == 20000
+    assert sorted(data_frame["Age"] * 2) == list(range(20000))
+    assert str(data_frame["CityTier"].dtype) == "int64"
+
+
+def test_read_data_frame_missing_int_values(client, schema_file_path):
+    client["tourism"]["travel_data"].insert_one({"row": 20000, "Age": 1.0, "Gender": "Male"})
+    source = MongoDBSource("tourism", "travel_data", schema_file_path, client=client, n_partitions=4,
+                           partition_field="row")
+    data_frame = source.read_data_frame()
+
+    assert len(data_frame) == 20001
+    assert str(data_frame["CityTier"].dtype) == "float64"
+    assert data_frame["CityTier"].isna().sum() == 1
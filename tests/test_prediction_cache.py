@@ -0,0 +1,102 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from tourism.entity.prediction_cache import CachedPredictor, PredictionCache
+from tourism.utils.main_utils import save_object, update_current_pointer
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubPredictor:
+    """
+    Positive probability of Age / 100, records the rows it was asked for.
+    """
+
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+        self.trained_model_object = SimpleNamespace(classes_=np.array([0, 1]))
+        self.batches = []
+
+    def predict_proba(self, X):
+        self.batches.append(len(X))
+        positive = pd.to_numeric(X["Age"]).to_numpy(dtype=float) / 100 + self.offset
+        return np.column_stack([1 - positive, positive])
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2, ttl_seconds=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    metrics = cache.metrics()
+    assert (metrics.hits, metrics.misses, metrics.evictions, metrics.size) == (3, 1, 1, 2)
+
+
+def test_entries_expire_after_ttl_from_their_computation():
+    clock = FakeClock()
+    cache = PredictionCache(ttl_seconds=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 5
+    cache.put("b", 2)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    # a hit does not extend the time to live
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    clock.now = 15
+    assert cache.get("b") is None
+    assert cache.metrics().expirations == 2
+    assert len(cache) == 0
+
+
+def test_cached_predictor_deduplicates_and_canonicalizes_rows():
+    predictor = StubPredictor()
+    cached_predictor = CachedPredictor(predictor=predictor, model_version="v1")
+    X = pd.DataFrame({"Age": [30, 30.0, 40], "Gender": ["Male", "Male", "Female"]})
+
+    expected = predictor.predict_proba(X)
+    predictor.batches.clear()
+    np.testing.assert_allclose(cached_predictor.predict_proba(X), expected)
+    assert predictor.batches == [2]
+
+    # same rows, read as strings and in another column order: all hits
+    X_text = pd.DataFrame({"Gender": ["Female", "Male"], "Age": ["40.0", "30"]})
+    np.testing.assert_allclose(cached_predictor.predict_proba(X_text), expected[[2, 0]])
+    assert predictor.batches == [2]
+    assert cached_predictor.predict(X).tolist() == [0, 0, 0]
+    metrics = cached_predictor.metrics()
+    assert (metrics.batch_duplicates, metrics.misses, metrics.size) == (2, 2, 2)
+
+
+def test_model_push_invalidates_the_cache(tmp_path):
+    pointer_path = str(tmp_path / "current")
+    for version, offset in (("v1", 0.0), ("v2", 0.5)):
+        save_object(os.path.join(tmp_path, version, "model.pkl"), StubPredictor(offset))
+    update_current_pointer(pointer_path, str(tmp_path / "v1"))
+    cached_predictor = CachedPredictor(current_pointer_path=pointer_path)
+    X = pd.DataFrame({"Age": [20]})
+
+    np.testing.assert_allclose(cached_predictor.predict_proba(X)[:, 1], [0.2])
+    np.testing.assert_allclose(cached_predictor.predict_proba(X)[:, 1], [0.2])
+    update_current_pointer(pointer_path, str(tmp_path / "v2"))
+
+    np.testing.assert_allclose(cached_predictor.predict_proba(X)[:, 1], [0.7])
+    assert cached_predictor.model_version == "v2"
+    assert cached_predictor.metrics().invalidations == 2
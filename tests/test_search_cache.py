@@ -0,0 +1,41 @@
+import math
+
+import pytest
+
+from tourism.entity.search_cache import SearchResultCache
+
+ESTIMATOR = "sklearn.ensemble._forest.RandomForestClassifier"
+CV_SPEC = '{"scoring": "accuracy", "splits": "StratifiedKFold(n_splits=3)"}'
+
+
+@pytest.fixture
+def search_cache(tmp_path):
+    return SearchResultCache(str(tmp_path / "search_cache.db"))
+
+
+def test_put_get_many(search_cache):
+    search_cache.put(ESTIMATOR, {"max_depth": 4}, CV_SPEC, "data", fold_scores=[0.5, 1.0], fit_seconds=1.5)
+
+    cached = search_cache.get_many(ESTIMATOR, [{"max_depth": 8}, {"max_depth": 4}], CV_SPEC, "data")
+
+    assert list(cached) == [1]
+    assert cached[1].mean_score == 0.75
+    assert search_cache.get(ESTIMATOR, {"max_depth": 4}, CV_SPEC, "other data") is None
+    assert search_cache.get(ESTIMATOR, {"max_depth": 4}, "other cv", "data") is None
+
+
+@pytest.mark.parametrize("fold_scores", [[0.5, math.nan], [math.inf, 0.5], []])
+def test_non_finite_scores_are_not_cached(search_cache, fold_scores):
+    with pytest.raises(Exception):
+        search_cache.put(ESTIMATOR, {"max_depth": 4}, CV_SPEC, "data", fold_scores=fold_scores)
+
+    assert len(search_cache) == 0
+
+
+def test_query_best_first(search_cache):
+    for max_depth, score in ((2, 0.6), (4, 0.9), (8, 0.7)):
+        search_cache.put(ESTIMATOR, {"max_depth": max_depth}, CV_SPEC, "data", fold_scores=[score])
+
+    results = search_cache.query(estimator="RandomForest", min_score=0.65)
+
+    assert [result.mean_score for result in results] == [0.9, 0.7]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from tourism.entity.threshold_tuning import (choose_operating_point, get_operating_point, threshold_sweep,
+                                             tune_threshold)
+
+
+def brute_force_sweep(target_feature, scores):
+    """
+    One prediction per distinct score, highest threshold first.
+    """
+    rows = []
+    for threshold in np.unique(scores)[::-1]:
+        predicted = (scores >= threshold).astype(int)
+        rows.append((threshold, precision_score(target_feature, predicted, zero_division=0),
+                     recall_score(target_feature, predicted, zero_division=0),
+                     f1_score(target_feature, predicted, zero_division=0),
+                     accuracy_score(target_feature, predicted)))
+    return np.array(rows)
+
+
+@pytest.mark.parametrize("decimals", [None, 1, 2])
+def test_threshold_sweep_matches_brute_force(decimals):
+    random = np.random.default_rng(0)
+    target_feature = (random.random(300) < 0.2).astype(int)
+    scores = np.clip(0.35 * target_feature + random.normal(0.3, 0.2, 300), 0, 1)
+    if decimals is not None:
+        # runs of equal scores
+        scores = scores.round(decimals)
+
+    sweep = threshold_sweep(target_feature, scores)
+
+    expected = brute_force_sweep(target_feature, scores)
+    np.testing.assert_allclose(np.column_stack(sweep), expected)
+
+
+def test_chosen_operating_point_matches_brute_force():
+    random = np.random.default_rng(1)
+    target_feature = (random.random(400) < 0.3).astype(int)
+    scores = np.clip(0.3 * target_feature + random.normal(0.35, 0.2, 400), 0, 1).round(2)
+    sweep = threshold_sweep(target_feature, scores)
+    expected = brute_force_sweep(target_feature, scores)
+
+    for metric, column in (("f1", 3), ("accuracy", 4), ("recall", 2)):
+        operating_point = choose_operating_point(sweep, metric=metric, min_precision=0.5)
+        allowed = expected[:, 1] >= 0.5
+        best = expected[allowed][np.argmax(expected[allowed, column])]
+        assert operating_point.threshold == best[0]
+        assert operating_point == get_operating_point(target_feature, scores, operating_point.threshold)
+
+    assert choose_operating_point(sweep, min_precision=1.01) is None
+
+
+def test_tune_threshold_default_point_and_fallback():
+    random = np.random.default_rng(2)
+    target_feature = (random.random(300) < 0.25).astype(int)
+    scores = np.clip(0.4 * target_feature + random.normal(0.3, 0.15, 300), 0, 1)
+
+    operating_point, calibration_map, default_point = tune_threshold(target_feature, scores)
+    assert calibration_map is None
+    np.testing.assert_allclose(default_point, get_operating_point(target_feature, scores, 0.5))
+    assert operating_point.f1 >= default_point.f1
+
+    operating_point, _, default_point = tune_threshold(target_feature, scores, min_precision=1.01)
+    assert operating_point == default_point
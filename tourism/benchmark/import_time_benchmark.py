@@ -0,0 +1,94 @@
+"""
+Cold start import-time benchmark for the tourism entry points.
+
+Every entry point is imported in a fresh interpreter with `python -X importtime`,
+the cumulative import time is compared against IMPORT_TIME_BUDGET_MS and the set of
+loaded modules is checked against HEAVY_MODULES, which must only be imported when a
+stage actually runs.
+
+usage: python -m tourism.benchmark.import_time_benchmark --repeat 5
+exit status is 1 when an entry point is over budget or pulls in a heavy module.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from typing import List
+
+import tourism
+
+# cumulative import time budget per entry point, in milliseconds
+IMPORT_TIME_BUDGET_MS = {
+    "tourism.logger": 80,
+    "tourism.configuration.configuration_file": 150,
+    "tourism.pipeline.training_pipeline": 200,
+    # prediction workers unpickle TourismPredictor from this module
+    "tourism.components.model_trainer": 200,
+}
+
+HEAVY_MODULES = ["pandas", "numpy", "sklearn", "evidently", "imblearn", "xgboost", "boto3", "dill"]
+
+ImportTimeResult = namedtuple("ImportTimeResult", ["module", "cumulative_ms", "budget_ms", "heavy_modules",
+                                                   "is_within_budget"])
+
+# a plain import statement: importlib.import_module() is not reported by -X importtime
+_PROBE = ("import {module}; import json, sys; "
+          "print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))")
+
+
+def _parse_cumulative_us(importtime_output: str, module: str) -> int:
+    """
+    -X importtime lines look like: `import time:   self [us] | cumulative | imported package`
+    """
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])
+    raise Exception(f"Module [{module}] not found in -X importtime output")
+
+
+def measure_import_time(module: str, repeat: int = 3) -> ImportTimeResult:
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(tourism.__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [project_root, os.environ.get("PYTHONPATH")])))
+
+    timings = []
+    heavy_modules = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                                    _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                   capture_output=True, text=True, env=env, cwd=project_root, check=True)
+        timings.append(_parse_cumulative_us(completed.stderr, module))
+        heavy_modules = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    cumulative_ms = min(timings) / 1000
+    budget_ms = IMPORT_TIME_BUDGET_MS[module]
+    return ImportTimeResult(module=module, cumulative_ms=cumulative_ms, budget_ms=budget_ms,
+                            heavy_modules=heavy_modules,
+                            is_within_budget=cumulative_ms <= budget_ms and not heavy_modules)
+
+
+def run(modules: List[str], repeat: int) -> List[ImportTimeResult]:
+    return [measure_import_time(module, repeat=repeat) for module in modules]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per entry point, best is kept")
+    parser.add_argument("--module", action="append", choices=sorted(IMPORT_TIME_BUDGET_MS),
+                        help="entry point to measure, defaults to all of them")
+    args = parser.parse_args()
+
+    results = run(args.module or list(IMPORT_TIME_BUDGET_MS), repeat=args.repeat)
+    for result in results:
+        print(json.dumps(result._asdict()))
+
+    if not all(result.is_within_budget for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
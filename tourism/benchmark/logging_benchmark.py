@@ -0,0 +1,112 @@
+"""
+Measures the time the training loop spends inside logging calls.
+
+sync  : logging.FileHandler with the old `^;` separated text format and eager f-strings
+async : SnapshotQueueHandler + QueueListener writing JSON lines, %s arguments formatted by the logging call
+
+usage: python -m tourism.benchmark.logging_benchmark --iterations 20000
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+from collections import namedtuple
+from typing import Optional
+
+from tourism.logger import SnapshotQueueHandler, JsonLineFormatter
+
+SYNC_LOG_FORMAT = '[%(asctime)s]^;%(levelname)s^;%(lineno)d^;%(filename)s^;%(funcName)s()^;%(message)s'
+
+# shaped like the artifacts/configs the components log on every step
+FakeArtifact = namedtuple("FakeArtifact", ["model_serial_number", "model", "best_model", "best_parameters",
+                                           "best_score"])
+
+
+def _fake_artifact(index: int) -> FakeArtifact:
+    best_parameters = {f"param_{i}": i * index for i in range(50)}
+    return FakeArtifact(model_serial_number=f"module_{index % 2}", model="RandomForestClassifier()",
+                        best_model="RandomForestClassifier(max_depth=5)", best_parameters=best_parameters,
+                        best_score=index / 1000)
+
+
+def _training_loop(logger: Optional[logging.Logger], iterations: int, lazy: bool) -> float:
+    artifact = _fake_artifact(1)
+    start = time.perf_counter()
+    for index in range(iterations):
+        # stand-in for a small piece of real work between two log lines
+        sum(i * i for i in range(100))
+        if logger is None:
+            continue
+        if lazy:
+            logger.info("Grid searched model: %s", artifact)
+        else:
+            logger.info(f"Grid searched model: {artifact}")
+    return time.perf_counter() - start
+
+
+def run_baseline(iterations: int) -> dict:
+    loop_time = _training_loop(None, iterations, lazy=False)
+    return {"mode": "no_logging", "loop_seconds": loop_time, "drain_seconds": 0.0}
+
+
+def run_sync(log_file_path: str, iterations: int) -> dict:
+    logger = logging.getLogger("benchmark.sync")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(log_file_path, mode="w")
+    handler.setFormatter(logging.Formatter(SYNC_LOG_FORMAT))
+    logger.addHandler(handler)
+    try:
+        loop_time = _training_loop(logger, iterations, lazy=False)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    return {"mode": "sync", "loop_seconds": loop_time, "drain_seconds": 0.0}
+
+
+def run_async(log_file_path: str, iterations: int) -> dict:
+    logger = logging.getLogger("benchmark.async")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    log_queue = queue.SimpleQueue()
+    file_handler = logging.FileHandler(log_file_path, mode="w")
+    file_handler.setFormatter(JsonLineFormatter())
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    queue_handler = SnapshotQueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        loop_time = _training_loop(logger, iterations, lazy=True)
+    finally:
+        drain_start = time.perf_counter()
+        listener.stop()
+        drain_time = time.perf_counter() - drain_start
+        logger.removeHandler(queue_handler)
+        file_handler.close()
+    return {"mode": "async", "loop_seconds": loop_time, "drain_seconds": drain_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = [run_baseline(args.iterations),
+                   run_sync(os.path.join(tmp_dir, "sync.log"), args.iterations),
+                   run_async(os.path.join(tmp_dir, "async.log"), args.iterations)]
+
+    baseline_seconds = results[0]["loop_seconds"]
+    for result in results:
+        result["iterations"] = args.iterations
+        result["us_per_iteration"] = result["loop_seconds"] / args.iterations * 1e6
+        result["logging_overhead_us_per_iteration"] = (result["loop_seconds"] - baseline_seconds) / args.iterations * 1e6
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
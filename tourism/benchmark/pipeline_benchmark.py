@@ -0,0 +1,250 @@
+"""
+Wall time, CPU time and memory of every training pipeline stage at scaled synthetic data sizes.
+
+Data is generated by SyntheticDataGenerator from config/schema.yaml, with the distributions of
+--seed-file when given, scale 1 is the size of notebooks/Travel_Data.csv. Each stage runs on the output of the previous one in a temporary
+artifact dir, so the numbers follow the data volume the pipeline really sees at that scale
+(e.g. SMOTEENN resampling feeds the search). Peak memory is the tracemalloc peak of the stage
+(numpy buffers included), rss_max_bytes is the process high-water mark after the stage.
+
+Results are JSON lines (one per stage and scale). With --baseline each result is compared to the
+baseline entry of the same stage and scale and the run exits 1 when a stage is slower or uses more
+memory than --tolerance allows.
+
+usage: python -m tourism.benchmark.pipeline_benchmark --scales 1 10 100 --output bench.jsonl
+       python -m tourism.benchmark.pipeline_benchmark --scales 1 10 --baseline bench.jsonl
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List
+
+from tourism.constant.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN_KEY
+from tourism.utils.data_generator import SyntheticDataGenerator
+from tourism.utils.main_utils import read_yaml_file
+
+# rows of notebooks/Travel_Data.csv
+BASE_ROWS = 4888
+
+# compared against the baseline, the other fields are informative
+COMPARED_METRICS = ["wall_seconds", "peak_memory_bytes"]
+
+STAGES = ["split_data_as_train_test", "load_data", "data_drift", "data_transformation", "get_best_model",
+          "evaluate_classification_model", "tourism_predictor_predict"]
+
+
+def measure(stage: str, scale: int, rows: int, function: Callable, trace_memory: bool = True):
+    """
+    return: (result of function, benchmark record)
+    """
+    if trace_memory:
+        tracemalloc.start()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        result = function()
+    finally:
+        wall_seconds = time.perf_counter() - start
+        cpu_seconds = time.process_time() - cpu_start
+        peak_memory_bytes = None
+        if trace_memory:
+            peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    record = {"stage": stage, "scale": scale, "rows": rows, "wall_seconds": wall_seconds, "cpu_seconds": cpu_seconds,
+              "peak_memory_bytes": peak_memory_bytes,
+              # ru_maxrss is KiB on linux
+              "rss_max_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    return result, record
+
+
+def benchmark_scale(scale: int, schema_file_path: str, model_config_path: str, work_dir: str,
+                    stages: List[str], trace_memory: bool = True, seed_file_path: str = None,
+                    n_jobs: int = 1) -> List[dict]:
+    """
+    Runs the pipeline stages in order on scale x BASE_ROWS synthetic rows.
+    A failing stage is recorded with its error and ends the run of this scale.
+    """
+    from tourism.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig
+    from tourism.entity.artifact_entity import DataValidationArtifact
+
+    schema = read_yaml_file(schema_file_path)
+    rows = scale * BASE_ROWS
+    raw_data_dir = os.path.join(work_dir, "raw_data")
+    os.makedirs(raw_data_dir, exist_ok=True)
+    generator = SyntheticDataGenerator(schema_file_path=schema_file_path)
+    if seed_file_path is not None:
+        generator.fit(seed_file_path)
+    generator.write(os.path.join(raw_data_dir, "travel_data.csv"), n_rows=rows, n_jobs=n_jobs)
+
+    records = []
+    state = {}
+
+    def split_data_as_train_test():
+        from tourism.components.data_ingestion import DataIngestion
+
+        data_ingestion_config = DataIngestionConfig(bucket_name=None, object_name=None,
+                                                    local_file_name="travel_data.csv",
+                                                    raw_data_dir=raw_data_dir,
+                                                    ingested_train_dir=os.path.join(work_dir, "ingested", "train"),
+                                                    ingested_test_dir=os.path.join(work_dir, "ingested", "test"),
+                                                    object_prefix=None, incremental_dir=None,
+                                                    manifest_file_path=None, download_workers=1, test_size=0.2,
+                                                    source="s3", mongodb_config=None,
+                                                    dataset_version_config=None)
+        state["data_ingestion_artifact"] = DataIngestion(data_ingestion_config).split_data_as_train_test()
+
+    def load_data():
+        from tourism.utils.main_utils import load_data as load_data_frame
+
+        return load_data_frame(file_path=state["data_ingestion_artifact"].train_file_path,
+                               schema_file_path=schema_file_path)
+
+    def data_drift():
+        from tourism.components.data_validation import DataValidation
+
+        data_validation_config = DataValidationConfig(
+            schema_file_path=schema_file_path,
+            report_file_path=os.path.join(work_dir, "data_validation", "report.json"),
+            report_page_file_path=os.path.join(work_dir, "data_validation", "report.html"))
+        data_validation = DataValidation(data_validation_config=data_validation_config,
+                                         data_ingestion_artifact=state["data_ingestion_artifact"])
+        data_validation.validate_dataset_schema()
+        return data_validation.is_data_drift_found()
+
+    def data_transformation():
+        from tourism.components.data_transformation import DataTransformation
+
+        data_transformation_config = DataTransformationConfig(
+            transformed_train_dir=os.path.join(work_dir, "transformed", "train"),
+            transformed_test_dir=os.path.join(work_dir, "transformed", "test"),
+            preprocessed_object_file_path=os.path.join(work_dir, "preprocessed", "preprocessor.pkl"))
+        data_validation_artifact = DataValidationArtifact(schema_file_path=schema_file_path, report_file_path=None,
+                                                          report_page_file_path=None, is_validated=True,
+                                                          message=None, is_drift_found=False)
+        state["data_transformation_artifact"] = DataTransformation(
+            data_transformation_config=data_transformation_config,
+            data_ingestion_artifact=state["data_ingestion_artifact"],
+            data_validation_artifact=data_validation_artifact).initiate_data_transformation()
+
+    def get_best_model():
+        from tourism.entity.model_factory import ModelFactory
+        from tourism.utils.main_utils import load_numpy_array_data
+
+        train_array = load_numpy_array_data(state["data_transformation_artifact"].transformed_train_file_path)
+        test_array = load_numpy_array_data(state["data_transformation_artifact"].transformed_test_file_path)
+        state["arrays"] = train_array[:, :-1], train_array[:, -1], test_array[:, :-1], test_array[:, -1]
+        # no warm start, fold or search cache: every run measures the full search
+        model_factory = ModelFactory(model_config_path=model_config_path)
+        # generic synthetic data carries no signal, any score is accepted
+        state["best_model"] = model_factory.get_best_model(X=state["arrays"][0], y=state["arrays"][1],
+                                                           base_accuracy=0.0)
+        state["model_list"] = [model.best_model for model in model_factory.grid_searched_best_model_list]
+
+    def evaluate_classification_model():
+        from tourism.entity.model_factory import evaluate_classification_model as evaluate
+
+        x_train, y_train, x_test, y_test = state["arrays"]
+        return evaluate(model_list=state["model_list"], X_train=x_train, y_train=y_train, X_test=x_test,
+                        y_test=y_test, base_accuracy=0.0)
+
+    def tourism_predictor_predict():
+        import pandas as pd
+        from tourism.components.model_trainer import TourismPredictor
+        from tourism.utils.main_utils import load_object
+
+        tourism_predictor = TourismPredictor(
+            preprocessing_object=load_object(state["data_transformation_artifact"].preprocessed_object_file_path),
+            trained_model_object=state["best_model"].best_model)
+        test_df = pd.read_csv(state["data_ingestion_artifact"].test_file_path)
+        return tourism_predictor.predict(test_df.drop(columns=[schema[TARGET_COLUMN_KEY]]))
+
+    stage_functions = {"split_data_as_train_test": split_data_as_train_test, "load_data": load_data,
+                       "data_drift": data_drift, "data_transformation": data_transformation,
+                       "get_best_model": get_best_model, "evaluate_classification_model": evaluate_classification_model,
+                       "tourism_predictor_predict": tourism_predictor_predict}
+    # later stages need the artifacts of the earlier ones
+    required = max(STAGES.index(stage) for stage in stages)
+    for stage in STAGES[:required + 1]:
+        try:
+            _, record = measure(stage, scale, rows, stage_functions[stage], trace_memory=trace_memory)
+        except Exception as e:
+            records.append({"stage": stage, "scale": scale, "rows": rows,
+                            "error": str(e).strip().splitlines()[-1]})
+            break
+        if stage in stages:
+            records.append(record)
+    return records
+
+
+def read_results(file_path: str) -> List[dict]:
+    with open(file_path) as result_file:
+        return [json.loads(line) for line in result_file if line.strip()]
+
+
+def compare_with_baseline(results: List[dict], baseline: List[dict], tolerance: float) -> List[dict]:
+    """
+    return: one entry per metric exceeding baseline * (1 + tolerance), stages missing from the baseline are skipped
+    """
+    baseline_records = {(record["stage"], record["scale"]): record for record in baseline if "error" not in record}
+    regressions = []
+    for record in results:
+        baseline_record = baseline_records.get((record["stage"], record["scale"]))
+        if baseline_record is None or "error" in record:
+            continue
+        for metric in COMPARED_METRICS:
+            value, baseline_value = record.get(metric), baseline_record.get(metric)
+            if value is None or not baseline_value:
+                continue
+            if value > baseline_value * (1 + tolerance):
+                regressions.append({"stage": record["stage"], "scale": record["scale"], "metric": metric,
+                                    "value": value, "baseline": baseline_value, "ratio": value / baseline_value})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10],
+                        help=f"multiples of {BASE_ROWS} rows, e.g. 1 10 100 1000")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--schema", default=SCHEMA_FILE_PATH)
+    parser.add_argument("--model-config", default=os.path.join("config", "model.yaml"))
+    parser.add_argument("--seed-file", help="csv the synthetic distributions are learnt from, "
+                                            "e.g. notebooks/Travel_Data.csv")
+    parser.add_argument("--jobs", type=int, default=1, help="processes generating the synthetic data")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="skip tracemalloc, it slows down allocation heavy stages")
+    parser.add_argument("--output", help="optional JSON lines output file, usable as a later --baseline")
+    parser.add_argument("--baseline", help="JSON lines file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative increase over the baseline")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as work_dir:
+            scale_results = benchmark_scale(scale, schema_file_path=args.schema,
+                                            model_config_path=args.model_config, work_dir=work_dir,
+                                            stages=args.stages, trace_memory=not args.no_trace_memory,
+                                            seed_file_path=args.seed_file, n_jobs=args.jobs)
+        for result in scale_results:
+            print(json.dumps(result))
+        results.extend(scale_results)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write("\n".join(json.dumps(result) for result in results) + "\n")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, read_results(args.baseline), tolerance=args.tolerance)
+        for regression in regressions:
+            print(json.dumps({"regression": regression}))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Timing comparison of the boosted candidates search: plain GridSearchCV over the model.yaml grid
+(every round count trained as a separate full fit) against ModelFactory's early stopping search
+(one fit per combination and fold covering every round count, histogram tree method).
+
+usage: python -m tourism.benchmark.search_benchmark --rows 5000 --features 30
+"""
+import argparse
+import json
+import os
+import time
+
+from tourism.entity.model_factory import ModelFactory
+
+
+def _boosted_models(model_factory: ModelFactory):
+    for initialized_model in model_factory.get_initialized_model_list():
+        if initialized_model.early_stopping_config and hasattr(initialized_model.model, "get_booster"):
+            yield initialized_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-config", default=os.path.join("config", "model.yaml"))
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--features", type=int, default=30)
+    args = parser.parse_args()
+
+    from sklearn.datasets import make_classification
+
+    x, y = make_classification(n_samples=args.rows, n_features=args.features, weights=[0.8, 0.2], random_state=42)
+    model_factory = ModelFactory(model_config_path=args.model_config)
+
+    for initialized_model in _boosted_models(model_factory):
+        start = time.perf_counter()
+        grid_searched = model_factory.execute_grid_search_operation(initialized_model, x, y)
+        grid_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        early_stopped = model_factory.execute_early_stopping_search_operation(initialized_model, x, y)
+        early_stopping_seconds = time.perf_counter() - start
+
+        print(json.dumps({
+            "model": initialized_model.model_name,
+            "grid_search_seconds": grid_seconds,
+            "grid_search_best_score": float(grid_searched.best_score),
+            "grid_search_best_parameters": grid_searched.best_parameters,
+            "early_stopping_seconds": early_stopping_seconds,
+            "early_stopping_best_score": float(early_stopped.best_score),
+            "early_stopping_best_parameters": early_stopped.best_parameters,
+            "speedup": grid_seconds / early_stopping_seconds,
+        }, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Save time, load time and file size of every serialization format for each model in model.yaml.
+
+Each estimator is initialized from its `params` block, fitted on a synthetic dataset shaped
+like the transformed training array and saved with save_object() in every applicable format.
+Load time is our serving cold start, it is measured with the mmap setting of the serving loads (mmap_mode="r").
+
+usage: python -m tourism.benchmark.serialization_benchmark --rows 20000 --features 30
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from tourism.entity.model_factory import ModelFactory
+from tourism.utils.main_utils import save_object, load_object
+from tourism.utils.serialization import DILL_FORMAT, JOBLIB_FORMAT, XGBOOST_FORMAT, is_xgboost_model
+
+# (serialization_format, compress) pairs measured for every model
+FORMAT_VARIANTS = [(DILL_FORMAT, 0), (JOBLIB_FORMAT, 0), (JOBLIB_FORMAT, 3), (JOBLIB_FORMAT, ("lz4", 3)),
+                   (XGBOOST_FORMAT, 0), (XGBOOST_FORMAT, 3)]
+
+
+def _fitted_models(model_config_path: str, rows: int, features: int):
+    from sklearn.datasets import make_classification
+
+    x, y = make_classification(n_samples=rows, n_features=features, weights=[0.8, 0.2], random_state=42)
+    model_factory = ModelFactory(model_config_path=model_config_path)
+    for initialized_model in model_factory.get_initialized_model_list():
+        model = initialized_model.model
+        model.fit(x, y)
+        yield initialized_model.model_name, model
+
+
+def benchmark_model(model_name: str, model, tmp_dir: str, repeat: int) -> list:
+    results = []
+    for serialization_format, compress in FORMAT_VARIANTS:
+        if serialization_format == XGBOOST_FORMAT and not is_xgboost_model(model):
+            continue
+        file_path = os.path.join(tmp_dir, f"{serialization_format}_{compress}.pkl")
+        try:
+            save_seconds = []
+            load_seconds = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                save_object(file_path=file_path, obj=model, serialization_format=serialization_format,
+                            compress=compress)
+                save_seconds.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                load_object(file_path=file_path, mmap_mode="r")
+                load_seconds.append(time.perf_counter() - start)
+        except Exception as e:
+            # e.g. lz4 not installed
+            results.append({"model": model_name, "format": serialization_format, "compress": str(compress),
+                            "error": str(e).strip().splitlines()[-1]})
+            continue
+        results.append({"model": model_name, "format": serialization_format, "compress": str(compress),
+                        "save_seconds": min(save_seconds), "load_seconds": min(load_seconds),
+                        "file_size_bytes": os.path.getsize(file_path)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-config", default=os.path.join("config", "model.yaml"))
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--features", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="optional JSON lines output file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for model_name, model in _fitted_models(args.model_config, rows=args.rows, features=args.features):
+            results.extend(benchmark_model(model_name, model, tmp_dir=tmp_dir, repeat=args.repeat))
+
+    lines = [json.dumps(result) for result in results]
+    print("\n".join(lines))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
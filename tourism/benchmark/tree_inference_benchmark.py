@@ -0,0 +1,79 @@
+"""
+Inference latency and throughput of the fitted tree ensembles against their FlatTreeEnsemble.
+
+Each tree ensemble of model.yaml is initialized from its `params` block, fitted on a synthetic dataset shaped
+like the transformed training array and flattened. Both engines predict_proba batches of every size with every
+thread count (n_jobs of the estimator, threads splitting the batch for the flat engine); the flat engine is
+first checked to predict the same labels.
+
+usage: python -m tourism.benchmark.tree_inference_benchmark --batch-sizes 1 100 10000 --threads 1 4
+"""
+import argparse
+import json
+import os
+import time
+
+from tourism.benchmark.serialization_benchmark import _fitted_models
+from tourism.entity.flat_ensemble import flatten_tree_ensemble, verify_flat_ensemble
+
+
+def _time_batch(predict_proba, batch, repeat: int) -> float:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict_proba(batch)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def benchmark_model(model_name: str, model, x, batch_sizes: list, threads: list, repeat: int) -> list:
+    flat_ensemble = flatten_tree_ensemble(model)
+    if flat_ensemble is None:
+        return []
+    results = []
+    is_matching = verify_flat_ensemble(flat_ensemble, model, x)
+    for n_jobs in threads:
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=n_jobs)
+        engines = {"estimator": model.predict_proba,
+                   "flat": lambda batch: flat_ensemble.predict_proba(batch, n_jobs=n_jobs)}
+        for batch_size in batch_sizes:
+            batch = x[:batch_size]
+            for engine, predict_proba in engines.items():
+                seconds = _time_batch(predict_proba, batch, repeat=repeat)
+                results.append({"model": model_name, "engine": engine, "batch_size": len(batch),
+                                "threads": n_jobs, "latency_ms": seconds * 1000,
+                                "rows_per_second": len(batch) / seconds if seconds else None,
+                                "n_trees": flat_ensemble.n_trees, "predictions_match": is_matching})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-config", default=os.path.join("config", "model.yaml"))
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--features", type=int, default=30)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="optional JSON lines output file")
+    args = parser.parse_args()
+
+    from sklearn.datasets import make_classification
+
+    # rows the models were not fitted on
+    x, _ = make_classification(n_samples=max(args.batch_sizes), n_features=args.features, random_state=7)
+    results = []
+    for model_name, model in _fitted_models(args.model_config, rows=args.rows, features=args.features):
+        results.extend(benchmark_model(model_name, model, x, batch_sizes=args.batch_sizes, threads=args.threads,
+                                       repeat=args.repeat))
+
+    lines = [json.dumps(result) for result in results]
+    print("\n".join(lines))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
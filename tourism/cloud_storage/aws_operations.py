@@ -0,0 +1,277 @@
+"""
+Artifact sync between the local artifact / saved_models dirs and S3.
+
+Files are stored content addressed (<prefix>/objects/<sha256>): a file already uploaded by any run or node,
+e.g. an unchanged schema or preprocessor, is never uploaded twice. Every synced directory gets a manifest
+(<prefix>/manifests/<relative dir>.json, relative file path -> sha256 and size) written after its objects,
+so a manifest only references complete uploads. Pointers such as saved_models/current are stored as small
+objects holding the relative directory they point to.
+
+Other nodes pull lazily: LazyArtifactDir reads the manifest and downloads a file on its first access only,
+files already present locally with the same sha256 are not downloaded again (hashes are cached per size and
+mtime, a file is not hashed again until it changes).
+
+ArtifactSyncService runs the uploads in a background thread so the pipeline never waits for S3; the
+pipeline only flushes it (with a timeout) when the run ends. Throughput is tuned with max_workers (files
+in flight) and the multipart settings of S3ObjectStore. A file://<dir> bucket name syncs to a local
+directory (LocalObjectStore), for tests and single host setups.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import Dict, List, Optional
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.utils.main_utils import resolve_current_pointer
+
+SyncResult = namedtuple("SyncResult", ["relative_dir", "files", "uploaded", "skipped", "uploaded_bytes", "seconds"])
+
+# written next to their target by the atomic save helpers, never complete files
+TEMPORARY_FILE_MARKER = ".tmp-"
+
+
+def get_file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as artifact_file:
+        for block in iter(lambda: artifact_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactSync:
+
+    def __init__(self, object_store, prefix: str, local_root: str, max_workers: int = 8):
+        """
+        object_store: S3ObjectStore or LocalObjectStore (tourism.utils.s3_operation.get_object_store)
+        prefix: key prefix of this project / namespace in the bucket
+        local_root: directory the synced paths are relative to, the same on every node
+        max_workers: files hashed and transferred in parallel
+        """
+        self.object_store = object_store
+        self.prefix = prefix.strip("/")
+        self.local_root = os.path.abspath(local_root)
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="artifact-sync")
+        # (path, size, mtime) -> sha256 and hashes known to be uploaded, both saving work on repeated syncs
+        self._hash_cache: Dict[tuple, str] = {}
+        self._uploaded_hashes = set()
+        self._lock = threading.Lock()
+
+    def get_relative_path(self, local_path: str) -> str:
+        relative_path = os.path.relpath(os.path.abspath(local_path), self.local_root)
+        if relative_path.startswith(os.pardir):
+            raise Exception(f"[{local_path}] is outside of the synced root [{self.local_root}]")
+        return relative_path.replace(os.sep, "/")
+
+    def get_local_path(self, relative_path: str) -> str:
+        return os.path.join(self.local_root, *relative_path.split("/"))
+
+    def get_object_key(self, sha256: str) -> str:
+        return f"{self.prefix}/objects/{sha256[:2]}/{sha256}"
+
+    def get_manifest_key(self, relative_dir: str) -> str:
+        return f"{self.prefix}/manifests/{relative_dir}.json"
+
+    def get_pointer_key(self, relative_pointer_path: str) -> str:
+        return f"{self.prefix}/pointers/{relative_pointer_path}"
+
+    @staticmethod
+    def _get_hash_cache_key(file_path: str) -> tuple:
+        stat = os.stat(file_path)
+        return file_path, stat.st_size, stat.st_mtime_ns
+
+    def _get_hash(self, file_path: str) -> str:
+        cache_key = self._get_hash_cache_key(file_path)
+        sha256 = self._hash_cache.get(cache_key)
+        if sha256 is None:
+            sha256 = get_file_sha256(file_path)
+            self._hash_cache[cache_key] = sha256
+        return sha256
+
+    def _push_file(self, file_path: str):
+        """
+        return: (sha256, size, uploaded)
+        """
+        sha256, size = self._get_hash(file_path), os.path.getsize(file_path)
+        with self._lock:
+            if sha256 in self._uploaded_hashes:
+                return sha256, size, False
+        object_key = self.get_object_key(sha256)
+        uploaded = not self.object_store.exists(object_key)
+        if uploaded:
+            self.object_store.upload(file_path, object_key)
+        with self._lock:
+            self._uploaded_hashes.add(sha256)
+        return sha256, size, uploaded
+
+    def push_dir(self, local_dir: str) -> SyncResult:
+        try:
+            start = time.perf_counter()
+            relative_dir = self.get_relative_path(local_dir)
+            file_paths = sorted(os.path.join(dir_path, file_name)
+                                for dir_path, _, file_names in os.walk(local_dir) for file_name in file_names
+                                if TEMPORARY_FILE_MARKER not in file_name)
+            results = list(self._executor.map(self._push_file, file_paths))
+
+            files = {os.path.relpath(file_path, local_dir).replace(os.sep, "/"): {"sha256": sha256, "size": size}
+                     for file_path, (sha256, size, _) in zip(file_paths, results)}
+            # the manifest goes last: readers never see files that are not uploaded yet
+            self.object_store.put_bytes(self.get_manifest_key(relative_dir),
+                                        json.dumps({"files": files}, sort_keys=True).encode())
+            sync_result = SyncResult(relative_dir=relative_dir, files=len(files),
+                                     uploaded=sum(uploaded for _, _, uploaded in results),
+                                     skipped=sum(not uploaded for _, _, uploaded in results),
+                                     uploaded_bytes=sum(size for _, size, uploaded in results if uploaded),
+                                     seconds=time.perf_counter() - start)
+            logging.info("Artifact sync: %s", sync_result)
+            return sync_result
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def push_pointer(self, pointer_path: str):
+        try:
+            target_dir = resolve_current_pointer(pointer_path)
+            if target_dir is None:
+                return
+            self.object_store.put_bytes(self.get_pointer_key(self.get_relative_path(pointer_path)),
+                                        self.get_relative_path(target_dir).encode())
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def resolve_pointer(self, relative_pointer_path: str) -> Optional[str]:
+        """
+        return: relative dir the remote pointer targets, None when it was never pushed
+        """
+        target = self.object_store.get_bytes(self.get_pointer_key(relative_pointer_path))
+        return None if target is None else target.decode()
+
+    def get_manifest(self, relative_dir: str) -> Optional[dict]:
+        manifest = self.object_store.get_bytes(self.get_manifest_key(relative_dir))
+        return None if manifest is None else json.loads(manifest)["files"]
+
+    def _pull_file(self, relative_dir: str, file_name: str, file_info: dict) -> str:
+        local_path = self.get_local_path(f"{relative_dir}/{file_name}")
+        # a stale or corrupted local copy of the same size is downloaded again
+        if (os.path.exists(local_path) and os.path.getsize(local_path) == file_info["size"]
+                and self._get_hash(local_path) == file_info["sha256"]):
+            return local_path
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        tmp_file_path = f"{local_path}{TEMPORARY_FILE_MARKER}{os.getpid()}-{threading.get_ident()}"
+        self.object_store.download(self.get_object_key(file_info["sha256"]), tmp_file_path)
+        if get_file_sha256(tmp_file_path) != file_info["sha256"]:
+            os.remove(tmp_file_path)
+            raise Exception(f"Checksum mismatch pulling [{relative_dir}/{file_name}]")
+        os.replace(tmp_file_path, local_path)
+        self._hash_cache[self._get_hash_cache_key(local_path)] = file_info["sha256"]
+        return local_path
+
+    def pull(self, relative_dir: str, file_names: List[str] = None) -> List[str]:
+        """
+        Downloads the given files (all files when None) of a synced dir that are missing locally.
+        return: local paths
+        """
+        try:
+            manifest = self.get_manifest(relative_dir)
+            if manifest is None:
+                raise Exception(f"[{relative_dir}] was never synced")
+            file_names = sorted(manifest) if file_names is None else file_names
+            return list(self._executor.map(lambda file_name: self._pull_file(relative_dir, file_name,
+                                                                             manifest[file_name]), file_names))
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def open_lazy(self, relative_dir: str) -> "LazyArtifactDir":
+        return LazyArtifactDir(self, relative_dir)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class LazyArtifactDir:
+    """
+    A synced directory whose files are downloaded on first access.
+    """
+
+    def __init__(self, artifact_sync: ArtifactSync, relative_dir: str):
+        self.artifact_sync = artifact_sync
+        self.relative_dir = relative_dir
+        self._manifest = None
+
+    @property
+    def file_names(self) -> List[str]:
+        if self._manifest is None:
+            self._manifest = self.artifact_sync.get_manifest(self.relative_dir)
+            if self._manifest is None:
+                raise Exception(f"[{self.relative_dir}] was never synced")
+        return sorted(self._manifest)
+
+    def get_path(self, file_name: str) -> str:
+        if file_name not in self.file_names:
+            raise Exception(f"[{file_name}] is not in the synced dir [{self.relative_dir}]")
+        return self.artifact_sync._pull_file(self.relative_dir, file_name, self._manifest[file_name])
+
+
+class ArtifactSyncService:
+    """
+    Background uploader: submit_* return immediately, failures are logged and kept in errors.
+    """
+
+    def __init__(self, artifact_sync: ArtifactSync):
+        self.artifact_sync = artifact_sync
+        self.results: List[SyncResult] = []
+        self.errors: List[str] = []
+        self._queue: Queue = Queue()
+        self._thread = threading.Thread(target=self._run, name="artifact-sync-service", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                kind, path = item
+                if kind == "dir":
+                    if os.path.isdir(path):
+                        self.results.append(self.artifact_sync.push_dir(path))
+                else:
+                    self.artifact_sync.push_pointer(path)
+            except Exception as e:
+                self.errors.append(f"{item}: {str(e).strip().splitlines()[-1]}")
+                logging.exception("Artifact sync of %s failed", item)
+            finally:
+                self._queue.task_done()
+
+    def submit_dir(self, local_dir: str):
+        self._queue.put(("dir", local_dir))
+
+    def submit_pointer(self, pointer_path: str):
+        self._queue.put(("pointer", pointer_path))
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        return: False when uploads were still pending after timeout seconds
+        """
+        flushed = threading.Event()
+
+        def wait_for_queue():
+            self._queue.join()
+            flushed.set()
+
+        threading.Thread(target=wait_for_queue, daemon=True).start()
+        return flushed.wait(timeout)
+
+    def close(self, timeout: float = None) -> bool:
+        is_flushed = self.flush(timeout)
+        self._queue.put(None)
+        if is_flushed:
+            self._thread.join()
+            self.artifact_sync.close()
+        return is_flushed
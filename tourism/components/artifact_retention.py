@@ -0,0 +1,241 @@
+"""
+Retention, deduplication and garbage collection of artifacts/ and saved_models/.
+
+Every run writes artifacts/<stage>/<time stamp> dirs and every push a saved_models/<time stamp> dir. The
+retention keeps, per stage, the keep_last_runs most recent run dirs and the keep_last_exports most recent
+exports; older dirs are removed unless they hold a model still in use:
+- the export the saved_models current pointer targets (the promoted model),
+- the best model and every history model of model_evaluation.yaml,
+- the estimators of the warm start state.
+
+The kept files are then deduplicated: files of the same size are hashed (sha256) and identical copies are
+replaced by hardlinks to one inode. Only files older than min_age_seconds are touched, files of a run in
+progress are left alone. Artifacts are written once and replaced through a rename, never updated in place,
+so sharing an inode is safe.
+
+Reclaimed bytes count an inode only when its last link is removed.
+
+usage: python -m tourism.components.artifact_retention --namespace eu --dry-run
+scheduled e.g. nightly from cron: 0 3 * * * cd /app && python -m tourism.components.artifact_retention
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import defaultdict, namedtuple
+from typing import Dict, List, Set
+
+from tourism.cloud_storage.aws_operations import get_file_sha256
+from tourism.constant.training_pipeline import (DATA_INGESTION_ARTIFACT_DIR, DATA_VALIDATION_ARTIFACT_DIR_NAME,
+                                                DATA_TRANSFORMATION_ARTIFACT_DIR, MODEL_TRAINER_ARTIFACT_DIR,
+                                                BEST_MODEL_KEY, HISTORY_KEY, MODEL_PATH_KEY, CONFIG_FILE_PATH)
+from tourism.entity.config_entity import RetentionConfig
+from tourism.entity.model_factory import STATE_MODELS_KEY, MODEL_FILE_PATH_KEY
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.utils.main_utils import read_yaml_file, resolve_current_pointer
+
+RUN_STAGE_DIRS = [DATA_INGESTION_ARTIFACT_DIR, DATA_VALIDATION_ARTIFACT_DIR_NAME, DATA_TRANSFORMATION_ARTIFACT_DIR,
+                  MODEL_TRAINER_ARTIFACT_DIR]
+
+# get_current_time_stamp(), with the -<n> suffix of the run queue for runs started within the same second
+RUN_DIR_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}(-\d+)?$")
+
+RetentionReport = namedtuple("RetentionReport", ["removed_dirs", "kept_dirs", "protected_dirs", "removed_bytes",
+                                                 "deduplicated_files", "deduplicated_bytes", "reclaimed_bytes",
+                                                 "dry_run", "seconds"])
+
+
+def get_run_dir_sort_key(name: str):
+    # 2024-01-01-10-00-00-10 after 2024-01-01-10-00-00-9
+    return name[:19], int(name[20:] or -1)
+
+
+class ArtifactRetention:
+
+    def __init__(self, retention_config: RetentionConfig, dry_run: bool = False):
+        """
+        dry_run: report what would be removed and deduplicated without touching any file
+        """
+        try:
+            logging.info("%sArtifact retention log started.%s ", ">>" * 30, "<<" * 30)
+            self.retention_config = retention_config
+            self.dry_run = dry_run
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_referenced_paths(self) -> Set[str]:
+        """
+        return: real paths of the models still in use: promoted, model_evaluation.yaml best and history,
+                warm start state estimators
+        """
+        config = self.retention_config
+        referenced_paths = set()
+        current_export_dir = resolve_current_pointer(os.path.join(config.export_root_dir,
+                                                                  config.current_pointer_name))
+        if current_export_dir is not None:
+            referenced_paths.add(current_export_dir)
+
+        if os.path.exists(config.model_evaluation_file_path):
+            model_eval_content = read_yaml_file(file_path=config.model_evaluation_file_path) or {}
+            models = [model_eval_content.get(BEST_MODEL_KEY)] + list((model_eval_content.get(HISTORY_KEY) or {})
+                                                                     .values())
+            referenced_paths.update(model[MODEL_PATH_KEY] for model in models if model and MODEL_PATH_KEY in model)
+
+        if config.warm_start_state_file_path is not None and os.path.exists(config.warm_start_state_file_path):
+            warm_start_state = read_yaml_file(file_path=config.warm_start_state_file_path) or {}
+            referenced_paths.update(model_state[MODEL_FILE_PATH_KEY]
+                                    for model_state in (warm_start_state.get(STATE_MODELS_KEY) or {}).values()
+                                    if model_state.get(MODEL_FILE_PATH_KEY))
+        return {os.path.realpath(path) for path in referenced_paths}
+
+    @staticmethod
+    def is_protected(dir_path: str, referenced_paths: Set[str]) -> bool:
+        real_dir_path = os.path.realpath(dir_path)
+        return any(path == real_dir_path or path.startswith(real_dir_path + os.sep) for path in referenced_paths)
+
+    def get_expired_dirs(self, referenced_paths: Set[str]):
+        """
+        return: (dirs to remove, kept dirs, dirs kept only because they are referenced)
+        """
+        config = self.retention_config
+        candidates = []
+        for stage_dir in RUN_STAGE_DIRS:
+            stage_path = os.path.join(config.artifact_dir, stage_dir)
+            if not os.path.isdir(stage_path):
+                continue
+            run_dirs = sorted((name for name in os.listdir(stage_path) if RUN_DIR_PATTERN.match(name)
+                               and os.path.isdir(os.path.join(stage_path, name))), key=get_run_dir_sort_key)
+            candidates.append(([os.path.join(stage_path, name) for name in run_dirs], config.keep_last_runs))
+
+        if os.path.isdir(config.export_root_dir):
+            export_dirs = sorted(name for name in os.listdir(config.export_root_dir)
+                                 if name.isdigit() and os.path.isdir(os.path.join(config.export_root_dir, name)))
+            candidates.append(([os.path.join(config.export_root_dir, name) for name in export_dirs],
+                               config.keep_last_exports))
+
+        expired_dirs, kept_dirs, protected_dirs = [], [], []
+        for dir_paths, keep_last in candidates:
+            keep_from = len(dir_paths) - keep_last if keep_last else 0
+            for position, dir_path in enumerate(dir_paths):
+                if position >= keep_from:
+                    kept_dirs.append(dir_path)
+                elif self.is_protected(dir_path, referenced_paths):
+                    protected_dirs.append(dir_path)
+                    kept_dirs.append(dir_path)
+                else:
+                    expired_dirs.append(dir_path)
+        return expired_dirs, kept_dirs, protected_dirs
+
+    @staticmethod
+    def get_reclaimable_bytes(dir_paths: List[str]) -> int:
+        """
+        return: bytes freed by removing dir_paths, inodes with links outside of them are not counted
+        """
+        links: Dict[tuple, list] = {}
+        for dir_path in dir_paths:
+            for root, _, file_names in os.walk(dir_path):
+                for file_name in file_names:
+                    stat = os.lstat(os.path.join(root, file_name))
+                    inode = links.setdefault((stat.st_dev, stat.st_ino), [stat.st_nlink, 0, stat.st_size])
+                    inode[1] += 1
+        return sum(size for n_links, removed_links, size in links.values() if removed_links >= n_links)
+
+    def remove_expired_dirs(self, expired_dirs: List[str]) -> int:
+        removed_bytes = self.get_reclaimable_bytes(expired_dirs)
+        if not self.dry_run:
+            for dir_path in expired_dirs:
+                shutil.rmtree(dir_path)
+        logging.info("%s %s expired dirs, %s bytes",
+                     "Would remove" if self.dry_run else "Removed", len(expired_dirs), removed_bytes)
+        return removed_bytes
+
+    def deduplicate(self, dir_paths: List[str]):
+        """
+        Replaces identical files of dir_paths by hardlinks to one inode.
+        return: (deduplicated files, reclaimed bytes)
+        """
+        config = self.retention_config
+        newest_mtime = time.time() - config.min_age_seconds
+        files_by_size = defaultdict(list)
+        for dir_path in dir_paths:
+            for root, _, file_names in os.walk(dir_path):
+                for file_name in file_names:
+                    file_path = os.path.join(root, file_name)
+                    stat = os.lstat(file_path)
+                    if (os.path.islink(file_path) or ".tmp-" in file_name or stat.st_size < config.min_file_size
+                            or stat.st_mtime > newest_mtime):
+                        continue
+                    files_by_size[(stat.st_dev, stat.st_size)].append((file_path, stat.st_ino, stat.st_nlink))
+
+        deduplicated_files, deduplicated_bytes = 0, 0
+        for (_, size), files in files_by_size.items():
+            if len({inode for _, inode, _ in files}) < 2:
+                continue
+            # one hash per inode, already linked copies are hashed once
+            first_path_by_hash, hash_by_inode, replaced_links = {}, {}, defaultdict(int)
+            for file_path, inode, n_links in files:
+                if inode not in hash_by_inode:
+                    hash_by_inode[inode] = get_file_sha256(file_path)
+                sha256 = hash_by_inode[inode]
+                first_path, first_inode = first_path_by_hash.setdefault(sha256, (file_path, inode))
+                if first_inode == inode:
+                    continue
+                if not self.dry_run:
+                    tmp_file_path = f"{file_path}.tmp-{os.getpid()}"
+                    os.link(first_path, tmp_file_path)
+                    os.replace(tmp_file_path, file_path)
+                deduplicated_files += 1
+                # the replaced inode is freed with its last link
+                replaced_links[inode] += 1
+                if replaced_links[inode] == n_links:
+                    deduplicated_bytes += size
+        logging.info("%s %s files, %s bytes",
+                     "Would deduplicate" if self.dry_run else "Deduplicated", deduplicated_files, deduplicated_bytes)
+        return deduplicated_files, deduplicated_bytes
+
+    def initiate_artifact_retention(self) -> RetentionReport:
+        try:
+            start = time.perf_counter()
+            referenced_paths = self.get_referenced_paths()
+            expired_dirs, kept_dirs, protected_dirs = self.get_expired_dirs(referenced_paths)
+            removed_bytes = self.remove_expired_dirs(expired_dirs)
+
+            deduplicated_files, deduplicated_bytes = 0, 0
+            if self.retention_config.deduplicate:
+                deduplicated_files, deduplicated_bytes = self.deduplicate(kept_dirs)
+
+            retention_report = RetentionReport(removed_dirs=expired_dirs, kept_dirs=len(kept_dirs),
+                                               protected_dirs=protected_dirs, removed_bytes=removed_bytes,
+                                               deduplicated_files=deduplicated_files,
+                                               deduplicated_bytes=deduplicated_bytes,
+                                               reclaimed_bytes=removed_bytes + deduplicated_bytes,
+                                               dry_run=self.dry_run, seconds=time.perf_counter() - start)
+            logging.info("Artifact retention report: %s", retention_report)
+            return retention_report
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def __del__(self):
+        logging.info("%sArtifact retention log completed.%s", ">>" * 20, "<<" * 20)
+
+
+def main():
+    from tourism.configuration.configuration_file import Configuration
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=CONFIG_FILE_PATH, help="config.yaml path")
+    parser.add_argument("--namespace", help="run variant whose artifacts and saved models are collected")
+    parser.add_argument("--dry-run", action="store_true", help="report without removing or linking files")
+    args = parser.parse_args()
+
+    retention_config = Configuration(config_file_path=args.config, namespace=args.namespace).get_retention_config()
+    retention_report = ArtifactRetention(retention_config, dry_run=args.dry_run).initiate_artifact_retention()
+    print(json.dumps(retention_report._asdict()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,19 @@
 import os, sys
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from tourism.entity.config_entity import DataIngestionConfig
 from tourism.entity.artifact_entity import DataIngestionArtifact
 from tourism.logger import logging
 from tourism.exception import CustomException
-import numpy as np
 import pandas as pd
-from six.moves import urllib
 from sklearn.model_selection import train_test_split
-from tourism.utils.s3_operation import download_from_s3
-from tourism.constant.training_pipeline import SCHEMA_FILE_PATH
+from tourism.utils.s3_operation import download_from_s3, get_object_store, ObjectInfo
+from tourism.entity.ingestion_manifest import IngestionManifest
+from tourism.entity.dataset_store import DatasetStore
+from tourism.constant.training_pipeline import SCHEMA_FILE_PATH, MONGODB_SOURCE
 from tourism.utils.main_utils import read_yaml_file
+from tourism.utils.profiling import profile_step
 
 
 class DataIngestion:
@@ -17,7 +21,7 @@ class DataIngestion:
     def __init__(self, data_ingestion_config: DataIngestionConfig):
 
         try:
-            logging.info(f"{'>>'*20}Data Ingestion log started.{'<<'*20} ")
+            logging.info("%sData Ingestion log started.%s ", ">>" * 20, "<<" * 20)
             self.data_ingestion_config = data_ingestion_config
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
         except Exception as e:
@@ -37,33 +41,68 @@ class DataIngestion:
 
             raw_data_dir = os.path.join(download_dir, local_file_name)
             
-            download_from_s3(bucket_name=bucket_name, 
-                             object_name= object_name, 
-                             filename=raw_data_dir)
+            with profile_step("download_from_s3"):
+                download_from_s3(bucket_name=bucket_name, 
+                                 object_name= object_name, 
+                                 filename=raw_data_dir)
         
-            logging.info(f"File :[{raw_data_dir}] has been downloaded successfully.")
+            logging.info("File :[%s] has been downloaded successfully.", raw_data_dir)
             return raw_data_dir
 
         except Exception as e:
             raise CustomException(e,sys) from e
 
-    def split_data_as_train_test(self) -> DataIngestionArtifact:
+    def read_mongodb_data(self, client=None) -> pd.DataFrame:
+        """
+        client: pymongo / mongomock client, created from the MONGODB_URL environment variable when None
+        """
         try:
-            raw_data_dir = self.data_ingestion_config.raw_data_dir
+            from tourism.data_access.mongodb_source import MongoDBSource
 
-            file_name = os.listdir(raw_data_dir)[0]
+            mongodb_config = self.data_ingestion_config.mongodb_config
+            source = MongoDBSource(database_name=mongodb_config.database_name,
+                                   collection_name=mongodb_config.collection_name,
+                                   schema_file_path=SCHEMA_FILE_PATH, client=client,
+                                   batch_size=mongodb_config.batch_size,
+                                   n_partitions=mongodb_config.n_partitions,
+                                   partition_field=mongodb_config.partition_field)
+            with profile_step("read_mongodb") as step:
+                data_frame = source.read_data_frame()
+                step.rows = len(data_frame)
+            return data_frame
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def split_data_as_train_test(self, data_frame: pd.DataFrame = None) -> DataIngestionArtifact:
+        """
+        data_frame: rows read from a source, the file in raw_data_dir when None
+        """
+        try:
+            data_file_path = None
+            if data_frame is None:
+                raw_data_dir = self.data_ingestion_config.raw_data_dir
 
-            data_file_path = os.path.join(raw_data_dir,file_name)
+                file_name = os.listdir(raw_data_dir)[0]
 
-            logging.info(f"Reading csv file: [{data_file_path}]")
-            data_frame = pd.read_csv(data_file_path, index_col=False)
+                data_file_path = os.path.join(raw_data_dir,file_name)
+
+                logging.info("Reading csv file: [%s]", data_file_path)
+                with profile_step("read_csv") as step:
+                    data_frame = pd.read_csv(data_file_path, index_col=False)
+                    step.rows = len(data_frame)
+            else:
+                file_name = self.data_ingestion_config.local_file_name
+            if self.data_ingestion_config.dataset_version_config is not None:
+                return self.split_dataset_version(data_frame, file_name=file_name, data_file_path=data_file_path)
             data_frame.drop(self._schema_config["Drop_columns"], axis=1, inplace=True)
 
-            logging.info(f"Splitting data into train and test")
+            logging.info("Splitting data into train and test")
             train_set = None
             test_set = None
 
-            train_set, test_set = train_test_split(data_frame, test_size=0.2, random_state=42)
+            with profile_step("train_test_split", rows=len(data_frame)):
+                train_set, test_set = train_test_split(data_frame, test_size=self.data_ingestion_config.test_size,
+                                                       random_state=42)
 
             train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir,
                                             file_name)
@@ -71,33 +110,153 @@ class DataIngestion:
             test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir,
                                         file_name)
             
-            if train_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_train_dir,exist_ok=True)
-                logging.info(f"Exporting training datset to file: [{train_file_path}]")
-                train_set.to_csv(train_file_path,index=False)
-
-            if test_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_test_dir, exist_ok= True)
-                logging.info(f"Exporting test dataset to file: [{test_file_path}]")
-                test_set.to_csv(test_file_path,index=False)
+            with profile_step("write_csv", rows=len(data_frame)):
+                if train_set is not None:
+                    os.makedirs(self.data_ingestion_config.ingested_train_dir,exist_ok=True)
+                    logging.info("Exporting training datset to file: [%s]", train_file_path)
+                    train_set.to_csv(train_file_path,index=False)
+
+                if test_set is not None:
+                    os.makedirs(self.data_ingestion_config.ingested_test_dir, exist_ok= True)
+                    logging.info("Exporting test dataset to file: [%s]", test_file_path)
+                    test_set.to_csv(test_file_path,index=False)
             
             data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
                                 test_file_path=test_file_path,
                                 is_ingested=True,
                                 message=f"Data ingestion completed successfully."
                                 )
-            logging.info(f"Data Ingestion artifact:[{data_ingestion_artifact}]")
+            logging.info("Data Ingestion artifact:[%s]", data_ingestion_artifact)
             return data_ingestion_artifact
         except Exception as e:
             raise CustomException(e,sys) from e
 
 
+    def split_dataset_version(self, data_frame: pd.DataFrame, file_name: str,
+                              data_file_path: str = None) -> DataIngestionArtifact:
+        """
+        Commits the rows to the dataset store and publishes the train / test splits of their version.
+        data_file_path: downloaded raw file, removed once committed: the version holds its rows
+        """
+        try:
+            config = self.data_ingestion_config
+            dataset_version_config = config.dataset_version_config
+            dataset_store = DatasetStore(store_dir=dataset_version_config.store_dir,
+                                         chunk_rows=dataset_version_config.chunk_rows)
+            with profile_step("commit_dataset_version", rows=len(data_frame)):
+                dataset_version = dataset_store.commit(data_frame, ref=dataset_version_config.time_stamp)
+            if data_file_path is not None:
+                os.remove(data_file_path)
+
+            train_file_path = os.path.join(config.ingested_train_dir, file_name)
+            test_file_path = os.path.join(config.ingested_test_dir, file_name)
+            with profile_step("materialize_splits", rows=dataset_version.rows):
+                dataset_store.materialize_splits(dataset_version.version_id, test_size=config.test_size,
+                                                 drop_columns=self._schema_config["Drop_columns"],
+                                                 train_file_path=train_file_path, test_file_path=test_file_path)
+
+            data_ingestion_artifact = DataIngestionArtifact(
+                train_file_path=train_file_path,
+                test_file_path=test_file_path,
+                is_ingested=True,
+                message=f"Data ingestion completed successfully, dataset version [{dataset_version.version_id}]: "
+                        f"{dataset_version.new_rows} of {dataset_version.rows} rows written.")
+            logging.info("Data Ingestion artifact:[%s]", data_ingestion_artifact)
+            return data_ingestion_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def fetch_partition(self, object_store, object_info: ObjectInfo) -> pd.DataFrame:
+        download_dir = self.data_ingestion_config.raw_data_dir
+        file_path = os.path.join(download_dir, object_info.key.replace("/", "__"))
+        object_store.download(object_info.key, file_path)
+        data_frame = pd.read_csv(file_path, index_col=False)
+        data_frame.drop(self._schema_config["Drop_columns"], axis=1, inplace=True)
+        logging.info("Partition [%s] fetched: %s rows", object_info.key, len(data_frame))
+        return data_frame
+
+    @staticmethod
+    def get_test_mask(partition_key: str, n_rows: int, test_size: float):
+        """
+        return: boolean mask of the test rows, a function of the partition key and the row position only,
+        so every host and every re-run assigns a row to the same split
+        """
+        import numpy as np
+
+        row_ids = np.array([f"{partition_key}:{row_number}" for row_number in range(n_rows)], dtype=object)
+        hash_key = hashlib.md5(partition_key.encode()).hexdigest()[:16]
+        return pd.util.hash_array(row_ids, hash_key=hash_key) % 10000 < int(round(test_size * 10000))
+
+    @staticmethod
+    def append_rows(data_frame: pd.DataFrame, file_path: str):
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            with open(file_path) as split_file:
+                columns = pd.read_csv(split_file, nrows=0).columns
+            data_frame[list(columns)].to_csv(file_path, mode="a", header=False, index=False)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            data_frame.to_csv(file_path, index=False)
+
+    def ingest_partitions(self) -> DataIngestionArtifact:
+        """
+        Appends the partitions under object_prefix not in the manifest yet to the incremental train / test
+        files, the cost of a run follows the new data only.
+        """
+        try:
+            config = self.data_ingestion_config
+            local_file_name = config.local_file_name
+            train_file_path = os.path.join(config.incremental_dir, "train", local_file_name)
+            test_file_path = os.path.join(config.incremental_dir, "test", local_file_name)
+
+            manifest = IngestionManifest(manifest_file_path=config.manifest_file_path,
+                                         train_file_path=train_file_path, test_file_path=test_file_path)
+            manifest.recover()
+
+            object_store = get_object_store(config.bucket_name)
+            with profile_step("list_partitions") as step:
+                objects = object_store.list_objects(config.object_prefix)
+                step.rows = len(objects)
+            new_objects = manifest.get_new_partitions(objects)
+            logging.info("%s partitions under [%s], %s new", len(objects), config.object_prefix, len(new_objects))
+
+            os.makedirs(config.raw_data_dir, exist_ok=True)
+            new_rows = 0
+            with ThreadPoolExecutor(max_workers=max(1, config.download_workers)) as executor:
+                # map yields in key order: partitions are appended in the same order on every run
+                partitions = executor.map(partial(self.fetch_partition, object_store), new_objects)
+                for object_info, data_frame in zip(new_objects, partitions):
+                    with profile_step("append_partition", rows=len(data_frame)):
+                        test_mask = self.get_test_mask(object_info.key, len(data_frame), config.test_size)
+                        self.append_rows(data_frame[~test_mask], train_file_path)
+                        self.append_rows(data_frame[test_mask], test_file_path)
+                        manifest.add_partition(object_info, train_rows=int((~test_mask).sum()),
+                                               test_rows=int(test_mask.sum()))
+                    new_rows += len(data_frame)
+
+            if not manifest.partitions:
+                raise Exception(f"No partition found under [{config.object_prefix}] in [{config.bucket_name}]")
+
+            data_ingestion_artifact = DataIngestionArtifact(
+                train_file_path=train_file_path,
+                test_file_path=test_file_path,
+                is_ingested=True,
+                message=f"Ingested {len(new_objects)} new partitions ({new_rows} rows), "
+                        f"{len(manifest.partitions)} partitions ({manifest.rows} rows) in total.")
+            logging.info("Data Ingestion artifact:[%s]", data_ingestion_artifact)
+            return data_ingestion_artifact
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def initiate_data_ingestion(self)-> DataIngestionArtifact:
         try:
+            if self.data_ingestion_config.source == MONGODB_SOURCE:
+                return self.split_data_as_train_test(data_frame=self.read_mongodb_data())
+            if self.data_ingestion_config.object_prefix:
+                return self.ingest_partitions()
             raw_data_dir =  self.download_tourism_data()
             return self.split_data_as_train_test()
         except Exception as e:
             raise CustomException(e,sys) from e
 
     def __del__(self):
-        logging.info(f"{'>>'*20}Data Ingestion log completed.{'<<'*20} \n\n")
\ No newline at end of file
+        logging.info("%sData Ingestion log completed.%s \n\n", ">>" * 20, "<<" * 20)
\ No newline at end of file
@@ -1,6 +1,7 @@
 import os
 import sys
-from typing import Union
+import time
+from typing import Callable, Union
 
 import numpy as np
 import pandas as pd
@@ -9,29 +10,50 @@ from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, OneHotEncoder, PowerTransformer
 from sklearn.compose import ColumnTransformer
-from tourism.entity.config_entity import DataTransformationConfig
+from tourism.entity.config_entity import DataTransformationConfig, FeatureSelectionConfig
 from tourism.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact
-from tourism.components.data_ingestion import DataIngestion
 from tourism.constant.training_pipeline import *
 from tourism.exception import CustomException
 from tourism.logger import logging
-from tourism.utils.main_utils import read_yaml_file, save_object, save_numpy_array_data, load_data
+from tourism.entity.input_validation import InputValidator
+from tourism.entity.feature_selection import (SelectedFeaturePreprocessor, IMPORTANCE_SOURCES,
+                                              PREVIOUS_MODEL_IMPORTANCE, CHEAP_MODEL_IMPORTANCE, get_feature_keys,
+                                              get_feature_importances, get_feature_name, get_selected_columns,
+                                              select_features)
+from tourism.utils.main_utils import (read_yaml_file, write_yaml_file, save_object, save_numpy_array_data,
+                                      load_data, load_object)
+from tourism.utils.profiling import profile_step
+
+# best of n timed predictions of the test set in the feature selection report
+LATENCY_REPEATS = 3
 
 class DataTransformation:
 
     def __init__(self, data_transformation_config: DataTransformationConfig,
                  data_ingestion_artifact: DataIngestionArtifact,
-                 data_validation_artifact: DataValidationArtifact):
+                 data_validation_artifact: DataValidationArtifact,
+                 feature_selection_config: FeatureSelectionConfig = None):
+        """
+        feature_selection_config: prunes the transformed features by importance when enabled
+        """
         try:
-            logging.info(f"{'>>' * 30}Data Transformation log started.{'<<' * 30} ")
+            logging.info("%sData Transformation log started.%s ", ">>" * 30, "<<" * 30)
             self.data_transformation_config = data_transformation_config
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_artifact = data_validation_artifact
+            self.feature_selection_config = feature_selection_config
+            if (feature_selection_config is not None and feature_selection_config.enabled
+                    and feature_selection_config.importance_source not in IMPORTANCE_SOURCES):
+                raise Exception(f"Unknown importance source [{feature_selection_config.importance_source}], "
+                                f"expected one of {IMPORTANCE_SOURCES}")
         except Exception as e:
             raise CustomException(e, sys) from e
 
 
-    def get_data_transformer_object(self) -> ColumnTransformer:
+    def get_data_transformer_object(self, selected_columns: dict = None) -> ColumnTransformer:
+        """
+        selected_columns: {transformer name: input columns} to keep, every schema column when None
+        """
         logging.info(
             "Entered get_data_transformer_object method of DataTransformation class"
         )
@@ -80,19 +102,25 @@ class DataTransformation:
                 ]
             )
 
-            preprocessor = ColumnTransformer(
-                [
-                    ("Discrete_Pipeline", discrete_pipeline, discrete_columns),
-                    ("Continuous_Pipeline", continuous_pipeline, continuous_columns),
-                    ("Categorical_Pipeline", cat_pipeline, categorical_columns),
-                    ("Power_Transformation", transform_pipe, transformation_columns),
-                ]
-            )
+            transformers = [
+                ("Discrete_Pipeline", discrete_pipeline, discrete_columns),
+                ("Continuous_Pipeline", continuous_pipeline, continuous_columns),
+                ("Categorical_Pipeline", cat_pipeline, categorical_columns),
+                ("Power_Transformation", transform_pipe, transformation_columns),
+            ]
+            if selected_columns is not None:
+                transformers = [(name, pipeline, [column for column in columns
+                                                  if column in selected_columns.get(name, [])])
+                                for name, pipeline, columns in transformers]
+                transformers = [transformer for transformer in transformers if transformer[2]]
+                logging.info("Pruned transformer columns: %s", selected_columns)
+
+            preprocessor = ColumnTransformer(transformers)
 
             logging.info("Created preprocessor object from ColumnTransformer")
 
-            logging.info(f"Categorical columns: {categorical_columns}")
-            logging.info(f"Numerical columns: {numerical_columns}")
+            logging.info("Categorical columns: %s", categorical_columns)
+            logging.info("Numerical columns: %s", numerical_columns)
 
             logging.info(
                 "Exited get_data_transformer_object method of DataTransformation class"
@@ -103,31 +131,155 @@ class DataTransformation:
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def get_previous_model_importances(self, feature_keys: list) -> Union[np.ndarray, None]:
+        """
+        return: importances of the previous best model in feature_keys order,
+        None without a previous model trained on exactly these features
+        """
+        model_evaluation_file_path = self.feature_selection_config.model_evaluation_file_path
+        if not os.path.exists(model_evaluation_file_path):
+            return None
+        model_eval_content = read_yaml_file(file_path=model_evaluation_file_path) or {}
+        if BEST_MODEL_KEY not in model_eval_content:
+            return None
+        previous_model = load_object(file_path=model_eval_content[BEST_MODEL_KEY][MODEL_PATH_KEY])
+        previous_feature_keys = get_feature_keys(previous_model.preprocessing_object)
+        # an already pruned model knows nothing about the features it dropped
+        if set(previous_feature_keys) != set(feature_keys):
+            logging.info("Previous best model was trained on other features, using the cheap model importances")
+            return None
+        importances = get_feature_importances(previous_model.trained_model_object)
+        if importances is None or len(importances) != len(previous_feature_keys):
+            logging.info("No usable importances in %s, using the cheap model importances", previous_model)
+            return None
+        importance_by_key = dict(zip(previous_feature_keys, importances))
+        return np.array([importance_by_key[feature_key] for feature_key in feature_keys])
+
+    def fit_cheap_model(self, input_feature, target_feature):
+        """
+        return: (fitted small random forest, fit seconds)
+        """
+        from sklearn.ensemble import RandomForestClassifier
+
+        model = RandomForestClassifier(n_estimators=self.feature_selection_config.n_estimators, max_depth=10,
+                                       n_jobs=-1, random_state=42)
+        start = time.perf_counter()
+        model.fit(input_feature, target_feature)
+        return model, time.perf_counter() - start
+
+    @staticmethod
+    def measure_latency(function: Callable) -> float:
+        latencies = []
+        for _ in range(LATENCY_REPEATS):
+            start = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - start)
+        return min(latencies)
+
+    def select_features(self, preprocessing_obj: ColumnTransformer, input_feature_train_df: pd.DataFrame,
+                        input_feature_test_df: pd.DataFrame, train_input: np.ndarray, train_target: np.ndarray,
+                        test_input: np.ndarray, test_target: np.ndarray):
+        """
+        Selects the features by importance, refits the preprocessor on the columns they need and
+        writes the feature selection report.
+        return: (SelectedFeaturePreprocessor, boolean mask of the selected columns of the transformed arrays)
+        """
+        try:
+            from sklearn.metrics import accuracy_score
+
+            config = self.feature_selection_config
+            feature_keys = get_feature_keys(preprocessing_obj)
+
+            importance_source, importances = config.importance_source, None
+            full_model, full_fit_seconds = None, None
+            if importance_source == PREVIOUS_MODEL_IMPORTANCE:
+                importances = self.get_previous_model_importances(feature_keys)
+            if importances is None:
+                importance_source = CHEAP_MODEL_IMPORTANCE
+                full_model, full_fit_seconds = self.fit_cheap_model(train_input, train_target)
+                importances = get_feature_importances(full_model)
+
+            feature_mask = select_features(importances, cumulative_importance=config.cumulative_importance,
+                                           min_features=config.min_features)
+            selected_keys = [feature_key for feature_key, selected in zip(feature_keys, feature_mask) if selected]
+            logging.info("Selected %s of %s features from %s importances",
+                         len(selected_keys), len(feature_keys), importance_source)
+
+            pruned_preprocessor = self.get_data_transformer_object(
+                selected_columns=get_selected_columns(selected_keys))
+            pruned_preprocessor.fit(input_feature_train_df)
+            pruned_keys = get_feature_keys(pruned_preprocessor)
+            selected_key_set = set(selected_keys)
+            pruned_mask = np.array([feature_key in selected_key_set for feature_key in pruned_keys])
+            if [feature_key for feature_key, selected in zip(pruned_keys, pruned_mask) if selected] != selected_keys:
+                raise Exception("Pruned preprocessor does not reproduce the selected features")
+            selected_preprocessor = SelectedFeaturePreprocessor(preprocessor=pruned_preprocessor,
+                                                                feature_mask=pruned_mask,
+                                                                feature_keys=selected_keys)
+
+            # costs and accuracy of the cheap model on all vs the selected features
+            if full_model is None:
+                full_model, full_fit_seconds = self.fit_cheap_model(train_input, train_target)
+            selected_model, selected_fit_seconds = self.fit_cheap_model(train_input[:, feature_mask], train_target)
+            full_latency = self.measure_latency(
+                lambda: full_model.predict(preprocessing_obj.transform(input_feature_test_df)))
+            selected_latency = self.measure_latency(
+                lambda: selected_model.predict(selected_preprocessor.transform(input_feature_test_df)))
+            full_accuracy = float(accuracy_score(test_target, full_model.predict(test_input)))
+            selected_accuracy = float(accuracy_score(test_target,
+                                                     selected_model.predict(test_input[:, feature_mask])))
+            n_rows = max(len(input_feature_test_df), 1)
+
+            report = {
+                "importance_source": importance_source,
+                "cumulative_importance": config.cumulative_importance,
+                "n_features": len(feature_keys),
+                "n_selected_features": len(selected_keys),
+                "selected_features": [get_feature_name(feature_key) for feature_key in selected_keys],
+                "dropped_features": [get_feature_name(feature_key) for feature_key, selected
+                                     in zip(feature_keys, feature_mask) if not selected],
+                "dropped_input_columns": sorted({column for _, column, _ in feature_keys}
+                                                - {column for _, column, _ in selected_keys}),
+                "train_seconds": {"all_features": float(full_fit_seconds),
+                                  "selected_features": float(selected_fit_seconds)},
+                "inference_ms_per_row": {"all_features": full_latency * 1000 / n_rows,
+                                         "selected_features": selected_latency * 1000 / n_rows},
+                "accuracy": {"all_features": full_accuracy, "selected_features": selected_accuracy},
+                "accuracy_delta": selected_accuracy - full_accuracy,
+            }
+            write_yaml_file(file_path=config.report_file_path, data=report)
+            logging.info("Feature selection report: %s", report)
+            return selected_preprocessor, feature_mask
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         try:
-            logging.info(f"Obtaining preprocessing object.")
+            logging.info("Obtaining preprocessing object.")
             preprocessing_obj = self.get_data_transformer_object()
 
-            logging.info(f"Obtaining training and test file path.")
+            logging.info("Obtaining training and test file path.")
             train_file_path = self.data_ingestion_artifact.train_file_path
             test_file_path = self.data_ingestion_artifact.test_file_path
 
             schema_file_path = self.data_validation_artifact.schema_file_path
 
             logging.info(
-                f"Loading training and test data as pandas dataframe.")
-            train_df = load_data(file_path=train_file_path,
-                                 schema_file_path=schema_file_path)
+                "Loading training and test data as pandas dataframe.")
+            with profile_step("load_data") as step:
+                train_df = load_data(file_path=train_file_path,
+                                     schema_file_path=schema_file_path)
 
-            test_df = load_data(file_path=test_file_path,
-                                schema_file_path=schema_file_path)
+                test_df = load_data(file_path=test_file_path,
+                                    schema_file_path=schema_file_path)
+                step.rows = len(train_df) + len(test_df)
 
             schema = read_yaml_file(file_path=schema_file_path)
 
             target_column_name = schema[TARGET_COLUMN_KEY]
             
             logging.info(
-                f"Splitting input and target feature from training and testing dataframe.")
+                "Splitting input and target feature from training and testing dataframe.")
             input_feature_train_df = train_df.drop(
                 columns=[target_column_name], axis=1)
             target_feature_train_df = train_df[[target_column_name]]
@@ -137,15 +289,17 @@ class DataTransformation:
             target_feature_test_df = test_df[[target_column_name]]
 
             logging.info(
-                f"Applying preprocessing object on training dataframe and testing dataframe")
-            input_feature_train_arr = preprocessing_obj.fit_transform(
-                input_feature_train_df)
+                "Applying preprocessing object on training dataframe and testing dataframe")
+            with profile_step("fit_transform", rows=len(input_feature_train_df)):
+                input_feature_train_arr = preprocessing_obj.fit_transform(
+                    input_feature_train_df)
 
             logging.info(
                     "Used the preprocessor object to fit transform the train features"
                 )
-            input_feature_test_arr = preprocessing_obj.transform(
-                input_feature_test_df)
+            with profile_step("transform", rows=len(input_feature_test_df)):
+                input_feature_test_arr = preprocessing_obj.transform(
+                    input_feature_test_df)
             logging.info("Used the preprocessor object to transform the test features")
 
             logging.info(
@@ -156,20 +310,35 @@ class DataTransformation:
 
             smt = SMOTEENN(sampling_strategy="minority")
 
-            input_feature_train_final, target_feature_train_final = smt.fit_resample(
-                    input_feature_train_arr, target_feature_train_df
-                )
+            with profile_step("smoteenn_train", rows=input_feature_train_arr.shape[0]):
+                input_feature_train_final, target_feature_train_final = smt.fit_resample(
+                        input_feature_train_arr, target_feature_train_df
+                    )
 
             logging.info("Applied SMOTEENN on training dataset")
 
             logging.info("Applying SMOTEENN on testing dataset")
 
-            input_feature_test_final, target_feature_test_final = smt.fit_resample(
-                    input_feature_test_arr, target_feature_test_df
-                )
+            with profile_step("smoteenn_test", rows=input_feature_test_arr.shape[0]):
+                input_feature_test_final, target_feature_test_final = smt.fit_resample(
+                        input_feature_test_arr, target_feature_test_df
+                    )
 
             logging.info("Applied SMOTEENN on testing dataset")
 
+            if self.feature_selection_config is not None and self.feature_selection_config.enabled:
+                with profile_step("feature_selection", rows=input_feature_train_final.shape[0]):
+                    preprocessing_obj, feature_mask = self.select_features(
+                        preprocessing_obj=preprocessing_obj,
+                        input_feature_train_df=input_feature_train_df,
+                        input_feature_test_df=input_feature_test_df,
+                        train_input=input_feature_train_final,
+                        train_target=np.ravel(target_feature_train_final),
+                        test_input=input_feature_test_final,
+                        test_target=np.ravel(target_feature_test_final))
+                input_feature_train_final = input_feature_train_final[:, feature_mask]
+                input_feature_test_final = input_feature_test_final[:, feature_mask]
+
             logging.info("Created train array and test array")
 
             train_arr = np.c_[
@@ -192,27 +361,36 @@ class DataTransformation:
             transformed_test_file_path = os.path.join(
                 transformed_test_dir, test_file_name)
 
-            logging.info(f"Saving transformed training and testing array.")
+            logging.info("Saving transformed training and testing array.")
 
-            save_numpy_array_data(
-                file_path=transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(
-                file_path=transformed_test_file_path, array=test_arr)
+            with profile_step("save_arrays", rows=len(train_arr) + len(test_arr)):
+                save_numpy_array_data(
+                    file_path=transformed_train_file_path, array=train_arr)
+                save_numpy_array_data(
+                    file_path=transformed_test_file_path, array=test_arr)
 
             preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
 
-            logging.info(f"Saving preprocessing object.")
+            logging.info("Saving preprocessing object.")
             save_object(file_path=preprocessing_obj_file_path,
                         obj=preprocessing_obj)
 
+            input_validator_file_path = self.data_transformation_config.input_validator_file_path
+            if input_validator_file_path is not None:
+                input_validator = InputValidator.from_training_data(
+                    schema=schema, input_feature_df=input_feature_train_df, preprocessor=preprocessing_obj,
+                    range_margin=self.data_transformation_config.range_margin)
+                save_object(file_path=input_validator_file_path, obj=input_validator)
+
             data_transformation_artifact = DataTransformationArtifact(is_transformed=True,
                                                                       message="Data transformation successfull.",
                                                                       transformed_train_file_path=transformed_train_file_path,
                                                                       transformed_test_file_path=transformed_test_file_path,
-                                                                      preprocessed_object_file_path=preprocessing_obj_file_path
+                                                                      preprocessed_object_file_path=preprocessing_obj_file_path,
+                                                                      input_validator_file_path=input_validator_file_path
                                                                       )
             logging.info(
-                f"Data transformationa artifact: {data_transformation_artifact}")
+                "Data transformationa artifact: %s", data_transformation_artifact)
             return data_transformation_artifact
 
         except Exception as e:
@@ -220,4 +398,4 @@ class DataTransformation:
 
     def __del__(self):
         logging.info(
-            f"{'>>'*30}Data Transformation log completed.{'<<'*30} \n\n")
\ No newline at end of file
+            "%sData Transformation log completed.%s \n\n", ">>" * 30, "<<" * 30)
\ No newline at end of file
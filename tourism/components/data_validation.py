@@ -10,6 +10,7 @@ from pandas import DataFrame
 from tourism.exception import CustomException
 from tourism.logger import logging
 from tourism.utils.main_utils import read_yaml_file, write_yaml_file
+from tourism.utils.profiling import profile_step
 from tourism.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
 from tourism.entity.config_entity import DataValidationConfig
 from tourism.constant.training_pipeline import SCHEMA_FILE_PATH
@@ -21,7 +22,7 @@ class DataValidation:
     def __init__(self, data_validation_config:DataValidationConfig,
         data_ingestion_artifact:DataIngestionArtifact):
         try:
-            logging.info(f"{'>>'*30}Data Valdaition log started.{'<<'*30} \n\n")
+            logging.info("%sData Valdaition log started.%s \n\n", ">>" * 30, "<<" * 30)
             self.data_validation_config = data_validation_config
             self.data_validation_info = read_yaml_file(self.data_validation_config.schema_file_path)
             self.data_ingestion_artifact = data_ingestion_artifact
@@ -52,7 +53,7 @@ class DataValidation:
 
             is_available =  is_train_file_exist and is_test_file_exist
 
-            logging.info(f"Is train and test file exists?-> {is_available}")
+            logging.info("Is train and test file exists?-> %s", is_available)
             
             if not is_available:
                 training_file = self.data_ingestion_artifact.train_file_path
@@ -101,7 +102,8 @@ class DataValidation:
 
             train_df,test_df = self.get_train_and_test_df()
 
-            profile.calculate(train_df,test_df)
+            with profile_step("drift_profile", rows=len(train_df) + len(test_df)):
+                profile.calculate(train_df,test_df)
 
             report = json.loads(profile.json())
 
@@ -119,7 +121,8 @@ class DataValidation:
         try:
             dashboard = Dashboard(tabs=[DataDriftTab()])
             train_df,test_df = self.get_train_and_test_df()
-            dashboard.calculate(train_df,test_df)
+            with profile_step("drift_dashboard", rows=len(train_df) + len(test_df)):
+                dashboard.calculate(train_df,test_df)
 
             report_page_file_path = self.data_validation_config.report_page_file_path
             report_page_dir = os.path.dirname(report_page_file_path)
@@ -133,7 +136,9 @@ class DataValidation:
         try:
             report = self.get_and_save_data_drift_report()
             self.save_data_drift_report_page()
-            return True
+            is_drift_found = bool(report["data_drift"]["data"]["metrics"]["dataset_drift"])
+            logging.info("Dataset drift found: %s", is_drift_found)
+            return is_drift_found
         except Exception as e:
             raise CustomException(e,sys) from e
 
@@ -141,20 +146,21 @@ class DataValidation:
         try:
             self.is_train_test_file_exists()
             self.validate_dataset_schema()
-            self.is_data_drift_found()
+            is_drift_found = self.is_data_drift_found()
 
             data_validation_artifact = DataValidationArtifact(
                 schema_file_path=self.data_validation_config.schema_file_path,
                 report_file_path=self.data_validation_config.report_file_path,
                 report_page_file_path=self.data_validation_config.report_page_file_path,
                 is_validated=True,
-                message="Data Validation performed successully."
+                message="Data Validation performed successully.",
+                is_drift_found=is_drift_found
             )
-            logging.info(f"Data validation artifact: {data_validation_artifact}")
+            logging.info("Data validation artifact: %s", data_validation_artifact)
             return data_validation_artifact
         except Exception as e:
             raise CustomException(e,sys) from e
 
 
     def __del__(self):
-        logging.info(f"{'>>'*30}Data Valdaition log completed.{'<<'*30} \n\n")
\ No newline at end of file
+        logging.info("%sData Valdaition log completed.%s \n\n", ">>" * 30, "<<" * 30)
\ No newline at end of file
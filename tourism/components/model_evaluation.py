@@ -16,7 +16,7 @@ class ModelEvaluation:
                  data_validation_artifact: DataValidationArtifact,
                  model_trainer_artifact: ModelTrainerArtifact):
         try:
-            logging.info(f"{'>>' * 30}Model Evaluation log started.{'<<' * 30} ")
+            logging.info("%sModel Evaluation log started.%s ", ">>" * 30, "<<" * 30)
             self.model_evaluation_config = model_evaluation_config
             self.model_trainer_artifact = model_trainer_artifact
             self.data_ingestion_artifact = data_ingestion_artifact
@@ -56,7 +56,7 @@ class ModelEvaluation:
             if BEST_MODEL_KEY in model_eval_content:
                 prevoius_best_model = model_eval_content[BEST_MODEL_KEY]
 
-            logging.info(f"Previous eval result: {model_eval_content}")
+            logging.info("Previous eval result: %s", model_eval_content)
             eval_result = {
                 BEST_MODEL_KEY: {
                     MODEL_PATH_KEY: model_evaluation_artifact.evaluated_model_path,
@@ -72,7 +72,7 @@ class ModelEvaluation:
                     model_eval_content[HISTORY_KEY].update(model_history)
 
             model_eval_content.update(eval_result)
-            logging.info(f"Updated eval result:{model_eval_content}")
+            logging.info("Updated eval result:%s", model_eval_content)
             write_yaml_file(file_path=eval_file_path, data=model_eval_content)
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -97,16 +97,16 @@ class ModelEvaluation:
             target_column_name = schema_content[TARGET_COLUMN_KEY]
 
             # target_column
-            logging.info(f"Converting target column into numpy array.")
+            logging.info("Converting target column into numpy array.")
             train_target_arr = np.array(train_dataframe[target_column_name])
             test_target_arr = np.array(test_dataframe[target_column_name])
-            logging.info(f"Conversion completed target column into numpy array.")
+            logging.info("Conversion completed target column into numpy array.")
 
             # dropping target column from the dataframe
-            logging.info(f"Dropping target column from the dataframe.")
+            logging.info("Dropping target column from the dataframe.")
             train_dataframe.drop(target_column_name, axis=1, inplace=True)
             test_dataframe.drop(target_column_name, axis=1, inplace=True)
-            logging.info(f"Dropping target column from the dataframe completed.")
+            logging.info("Dropping target column from the dataframe completed.")
 
             model = self.get_best_model()
 
@@ -115,7 +115,7 @@ class ModelEvaluation:
                 model_evaluation_artifact = ModelEvaluationArtifact(evaluated_model_path=trained_model_file_path,
                                                                     is_model_accepted=True)
                 self.update_evaluation_report(model_evaluation_artifact)
-                logging.info(f"Model accepted. Model eval artifact {model_evaluation_artifact} created")
+                logging.info("Model accepted. Model eval artifact %s created", model_evaluation_artifact)
                 return model_evaluation_artifact
 
             model_list = [model, trained_model_object]
@@ -127,7 +127,7 @@ class ModelEvaluation:
                                                                y_test=test_target_arr,
                                                                base_accuracy=self.model_trainer_artifact.model_accuracy,
                                                                )
-            logging.info(f"Model evaluation completed. model metric artifact: {metric_info_artifact}")
+            logging.info("Model evaluation completed. model metric artifact: %s", metric_info_artifact)
 
             if metric_info_artifact is None:
                 response = ModelEvaluationArtifact(is_model_accepted=False,
@@ -140,7 +140,7 @@ class ModelEvaluation:
                 model_evaluation_artifact = ModelEvaluationArtifact(evaluated_model_path=trained_model_file_path,
                                                                     is_model_accepted=True)
                 self.update_evaluation_report(model_evaluation_artifact)
-                logging.info(f"Model accepted. Model eval artifact {model_evaluation_artifact} created")
+                logging.info("Model accepted. Model eval artifact %s created", model_evaluation_artifact)
 
             else:
                 logging.info("Trained model is no better than existing model hence not accepting trained model")
@@ -151,4 +151,4 @@ class ModelEvaluation:
             raise CustomException(e, sys) from e
 
     def __del__(self):
-        logging.info(f"{'=' * 20}Model Evaluation log completed.{'=' * 20} ")
\ No newline at end of file
+        logging.info("%sModel Evaluation log completed.%s ", "=" * 20, "=" * 20)
\ No newline at end of file
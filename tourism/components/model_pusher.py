@@ -1,7 +1,9 @@
 from tourism.logger import logging
 from tourism.exception import CustomException
-from tourism.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact 
+from tourism.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact
 from tourism.entity.config_entity import ModelPusherConfig
+from tourism.utils.main_utils import promote_file, update_current_pointer, resolve_current_pointer
+from tourism.utils.serialization import get_metadata_file_path
 import os, sys
 import shutil
 
@@ -11,39 +13,81 @@ class ModelPusher:
                  model_evaluation_artifact: ModelEvaluationArtifact
                  ):
         try:
-            logging.info(f"{'>>' * 30}Model Pusher log started.{'<<' * 30} ")
+            logging.info("%sModel Pusher log started.%s ", ">>" * 30, "<<" * 30)
             self.model_pusher_config = model_pusher_config
             self.model_evaluation_artifact = model_evaluation_artifact
-        
+
         except Exception as e:
-            raise CustomException(e,sys) from e 
-    
-    def export_model(self)-> ModelPusherConfig:
+            raise CustomException(e,sys) from e
+
+    def export_model(self)-> ModelPusherArtifact:
         try:
             evaluated_model_file_path = self.model_evaluation_artifact.evaluated_model_path
             export_dir = self.model_pusher_config.export_dir_path
             model_file_name = os.path.basename(evaluated_model_file_path)
             export_model_file_path = os.path.join(export_dir, model_file_name)
-            logging.info(f"Exporting model file: [{export_model_file_path}]")
+            logging.info("Exporting model file: [%s]", export_model_file_path)
             os.makedirs(export_dir, exist_ok=True)
 
-            shutil.copy(src=evaluated_model_file_path, dst=export_model_file_path)
-            logging.info(
-                f"Trained model: {evaluated_model_file_path} is copied in export dir:[{export_model_file_path}]")
-            
+            # metadata first: once the model file is visible its format is known
+            metadata_file_path = get_metadata_file_path(evaluated_model_file_path)
+            if os.path.exists(metadata_file_path):
+                promote_file(src=metadata_file_path, dst=get_metadata_file_path(export_model_file_path))
+            promotion_method = promote_file(src=evaluated_model_file_path, dst=export_model_file_path)
+            logging.info("Trained model: %s is exported in export dir:[%s] using %s",
+                         evaluated_model_file_path, export_model_file_path, promotion_method)
+
+            current_pointer_path = os.path.join(self.model_pusher_config.export_root_dir,
+                                                self.model_pusher_config.current_pointer_name)
+            update_current_pointer(pointer_path=current_pointer_path, target_dir=export_dir)
+            logging.info("Current model pointer: [%s] -> [%s]", current_pointer_path, export_dir)
+
+            self.remove_old_exports()
+
             model_pusher_artifact = ModelPusherArtifact(is_model_pusher=True,
-                                                        export_model_file_path=export_model_file_path
+                                                        export_model_file_path=export_model_file_path,
+                                                        current_pointer_path=current_pointer_path,
+                                                        promotion_method=promotion_method
                                                         )
-            logging.info(f"Model Pusher artifact: [{model_pusher_artifact}")
+            logging.info("Model Pusher artifact: [%s]", model_pusher_artifact)
             return model_pusher_artifact
         except Exception as e:
-            raise CustomException(e,sys) from e 
-    
+            raise CustomException(e,sys) from e
+
+    def remove_old_exports(self) -> list:
+        """
+        Keeps the `keep_last_exports` most recent export dirs plus the one the current pointer targets.
+        Export dir names are timestamps (%Y%m%d%H%M%S) so lexical order is chronological.
+        return: list of removed export dirs
+        """
+        try:
+            keep_last_exports = self.model_pusher_config.keep_last_exports
+            if not keep_last_exports:
+                return []
+
+            export_root_dir = self.model_pusher_config.export_root_dir
+            current_pointer_path = os.path.join(export_root_dir, self.model_pusher_config.current_pointer_name)
+            current_export_dir = resolve_current_pointer(current_pointer_path)
+
+            export_dirs = sorted(os.path.join(export_root_dir, name) for name in os.listdir(export_root_dir)
+                                 if name.isdigit() and os.path.isdir(os.path.join(export_root_dir, name)))
+
+            removed_export_dirs = []
+            for export_dir in export_dirs[:-keep_last_exports]:
+                if current_export_dir is not None and os.path.samefile(export_dir, current_export_dir):
+                    continue
+                shutil.rmtree(export_dir)
+                removed_export_dirs.append(export_dir)
+            logging.info("Removed old model exports: %s", removed_export_dirs)
+            return removed_export_dirs
+        except Exception as e:
+            raise CustomException(e,sys) from e
+
     def initiate_model_pusher(self)-> ModelPusherArtifact:
         try:
             return self.export_model()
         except Exception as e:
             raise CustomException(e,sys) from e
-    
+
     def __del__(self):
-        logging.info(f"{'>>'*20}Model Pusher log completed.{'<<'*20}")
\ No newline at end of file
+        logging.info("%sModel Pusher log completed.%s", ">>" * 20, "<<" * 20)
@@ -2,23 +2,72 @@ import os
 import sys
 from tourism.exception import CustomException
 from tourism.logger import logging
+from collections import namedtuple
 from typing import List
 from tourism.entity.artifact_entity import ModelTrainerArtifact, DataTransformationArtifact
-from tourism.entity.config_entity import ModelTrainerConfig
-from tourism.utils.main_utils import save_object, load_object, load_numpy_array_data
+from tourism.entity.config_entity import ModelTrainerConfig, ThresholdTuningConfig
+from tourism.entity.threshold_tuning import (ProbabilityCache, tune_threshold, get_out_of_fold_scores,
+                                             get_operating_point)
+from tourism.entity.flat_ensemble import flatten_tree_ensemble, verify_flat_ensemble
+from tourism.utils.main_utils import save_object, load_object, load_numpy_array_data, write_yaml_file
+from tourism.utils.serialization import SERIALIZATION_FORMAT_KEY
 from tourism.entity.model_factory import MetricInfoArtifact, ModelFactory, GridSearchedBestModel
 from tourism.entity.model_factory import evaluate_classification_model
+from tourism.utils.profiling import profile_step
+
+# predict_validated output: full batch length, None labels and NaN probabilities for the invalid rows
+ValidatedPrediction = namedtuple("ValidatedPrediction", ["prediction", "probability", "validation"])
+
 
 class TourismPredictor:
-    def __init__(self, preprocessing_object, trained_model_object):
+    def __init__(self, preprocessing_object, trained_model_object, threshold: float = None,
+                 calibration_map=None, input_validator=None):
         """
         TrainedModel constructor
         preprocessing_object: preprocessing_object
         trained_model_object: trained_model_object
+        threshold: positive class probability from which predict returns the positive class,
+        the estimator's own predict when None
+        calibration_map: CalibrationMap applied to the positive class probability
+        input_validator: InputValidator compiled at training time, used by validate / predict_validated
         """
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
-    
+        self.threshold = threshold
+        self.calibration_map = calibration_map
+        self.input_validator = input_validator
+
+    def set_threshold(self, threshold: float = None):
+        """
+        Moves the operating point, None goes back to the estimator's own predict.
+        """
+        self.threshold = threshold
+
+    def _predict_proba(self, transformed_feature):
+        probability = self.trained_model_object.predict_proba(transformed_feature)
+        # models pickled before threshold tuning have no calibration_map attribute
+        calibration_map = getattr(self, "calibration_map", None)
+        if calibration_map is not None:
+            import numpy as np
+
+            positive_probability = calibration_map.transform(probability[:, -1])
+            probability = np.c_[1 - positive_probability, positive_probability]
+        return probability
+
+    def _predict(self, transformed_feature, probability=None):
+        """
+        probability: _predict_proba of transformed_feature when already computed
+        """
+        threshold = getattr(self, "threshold", None)
+        if threshold is None:
+            return self.trained_model_object.predict(transformed_feature)
+        import numpy as np
+
+        if probability is None:
+            probability = self._predict_proba(transformed_feature)
+        classes = self.trained_model_object.classes_
+        return np.where(probability[:, -1] >= threshold, classes[-1], classes[0])
+
     def predict(self, X):
         """
         function accepts raw inputs and then transformed raw input using preprocessing_object
@@ -26,7 +75,7 @@ class TourismPredictor:
         At last it perform prediction on transformed features
         """
         transformed_feature = self.preprocessing_object.transform(X)
-        return self.trained_model_object.predict(transformed_feature)
+        return self._predict(transformed_feature)
 
     def predict_proba(self, X):
         """
@@ -35,7 +84,37 @@ class TourismPredictor:
         At last it performs Probaility prediction on transformed features
         """
         transformed_feature = self.preprocessing_object.transform(X)
-        return self.trained_model_object.predict_proba(transformed_feature)
+        return self._predict_proba(transformed_feature)
+
+    def validate(self, X):
+        """
+        return: ValidationResult of the raw inputs, per row and column error bits
+        """
+        # models pickled before input validation have no input_validator attribute
+        input_validator = getattr(self, "input_validator", None)
+        if input_validator is None:
+            raise Exception("This model was exported without an input validator")
+        return input_validator.validate(X)
+
+    def predict_validated(self, X) -> ValidatedPrediction:
+        """
+        Validates the raw inputs and scores the valid rows in the same call, invalid rows never reach the
+        preprocessor.
+        """
+        import numpy as np
+
+        validation = self.validate(X)
+        n_classes = len(self.trained_model_object.classes_)
+        prediction = np.full(len(X), None, dtype=object)
+        probability = np.full((len(X), n_classes), np.nan)
+        valid_rows = np.flatnonzero(validation.valid_mask)
+        if len(valid_rows):
+            transformed_feature = self.preprocessing_object.transform(
+                X if len(valid_rows) == len(X) else X.iloc[valid_rows])
+            valid_probability = self._predict_proba(transformed_feature)
+            probability[valid_rows] = valid_probability
+            prediction[valid_rows] = self._predict(transformed_feature, probability=valid_probability)
+        return ValidatedPrediction(prediction=prediction, probability=probability, validation=validation)
 
     def __repr__(self):
         return f"{type(self.trained_model_object).__name__}()"
@@ -47,61 +126,171 @@ class TourismPredictor:
 class ModelTrainer:
 
     def __init__(self, model_trainer_config: ModelTrainerConfig,
-                 data_transformation_artifact: DataTransformationArtifact):
+                 data_transformation_artifact: DataTransformationArtifact,
+                 force_full_search: bool = False, cpu_budget: int = None,
+                 threshold_tuning_config: ThresholdTuningConfig = None):
+        """
+        force_full_search: ignore warm start and search the whole model.yaml grid (e.g. data drift was found)
+        cpu_budget: cpus the model search of this run may use, model.yaml decides when None
+        threshold_tuning_config: picks the decision threshold of the exported model when enabled
+        """
         try:
-            logging.info(f"{'>>' * 30}Model trainer log started.{'<<' * 30} ")
+            logging.info("%sModel trainer log started.%s ", ">>" * 30, "<<" * 30)
             self.model_trainer_config = model_trainer_config
             self.data_transformation_artifact = data_transformation_artifact
+            self.force_full_search = force_full_search
+            self.cpu_budget = cpu_budget
+            self.threshold_tuning_config = threshold_tuning_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def tune_thresholds(self, model_list: list, selected_index: int, folds: list, x_test, y_test):
+        """
+        Sweeps the thresholds of every model with predict_proba on its out-of-fold probabilities of the training
+        data and writes the report. The test set, which selects and accepts the model, only reports the
+        metrics at the chosen operating point.
+        folds: CV folds of the training data, ModelFactory.get_cv_folds
+        return: (threshold, calibration map) of the selected model, (None, None) when it has no predict_proba
+        """
+        try:
+            config = self.threshold_tuning_config
+            probability_cache = ProbabilityCache()
+            model_reports, selected_point, selected_calibration_map = [], None, None
+            for index, model in enumerate(model_list):
+                if not hasattr(model, "predict_proba"):
+                    continue
+                with profile_step("out_of_fold_scores"):
+                    y_out_of_fold, out_of_fold_scores = get_out_of_fold_scores(model, folds)
+                operating_point, calibration_map, default_point = tune_threshold(
+                    y_out_of_fold, out_of_fold_scores, metric=config.metric, min_precision=config.min_precision,
+                    min_recall=config.min_recall, calibrate=config.calibrate)
+                test_scores = probability_cache.get_scores(index, model, "test", x_test)
+                if calibration_map is not None:
+                    test_scores = calibration_map.transform(test_scores)
+                test_point = get_operating_point(y_test, test_scores, operating_point.threshold)
+                model_reports.append({"model_name": str(model), "selected": index == selected_index,
+                                      "operating_point": dict(operating_point._asdict()),
+                                      "default_operating_point": dict(default_point._asdict()),
+                                      "test_operating_point": dict(test_point._asdict())})
+                if index == selected_index:
+                    selected_point, selected_calibration_map = operating_point, calibration_map
+
+            write_yaml_file(file_path=config.report_file_path,
+                            data={"metric": config.metric, "min_precision": config.min_precision,
+                                  "min_recall": config.min_recall, "calibrate": config.calibrate,
+                                  "models": model_reports})
+            if selected_point is None:
+                logging.info("Selected model has no predict_proba, keeping its own predict")
+                return None, None
+            logging.info("Selected operating point: %s", selected_point)
+            return selected_point.threshold, selected_calibration_map
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def flatten_model(self, model_object, x_test):
+        """
+        Exports a RandomForestClassifier / XGBClassifier as a FlatTreeEnsemble when its predictions on the test
+        set match the fitted estimator.
+        return: the estimator to export
+        """
+        try:
+            flat_ensemble = flatten_tree_ensemble(model_object)
+            if flat_ensemble is None:
+                logging.info("%s is not a tree ensemble, exported as is", type(model_object).__name__)
+                return model_object
+            if not verify_flat_ensemble(flat_ensemble, model_object, x_test):
+                logging.warning("Flattened %s predictions differ, exported as is", type(model_object).__name__)
+                return model_object
+            return flat_ensemble
         except Exception as e:
             raise CustomException(e, sys) from e
 
     def initiate_model_trainer(self) -> ModelTrainerArtifact:
         try:
-            logging.info(f"Loading transformed training dataset")
+            logging.info("Extracting model config file path")
+            model_config_file_path = self.model_trainer_config.model_config_file_path
+
+            logging.info("Initializing model factory class using above model config file: %s", model_config_file_path)
+            model_factory = ModelFactory(model_config_path=model_config_file_path,
+                                         warm_start_state_file_path=self.model_trainer_config.warm_start_state_file_path,
+                                         force_full_search=self.force_full_search,
+                                         fold_cache_dir=self.model_trainer_config.cv_fold_dir,
+                                         search_cache_file_path=self.model_trainer_config.search_cache_file_path,
+                                         search_queue_file_path=self.model_trainer_config.search_queue_file_path,
+                                         cpu_budget=self.cpu_budget)
+
+            # out-of-core training streams chunks of the memory mapped arrays instead of reading them in memory
+            mmap_mode = "r" if model_factory.is_out_of_core else None
+            logging.info("Loading transformed training dataset")
             transformed_train_file_path = self.data_transformation_artifact.transformed_train_file_path
-            train_array = load_numpy_array_data(file_path=transformed_train_file_path)
+            train_array = load_numpy_array_data(file_path=transformed_train_file_path, mmap_mode=mmap_mode)
 
-            logging.info(f"Loading transformed testing dataset")
+            logging.info("Loading transformed testing dataset")
             transformed_test_file_path = self.data_transformation_artifact.transformed_test_file_path
-            test_array = load_numpy_array_data(file_path=transformed_test_file_path)
+            test_array = load_numpy_array_data(file_path=transformed_test_file_path, mmap_mode=mmap_mode)
 
-            logging.info(f"Splitting training and testing input and target feature")
+            logging.info("Splitting training and testing input and target feature")
             x_train, y_train, x_test, y_test = train_array[:, :-1], train_array[:, -1], test_array[:, :-1], test_array[
                                                                                                             :, -1]
 
-            logging.info(f"Extracting model config file path")
-            model_config_file_path = self.model_trainer_config.model_config_file_path
-
-            logging.info(f"Initializing model factory class using above model config file: {model_config_file_path}")
-            model_factory = ModelFactory(model_config_path=model_config_file_path)
-
             base_accuracy = self.model_trainer_config.base_accuracy
-            logging.info(f"Expected accuracy: {base_accuracy}")
+            logging.info("Expected accuracy: %s", base_accuracy)
 
-            logging.info(f"Initiating operation model selection")
-            best_model = model_factory.get_best_model(X=x_train, y=y_train, base_accuracy=base_accuracy)
+            logging.info("Initiating operation model selection")
+            with profile_step("get_best_model", rows=len(x_train)):
+                best_model = model_factory.get_best_model(X=x_train, y=y_train, base_accuracy=base_accuracy)
 
-            logging.info(f"Best model found on training dataset: {best_model}")
+            logging.info("Best model found on training dataset: %s", best_model)
 
-            logging.info(f"Extracting trained model list.")
+            logging.info("Extracting trained model list.")
             grid_searched_best_model_list: List[GridSearchedBestModel] = model_factory.grid_searched_best_model_list
+            model_factory.save_warm_start_state(
+                model_dir=os.path.dirname(self.model_trainer_config.trained_model_file_path))
 
             model_list = [model.best_model for model in grid_searched_best_model_list]
-            logging.info(f"Evaluation all trained model on training and testing dataset both")
-            metric_info: MetricInfoArtifact = evaluate_classification_model(model_list=model_list, X_train=x_train,
-                                                                        y_train=y_train, X_test=x_test, y_test=y_test,
-                                                                        base_accuracy=base_accuracy)
+            logging.info("Evaluation all trained model on training and testing dataset both")
+            with profile_step("evaluate_classification_model", rows=len(x_train) + len(x_test)):
+                metric_info: MetricInfoArtifact = evaluate_classification_model(
+                    model_list=model_list, X_train=x_train, y_train=y_train, X_test=x_test, y_test=y_test,
+                    base_accuracy=base_accuracy, chunk_rows=model_factory.chunk_rows)
             print(metric_info.model_name)
-            logging.info(f"Best found model on both training and testing dataset.")
+            logging.info("Best found model on both training and testing dataset.")
 
             preprocessing_obj = load_object(file_path=self.data_transformation_artifact.preprocessed_object_file_path)
             model_object = metric_info.model_object
 
+            threshold, calibration_map = None, None
+            if self.threshold_tuning_config is not None and self.threshold_tuning_config.enabled:
+                if model_factory.is_out_of_core:
+                    # refitting clones per fold would read the whole training array in memory
+                    logging.warning("Threshold tuning needs in memory CV folds, skipped in out-of-core mode")
+                else:
+                    with profile_step("tune_threshold", rows=len(x_train)):
+                        threshold, calibration_map = self.tune_thresholds(
+                            model_list=model_list, selected_index=metric_info.index_number,
+                            folds=model_factory.get_cv_folds(x_train, y_train), x_test=x_test, y_test=y_test)
+
+            if getattr(self.model_trainer_config, "flatten_tree_ensemble", False):
+                with profile_step("flatten_tree_ensemble", rows=len(x_test)):
+                    model_object = self.flatten_model(model_object=model_object, x_test=x_test)
+
             trained_model_file_path = self.model_trainer_config.trained_model_file_path
+            input_validator = None
+            input_validator_file_path = self.data_transformation_artifact.input_validator_file_path
+            if input_validator_file_path is not None and os.path.exists(input_validator_file_path):
+                input_validator = load_object(file_path=input_validator_file_path)
+
             tourism_model = TourismPredictor(preprocessing_object=preprocessing_obj,
-                                                      trained_model_object=model_object)
-            logging.info(f"Saving model at path: {trained_model_file_path}")
-            save_object(file_path=trained_model_file_path, obj=tourism_model)
+                                                      trained_model_object=model_object,
+                                                      threshold=threshold,
+                                                      calibration_map=calibration_map,
+                                                      input_validator=input_validator)
+            logging.info("Saving model at path: %s", trained_model_file_path)
+            with profile_step("save_model"):
+                model_metadata = save_object(file_path=trained_model_file_path, obj=tourism_model,
+                                             serialization_format=self.model_trainer_config.serialization_format,
+                                             compress=self.model_trainer_config.serialization_compress)
+            logging.info("Saved model metadata: %s", model_metadata)
 
             model_trainer_artifact = ModelTrainerArtifact(is_trained=True, message="Model Trained successfully",
                                                           trained_model_file_path=trained_model_file_path,
@@ -109,13 +298,14 @@ class ModelTrainer:
                                                           test_f1=metric_info.test_f1,
                                                           train_accuracy=metric_info.train_accuracy,
                                                           test_accuracy=metric_info.test_accuracy,
-                                                          model_accuracy=metric_info.model_accuracy
+                                                          model_accuracy=metric_info.model_accuracy,
+                                                          serialization_format=model_metadata[SERIALIZATION_FORMAT_KEY]
                                                           )
 
-            logging.info(f"Model Trainer Artifact: {model_trainer_artifact}")
+            logging.info("Model Trainer Artifact: %s", model_trainer_artifact)
             return model_trainer_artifact
         except Exception as e:
             raise CustomException(e, sys) from e
 
     def __del__(self):
-        logging.info(f"{'>>' * 30}Model trainer log completed.{'<<' * 30} ")
\ No newline at end of file
+        logging.info("%sModel trainer log completed.%s ", ">>" * 30, "<<" * 30)
\ No newline at end of file
@@ -1,9 +1,18 @@
 from tourism.entity.config_entity import (DataIngestionConfig, 
+                                          MongoDBConfig,
+                                          DatasetVersionConfig,
                                           DataValidationConfig,
                                           DataTransformationConfig,
+                                          FeatureSelectionConfig,
                                           ModelTrainerConfig,
+                                          ThresholdTuningConfig,
+                                          PredictionCacheConfig,
                                           ModelEvaluationConfig,
                                           ModelPusherConfig, 
+                                          ProfilingConfig,
+                                          ArtifactSyncConfig,
+                                          RunQueueConfig,
+                                          RetentionConfig,
                                           TrainingPipelineConfig)
 from tourism.utils.main_utils import read_yaml_file
 from tourism.logger import logging
@@ -14,12 +23,21 @@ import os, sys
 class Configuration:
     def __init__(self, 
         config_file_path: str = CONFIG_FILE_PATH,
-        current_time_stamp: str = CURRENT_TIME_STAMP
+        current_time_stamp: str = None,
+        namespace: str = None
         ) -> None:
+        """
+        current_time_stamp: artifact time stamp of the run, taken when the configuration is created when None
+        namespace: isolates the artifacts, saved models and experiment history of a run variant
+                   (e.g. a region) under <artifact_dir>/<namespace> and <model_export_dir>/<namespace>
+        """
         try:
+            if namespace is not None and (os.path.basename(namespace) != namespace or namespace.startswith(".")):
+                raise Exception(f"Namespace [{namespace}] must be a plain directory name")
+            self.namespace = namespace
             self.config_info = read_yaml_file(file_path=config_file_path)
             self.training_pipeline_config = self.get_training_pipeline_config()
-            self.time_stamp = current_time_stamp
+            self.time_stamp = current_time_stamp or get_current_time_stamp()
         except Exception as e:
             raise CustomException(e, sys) from e
 
@@ -55,15 +73,61 @@ class Configuration:
                 ingested_data_dir,
                 data_ingestion_info[DATA_INGESTION_TEST_DIR_KEY]
             )
+
+            # appended to by every run, not time stamped
+            incremental_dir = os.path.join(
+                artifact_dir,
+                DATA_INGESTION_ARTIFACT_DIR,
+                data_ingestion_info.get(DATA_INGESTION_INCREMENTAL_DIR_KEY, "incremental")
+            )
+            manifest_file_path = os.path.join(
+                incremental_dir,
+                data_ingestion_info.get(DATA_INGESTION_MANIFEST_FILE_NAME_KEY, "ingestion_manifest.yaml")
+            )
+
+            source = data_ingestion_info.get(DATA_INGESTION_SOURCE_KEY, S3_SOURCE)
+            if source not in (S3_SOURCE, MONGODB_SOURCE):
+                raise Exception(f"Unknown ingestion source [{source}], expected {S3_SOURCE} or {MONGODB_SOURCE}")
+            mongodb_config = None
+            if source == MONGODB_SOURCE:
+                mongodb_info = data_ingestion_info[DATA_INGESTION_MONGODB_KEY]
+                mongodb_config = MongoDBConfig(
+                    database_name=mongodb_info[MONGODB_DATABASE_NAME_KEY],
+                    collection_name=mongodb_info[MONGODB_COLLECTION_NAME_KEY],
+                    batch_size=mongodb_info.get(MONGODB_BATCH_SIZE_KEY, 10000),
+                    n_partitions=mongodb_info.get(MONGODB_N_PARTITIONS_KEY, 4),
+                    partition_field=mongodb_info.get(MONGODB_PARTITION_FIELD_KEY, "_id")
+                )
+
+            # shared by every run, not time stamped
+            dataset_version_config = None
+            dataset_version_info = data_ingestion_info.get(DATA_INGESTION_DATASET_VERSION_KEY) or {}
+            if dataset_version_info.get(DATASET_VERSION_ENABLED_KEY, False):
+                dataset_version_config = DatasetVersionConfig(
+                    store_dir=os.path.join(artifact_dir,
+                                           DATA_INGESTION_ARTIFACT_DIR,
+                                           dataset_version_info.get(DATASET_VERSION_STORE_DIR_KEY, "dataset_store")),
+                    chunk_rows=dataset_version_info.get(DATASET_VERSION_CHUNK_ROWS_KEY, 5000),
+                    time_stamp=self.time_stamp
+                )
+
             data_ingestion_config=DataIngestionConfig(
                 bucket_name=bucket_name,
                 object_name=object_name,
                 local_file_name=local_file_name,
                 raw_data_dir=raw_data_dir, 
                 ingested_train_dir=ingested_train_dir, 
-                ingested_test_dir=ingested_test_dir
+                ingested_test_dir=ingested_test_dir,
+                object_prefix=data_ingestion_info.get(DATA_INGESTION_OBJECT_PREFIX_KEY),
+                incremental_dir=incremental_dir,
+                manifest_file_path=manifest_file_path,
+                download_workers=data_ingestion_info.get(DATA_INGESTION_DOWNLOAD_WORKERS_KEY, 8),
+                test_size=data_ingestion_info.get(DATA_INGESTION_TEST_SIZE_KEY, 0.2),
+                source=source,
+                mongodb_config=mongodb_config,
+                dataset_version_config=dataset_version_config
             )
-            logging.info(f"Data Ingestion config: {data_ingestion_config}")
+            logging.info("Data Ingestion config: %s", data_ingestion_config)
             return data_ingestion_config
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -134,17 +198,57 @@ class Configuration:
                 data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSED_FILE_NAME_KEY]
             )
 
+            # the validator ships with the preprocessor it was compiled from
+            input_validator_file_path = None
+            if DATA_TRANSFORMATION_INPUT_VALIDATOR_FILE_NAME_KEY in data_transformation_config_info:
+                input_validator_file_path = os.path.join(
+                    data_transformation_artifact_dir,
+                    data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
+                    data_transformation_config_info[DATA_TRANSFORMATION_INPUT_VALIDATOR_FILE_NAME_KEY]
+                )
+
             data_transformation_config = DataTransformationConfig(
                 transformed_train_dir=transformed_train_dir,
                 transformed_test_dir=transformed_test_dir,
-                preprocessed_object_file_path=preprocessed_object_file_path
+                preprocessed_object_file_path=preprocessed_object_file_path,
+                input_validator_file_path=input_validator_file_path,
+                range_margin=data_transformation_config_info.get(DATA_TRANSFORMATION_RANGE_MARGIN_KEY, 0.1)
             )
 
-            logging.info(f"Data transformation config: {data_transformation_config}")
+            logging.info("Data transformation config: %s", data_transformation_config)
             return data_transformation_config
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def get_feature_selection_config(self) -> FeatureSelectionConfig:
+        try:
+            feature_selection_config_info = self.config_info.get(FEATURE_SELECTION_CONFIG_KEY, {})
+
+            report_file_path = os.path.join(
+                self.training_pipeline_config.artifact_dir,
+                DATA_TRANSFORMATION_ARTIFACT_DIR,
+                self.time_stamp,
+                feature_selection_config_info.get(FEATURE_SELECTION_REPORT_FILE_NAME_KEY,
+                                                  "feature_selection_report.yaml")
+            )
+
+            feature_selection_config = FeatureSelectionConfig(
+                enabled=feature_selection_config_info.get(FEATURE_SELECTION_ENABLED_KEY, False),
+                importance_source=feature_selection_config_info.get(FEATURE_SELECTION_IMPORTANCE_SOURCE_KEY,
+                                                                    "previous_model"),
+                cumulative_importance=feature_selection_config_info.get(
+                    FEATURE_SELECTION_CUMULATIVE_IMPORTANCE_KEY, 0.99),
+                min_features=feature_selection_config_info.get(FEATURE_SELECTION_MIN_FEATURES_KEY, 1),
+                n_estimators=feature_selection_config_info.get(FEATURE_SELECTION_N_ESTIMATORS_KEY, 50),
+                report_file_path=report_file_path,
+                # the previous best model is looked up in the evaluation history
+                model_evaluation_file_path=self.get_model_evaluation_config().model_evaluation_file_path
+            )
+            logging.info("Feature selection config: %s", feature_selection_config)
+            return feature_selection_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def get_model_trainer_config(self) -> ModelTrainerConfig:
         try:
             artifact_dir = self.training_pipeline_config.artifact_dir
@@ -170,17 +274,83 @@ class Configuration:
                 model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY]
             )
 
+            serialization_format = model_trainer_config_info.get(MODEL_TRAINER_SERIALIZATION_FORMAT_KEY, "auto")
+            serialization_compress = model_trainer_config_info.get(MODEL_TRAINER_SERIALIZATION_COMPRESS_KEY, 0)
+
+            # shared by every run, not time stamped
+            warm_start_state_file_path = None
+            if MODEL_TRAINER_WARM_START_STATE_FILE_NAME_KEY in model_trainer_config_info:
+                warm_start_state_file_path = os.path.join(
+                    artifact_dir,
+                    MODEL_TRAINER_ARTIFACT_DIR,
+                    model_trainer_config_info[MODEL_TRAINER_WARM_START_STATE_FILE_NAME_KEY]
+                )
+
+            # candidate scores are reused across runs, not time stamped either
+            search_cache_file_path = None
+            if MODEL_TRAINER_SEARCH_CACHE_FILE_NAME_KEY in model_trainer_config_info:
+                search_cache_file_path = os.path.join(
+                    artifact_dir,
+                    MODEL_TRAINER_ARTIFACT_DIR,
+                    model_trainer_config_info[MODEL_TRAINER_SEARCH_CACHE_FILE_NAME_KEY]
+                )
+
+            # tasks of every run carry their search id, workers may serve several runs
+            search_queue_file_path = None
+            if MODEL_TRAINER_SEARCH_QUEUE_FILE_NAME_KEY in model_trainer_config_info:
+                search_queue_file_path = os.path.join(
+                    artifact_dir,
+                    MODEL_TRAINER_ARTIFACT_DIR,
+                    model_trainer_config_info[MODEL_TRAINER_SEARCH_QUEUE_FILE_NAME_KEY]
+                )
+
+            cv_fold_dir = None
+            if MODEL_TRAINER_CV_FOLD_DIR_KEY in model_trainer_config_info:
+                cv_fold_dir = os.path.join(model_trainer_artifact_dir,
+                                           model_trainer_config_info[MODEL_TRAINER_CV_FOLD_DIR_KEY])
+
             model_trainer_config = ModelTrainerConfig(
                 trained_model_file_path=trained_model_file_path,
                 base_accuracy=base_accuracy,
-                model_config_file_path=model_config_file_path
+                model_config_file_path=model_config_file_path,
+                serialization_format=serialization_format,
+                serialization_compress=serialization_compress,
+                warm_start_state_file_path=warm_start_state_file_path,
+                cv_fold_dir=cv_fold_dir,
+                search_cache_file_path=search_cache_file_path,
+                search_queue_file_path=search_queue_file_path,
+                flatten_tree_ensemble=model_trainer_config_info.get(MODEL_TRAINER_FLATTEN_TREE_ENSEMBLE_KEY, False)
             )
             
-            logging.info(f"Model trainer config: {model_trainer_config}")
+            logging.info("Model trainer config: %s", model_trainer_config)
             return model_trainer_config
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def get_threshold_tuning_config(self) -> ThresholdTuningConfig:
+        try:
+            threshold_tuning_config_info = self.config_info.get(THRESHOLD_TUNING_CONFIG_KEY, {})
+
+            report_file_path = os.path.join(
+                self.training_pipeline_config.artifact_dir,
+                MODEL_TRAINER_ARTIFACT_DIR,
+                self.time_stamp,
+                threshold_tuning_config_info.get(THRESHOLD_TUNING_REPORT_FILE_NAME_KEY, "threshold_report.yaml")
+            )
+
+            threshold_tuning_config = ThresholdTuningConfig(
+                enabled=threshold_tuning_config_info.get(THRESHOLD_TUNING_ENABLED_KEY, False),
+                metric=threshold_tuning_config_info.get(THRESHOLD_TUNING_METRIC_KEY, "f1"),
+                min_precision=threshold_tuning_config_info.get(THRESHOLD_TUNING_MIN_PRECISION_KEY),
+                min_recall=threshold_tuning_config_info.get(THRESHOLD_TUNING_MIN_RECALL_KEY),
+                calibrate=threshold_tuning_config_info.get(THRESHOLD_TUNING_CALIBRATE_KEY, False),
+                report_file_path=report_file_path
+            )
+            logging.info("Threshold tuning config: %s", threshold_tuning_config)
+            return threshold_tuning_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def get_model_evaluation_config(self) -> ModelEvaluationConfig:
         try:
             artifact_dir = os.path.join(self.training_pipeline_config.artifact_dir,
@@ -194,7 +364,7 @@ class Configuration:
                 model_evaluation_file_path=model_evaluation_file_path,
                 time_stamp=self.time_stamp
             ) 
-            logging.info(f"Model Evaluation Config: {response}.")
+            logging.info("Model Evaluation Config: %s.", response)
             return response
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -203,25 +373,132 @@ class Configuration:
         try:
             time_stamp = f"{datetime.now().strftime('%Y%m%d%H%M%S')}"
             model_pusher_config_info = self.config_info[MODEL_PUSHER_CONFIG_KEY]
-            export_dir_path = os.path.join(ROOT_DIR, model_pusher_config_info[MODEL_PUSHER_MODEL_EXPORT_DIR_KEY],
-                                           time_stamp)
-
-            model_pusher_config = ModelPusherConfig(export_dir_path=export_dir_path)
-            logging.info(f"Model pusher config {model_pusher_config}")
+            export_root_dir = os.path.join(ROOT_DIR, model_pusher_config_info[MODEL_PUSHER_MODEL_EXPORT_DIR_KEY])
+            if self.namespace is not None:
+                export_root_dir = os.path.join(export_root_dir, self.namespace)
+            export_dir_path = os.path.join(export_root_dir, time_stamp)
+
+            current_pointer_name = model_pusher_config_info.get(MODEL_PUSHER_CURRENT_POINTER_NAME_KEY, "current")
+            keep_last_exports = model_pusher_config_info.get(MODEL_PUSHER_KEEP_LAST_EXPORTS_KEY)
+
+            model_pusher_config = ModelPusherConfig(export_dir_path=export_dir_path,
+                                                    export_root_dir=export_root_dir,
+                                                    current_pointer_name=current_pointer_name,
+                                                    keep_last_exports=keep_last_exports)
+            logging.info("Model pusher config %s", model_pusher_config)
             return model_pusher_config
 
         except Exception as e:
             raise CustomException(e,sys) from e
 
+    def get_prediction_cache_config(self) -> PredictionCacheConfig:
+        try:
+            prediction_cache_config_info = self.config_info.get(PREDICTION_CACHE_CONFIG_KEY, {})
+            # the cache follows the current pointer of the model pusher to see model pushes
+            model_pusher_config = self.get_model_pusher_config()
+            current_pointer_path = os.path.join(model_pusher_config.export_root_dir,
+                                                model_pusher_config.current_pointer_name)
+
+            prediction_cache_config = PredictionCacheConfig(
+                enabled=prediction_cache_config_info.get(PREDICTION_CACHE_ENABLED_KEY, False),
+                max_entries=prediction_cache_config_info.get(PREDICTION_CACHE_MAX_ENTRIES_KEY, 100000),
+                ttl_seconds=prediction_cache_config_info.get(PREDICTION_CACHE_TTL_SECONDS_KEY, 3600),
+                current_pointer_path=current_pointer_path,
+                model_file_name=self.config_info[MODEL_TRAINER_CONFIG_KEY][MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY]
+            )
+            logging.info("Prediction cache config: %s", prediction_cache_config)
+            return prediction_cache_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_profiling_config(self) -> ProfilingConfig:
+        try:
+            profiling_config_info = self.config_info.get(PROFILING_CONFIG_KEY, {})
+            # one sub directory per experiment id is created by the pipeline
+            profile_dir = os.path.join(self.training_pipeline_config.artifact_dir,
+                                       EXPERIMENT_DIR_NAME,
+                                       profiling_config_info.get(PROFILING_DIR_KEY, "profiles"))
+
+            profiling_config = ProfilingConfig(enabled=profiling_config_info.get(PROFILING_ENABLED_KEY, True),
+                                               profiler=profiling_config_info.get(PROFILING_PROFILER_KEY, "none"),
+                                               sampling_interval=profiling_config_info.get(
+                                                   PROFILING_SAMPLING_INTERVAL_KEY, 0.01),
+                                               profile_dir=profile_dir)
+            logging.info("Profiling config: %s", profiling_config)
+            return profiling_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_artifact_sync_config(self) -> ArtifactSyncConfig:
+        try:
+            artifact_sync_config_info = self.config_info.get(ARTIFACT_SYNC_CONFIG_KEY, {})
+            # artifacts/<namespace>/... and saved_models/<namespace>/... keep their relative paths in the bucket
+            artifact_sync_config = ArtifactSyncConfig(
+                enabled=artifact_sync_config_info.get(ARTIFACT_SYNC_ENABLED_KEY, False),
+                bucket_name=artifact_sync_config_info.get(ARTIFACT_SYNC_BUCKET_NAME_KEY),
+                prefix=artifact_sync_config_info.get(ARTIFACT_SYNC_PREFIX_KEY, "tourism"),
+                local_root=ROOT_DIR,
+                max_workers=artifact_sync_config_info.get(ARTIFACT_SYNC_MAX_WORKERS_KEY, 8),
+                multipart_threshold=int(artifact_sync_config_info.get(ARTIFACT_SYNC_MULTIPART_THRESHOLD_KEY, 64) * 2 ** 20),
+                multipart_chunksize=int(artifact_sync_config_info.get(ARTIFACT_SYNC_MULTIPART_CHUNKSIZE_KEY, 16) * 2 ** 20),
+                flush_timeout=artifact_sync_config_info.get(ARTIFACT_SYNC_FLUSH_TIMEOUT_KEY, 600))
+            logging.info("Artifact sync config: %s", artifact_sync_config)
+            return artifact_sync_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_run_queue_config(self) -> RunQueueConfig:
+        try:
+            run_queue_config_info = self.config_info.get(RUN_QUEUE_CONFIG_KEY, {})
+            run_queue_config = RunQueueConfig(
+                max_concurrent_runs=run_queue_config_info.get(RUN_QUEUE_MAX_CONCURRENT_RUNS_KEY, 1),
+                total_cpus=run_queue_config_info.get(RUN_QUEUE_TOTAL_CPUS_KEY) or os.cpu_count() or 1)
+            logging.info("Run queue config: %s", run_queue_config)
+            return run_queue_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_retention_config(self) -> RetentionConfig:
+        try:
+            retention_config_info = self.config_info.get(RETENTION_CONFIG_KEY, {})
+            # the exports, the current pointer and the files naming the models in use are the pipeline's own
+            model_pusher_config = self.get_model_pusher_config()
+            model_trainer_config_info = self.config_info[MODEL_TRAINER_CONFIG_KEY]
+            warm_start_state_file_path = None
+            if MODEL_TRAINER_WARM_START_STATE_FILE_NAME_KEY in model_trainer_config_info:
+                warm_start_state_file_path = os.path.join(
+                    self.training_pipeline_config.artifact_dir,
+                    MODEL_TRAINER_ARTIFACT_DIR,
+                    model_trainer_config_info[MODEL_TRAINER_WARM_START_STATE_FILE_NAME_KEY]
+                )
+
+            retention_config = RetentionConfig(
+                artifact_dir=self.training_pipeline_config.artifact_dir,
+                export_root_dir=model_pusher_config.export_root_dir,
+                current_pointer_name=model_pusher_config.current_pointer_name,
+                keep_last_runs=retention_config_info.get(RETENTION_KEEP_LAST_RUNS_KEY, 5),
+                keep_last_exports=model_pusher_config.keep_last_exports,
+                model_evaluation_file_path=self.get_model_evaluation_config().model_evaluation_file_path,
+                warm_start_state_file_path=warm_start_state_file_path,
+                deduplicate=retention_config_info.get(RETENTION_DEDUPLICATE_KEY, True),
+                min_file_size=int(retention_config_info.get(RETENTION_MIN_FILE_SIZE_KEY, 64) * 2 ** 10),
+                min_age_seconds=retention_config_info.get(RETENTION_MIN_AGE_HOURS_KEY, 1) * 3600)
+            logging.info("Retention config: %s", retention_config)
+            return retention_config
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def get_training_pipeline_config(self) ->TrainingPipelineConfig:
         try:
             training_pipeline_config = self.config_info[TRAINING_PIPELINE_CONFIG_KEY]
             artifact_dir = os.path.join(ROOT_DIR,
             training_pipeline_config[TRAINING_PIPELINE_ARTIFACT_DIR_KEY]
             )
+            if self.namespace is not None:
+                artifact_dir = os.path.join(artifact_dir, self.namespace)
 
             training_pipeline_config = TrainingPipelineConfig(artifact_dir=artifact_dir)
-            logging.info(f"Training pipleine config: {training_pipeline_config}")
+            logging.info("Training pipleine config: %s", training_pipeline_config)
             return training_pipeline_config
         except Exception as e:
             raise CustomException(e,sys) from e
\ No newline at end of file
@@ -0,0 +1 @@
+MONGODB_URL_KEY = "MONGODB_URL"
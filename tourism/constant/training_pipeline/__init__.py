@@ -12,8 +12,6 @@ SCHEMA_FILE_NAME = "schema.yaml"
 CONFIG_FILE_PATH = os.path.join(ROOT_DIR, CONFIG_DIR, CONFIG_FILE_NAME)
 SCHEMA_FILE_PATH = os.path.join(ROOT_DIR, CONFIG_DIR, SCHEMA_FILE_NAME)
 
-CURRENT_TIME_STAMP = get_current_time_stamp()
-
 # Training pipeline realted variables
 TRAINING_PIPELINE_CONFIG_KEY = "training_pipeline_config"
 TRAINING_PIPELINE_ARTIFACT_DIR_KEY = "artifact_dir"
@@ -29,6 +27,24 @@ DATA_INGESTION_RAW_DATA_DIR_KEY = "raw_data_dir"
 DATA_INGESTION_INGESTED_DIR_NAME_KEY = "ingested_dir"
 DATA_INGESTION_TRAIN_DIR_KEY = "ingested_train_dir"
 DATA_INGESTION_TEST_DIR_KEY = "ingested_test_dir"
+DATA_INGESTION_OBJECT_PREFIX_KEY = "object_prefix"
+DATA_INGESTION_INCREMENTAL_DIR_KEY = "incremental_dir"
+DATA_INGESTION_MANIFEST_FILE_NAME_KEY = "manifest_file_name"
+DATA_INGESTION_DOWNLOAD_WORKERS_KEY = "download_workers"
+DATA_INGESTION_TEST_SIZE_KEY = "test_size"
+DATA_INGESTION_SOURCE_KEY = "source"
+DATA_INGESTION_MONGODB_KEY = "mongodb"
+MONGODB_DATABASE_NAME_KEY = "database_name"
+MONGODB_COLLECTION_NAME_KEY = "collection_name"
+MONGODB_BATCH_SIZE_KEY = "batch_size"
+MONGODB_N_PARTITIONS_KEY = "n_partitions"
+MONGODB_PARTITION_FIELD_KEY = "partition_field"
+DATA_INGESTION_DATASET_VERSION_KEY = "dataset_version"
+DATASET_VERSION_ENABLED_KEY = "enabled"
+DATASET_VERSION_STORE_DIR_KEY = "store_dir"
+DATASET_VERSION_CHUNK_ROWS_KEY = "chunk_rows"
+S3_SOURCE = "s3"
+MONGODB_SOURCE = "mongodb"
 
 # Data Validation related variables or constant
 DATA_VALIDATION_CONFIG_KEY = "data_validation_config"
@@ -54,6 +70,17 @@ DATA_TRANSFORMATION_TRAIN_DIR_NAME_KEY = "transformed_train_dir"
 DATA_TRANSFORMATION_TEST_DIR_NAME_KEY = "transformed_test_dir"
 DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY = "preprocessing_dir"
 DATA_TRANSFORMATION_PREPROCESSED_FILE_NAME_KEY = "preprocessed_object_file_name"
+DATA_TRANSFORMATION_INPUT_VALIDATOR_FILE_NAME_KEY = "input_validator_file_name"
+DATA_TRANSFORMATION_RANGE_MARGIN_KEY = "range_margin"
+
+# Feature selection related variables or constant
+FEATURE_SELECTION_CONFIG_KEY = "feature_selection_config"
+FEATURE_SELECTION_ENABLED_KEY = "enabled"
+FEATURE_SELECTION_IMPORTANCE_SOURCE_KEY = "importance_source"
+FEATURE_SELECTION_CUMULATIVE_IMPORTANCE_KEY = "cumulative_importance"
+FEATURE_SELECTION_MIN_FEATURES_KEY = "min_features"
+FEATURE_SELECTION_N_ESTIMATORS_KEY = "n_estimators"
+FEATURE_SELECTION_REPORT_FILE_NAME_KEY = "report_file_name"
 
 # Model Training related variables or constant
 MODEL_TRAINER_ARTIFACT_DIR = "model_trainer"
@@ -63,6 +90,27 @@ MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY = "model_file_name"
 MODEL_TRAINER_BASE_ACCURACY_KEY = "base_accuracy"
 MODEL_TRAINER_MODEL_CONFIG_DIR_KEY = "model_config_dir"
 MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY = "model_config_file_name"
+MODEL_TRAINER_SERIALIZATION_FORMAT_KEY = "serialization_format"
+MODEL_TRAINER_SERIALIZATION_COMPRESS_KEY = "serialization_compress"
+MODEL_TRAINER_WARM_START_STATE_FILE_NAME_KEY = "warm_start_state_file_name"
+MODEL_TRAINER_CV_FOLD_DIR_KEY = "cv_fold_dir"
+MODEL_TRAINER_SEARCH_CACHE_FILE_NAME_KEY = "search_cache_file_name"
+MODEL_TRAINER_SEARCH_QUEUE_FILE_NAME_KEY = "search_queue_file_name"
+MODEL_TRAINER_FLATTEN_TREE_ENSEMBLE_KEY = "flatten_tree_ensemble"
+
+# Threshold tuning related variables or constant
+THRESHOLD_TUNING_CONFIG_KEY = "threshold_tuning_config"
+THRESHOLD_TUNING_ENABLED_KEY = "enabled"
+THRESHOLD_TUNING_METRIC_KEY = "metric"
+THRESHOLD_TUNING_MIN_PRECISION_KEY = "min_precision"
+THRESHOLD_TUNING_MIN_RECALL_KEY = "min_recall"
+THRESHOLD_TUNING_CALIBRATE_KEY = "calibrate"
+THRESHOLD_TUNING_REPORT_FILE_NAME_KEY = "report_file_name"
+
+PREDICTION_CACHE_CONFIG_KEY = "prediction_cache_config"
+PREDICTION_CACHE_ENABLED_KEY = "enabled"
+PREDICTION_CACHE_MAX_ENTRIES_KEY = "max_entries"
+PREDICTION_CACHE_TTL_SECONDS_KEY = "ttl_seconds"
 
 # Model Evaluation related variables or constant
 MODEL_EVALUATION_CONFIG_KEY = "model_evaluation_config"
@@ -76,7 +124,38 @@ MODEL_PATH_KEY = "model_path"
 # Model Pusher config key
 MODEL_PUSHER_CONFIG_KEY = "model_pusher_config"
 MODEL_PUSHER_MODEL_EXPORT_DIR_KEY = "model_export_dir"
+MODEL_PUSHER_CURRENT_POINTER_NAME_KEY = "current_pointer_name"
+MODEL_PUSHER_KEEP_LAST_EXPORTS_KEY = "keep_last_exports"
 
 EXPERIMENT_DIR_NAME="experiment"
 EXPERIMENT_FILE_NAME="experiment.csv"
 
+# Profiling config key
+PROFILING_CONFIG_KEY = "profiling_config"
+PROFILING_ENABLED_KEY = "enabled"
+PROFILING_PROFILER_KEY = "profiler"
+PROFILING_SAMPLING_INTERVAL_KEY = "sampling_interval"
+PROFILING_DIR_KEY = "profile_dir"
+
+# Artifact sync config key
+ARTIFACT_SYNC_CONFIG_KEY = "artifact_sync_config"
+ARTIFACT_SYNC_ENABLED_KEY = "enabled"
+ARTIFACT_SYNC_BUCKET_NAME_KEY = "bucket_name"
+ARTIFACT_SYNC_PREFIX_KEY = "prefix"
+ARTIFACT_SYNC_MAX_WORKERS_KEY = "max_workers"
+ARTIFACT_SYNC_MULTIPART_THRESHOLD_KEY = "multipart_threshold_mb"
+ARTIFACT_SYNC_MULTIPART_CHUNKSIZE_KEY = "multipart_chunksize_mb"
+ARTIFACT_SYNC_FLUSH_TIMEOUT_KEY = "flush_timeout"
+
+# Run queue config key
+RUN_QUEUE_CONFIG_KEY = "run_queue_config"
+RUN_QUEUE_MAX_CONCURRENT_RUNS_KEY = "max_concurrent_runs"
+RUN_QUEUE_TOTAL_CPUS_KEY = "total_cpus"
+
+# Retention config key
+RETENTION_CONFIG_KEY = "retention_config"
+RETENTION_KEEP_LAST_RUNS_KEY = "keep_last_runs"
+RETENTION_DEDUPLICATE_KEY = "deduplicate"
+RETENTION_MIN_FILE_SIZE_KEY = "min_file_size_kb"
+RETENTION_MIN_AGE_HOURS_KEY = "min_age_hours"
+
@@ -0,0 +1,176 @@
+"""
+MongoDB ingestion source.
+
+The collection is read with a server side projection to the schema.yaml columns, split into ranges of
+partition_field read by parallel cursors. With pymongoarrow installed (and a pymongo collection) every
+range is decoded from BSON straight into typed Arrow columns, no per document Python dict is built.
+Otherwise (mongomock, no pymongoarrow) documents are appended column by column to per column buffers and
+converted once into typed numpy arrays. mongomock is not thread safe: its ranges are read one after another.
+
+The connection string is read from the MONGODB_URL environment variable unless a client is given,
+e.g. mongomock.MongoClient() in tests.
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, TYPE_CHECKING
+
+from tourism.constant.env_variable import MONGODB_URL_KEY
+from tourism.constant.training_pipeline import DATASET_SCHEMA_COLUMNS_KEY
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.utils.main_utils import read_yaml_file
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+INT_TYPE = "int"
+FLOAT_TYPE = "float"
+CATEGORY_TYPE = "category"
+
+
+class MongoDBSource:
+
+    def __init__(self, database_name: str, collection_name: str, schema_file_path: str, client=None,
+                 batch_size: int = 10000, n_partitions: int = 4, partition_field: str = "_id"):
+        """
+        client: pymongo (or mongomock) client, created from MONGODB_URL when None
+        batch_size: documents per server round trip of every cursor
+        n_partitions: parallel cursors over ranges of partition_field (ObjectId or numeric values)
+        """
+        try:
+            if client is None:
+                import pymongo
+
+                mongo_url = os.getenv(MONGODB_URL_KEY)
+                if mongo_url is None:
+                    raise Exception(f"Environment variable [{MONGODB_URL_KEY}] is not set")
+                client = pymongo.MongoClient(mongo_url)
+            self.client = client
+            self.collection = client[database_name][collection_name]
+            self.column_types: Dict[str, str] = read_yaml_file(schema_file_path)[DATASET_SCHEMA_COLUMNS_KEY]
+            self.projection = {column: 1 for column in self.column_types}
+            self.projection["_id"] = 0
+            self.batch_size = batch_size
+            self.n_partitions = max(1, n_partitions)
+            self.partition_field = partition_field
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _get_boundary(self, direction: int):
+        documents = list(self.collection.find({self.partition_field: {"$ne": None}}, {self.partition_field: 1})
+                         .sort(self.partition_field, direction).limit(1))
+        return documents[0][self.partition_field] if documents else None
+
+    def get_partition_queries(self) -> List[dict]:
+        """
+        return: one filter per cursor, together covering every document exactly once
+        """
+        field = self.partition_field
+        # documents without the field are in no range
+        queries = [] if field == "_id" else [{field: None}]
+        low, high = self._get_boundary(1), self._get_boundary(-1)
+        if self.n_partitions == 1 or low is None:
+            return [{}]
+
+        from bson import ObjectId
+
+        if isinstance(low, ObjectId):
+            low_time, high_time = low.generation_time.timestamp(), high.generation_time.timestamp()
+            bounds = [ObjectId.from_datetime(datetime.fromtimestamp(low_time + (high_time - low_time) * step
+                                                                    / self.n_partitions, tz=timezone.utc))
+                      for step in range(1, self.n_partitions)]
+        elif isinstance(low, (int, float)) and not isinstance(low, bool):
+            bounds = [low + (high - low) * step / self.n_partitions for step in range(1, self.n_partitions)]
+        else:
+            logging.info("[%s] is not range partitionable, reading with a single cursor", field)
+            return [{}]
+        bounds = sorted(set(bounds))
+
+        queries.append({field: {"$lt": bounds[0]}})
+        queries.extend({field: {"$gte": lower, "$lt": upper}} for lower, upper in zip(bounds, bounds[1:]))
+        queries.append({field: {"$gte": bounds[-1]}})
+        return queries
+
+    def _read_arrow(self, query: dict):
+        import pyarrow as pa
+        from pymongoarrow.api import Schema, find_arrow_all
+
+        arrow_types = {INT_TYPE: pa.int64(), FLOAT_TYPE: pa.float64(), CATEGORY_TYPE: pa.string()}
+        schema = Schema({column: arrow_types[column_type] for column, column_type in self.column_types.items()})
+        return find_arrow_all(self.collection, query, schema=schema, projection=self.projection,
+                              batch_size=self.batch_size)
+
+    def _read_columns(self, query: dict) -> Dict[str, list]:
+        columns = {column: [] for column in self.column_types}
+        appenders = [(column, values.append) for column, values in columns.items()]
+        for document in self.collection.find(query, self.projection, batch_size=self.batch_size):
+            get = document.get
+            for column, append in appenders:
+                append(get(column))
+        return columns
+
+    def _to_data_frame(self, columns: Dict[str, list]) -> "pd.DataFrame":
+        """
+        Same dtypes as read_csv of the exported file: int64 (float64 with missing values), float64, object.
+        """
+        import numpy as np
+        import pandas as pd
+
+        arrays = {}
+        for column, values in columns.items():
+            column_type = self.column_types[column]
+            if column_type == CATEGORY_TYPE:
+                arrays[column] = np.array(values, dtype=object)
+            elif column_type == INT_TYPE and None not in values:
+                arrays[column] = np.array(values, dtype=np.int64)
+            else:
+                arrays[column] = np.array(values, dtype=np.float64)
+        return pd.DataFrame(arrays, columns=list(self.column_types))
+
+    def is_pymongo_collection(self) -> bool:
+        try:
+            import pymongo
+        except ImportError:
+            return False
+        return isinstance(self.collection, pymongo.collection.Collection)
+
+    def use_arrow(self) -> bool:
+        if not self.is_pymongo_collection():
+            return False
+        try:
+            import pymongoarrow  # noqa: F401
+        except ImportError:
+            logging.warning("pymongoarrow is not installed: documents are decoded one by one into Python dicts, "
+                            "install it (requirements.txt) for the arrow decoding")
+            return False
+        return True
+
+    def read_data_frame(self) -> "pd.DataFrame":
+        try:
+            import pandas as pd
+
+            queries = self.get_partition_queries()
+            use_arrow = self.use_arrow()
+            logging.info("Reading [%s] with %s cursors, %s decoding",
+                         self.collection.full_name, len(queries), "arrow" if use_arrow else "column buffer")
+            read_partition = self._read_arrow if use_arrow else self._read_columns
+            if self.is_pymongo_collection():
+                # cursors wait on the server and the arrow decoding releases the GIL: threads overlap both
+                with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                    partitions = list(executor.map(read_partition, queries))
+            else:
+                # mongomock collections are plain dicts, a cursor fails when another thread iterates them
+                partitions = [read_partition(query) for query in queries]
+
+            if use_arrow:
+                import pyarrow as pa
+
+                data_frame = pa.concat_tables(partitions).to_pandas()
+            else:
+                data_frame = pd.concat([self._to_data_frame(columns) for columns in partitions], ignore_index=True)
+            logging.info("Read %s documents from [%s]", len(data_frame), self.collection.full_name)
+            return data_frame
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -4,16 +4,17 @@ DataIngestionArtifact = namedtuple('DataIngestionArtifact',
 ["train_file_path", "test_file_path", "is_ingested", "message"])
 
 DataValidationArtifact = namedtuple("DataValidationArtifact",
-["schema_file_path","report_file_path","report_page_file_path","is_validated","message"])
+["schema_file_path","report_file_path","report_page_file_path","is_validated","message","is_drift_found"])
 
 DataTransformationArtifact = namedtuple("DataTransformationArtifact",
 ["transformed_train_file_path", "transformed_test_file_path", "preprocessed_object_file_path", "is_transformed",
-"message"])
+"message", "input_validator_file_path"])
 
 ModelTrainerArtifact = namedtuple("ModelTrainerArtifact", ["is_trained", "message", "trained_model_file_path",
                                                            "train_f1", "test_f1", "train_accuracy", "test_accuracy",
-                                                           "model_accuracy"])
+                                                           "model_accuracy", "serialization_format"])
 
 ModelEvaluationArtifact = namedtuple("ModelEvaluationArtifact", ["is_model_accepted", "evaluated_model_path"])
 
-ModelPusherArtifact = namedtuple("ModelPusherArtifact", ["is_model_pusher", "export_model_file_path"])
\ No newline at end of file
+ModelPusherArtifact = namedtuple("ModelPusherArtifact", ["is_model_pusher", "export_model_file_path",
+                                                         "current_pointer_path", "promotion_method"])
\ No newline at end of file
@@ -1,16 +1,48 @@
 from collections import namedtuple
 
-DataIngestionConfig = namedtuple("DataIngestionConfig",["bucket_name","object_name","local_file_name","raw_data_dir","ingested_train_dir","ingested_test_dir"])
+DataIngestionConfig = namedtuple("DataIngestionConfig",["bucket_name","object_name","local_file_name","raw_data_dir","ingested_train_dir","ingested_test_dir",
+"object_prefix", "incremental_dir", "manifest_file_path", "download_workers", "test_size", "source", "mongodb_config",
+"dataset_version_config"])
+
+MongoDBConfig = namedtuple("MongoDBConfig", ["database_name", "collection_name", "batch_size", "n_partitions",
+                                             "partition_field"])
+
+DatasetVersionConfig = namedtuple("DatasetVersionConfig", ["store_dir", "chunk_rows", "time_stamp"])
 
 DataValidationConfig = namedtuple("DataValidationConfig",["schema_file_path", "report_file_path", "report_page_file_path"])
 
 DataTransformationConfig = namedtuple("DataTransformationConfig",["transformed_train_dir", "transformed_test_dir",
-"preprocessed_object_file_path"])
+"preprocessed_object_file_path", "input_validator_file_path", "range_margin"])
+
+FeatureSelectionConfig = namedtuple("FeatureSelectionConfig", ["enabled", "importance_source", "cumulative_importance",
+                                                               "min_features", "n_estimators", "report_file_path",
+                                                               "model_evaluation_file_path"])
+
+ModelTrainerConfig = namedtuple("ModelTrainerConfig",["trained_model_file_path", "base_accuracy", "model_config_file_path",
+"serialization_format", "serialization_compress", "warm_start_state_file_path", "cv_fold_dir",
+"search_cache_file_path", "search_queue_file_path", "flatten_tree_ensemble"])
+
+ThresholdTuningConfig = namedtuple("ThresholdTuningConfig", ["enabled", "metric", "min_precision", "min_recall",
+                                                             "calibrate", "report_file_path"])
 
-ModelTrainerConfig = namedtuple("ModelTrainerConfig",["trained_model_file_path", "base_accuracy", "model_config_file_path"])
+PredictionCacheConfig = namedtuple("PredictionCacheConfig", ["enabled", "max_entries", "ttl_seconds",
+                                                             "current_pointer_path", "model_file_name"])
 
 ModelEvaluationConfig = namedtuple("ModelEvaluationConfig",["model_evaluation_file_path", "time_stamp"])
 
-ModelPusherConfig = namedtuple("ModelPusherConfig", ["export_dir_path"])
+ModelPusherConfig = namedtuple("ModelPusherConfig", ["export_dir_path", "export_root_dir", "current_pointer_name",
+                                                     "keep_last_exports"])
+
+ProfilingConfig = namedtuple("ProfilingConfig", ["enabled", "profiler", "sampling_interval", "profile_dir"])
+
+ArtifactSyncConfig = namedtuple("ArtifactSyncConfig", ["enabled", "bucket_name", "prefix", "local_root", "max_workers",
+                                                       "multipart_threshold", "multipart_chunksize", "flush_timeout"])
+
+RetentionConfig = namedtuple("RetentionConfig", ["artifact_dir", "export_root_dir", "current_pointer_name",
+                                                 "keep_last_runs", "keep_last_exports", "model_evaluation_file_path",
+                                                 "warm_start_state_file_path", "deduplicate", "min_file_size",
+                                                 "min_age_seconds"])
+
+RunQueueConfig = namedtuple("RunQueueConfig", ["max_concurrent_runs", "total_cpus"])
 
 TrainingPipelineConfig = namedtuple("TrainingPipelineConfig", ["artifact_dir"])
\ No newline at end of file
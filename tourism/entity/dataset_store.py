@@ -0,0 +1,281 @@
+"""
+Content addressed, deduplicated store of the ingested dataset versions.
+
+A data frame is cut into row groups at content defined boundaries: a row ends a group when the
+hash_pandas_object hash of its canonical text is a multiple of chunk_rows, so groups average chunk_rows rows
+and an inserted or removed row only changes the group it falls in. The canonical text does not depend on the
+dtypes pandas inferred: integral numbers are written without decimals and missing values as empty fields, so
+a null showing up in an int column (which turns it into float64) leaves the other rows' hashes unchanged.
+Every group is saved once, as that text, in a CSV chunk named after the sha256 of its row hashes; a version is
+the manifest of its chunk ids, named after the sha256 of that list.
+Committing yesterday's data again with a few changed rows writes the changed chunks and a manifest only.
+
+The train / test splits of a version are materialized on first use, per test size and dropped columns, and
+reused by every later run of the same version. A row goes to the test split when the hash of its text is
+below test_size, like DataIngestion.get_test_mask: the split of a row follows its content, an unchanged row
+stays in the same split across versions.
+
+refs/<ref> files name the version committed by a run (its artifact time stamp), read_version rebuilds any of
+them for comparison.
+
+store_dir/
+    chunks/<id[:2]>/<id>.csv
+    versions/<version id>.yaml
+    splits/<version id>/<split key>/train.csv, test.csv
+    refs/<ref>
+"""
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Tuple, TYPE_CHECKING
+
+import yaml
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.utils.main_utils import promote_file
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+DatasetVersion = namedtuple("DatasetVersion", ["version_id", "columns", "rows", "chunks", "new_chunks", "new_rows",
+                                               "created_at"])
+
+# chunk_id, rows
+ChunkRef = namedtuple("ChunkRef", ["chunk_id", "rows"])
+
+TRAIN_SPLIT = "train"
+TEST_SPLIT = "test"
+
+
+def _get_tmp_path(path: str) -> str:
+    return f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+
+def _read_text(file_path: str) -> str:
+    with open(file_path) as text_file:
+        return text_file.read()
+
+
+class DatasetStore:
+
+    def __init__(self, store_dir: str, chunk_rows: int = 5000, read_workers: int = 8):
+        """
+        chunk_rows: average rows of a chunk, no chunk is larger than 4 times this
+        read_workers: threads reading the chunks of a version
+        """
+        try:
+            self.store_dir = store_dir
+            self.chunk_rows = max(1, chunk_rows)
+            self.max_chunk_rows = 4 * self.chunk_rows
+            self.read_workers = max(1, read_workers)
+            for dir_name in ("chunks", "versions", "splits", "refs"):
+                os.makedirs(os.path.join(store_dir, dir_name), exist_ok=True)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_chunk_file_path(self, chunk_id: str) -> str:
+        return os.path.join(self.store_dir, "chunks", chunk_id[:2], f"{chunk_id}.csv")
+
+    def get_manifest_file_path(self, version_id: str) -> str:
+        return os.path.join(self.store_dir, "versions", f"{version_id}.yaml")
+
+    def get_chunk_bounds(self, row_hashes: "np.ndarray") -> List[Tuple[int, int]]:
+        """
+        return: (start, stop) row range of every chunk
+        """
+        import numpy as np
+
+        cuts = (np.flatnonzero(row_hashes % np.uint64(self.chunk_rows) == 0) + 1).tolist()
+        bounds, start = [], 0
+        for cut in cuts + [len(row_hashes)]:
+            while cut - start > self.max_chunk_rows:
+                bounds.append((start, start + self.max_chunk_rows))
+                start += self.max_chunk_rows
+            if cut > start:
+                bounds.append((start, cut))
+                start = cut
+        return bounds
+
+    @staticmethod
+    def get_canonical_text(data_frame: "pd.DataFrame") -> "pd.DataFrame":
+        """
+        return: data_frame as text, the same whatever dtypes the values were read with (3, 3.0 -> "3", NaN -> "")
+        """
+        import numpy as np
+        import pandas as pd
+
+        canonical = {}
+        for column in data_frame.columns:
+            values = data_frame[column]
+            text = values.astype(str)
+            if pd.api.types.is_float_dtype(values):
+                integral = values.notna() & (values % 1 == 0) & (values.abs() < 2 ** 53)
+                text[integral] = values[integral].astype(np.int64).astype(str)
+            canonical[column] = text.where(values.notna(), "")
+        return pd.DataFrame(canonical, index=data_frame.index)
+
+    def commit(self, data_frame: "pd.DataFrame", ref: str = None) -> DatasetVersion:
+        """
+        Saves the chunks of data_frame not in the store yet and the manifest of its version.
+        ref: name of the version for later lookups, e.g. the artifact time stamp of the run
+        """
+        try:
+            import pandas as pd
+
+            columns = [str(column) for column in data_frame.columns]
+            column_key = json.dumps(columns).encode()
+            canonical_df = self.get_canonical_text(data_frame)
+            row_hashes = pd.util.hash_pandas_object(canonical_df, index=False).to_numpy()
+
+            chunks, new_chunks, new_rows = [], 0, 0
+            for start, stop in self.get_chunk_bounds(row_hashes):
+                chunk_id = hashlib.sha256(column_key + row_hashes[start:stop].tobytes()).hexdigest()
+                chunk_file_path = self.get_chunk_file_path(chunk_id)
+                if not os.path.exists(chunk_file_path):
+                    os.makedirs(os.path.dirname(chunk_file_path), exist_ok=True)
+                    tmp_file_path = _get_tmp_path(chunk_file_path)
+                    canonical_df.iloc[start:stop].to_csv(tmp_file_path, index=False)
+                    os.replace(tmp_file_path, chunk_file_path)
+                    new_chunks += 1
+                    new_rows += stop - start
+                chunks.append(ChunkRef(chunk_id=chunk_id, rows=stop - start))
+
+            version_id = hashlib.sha256(column_key + "\n".join(chunk.chunk_id for chunk in chunks).encode()).hexdigest()
+            manifest_file_path = self.get_manifest_file_path(version_id)
+            if os.path.exists(manifest_file_path):
+                dataset_version = self.read_manifest(version_id)._replace(new_chunks=new_chunks, new_rows=new_rows)
+            else:
+                dataset_version = DatasetVersion(version_id=version_id, columns=columns, rows=len(data_frame),
+                                                 chunks=chunks, new_chunks=new_chunks, new_rows=new_rows,
+                                                 created_at=datetime.now().isoformat())
+                tmp_file_path = _get_tmp_path(manifest_file_path)
+                with open(tmp_file_path, "w") as manifest_file:
+                    yaml.safe_dump({"version_id": version_id, "columns": columns, "rows": dataset_version.rows,
+                                    "created_at": dataset_version.created_at,
+                                    "chunks": [list(chunk) for chunk in chunks]}, manifest_file)
+                os.replace(tmp_file_path, manifest_file_path)
+
+            if ref is not None:
+                self.set_ref(ref, version_id)
+            logging.info("Dataset version [%s]: %s rows in %s chunks, %s new chunks (%s rows) written",
+                         version_id, dataset_version.rows, len(chunks), new_chunks, new_rows)
+            return dataset_version
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def read_manifest(self, version_id: str) -> DatasetVersion:
+        try:
+            with open(self.get_manifest_file_path(version_id)) as manifest_file:
+                content = yaml.safe_load(manifest_file)
+            return DatasetVersion(version_id=content["version_id"], columns=content["columns"], rows=content["rows"],
+                                  chunks=[ChunkRef(*chunk) for chunk in content["chunks"]], new_chunks=0,
+                                  new_rows=0, created_at=content["created_at"])
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def set_ref(self, ref: str, version_id: str):
+        ref_file_path = os.path.join(self.store_dir, "refs", ref)
+        tmp_file_path = _get_tmp_path(ref_file_path)
+        with open(tmp_file_path, "w") as ref_file:
+            ref_file.write(version_id)
+        os.replace(tmp_file_path, ref_file_path)
+
+    def resolve(self, version: str) -> str:
+        """
+        version: version id or ref
+        return: version id
+        """
+        ref_file_path = os.path.join(self.store_dir, "refs", version)
+        if os.path.isfile(ref_file_path):
+            return _read_text(ref_file_path).strip()
+        if os.path.exists(self.get_manifest_file_path(version)):
+            return version
+        raise Exception(f"No dataset version or ref [{version}] in [{self.store_dir}]")
+
+    @staticmethod
+    def get_test_mask(chunk_df: "pd.DataFrame", test_size: float) -> "np.ndarray":
+        """
+        chunk_df: chunk rows read as text
+        """
+        import pandas as pd
+
+        row_hashes = pd.util.hash_pandas_object(chunk_df, index=False).to_numpy()
+        return row_hashes % 10000 < int(round(test_size * 10000))
+
+    def materialize_splits(self, version: str, test_size: float, drop_columns: List[str] = None,
+                           train_file_path: str = None, test_file_path: str = None) -> Tuple[str, str]:
+        """
+        Writes the train / test CSV of a version once, later calls reuse them.
+        train_file_path, test_file_path: published there as well, hardlinked where the filesystem allows it
+        return: (train file path, test file path)
+        """
+        try:
+            import pandas as pd
+
+            version_id = self.resolve(version)
+            drop_columns = sorted(drop_columns or [])
+            split_key = hashlib.sha256(json.dumps([test_size, drop_columns]).encode()).hexdigest()[:16]
+            split_dir = os.path.join(self.store_dir, "splits", version_id, split_key)
+            split_file_paths = {split: os.path.join(split_dir, f"{split}.csv") for split in (TRAIN_SPLIT, TEST_SPLIT)}
+
+            if not all(os.path.exists(file_path) for file_path in split_file_paths.values()):
+                logging.info("Materializing the splits of dataset version [%s] in [%s]", version_id, split_dir)
+                os.makedirs(split_dir, exist_ok=True)
+                tmp_file_paths = {split: _get_tmp_path(file_path) for split, file_path in split_file_paths.items()}
+                split_files = {split: open(file_path, "w", newline="") for split, file_path in tmp_file_paths.items()}
+                try:
+                    for position, chunk in enumerate(self.read_manifest(version_id).chunks):
+                        # text in, text out: values are written back as they were committed
+                        chunk_df = pd.read_csv(self.get_chunk_file_path(chunk.chunk_id), dtype=str,
+                                               keep_default_na=False)
+                        test_mask = self.get_test_mask(chunk_df, test_size)
+                        chunk_df = chunk_df.drop(columns=drop_columns, errors="ignore")
+                        for split, rows in ((TRAIN_SPLIT, chunk_df[~test_mask]), (TEST_SPLIT, chunk_df[test_mask])):
+                            rows.to_csv(split_files[split], index=False, header=position == 0)
+                finally:
+                    for split_file in split_files.values():
+                        split_file.close()
+                for split, file_path in split_file_paths.items():
+                    os.replace(tmp_file_paths[split], file_path)
+
+            for split, file_path in ((TRAIN_SPLIT, train_file_path), (TEST_SPLIT, test_file_path)):
+                if file_path is not None:
+                    promote_file(split_file_paths[split], file_path)
+            return split_file_paths[TRAIN_SPLIT], split_file_paths[TEST_SPLIT]
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def read_version(self, version: str, split: str = None, test_size: float = 0.2,
+                     drop_columns: List[str] = None) -> "pd.DataFrame":
+        """
+        version: version id or ref
+        split: train or test split of the version, every row when None
+        return: the data frame as read from the original CSV, except integral float columns come back as int64
+        """
+        try:
+            import pandas as pd
+
+            version_id = self.resolve(version)
+            if split is not None:
+                split_file_paths = dict(zip((TRAIN_SPLIT, TEST_SPLIT),
+                                            self.materialize_splits(version_id, test_size, drop_columns)))
+                return pd.read_csv(split_file_paths[split], index_col=False)
+
+            chunk_file_paths = [self.get_chunk_file_path(chunk.chunk_id)
+                                for chunk in self.read_manifest(version_id).chunks]
+            with ThreadPoolExecutor(max_workers=self.read_workers) as executor:
+                texts = list(executor.map(_read_text, chunk_file_paths))
+            # every chunk starts with the same header, kept once: one parse infers the dtypes of all rows
+            text = "".join(texts[:1] + [chunk_text.split("\n", 1)[1] for chunk_text in texts[1:]])
+            data_frame = pd.read_csv(io.StringIO(text), index_col=False)
+            return data_frame.drop(columns=drop_columns or [], errors="ignore")
+        except Exception as e:
+            raise CustomException(e, sys) from e
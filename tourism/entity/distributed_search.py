@@ -0,0 +1,385 @@
+"""
+Hyperparameter search candidates scored by a pool of worker processes through a SQLite task queue.
+
+The coordinator (ModelFactory) submits one task per candidate: the pickled unfitted estimator and the paths
+of the training matrix, target and CV fold indices materialized by CVFoldCache. Workers open the data as
+read-only memory maps, so any number of workers on the host share one copy of it, and workers on other hosts
+only need the queue file and the fold cache dir on shared storage (note that SQLite locking over NFS is only
+as reliable as the NFS lock daemon).
+
+A claimed task holds a lease the worker renews while it fits. A task whose lease expired (worker killed,
+host lost) goes back to pending until max_attempts is reached, then it is marked failed and the coordinator
+leaves the candidate out of the search.
+
+Start external workers with:
+    python -m tourism.entity.distributed_search --queue artifacts/model_trainer/search_queue.db --workers 8
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import pickle
+import socket
+import sqlite3
+import threading
+import multiprocessing
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import List, Optional
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+
+DISTRIBUTED_SEARCH_KEY = "distributed_search"
+DISTRIBUTED_SEARCH_ENABLED_KEY = "enabled"
+DISTRIBUTED_SEARCH_LOCAL_WORKERS_KEY = "local_workers"
+DISTRIBUTED_SEARCH_MAX_ATTEMPTS_KEY = "max_attempts"
+DISTRIBUTED_SEARCH_LEASE_SECONDS_KEY = "lease_seconds"
+DISTRIBUTED_SEARCH_POLL_INTERVAL_KEY = "poll_interval"
+DISTRIBUTED_SEARCH_TIMEOUT_KEY = "timeout"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SearchTask = namedtuple("SearchTask", ["task_id", "search_id", "candidate_index", "estimator", "data_path",
+                                       "target_path", "splits_path", "n_splits", "scoring", "attempts"])
+
+TaskResult = namedtuple("TaskResult", ["candidate_index", "status", "fold_scores", "fit_seconds", "attempts",
+                                       "worker_id", "error"])
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS search_tasks (
+    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    search_id TEXT NOT NULL,
+    candidate_index INTEGER NOT NULL,
+    estimator BLOB NOT NULL,
+    data_path TEXT NOT NULL,
+    target_path TEXT NOT NULL,
+    splits_path TEXT NOT NULL,
+    n_splits INTEGER NOT NULL,
+    scoring TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    fold_scores TEXT,
+    fit_seconds REAL,
+    error TEXT
+)
+"""
+_CREATE_INDEX = "CREATE INDEX IF NOT EXISTS search_tasks_status ON search_tasks (status, search_id)"
+
+
+class SearchTaskQueue:
+
+    def __init__(self, queue_file_path: str):
+        try:
+            self.queue_file_path = queue_file_path
+            os.makedirs(os.path.dirname(queue_file_path) or ".", exist_ok=True)
+            with self._connect() as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(_CREATE_TABLE)
+                connection.execute(_CREATE_INDEX)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @contextmanager
+    def _connect(self):
+        # autocommit, write transactions are opened explicitly with BEGIN IMMEDIATE
+        connection = sqlite3.connect(self.queue_file_path, timeout=60, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def submit(self, search_id: str, estimators: list, data_path: str, target_path: str, splits_path: str,
+               n_splits: int, scoring: str = None, max_attempts: int = 3):
+        """
+        estimators: unfitted estimators, one task each, the position is the candidate index
+        """
+        try:
+            rows = [(search_id, candidate_index, pickle.dumps(estimator), data_path, target_path, splits_path,
+                     n_splits, scoring, PENDING, max_attempts)
+                    for candidate_index, estimator in enumerate(estimators)]
+            with self._transaction() as connection:
+                connection.executemany(
+                    "INSERT INTO search_tasks (search_id, candidate_index, estimator, data_path, target_path, "
+                    "splits_path, n_splits, scoring, status, max_attempts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def requeue_expired(self, search_id: str = None) -> int:
+        """
+        Running tasks with an expired lease go back to pending, or fail once max_attempts is reached.
+        return: number of requeued tasks
+        """
+        search_filter, values = ("AND search_id = ?", [search_id]) if search_id is not None else ("", [])
+        with self._transaction() as connection:
+            connection.execute(
+                f"UPDATE search_tasks SET status = ?, error = 'lease expired on ' || worker_id "
+                f"WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts {search_filter}",
+                [FAILED, RUNNING, time.time(), *values])
+            return connection.execute(
+                f"UPDATE search_tasks SET status = ?, worker_id = NULL "
+                f"WHERE status = ? AND lease_expires_at < ? {search_filter}",
+                [PENDING, RUNNING, time.time(), *values]).rowcount
+
+    def claim(self, worker_id: str, lease_seconds: float, search_id: str = None) -> Optional[SearchTask]:
+        self.requeue_expired(search_id)
+        search_filter, values = ("AND search_id = ?", [search_id]) if search_id is not None else ("", [])
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT task_id, search_id, candidate_index, estimator, data_path, target_path, splits_path, "
+                f"n_splits, scoring, attempts FROM search_tasks WHERE status = ? {search_filter} "
+                f"ORDER BY task_id LIMIT 1", [PENDING, *values]).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE search_tasks SET status = ?, attempts = attempts + 1, worker_id = ?, "
+                               "lease_expires_at = ? WHERE task_id = ?",
+                               (RUNNING, worker_id, time.time() + lease_seconds, row[0]))
+        task = SearchTask(*row)
+        return task._replace(attempts=task.attempts + 1)
+
+    def renew_lease(self, task_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """
+        return: False when the task is no longer held by this worker
+        """
+        with self._transaction() as connection:
+            return connection.execute("UPDATE search_tasks SET lease_expires_at = ? "
+                                      "WHERE task_id = ? AND worker_id = ? AND status = ?",
+                                      (time.time() + lease_seconds, task_id, worker_id, RUNNING)).rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str, fold_scores: List[float], fit_seconds: float):
+        with self._transaction() as connection:
+            connection.execute("UPDATE search_tasks SET status = ?, fold_scores = ?, fit_seconds = ?, error = NULL "
+                               "WHERE task_id = ? AND worker_id = ?",
+                               (DONE, json.dumps([float(score) for score in fold_scores]), fit_seconds, task_id,
+                                worker_id))
+
+    def fail(self, task_id: int, worker_id: str, error: str):
+        """
+        The task is retried by another claim until it used its max_attempts.
+        """
+        with self._transaction() as connection:
+            connection.execute("UPDATE search_tasks SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? "
+                               "END, worker_id = NULL, error = ? WHERE task_id = ? AND worker_id = ?",
+                               (FAILED, PENDING, error, task_id, worker_id))
+
+    def get_results(self, search_id: str) -> List[TaskResult]:
+        with self._connect() as connection:
+            rows = connection.execute("SELECT candidate_index, status, fold_scores, fit_seconds, attempts, "
+                                      "worker_id, error FROM search_tasks WHERE search_id = ? "
+                                      "ORDER BY candidate_index", (search_id,)).fetchall()
+        return [TaskResult(candidate_index, status, None if fold_scores is None else json.loads(fold_scores),
+                           fit_seconds, attempts, worker_id, error)
+                for candidate_index, status, fold_scores, fit_seconds, attempts, worker_id, error in rows]
+
+    def has_open_tasks(self, search_id: str = None) -> bool:
+        search_filter, values = ("AND search_id = ?", [search_id]) if search_id is not None else ("", [])
+        with self._connect() as connection:
+            return connection.execute(f"SELECT COUNT(*) FROM search_tasks WHERE status IN (?, ?) {search_filter}",
+                                      [PENDING, RUNNING, *values]).fetchone()[0] > 0
+
+    def purge(self, search_id: str):
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM search_tasks WHERE search_id = ?", (search_id,))
+
+
+_worker_data = {}
+
+
+def _load_array(file_path: str):
+    import numpy as np
+
+    # memory maps are reused by every task of the worker on the same data
+    if file_path not in _worker_data:
+        _worker_data[file_path] = np.load(file_path, mmap_mode="r")
+    return _worker_data[file_path]
+
+
+def evaluate_task(task: SearchTask):
+    """
+    Cross validates the task estimator on the shared folds.
+    return: (fold_scores, fit_seconds)
+    """
+    import numpy as np
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+
+    input_feature = _load_array(task.data_path)
+    output_feature = _load_array(task.target_path)
+    estimator = pickle.loads(task.estimator)
+    scorer = get_scorer(task.scoring) if task.scoring else None
+
+    fold_scores, fit_seconds = [], 0.0
+    with np.load(task.splits_path) as folds:
+        for fold_number in range(task.n_splits):
+            train_index, test_index = folds[f"fold_{fold_number}_train"], folds[f"fold_{fold_number}_test"]
+            model = clone(estimator)
+            start = time.perf_counter()
+            model.fit(input_feature[train_index], output_feature[train_index])
+            fit_seconds += time.perf_counter() - start
+            x_test, y_test = input_feature[test_index], output_feature[test_index]
+            # GridSearchCV falls back to estimator.score as well
+            fold_scores.append(scorer(model, x_test, y_test) if scorer is not None else model.score(x_test, y_test))
+    return fold_scores, fit_seconds
+
+
+def run_worker(queue_file_path: str, worker_id: str = None, search_id: str = None, exit_when_idle: bool = False,
+               lease_seconds: float = 600, poll_interval: float = 1.0):
+    """
+    Claims and evaluates tasks until stopped, or until no task is open when exit_when_idle.
+    search_id: only serve the tasks of this search
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    task_queue = SearchTaskQueue(queue_file_path)
+    logging.info("Search worker [%s] serving [%s]", worker_id, queue_file_path)
+    while True:
+        task = task_queue.claim(worker_id, lease_seconds=lease_seconds, search_id=search_id)
+        if task is None:
+            if exit_when_idle and not task_queue.has_open_tasks(search_id):
+                return
+            time.sleep(poll_interval)
+            continue
+
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(lease_seconds / 3):
+                task_queue.renew_lease(task.task_id, worker_id, lease_seconds)
+
+        heartbeat_thread = threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True)
+        heartbeat_thread.start()
+        try:
+            fold_scores, fit_seconds = evaluate_task(task)
+            task_queue.complete(task.task_id, worker_id, fold_scores=fold_scores, fit_seconds=fit_seconds)
+        except Exception as e:
+            logging.exception("Search worker [%s] task %s attempt %s failed", worker_id, task.task_id, task.attempts)
+            task_queue.fail(task.task_id, worker_id, error=f"{type(e).__name__}: {e}")
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+
+class DistributedSearch:
+
+    def __init__(self, queue_file_path: str, local_workers: int = 0, max_attempts: int = 3,
+                 lease_seconds: float = 600, poll_interval: float = 1.0, timeout: float = None):
+        """
+        local_workers: worker processes started for every search, 0 when external workers serve the queue
+        timeout: seconds to wait for the candidates of one search, no limit when None
+        """
+        self.task_queue = SearchTaskQueue(queue_file_path)
+        self.queue_file_path = queue_file_path
+        self.local_workers = local_workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def _start_local_worker(self, search_id: str, worker_number: int):
+        # spawn: the parent holds logging and sqlite threads which a forked child must not inherit
+        worker = multiprocessing.get_context("spawn").Process(
+            target=run_worker, name=f"search-worker-{worker_number}",
+            kwargs=dict(queue_file_path=self.queue_file_path,
+                        worker_id=f"{socket.gethostname()}-{os.getpid()}-local{worker_number}",
+                        search_id=search_id, exit_when_idle=True, lease_seconds=self.lease_seconds,
+                        poll_interval=self.poll_interval))
+        worker.start()
+        return worker
+
+    def score_candidates(self, estimators: list, data_path: str, target_path: str, splits_path: str,
+                         n_splits: int, scoring: str = None) -> List[Optional[tuple]]:
+        """
+        return: (fold_scores, fit_seconds) per estimator, None for candidates failed max_attempts times
+        """
+        try:
+            search_id = uuid.uuid4().hex
+            self.task_queue.submit(search_id, estimators, data_path=data_path, target_path=target_path,
+                                   splits_path=splits_path, n_splits=n_splits, scoring=scoring,
+                                   max_attempts=self.max_attempts)
+            logging.info("Distributed search [%s]: %s candidates queued in [%s], %s local workers",
+                         search_id, len(estimators), self.queue_file_path, self.local_workers)
+
+            workers = [self._start_local_worker(search_id, worker_number)
+                       for worker_number in range(self.local_workers)]
+            start = time.monotonic()
+            timed_out = False
+            try:
+                while self.task_queue.has_open_tasks(search_id):
+                    if self.timeout is not None and time.monotonic() - start > self.timeout:
+                        timed_out = True
+                        break
+                    self.task_queue.requeue_expired(search_id)
+                    # a crashed local worker is replaced, its task is retried once its lease expires
+                    for worker_number, worker in enumerate(workers):
+                        if not worker.is_alive() and worker.exitcode != 0:
+                            logging.info("Search worker %s died (%s), restarting", worker.name, worker.exitcode)
+                            workers[worker_number] = self._start_local_worker(search_id, worker_number)
+                    time.sleep(self.poll_interval)
+            finally:
+                for worker in workers:
+                    worker.join(timeout=self.poll_interval)
+                    if worker.is_alive():
+                        worker.terminate()
+            if timed_out:
+                # the pending and leased tasks of the batch would keep external workers busy for nothing
+                self.task_queue.purge(search_id)
+                raise Exception(f"Distributed search [{search_id}] timed out after {self.timeout}s, "
+                                f"its tasks were removed from [{self.queue_file_path}]")
+
+            results: List[Optional[tuple]] = [None] * len(estimators)
+            for task_result in self.task_queue.get_results(search_id):
+                if task_result.status == DONE:
+                    results[task_result.candidate_index] = (task_result.fold_scores, task_result.fit_seconds)
+                else:
+                    logging.info("Distributed search [%s] candidate %s failed after %s attempts: %s",
+                                 search_id, task_result.candidate_index, task_result.attempts, task_result.error)
+            self.task_queue.purge(search_id)
+            return results
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", required=True, help="sqlite task queue file shared with the trainer")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes on this host")
+    parser.add_argument("--lease-seconds", type=float, default=600)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--exit-when-idle", action="store_true")
+    args = parser.parse_args()
+
+    worker_kwargs = dict(queue_file_path=args.queue, exit_when_idle=args.exit_when_idle,
+                         lease_seconds=args.lease_seconds, poll_interval=args.poll_interval)
+    if args.workers == 1:
+        run_worker(**worker_kwargs)
+        return
+    workers = [multiprocessing.get_context("spawn").Process(target=run_worker, kwargs=worker_kwargs)
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
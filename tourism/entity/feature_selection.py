@@ -0,0 +1,138 @@
+"""
+Importance driven pruning of the transformed feature space.
+
+Every output column of the fitted ColumnTransformer is identified by a feature key
+(transformer name, input column, one-hot category or None). Importances come from the previous best model
+when it was trained on the same feature keys, otherwise from a small random forest fitted on the
+transformed training data. The most important features covering cumulative_importance of the total are kept.
+
+All transformers of the preprocessor work column by column (imputers, scalers, power transform, one-hot
+encoding), so a preprocessor refitted on the input columns of the selected features produces exactly the
+selected columns of the full one. SelectedFeaturePreprocessor wraps that pruned preprocessor with the mask
+of the selected one-hot categories: TourismPredictor does not impute, scale or encode dropped columns.
+"""
+import sys
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from tourism.exception import CustomException
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PREVIOUS_MODEL_IMPORTANCE = "previous_model"
+CHEAP_MODEL_IMPORTANCE = "cheap_model"
+IMPORTANCE_SOURCES = [PREVIOUS_MODEL_IMPORTANCE, CHEAP_MODEL_IMPORTANCE]
+
+FeatureKey = Tuple[str, str, Optional[str]]
+
+
+def get_feature_name(feature_key: FeatureKey) -> str:
+    transformer_name, column, category = feature_key
+    if category is None:
+        return f"{transformer_name}__{column}"
+    return f"{transformer_name}__{column}_{category}"
+
+
+def get_feature_keys(preprocessor) -> List[FeatureKey]:
+    """
+    return: feature key of every output column of a fitted ColumnTransformer or SelectedFeaturePreprocessor
+    """
+    if isinstance(preprocessor, SelectedFeaturePreprocessor):
+        return list(preprocessor.feature_keys)
+    feature_keys = []
+    for transformer_name, transformer, columns in preprocessor.transformers_:
+        if transformer_name == "remainder" or isinstance(transformer, str):
+            continue
+        steps = [step for _, step in transformer.steps] if hasattr(transformer, "steps") else [transformer]
+        encoder = next((step for step in steps if hasattr(step, "categories_")), None)
+        for position, column in enumerate(columns):
+            if encoder is None:
+                feature_keys.append((transformer_name, column, None))
+            else:
+                feature_keys.extend((transformer_name, column, str(category))
+                                    for category in encoder.categories_[position])
+    return feature_keys
+
+
+def get_feature_importances(model) -> Optional["np.ndarray"]:
+    """
+    return: importances normalized to sum 1, None when the model exposes neither
+    feature_importances_ nor coef_
+    """
+    import numpy as np
+
+    if hasattr(model, "feature_importances_"):
+        importances = np.asarray(model.feature_importances_, dtype=float)
+    elif hasattr(model, "coef_"):
+        coefficients = np.abs(np.asarray(model.coef_, dtype=float))
+        importances = coefficients.sum(axis=0) if coefficients.ndim == 2 else coefficients
+    else:
+        return None
+    total = importances.sum()
+    if not np.isfinite(total) or total <= 0:
+        return None
+    return importances / total
+
+
+def select_features(importances: "np.ndarray", cumulative_importance: float, min_features: int) -> "np.ndarray":
+    """
+    return: boolean mask of the most important features reaching cumulative_importance,
+    at least min_features of them
+    """
+    import numpy as np
+
+    order = np.argsort(-importances, kind="stable")
+    cumulative = np.cumsum(importances[order])
+    n_selected = int(np.searchsorted(cumulative, cumulative_importance - 1e-12) + 1)
+    n_selected = min(len(importances), max(n_selected, min_features))
+    feature_mask = np.zeros(len(importances), dtype=bool)
+    feature_mask[order[:n_selected]] = True
+    return feature_mask
+
+
+def get_selected_columns(feature_keys: List[FeatureKey]) -> dict:
+    """
+    return: {transformer name: input columns} needed to compute the given features, in input order
+    """
+    selected_columns = {}
+    for transformer_name, column, _ in feature_keys:
+        columns = selected_columns.setdefault(transformer_name, [])
+        if column not in columns:
+            columns.append(column)
+    return selected_columns
+
+
+class SelectedFeaturePreprocessor:
+    """
+    Fitted preprocessor restricted to the selected features, a drop-in for the ColumnTransformer
+    in TourismPredictor.
+    """
+
+    def __init__(self, preprocessor, feature_mask: "np.ndarray", feature_keys: List[FeatureKey]):
+        """
+        preprocessor: ColumnTransformer fitted on the input columns of the selected features only
+        feature_mask: selected output columns of preprocessor (one-hot categories of a kept column may be dropped)
+        feature_keys: keys of the selected features, in output order
+        """
+        try:
+            if int(feature_mask.sum()) != len(feature_keys):
+                raise Exception(f"Feature mask selects {int(feature_mask.sum())} columns "
+                                f"for {len(feature_keys)} feature keys")
+            self.preprocessor = preprocessor
+            self.feature_mask = feature_mask
+            self.feature_keys = list(feature_keys)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [get_feature_name(feature_key) for feature_key in self.feature_keys]
+
+    def transform(self, X):
+        transformed_feature = self.preprocessor.transform(X)
+        if self.feature_mask.all():
+            return transformed_feature
+        return transformed_feature[:, self.feature_mask]
+
+    def __repr__(self):
+        return f"{type(self).__name__}(n_features={len(self.feature_keys)})"
@@ -0,0 +1,273 @@
+"""
+Tree ensembles flattened into contiguous arrays for batch inference.
+
+Every node of every tree of a fitted RandomForestClassifier or XGBClassifier becomes one slot of the arrays
+feature, threshold, left, right, default_left and value; leaves point to themselves so a traversal step is
+idempotent once a leaf is reached. Prediction moves a (rows x trees) matrix of node indices max_depth times
+with vectorized gathers, instead of one Python level estimator call per tree.
+
+Split semantics follow the original libraries: scikit-learn sends a row left when float32(x) <= threshold,
+xgboost when float32(x) < split_condition, and a missing value follows default_left (xgboost's missing
+branch, scikit-learn's missing_go_to_left where available).
+"""
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, TYPE_CHECKING
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+
+if TYPE_CHECKING:
+    import numpy as np
+
+RANDOM_FOREST_KIND = "random_forest"
+XGBOOST_KIND = "xgboost"
+
+# rows x trees node indices per traversal chunk
+CHUNK_CELLS = 1 << 22
+
+
+class FlatTreeEnsemble:
+    """
+    Drop-in for the fitted estimator in TourismPredictor: predict, predict_proba, classes_ and
+    feature_importances_.
+    """
+
+    def __init__(self, kind: str, classes, n_features: int, feature, threshold, left, right, default_left, value,
+                 roots, max_depth: int, strict: bool, tree_class=None, base_margin=None, feature_importances=None,
+                 n_jobs: int = 1):
+        """
+        value: (nodes, classes) leaf class probabilities for random forests, (nodes,) leaf margins for xgboost
+        roots: root node index of every tree
+        strict: x < threshold goes left (xgboost) instead of x <= threshold (scikit-learn)
+        tree_class: output class of every xgboost tree, base_margin: initial margin per output
+        n_jobs: threads splitting a batch, numpy releases the GIL in the gathers
+        """
+        self.kind = kind
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.strict = strict
+        self.tree_class = tree_class
+        self.base_margin = base_margin
+        self.n_jobs = n_jobs
+        if feature_importances is not None:
+            self.feature_importances_ = feature_importances
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def apply(self, X) -> "np.ndarray":
+        """
+        return: (rows, trees) leaf node index reached by every row in every tree
+        """
+        import numpy as np
+
+        # both libraries split on float32 features, the thresholds are float64
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            threshold = self.threshold[nodes]
+            go_left = x < threshold if self.strict else x <= threshold
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def _predict_proba_chunk(self, X) -> "np.ndarray":
+        import numpy as np
+
+        leaves = self.apply(X)
+        if self.kind == RANDOM_FOREST_KIND:
+            return self.value[leaves].sum(axis=1) / self.n_trees
+        margin = np.zeros((len(leaves), len(self.base_margin)))
+        leaf_values = self.value[leaves]
+        for output in range(len(self.base_margin)):
+            margin[:, output] = leaf_values[:, self.tree_class == output].sum(axis=1) + self.base_margin[output]
+        if margin.shape[1] == 1:
+            positive = 1 / (1 + np.exp(-margin[:, 0]))
+            return np.c_[1 - positive, positive]
+        margin = np.exp(margin - margin.max(axis=1, keepdims=True))
+        return margin / margin.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, X, n_jobs: int = None) -> "np.ndarray":
+        import numpy as np
+
+        X = np.asarray(X, dtype=np.float32)
+        n_jobs = n_jobs or self.n_jobs
+        chunk_rows = max(1, CHUNK_CELLS // max(self.n_trees, 1))
+        if len(X) > chunk_rows or n_jobs > 1:
+            chunk_rows = min(chunk_rows, max(1, -(-len(X) // n_jobs)))
+        chunks = [X[start:start + chunk_rows] for start in range(0, len(X), chunk_rows)]
+        if len(chunks) == 1:
+            return self._predict_proba_chunk(chunks[0])
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            return np.concatenate(list(executor.map(self._predict_proba_chunk, chunks)))
+
+    def predict(self, X, n_jobs: int = None) -> "np.ndarray":
+        probability = self.predict_proba(X, n_jobs=n_jobs)
+        if self.kind == XGBOOST_KIND and probability.shape[1] == 2:
+            # XGBClassifier.predict: positive when the probability is above 0.5
+            return self.classes_[(probability[:, 1] > 0.5).astype(int)]
+        return self.classes_[probability.argmax(axis=1)]
+
+    def __repr__(self):
+        return f"{type(self).__name__}(kind={self.kind}, n_trees={self.n_trees}, n_nodes={self.n_nodes})"
+
+
+def flatten_random_forest(model) -> FlatTreeEnsemble:
+    import numpy as np
+
+    features, thresholds, lefts, rights, default_lefts, values, roots = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_index = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_index, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_index, tree.children_right) + offset)
+        missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+        default_lefts.append(np.zeros(tree.node_count, dtype=bool) if missing_go_to_left is None
+                             else np.asarray(missing_go_to_left, dtype=bool))
+        # class counts (weighted fractions since scikit-learn 1.4), normalized as in DecisionTreeClassifier
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1
+        values.append(value / normalizer)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return FlatTreeEnsemble(kind=RANDOM_FOREST_KIND, classes=model.classes_, n_features=model.n_features_in_,
+                            feature=np.concatenate(features).astype(np.intp),
+                            threshold=np.concatenate(thresholds),
+                            left=np.concatenate(lefts).astype(np.intp), right=np.concatenate(rights).astype(np.intp),
+                            default_left=np.concatenate(default_lefts), value=np.concatenate(values),
+                            roots=np.array(roots, dtype=np.intp), max_depth=max_depth, strict=False,
+                            feature_importances=getattr(model, "feature_importances_", None))
+
+
+def _parse_floats(value) -> List[float]:
+    # xgboost >= 2.1 writes vector parameters as "[5E-1]", one value per class for multiclass models (>= 3.0)
+    return [float(item) for item in str(value).strip("[]").split(",")]
+
+
+def flatten_xgboost(model) -> FlatTreeEnsemble:
+    import numpy as np
+
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    base_score = _parse_floats(config["learner"]["learner_model_param"]["base_score"])
+    n_classes = len(model.classes_)
+    if objective == "binary:logistic":
+        n_outputs, base_margin = 1, [np.log(base_score[0] / (1 - base_score[0]))]
+    elif objective in ("multi:softprob", "multi:softmax"):
+        # a single value is shared by every class
+        n_outputs, base_margin = n_classes, base_score * n_classes if len(base_score) == 1 else base_score
+    else:
+        raise Exception(f"Objective [{objective}] can not be flattened")
+
+    dumps = booster.get_dump(dump_format="json")
+    best_iteration = None
+    try:
+        best_iteration = model.best_iteration
+    except AttributeError:
+        pass
+    if best_iteration is not None:
+        # XGBClassifier.predict stops at the best early stopping round
+        dumps = dumps[:(best_iteration + 1) * n_outputs]
+    feature_names = booster.feature_names
+
+    features, thresholds, lefts, rights, default_lefts, values, roots = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for tree_dump in dumps:
+        nodes, stack = {}, [json.loads(tree_dump)]
+        while stack:
+            node = stack.pop()
+            nodes[node["nodeid"]] = node
+            stack.extend(node.get("children", []))
+        node_count = max(nodes) + 1
+        feature, threshold = np.zeros(node_count, dtype=np.intp), np.zeros(node_count)
+        left, right = np.arange(node_count) + offset, np.arange(node_count) + offset
+        default_left, value = np.zeros(node_count, dtype=bool), np.zeros(node_count)
+        for node_id, node in nodes.items():
+            if "leaf" in node:
+                value[node_id] = node["leaf"]
+                continue
+            if "split_condition" not in node:
+                raise Exception("Categorical splits can not be flattened")
+            split = node["split"]
+            feature[node_id] = feature_names.index(split) if feature_names else int(split.lstrip("f"))
+            # compared in float32 like xgboost does
+            threshold[node_id] = np.float32(node["split_condition"])
+            left[node_id], right[node_id] = node["yes"] + offset, node["no"] + offset
+            default_left[node_id] = node["missing"] == node["yes"]
+            max_depth = max(max_depth, node.get("depth", 0) + 1)
+        roots.append(offset)
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        default_lefts.append(default_left)
+        values.append(value)
+        offset += node_count
+
+    feature_importances = None
+    try:
+        feature_importances = model.feature_importances_
+    except Exception:
+        pass
+    return FlatTreeEnsemble(kind=XGBOOST_KIND, classes=np.asarray(model.classes_), n_features=model.n_features_in_,
+                            feature=np.concatenate(features), threshold=np.concatenate(thresholds),
+                            left=np.concatenate(lefts), right=np.concatenate(rights),
+                            default_left=np.concatenate(default_lefts), value=np.concatenate(values),
+                            roots=np.array(roots, dtype=np.intp), max_depth=max_depth, strict=True,
+                            tree_class=np.arange(len(dumps)) % n_outputs, base_margin=np.array(base_margin),
+                            feature_importances=feature_importances)
+
+
+def flatten_tree_ensemble(model) -> Optional[FlatTreeEnsemble]:
+    """
+    return: flattened RandomForestClassifier / XGBClassifier, None for other estimators
+    """
+    try:
+        model_class = f"{type(model).__module__.split('.')[0]}.{type(model).__name__}"
+        if model_class == "sklearn.RandomForestClassifier":
+            return flatten_random_forest(model)
+        if model_class == "xgboost.XGBClassifier":
+            return flatten_xgboost(model)
+        return None
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def verify_flat_ensemble(flat_ensemble: FlatTreeEnsemble, model, X, atol: float = 1e-5) -> bool:
+    """
+    return: True when predict matches exactly and predict_proba within atol on X
+    """
+    import numpy as np
+
+    labels_match = np.array_equal(flat_ensemble.predict(X), model.predict(X))
+    max_difference = float(np.abs(flat_ensemble.predict_proba(X) - model.predict_proba(X)).max()) if len(X) else 0.0
+    logging.info("Flattened %s: labels match=%s, max probability difference=%s",
+                 flat_ensemble, labels_match, max_difference)
+    return labels_match and max_difference <= atol
@@ -0,0 +1,154 @@
+import os
+import sys
+import hashlib
+from collections import namedtuple
+from typing import List, Tuple, TYPE_CHECKING
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CV_FOLDS_KEY = "cv_folds"
+CV_FOLDS_SHUFFLE_KEY = "shuffle"
+CV_FOLDS_RANDOM_STATE_KEY = "random_state"
+CV_FOLDS_MEMORY_MAP_KEY = "memory_map"
+
+FOLD_INDEX_FILE_NAME = "folds.npz"
+FOLD_SPEC_FILE_NAME = "fold_spec.yaml"
+INPUT_FEATURE_FILE_NAME = "input_feature.npy"
+OUTPUT_FEATURE_FILE_NAME = "output_feature.npy"
+
+CVFoldSpec = namedtuple("CVFoldSpec", ["n_splits", "shuffle", "random_state", "n_samples", "data_hash",
+                                       "split_hash", "fold_sizes", "fold_index_file_path"])
+
+
+def compute_data_hash(*arrays) -> str:
+    """
+    sha256 of the shape, dtype and raw bytes of every array, without copying contiguous arrays.
+    """
+    import numpy as np
+
+    data_hash = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        data_hash.update(f"{array.shape}{array.dtype.str}".encode())
+        data_hash.update(memoryview(array).cast("B"))
+    return data_hash.hexdigest()
+
+
+def _save_array(file_path: str, array):
+    """
+    np.save through a temporary file, concurrent readers only ever see complete .npy files.
+    """
+    import numpy as np
+
+    tmp_file_path = f"{file_path}.tmp-{os.getpid()}"
+    with open(tmp_file_path, "wb") as file_obj:
+        np.save(file_obj, np.ascontiguousarray(array))
+    os.replace(tmp_file_path, file_path)
+
+
+class CVFoldCache:
+    """
+    Materializes the cross validation splits once so every model search runs on the very same folds.
+
+    The splits are StratifiedKFold index arrays, saved with a spec (data hash, seed, fold sizes) so scores
+    of different models and different runs can be compared fold by fold. With memory_map the training
+    matrix is written once and handed to the searches as a read-only memmap: joblib workers then share
+    the pages instead of receiving a pickled copy. Pre-sliced fold matrices are written lazily by get_fold().
+    """
+
+    def __init__(self, cache_dir: str, n_splits: int, shuffle: bool = True, random_state: int = 42,
+                 memory_map: bool = True):
+        self.cache_dir = cache_dir
+        self.n_splits = int(n_splits)
+        self.shuffle = shuffle
+        self.random_state = random_state if shuffle else None
+        self.memory_map = memory_map
+
+        self.splits: List[Tuple["np.ndarray", "np.ndarray"]] = None
+        self.input_feature = None
+        self.output_feature = None
+        self.fold_spec: CVFoldSpec = None
+
+    def materialize(self, input_feature, output_feature) -> CVFoldSpec:
+        try:
+            import numpy as np
+            from sklearn.model_selection import StratifiedKFold
+            from tourism.utils.main_utils import write_yaml_file
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data_hash = compute_data_hash(input_feature, output_feature)
+
+            splitter = StratifiedKFold(n_splits=self.n_splits, shuffle=self.shuffle, random_state=self.random_state)
+            self.splits = [(train_index.astype(np.int64), test_index.astype(np.int64))
+                           for train_index, test_index in splitter.split(input_feature, output_feature)]
+
+            fold_index_file_path = os.path.join(self.cache_dir, FOLD_INDEX_FILE_NAME)
+            np.savez(fold_index_file_path,
+                     **{f"fold_{i}_{part}": index for i, split in enumerate(self.splits)
+                        for part, index in zip(("train", "test"), split)})
+
+            if self.memory_map:
+                self.input_feature = self._memory_map(INPUT_FEATURE_FILE_NAME, input_feature)
+                self.output_feature = self._memory_map(OUTPUT_FEATURE_FILE_NAME, output_feature)
+            else:
+                self.input_feature, self.output_feature = input_feature, output_feature
+
+            self.fold_spec = CVFoldSpec(n_splits=self.n_splits,
+                                        shuffle=self.shuffle,
+                                        random_state=self.random_state,
+                                        n_samples=int(len(output_feature)),
+                                        data_hash=data_hash,
+                                        split_hash=compute_data_hash(*[index for split in self.splits
+                                                                       for index in split]),
+                                        fold_sizes=[[int(len(train)), int(len(test))] for train, test in self.splits],
+                                        fold_index_file_path=fold_index_file_path)
+            write_yaml_file(file_path=os.path.join(self.cache_dir, FOLD_SPEC_FILE_NAME),
+                            data=dict(self.fold_spec._asdict()))
+            logging.info("CV folds materialized: %s", self.fold_spec)
+            return self.fold_spec
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @property
+    def input_feature_file_path(self) -> str:
+        return os.path.join(self.cache_dir, INPUT_FEATURE_FILE_NAME)
+
+    @property
+    def output_feature_file_path(self) -> str:
+        return os.path.join(self.cache_dir, OUTPUT_FEATURE_FILE_NAME)
+
+    def _memory_map(self, file_name: str, array):
+        import numpy as np
+
+        file_path = os.path.join(self.cache_dir, file_name)
+        _save_array(file_path, array)
+        return np.load(file_path, mmap_mode="r")
+
+    def get_fold(self, fold_number: int):
+        """
+        return: x_train, y_train, x_test, y_test of the fold, as read-only memmaps when memory_map is on.
+        Slices are written on first access and reused by every later caller.
+        """
+        try:
+            import numpy as np
+
+            train_index, test_index = self.splits[fold_number]
+            if not self.memory_map:
+                return (self.input_feature[train_index], self.output_feature[train_index],
+                        self.input_feature[test_index], self.output_feature[test_index])
+
+            fold_arrays = []
+            for part, index in (("train", train_index), ("test", test_index)):
+                for name, array in (("x", self.input_feature), ("y", self.output_feature)):
+                    file_path = os.path.join(self.cache_dir, f"fold_{fold_number}_{name}_{part}.npy")
+                    if not os.path.exists(file_path):
+                        _save_array(file_path, array[index])
+                    fold_arrays.append(np.load(file_path, mmap_mode="r"))
+            x_train, y_train, x_test, y_test = fold_arrays
+            return x_train, y_train, x_test, y_test
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,114 @@
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, List
+
+import yaml
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.utils.s3_operation import ObjectInfo
+
+PartitionRecord = namedtuple("PartitionRecord", ["key", "etag", "rows", "train_rows", "test_rows", "ingested_at"])
+
+MANIFEST_KEYS = ("partitions", "test_file_size", "train_file_size")
+
+
+class IngestionManifest:
+    """
+    Partitions already appended to the incremental train / test files, with the size of both files after the
+    last completed partition. Rows appended by an interrupted run are past these sizes and are truncated
+    away by recover() before the next partition is appended, so a partition is in the splits exactly once.
+    """
+
+    def __init__(self, manifest_file_path: str, train_file_path: str, test_file_path: str):
+        try:
+            self.manifest_file_path = manifest_file_path
+            self.train_file_path = train_file_path
+            self.test_file_path = test_file_path
+            self.partitions: Dict[str, PartitionRecord] = {}
+            self.train_file_size = 0
+            self.test_file_size = 0
+            if os.path.exists(manifest_file_path):
+                content = self.read_content(manifest_file_path)
+                self.partitions = {partition["key"]: PartitionRecord(**partition)
+                                   for partition in content.get("partitions", [])}
+                self.train_file_size = content.get("train_file_size", 0)
+                self.test_file_size = content.get("test_file_size", 0)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def read_content(manifest_file_path: str) -> dict:
+        """
+        return: manifest content, empty when the file is truncated (e.g. by a crash before it reached the disk).
+        recover() then truncates both splits and every partition is ingested again.
+        """
+        with open(manifest_file_path) as manifest_file:
+            raw_content = manifest_file.read()
+        try:
+            content = yaml.safe_load(raw_content)
+        except yaml.YAMLError:
+            content = None
+        # save() writes the sizes after the partitions and ends with a new line: a cut file misses one of them
+        if not raw_content.endswith("\n") or not isinstance(content, dict) or \
+                any(key not in content for key in MANIFEST_KEYS):
+            logging.warning("Manifest [%s] is truncated, every partition is ingested again", manifest_file_path)
+            return {}
+        return content
+
+    @property
+    def rows(self) -> int:
+        return sum(partition.rows for partition in self.partitions.values())
+
+    def recover(self):
+        for file_path, file_size in [(self.train_file_path, self.train_file_size),
+                                     (self.test_file_path, self.test_file_size)]:
+            current_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            if current_size < file_size:
+                raise Exception(f"[{file_path}] has {current_size} bytes, the manifest recorded {file_size}: "
+                                f"remove {self.manifest_file_path} to ingest every partition again")
+            if current_size > file_size:
+                logging.info("Truncating [%s] to %s bytes, left over by an interrupted run", file_path, file_size)
+                with open(file_path, "r+b") as split_file:
+                    split_file.truncate(file_size)
+
+    def get_new_partitions(self, objects: List[ObjectInfo]) -> List[ObjectInfo]:
+        """
+        return: objects not ingested yet. Ingested objects with another ETag were rewritten upstream,
+        their rows can not be replaced in the append only splits: they are logged and skipped.
+        """
+        new_objects = []
+        for object_info in objects:
+            partition = self.partitions.get(object_info.key)
+            if partition is None:
+                new_objects.append(object_info)
+            elif partition.etag != object_info.etag:
+                logging.warning("Partition [%s] changed since its ingestion (ETag %s -> %s), skipped",
+                                object_info.key, partition.etag, object_info.etag)
+        return new_objects
+
+    def add_partition(self, object_info: ObjectInfo, train_rows: int, test_rows: int):
+        self.partitions[object_info.key] = PartitionRecord(key=object_info.key, etag=object_info.etag,
+                                                           rows=train_rows + test_rows, train_rows=train_rows,
+                                                           test_rows=test_rows,
+                                                           ingested_at=datetime.now().isoformat())
+        self.train_file_size = os.path.getsize(self.train_file_path) if os.path.exists(self.train_file_path) else 0
+        self.test_file_size = os.path.getsize(self.test_file_path) if os.path.exists(self.test_file_path) else 0
+        self.save()
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.manifest_file_path), exist_ok=True)
+            tmp_file_path = f"{self.manifest_file_path}.tmp-{os.getpid()}"
+            with open(tmp_file_path, "w") as manifest_file:
+                yaml.safe_dump({"train_file_size": self.train_file_size, "test_file_size": self.test_file_size,
+                                "partitions": [dict(partition._asdict()) for partition in
+                                               sorted(self.partitions.values(), key=lambda record: record.key)]},
+                               manifest_file)
+                manifest_file.flush()
+                os.fsync(manifest_file.fileno())
+            os.replace(tmp_file_path, self.manifest_file_path)
+        except Exception as e:
+            raise CustomException(e, sys) from e
@@ -0,0 +1,162 @@
+"""
+Serving time validation of prediction records against schema.yaml.
+
+InputValidator is compiled once at training time from the schema.yaml ColumnNames types, the value ranges
+and null presence of the training input columns and the categories of the fitted one-hot encoders. A batch is
+then checked column by column with vectorized pandas / numpy operations, no per row Python code, into an
+error code matrix (rows x columns) whose bits tell which checks failed. Rows without any error bit are the ones
+the preprocessor accepts, TourismPredictor.predict_validated scores them in the same call.
+"""
+import sys
+from collections import namedtuple
+from typing import Dict, List, TYPE_CHECKING
+
+from tourism.constant.training_pipeline import DATASET_SCHEMA_COLUMNS_KEY, TARGET_COLUMN_KEY
+from tourism.exception import CustomException
+from tourism.logger import logging
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# error bits of ValidationResult.error_codes
+MISSING_COLUMN_ERROR = 1
+TYPE_ERROR = 2
+NULL_ERROR = 4
+RANGE_ERROR = 8
+UNKNOWN_CATEGORY_ERROR = 16
+
+ERROR_NAMES = {MISSING_COLUMN_ERROR: "missing column", TYPE_ERROR: "wrong type", NULL_ERROR: "null",
+               RANGE_ERROR: "out of range", UNKNOWN_CATEGORY_ERROR: "unknown category"}
+
+INT_TYPE = "int"
+FLOAT_TYPE = "float"
+
+# valid_mask: rows without any error, error_codes: (rows, columns) uint8 error bits
+ValidationResult = namedtuple("ValidationResult", ["valid_mask", "error_codes", "columns"])
+
+# per column check compiled from the training data
+ColumnCheck = namedtuple("ColumnCheck", ["column", "column_type", "is_required", "is_nullable", "low", "high",
+                                         "categories"])
+
+
+def get_encoder_categories(preprocessor) -> Dict[str, list]:
+    """
+    return: known categories of every one-hot encoded input column of a fitted ColumnTransformer
+            (or SelectedFeaturePreprocessor)
+    """
+    preprocessor = getattr(preprocessor, "preprocessor", preprocessor)
+    categories = {}
+    for transformer_name, transformer, columns in preprocessor.transformers_:
+        if transformer_name == "remainder" or isinstance(transformer, str):
+            continue
+        steps = [step for _, step in transformer.steps] if hasattr(transformer, "steps") else [transformer]
+        encoder = next((step for step in steps if hasattr(step, "categories_")), None)
+        if encoder is not None:
+            categories.update((column, list(encoder.categories_[position])) for position, column in enumerate(columns))
+    return categories
+
+
+def get_input_columns(preprocessor) -> List[str]:
+    preprocessor = getattr(preprocessor, "preprocessor", preprocessor)
+    return sorted({column for transformer_name, transformer, columns in preprocessor.transformers_
+                   if transformer_name != "remainder" and not isinstance(transformer, str) for column in columns})
+
+
+class InputValidator:
+
+    def __init__(self, column_checks: List[ColumnCheck]):
+        self.column_checks = column_checks
+        self.columns = [column_check.column for column_check in column_checks]
+
+    @classmethod
+    def from_training_data(cls, schema: dict, input_feature_df: "pd.DataFrame", preprocessor,
+                           range_margin: float = 0.1) -> "InputValidator":
+        """
+        schema: content of schema.yaml
+        input_feature_df: training input columns the preprocessor was fitted on
+        preprocessor: the fitted preprocessor exported with the model
+        range_margin: numeric values may leave the training [min, max] by this fraction of its width
+        """
+        try:
+            import numpy as np
+            import pandas as pd
+
+            required_columns = set(get_input_columns(preprocessor))
+            encoder_categories = get_encoder_categories(preprocessor)
+            column_checks = []
+            for column, column_type in schema[DATASET_SCHEMA_COLUMNS_KEY].items():
+                if column == schema.get(TARGET_COLUMN_KEY) or column not in input_feature_df.columns:
+                    continue
+                values = input_feature_df[column]
+                low = high = None
+                if column_type in (INT_TYPE, FLOAT_TYPE):
+                    numeric = pd.to_numeric(values, errors="coerce")
+                    if numeric.notna().any():
+                        margin = range_margin * float(numeric.max() - numeric.min())
+                        low, high = float(numeric.min()) - margin, float(numeric.max()) + margin
+                categories = encoder_categories.get(column)
+                column_checks.append(ColumnCheck(column=column, column_type=column_type,
+                                                 is_required=column in required_columns,
+                                                 # the imputers fill nulls of the columns that had some in training
+                                                 is_nullable=bool(values.isna().any()),
+                                                 low=low, high=high,
+                                                 categories=None if categories is None else np.array(categories,
+                                                                                                     dtype=object)))
+            input_validator = cls(column_checks)
+            logging.info("Compiled input validator: %s", input_validator)
+            return input_validator
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def validate(self, X: "pd.DataFrame") -> ValidationResult:
+        try:
+            import numpy as np
+            import pandas as pd
+
+            error_codes = np.zeros((len(X), len(self.column_checks)), dtype=np.uint8)
+            for position, column_check in enumerate(self.column_checks):
+                if column_check.column not in X.columns:
+                    if column_check.is_required:
+                        error_codes[:, position] |= MISSING_COLUMN_ERROR
+                    continue
+                values = X[column_check.column]
+                is_null = values.isna().to_numpy()
+                if not column_check.is_nullable:
+                    error_codes[is_null, position] |= NULL_ERROR
+
+                if column_check.column_type in (INT_TYPE, FLOAT_TYPE):
+                    numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                    is_wrong_type = np.isnan(numeric) & ~is_null
+                    if column_check.column_type == INT_TYPE:
+                        with np.errstate(invalid="ignore"):
+                            is_wrong_type |= np.isfinite(numeric) & (numeric != np.round(numeric))
+                    error_codes[is_wrong_type, position] |= TYPE_ERROR
+                    if column_check.low is not None:
+                        with np.errstate(invalid="ignore"):
+                            is_out_of_range = (numeric < column_check.low) | (numeric > column_check.high)
+                        error_codes[is_out_of_range, position] |= RANGE_ERROR
+                elif column_check.categories is not None:
+                    is_unknown = ~values.isin(column_check.categories).to_numpy() & ~is_null
+                    error_codes[is_unknown, position] |= UNKNOWN_CATEGORY_ERROR
+            return ValidationResult(valid_mask=~error_codes.any(axis=1), error_codes=error_codes,
+                                    columns=self.columns)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def get_error_messages(validation_result: ValidationResult, max_rows: int = 10) -> List[str]:
+        """
+        return: one message per invalid row, e.g. "row 3: Age out of range, Occupation unknown category"
+        """
+        import numpy as np
+
+        messages = []
+        for row in np.flatnonzero(~validation_result.valid_mask)[:max_rows].tolist():
+            errors = [f"{column} {name}" for position, column in enumerate(validation_result.columns)
+                      for bit, name in ERROR_NAMES.items() if validation_result.error_codes[row, position] & bit]
+            messages.append(f"row {row}: {', '.join(errors)}")
+        return messages
+
+    def __repr__(self):
+        return f"{type(self).__name__}(columns={len(self.column_checks)})"
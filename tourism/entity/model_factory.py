@@ -1,15 +1,30 @@
 import importlib
-from pyexpat import model
-import numpy as np
+import json
+import math
 import yaml
 from tourism.exception import CustomException
 import os
 import sys
 
 from collections import namedtuple
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
 from tourism.logger import logging
-from sklearn.metrics import accuracy_score, f1_score
+from tourism.entity.fold_cache import (CVFoldCache, CV_FOLDS_KEY, CV_FOLDS_SHUFFLE_KEY, CV_FOLDS_RANDOM_STATE_KEY,
+                                       CV_FOLDS_MEMORY_MAP_KEY, compute_data_hash)
+from tourism.entity.search_cache import SearchResultCache, get_estimator_name
+from tourism.entity.distributed_search import (DistributedSearch, DISTRIBUTED_SEARCH_KEY,
+                                               DISTRIBUTED_SEARCH_ENABLED_KEY, DISTRIBUTED_SEARCH_LOCAL_WORKERS_KEY,
+                                               DISTRIBUTED_SEARCH_MAX_ATTEMPTS_KEY,
+                                               DISTRIBUTED_SEARCH_LEASE_SECONDS_KEY,
+                                               DISTRIBUTED_SEARCH_POLL_INTERVAL_KEY, DISTRIBUTED_SEARCH_TIMEOUT_KEY)
+from tourism.entity.out_of_core import (OUT_OF_CORE_KEY, OUT_OF_CORE_ENABLED_KEY, OUT_OF_CORE_CHUNK_ROWS_KEY,
+                                        OUT_OF_CORE_EPOCHS_KEY, OUT_OF_CORE_VALIDATION_EVERY_KEY,
+                                        OUT_OF_CORE_RANDOM_STATE_KEY, get_streamed_classification_scores,
+                                        search_incremental_models, search_external_memory_model)
+from tourism.utils.profiling import profile_step
+
+if TYPE_CHECKING:
+    import numpy as np
 
 GRID_SEARCH_KEY = 'grid_search'
 MODULE_KEY = 'module'
@@ -17,9 +32,36 @@ CLASS_KEY = 'class'
 PARAM_KEY = 'params'
 MODEL_SELECTION_KEY = 'model_selection'
 SEARCH_PARAM_GRID_KEY = "search_param_grid"
+THREAD_PARAM_KEY = "thread_param"
+
+EARLY_STOPPING_KEY = "early_stopping"
+EARLY_STOPPING_ROUND_PARAM_KEY = "round_param"
+EARLY_STOPPING_ROUNDS_KEY = "rounds"
+EARLY_STOPPING_VALIDATION_FRACTION_KEY = "validation_fraction"
+
+RESOURCES_KEY = "resources"
+CPU_BUDGET_KEY = "cpu_budget"
+
+# estimator parameters which do not change the fitted model, left out of the search cache key
+SEARCH_CACHE_IGNORED_PARAMS = ["n_jobs", "nthread", "verbose", "verbosity"]
+
+WARM_START_KEY = "warm_start"
+WARM_START_ENABLED_KEY = "enabled"
+WARM_START_FULL_SEARCH_EVERY_N_RUNS_KEY = "full_search_every_n_runs"
+WARM_START_NEIGHBOURHOOD_SIZE_KEY = "neighbourhood_size"
+WARM_START_INCREMENTAL_ESTIMATORS_KEY = "incremental_estimators"
+
+# warm start state file keys
+RUNS_SINCE_FULL_SEARCH_KEY = "runs_since_full_search"
+STATE_MODELS_KEY = "models"
+MODEL_NAME_KEY = "model_name"
+BEST_PARAMETERS_KEY = "best_parameters"
+BEST_SCORE_KEY = "best_score"
+MODEL_FILE_PATH_KEY = "model_file_path"
 
 InitializedModelDetail = namedtuple("InitializedModelDetail",
-                                    ["model_serial_number", "model", "param_grid_search", "model_name"])
+                                    ["model_serial_number", "model", "param_grid_search", "model_name",
+                                     "early_stopping_config"])
 
 GridSearchedBestModel = namedtuple("GridSearchedBestModel", ["model_serial_number",
                                                              "model",
@@ -40,8 +82,9 @@ MetricInfoArtifact = namedtuple("MetricInfoArtifact",
 
 
 # can be used in case of classification model
-def evaluate_classification_model(model_list: list, X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray,
-                                  y_test: np.ndarray, base_accuracy: float = 0.6) -> MetricInfoArtifact:
+def evaluate_classification_model(model_list: list, X_train: "np.ndarray", y_train: "np.ndarray", X_test: "np.ndarray",
+                                  y_test: "np.ndarray", base_accuracy: float = 0.6,
+                                  chunk_rows: int = None) -> MetricInfoArtifact:
     """
     Description:
     This function compare multiple classification models and returns best model
@@ -51,6 +94,7 @@ def evaluate_classification_model(model_list: list, X_train: np.ndarray, y_train
     y_train: Training dataset target feature
     X_test: Testing dataset input feature
     y_test: Testing dataset input feature
+    chunk_rows: predict chunk_rows rows at a time (out-of-core training on memory mapped arrays)
     return
     It returned a named tuple
     
@@ -59,38 +103,43 @@ def evaluate_classification_model(model_list: list, X_train: np.ndarray, y_train
                                  "test_accuracy", "model_accuracy", "index_number"])
     """
     try:
+        from sklearn.metrics import accuracy_score, f1_score
 
         index_number = 0
         metric_info_artifact = None
         for model in model_list:
             model_name = str(model)  # getting model name based on model object
-            logging.info(f"{'>>' * 30}Started evaluating model: [{type(model).__name__}] {'<<' * 30}")
+            logging.info("%sStarted evaluating model: [%s] %s", ">>" * 30, type(model).__name__, "<<" * 30)
 
-            # Getting prediction for training and testing dataset
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
+            if chunk_rows is not None:
+                train_acc, train_f1 = get_streamed_classification_scores(model, X_train, y_train, chunk_rows)
+                test_acc, test_f1 = get_streamed_classification_scores(model, X_test, y_test, chunk_rows)
+            else:
+                # Getting prediction for training and testing dataset
+                y_train_pred = model.predict(X_train)
+                y_test_pred = model.predict(X_test)
 
-            # Calculating r squared score on training and testing dataset
-            train_acc = accuracy_score(y_train, y_train_pred)
-            test_acc = accuracy_score(y_test, y_test_pred)
+                # Calculating r squared score on training and testing dataset
+                train_acc = accuracy_score(y_train, y_train_pred)
+                test_acc = accuracy_score(y_test, y_test_pred)
 
-            # Calculating mean squared error on training and testing dataset
-            train_f1 = f1_score(y_train, y_train_pred)
-            test_f1 = f1_score(y_test, y_test_pred)
+                # Calculating mean squared error on training and testing dataset
+                train_f1 = f1_score(y_train, y_train_pred)
+                test_f1 = f1_score(y_test, y_test_pred)
 
             # Calculating harmonic mean of train_accuracy and test_accuracy
             model_accuracy = (2 * (train_acc * test_acc)) / (train_acc + test_acc)
             diff_test_train_acc = abs(test_acc - train_acc)
 
             # logging all important metric
-            logging.info(f"{'>>' * 30} Score {'<<' * 30}")
-            logging.info(f"Train Score\t\t Test Score\t\t Average Score")
-            logging.info(f"{train_acc}\t\t {test_acc}\t\t{model_accuracy}")
+            logging.info("%s Score %s", ">>" * 30, "<<" * 30)
+            logging.info("Train Score\t\t Test Score\t\t Average Score")
+            logging.info("%s\t\t %s\t\t%s", train_acc, test_acc, model_accuracy)
 
-            logging.info(f"{'>>' * 30} F1 Score {'<<' * 30}")
-            logging.info(f"Diff test train accuracy: [{diff_test_train_acc}].")
-            logging.info(f"Train root mean squared error: [{train_f1}].")
-            logging.info(f"Test root mean squared error: [{test_f1}].")
+            logging.info("%s F1 Score %s", ">>" * 30, "<<" * 30)
+            logging.info("Diff test train accuracy: [%s].", diff_test_train_acc)
+            logging.info("Train root mean squared error: [%s].", train_f1)
+            logging.info("Test root mean squared error: [%s].", test_f1)
 
             # if model accuracy is greater than base accuracy and train and test score is within certain threshold
             # we will accept that model as accepted model
@@ -105,17 +154,17 @@ def evaluate_classification_model(model_list: list, X_train: np.ndarray, y_train
                                                           model_accuracy=model_accuracy,
                                                           index_number=index_number)
 
-                logging.info(f"Acceptable model found {metric_info_artifact}. ")
+                logging.info("Acceptable model found %s. ", metric_info_artifact)
             index_number += 1
         if metric_info_artifact is None:
-            logging.info(f"No model found with higher accuracy than base accuracy")
+            logging.info("No model found with higher accuracy than base accuracy")
         return metric_info_artifact
     except Exception as e:
         raise CustomException(e, sys) from e
 
 
-def evaluate_regression_model(model_list: list, X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray,
-                              y_test: np.ndarray, base_accuracy: float = 0.6) -> MetricInfoArtifact:
+def evaluate_regression_model(model_list: list, X_train: "np.ndarray", y_train: "np.ndarray", X_test: "np.ndarray",
+                              y_test: "np.ndarray", base_accuracy: float = 0.6) -> MetricInfoArtifact:
     pass
 
 
@@ -156,8 +205,44 @@ def get_sample_model_config_yaml_file(export_dir: str):
         raise CustomException(e, sys)
 
 
+def get_neighbourhood_param_grid(param_grid: dict, best_parameters: dict, neighbourhood_size: int = 1) -> dict:
+    """
+    Narrows a search grid around previously found best parameters.
+    Numeric values keep the `neighbourhood_size` closest grid values on each side of the previous best,
+    any other parameter (strings, None, values outside the grid) is pinned to the previous best.
+    """
+    narrowed_param_grid = {}
+    for param_name, values in param_grid.items():
+        if param_name not in best_parameters:
+            narrowed_param_grid[param_name] = values
+            continue
+        best_value = best_parameters[param_name]
+        numeric_values = sorted({value for value in values
+                                 if isinstance(value, (int, float)) and not isinstance(value, bool)})
+        is_numeric_best = isinstance(best_value, (int, float)) and not isinstance(best_value, bool)
+        if not is_numeric_best or best_value not in numeric_values:
+            narrowed_param_grid[param_name] = [best_value]
+            continue
+        index = numeric_values.index(best_value)
+        narrowed_param_grid[param_name] = numeric_values[max(0, index - neighbourhood_size):
+                                                         index + neighbourhood_size + 1]
+    return narrowed_param_grid
+
+
 class ModelFactory:
-    def __init__(self, model_config_path: str = None,):
+    def __init__(self, model_config_path: str = None, warm_start_state_file_path: str = None,
+                 force_full_search: bool = False, fold_cache_dir: str = None, search_cache_file_path: str = None,
+                 cpu_budget: int = None, search_queue_file_path: str = None):
+        """
+        model_config_path: model.yaml path
+        warm_start_state_file_path: yaml file keeping the best parameters of the previous runs,
+                                    warm start is disabled when not given
+        force_full_search: search the whole grid even if warm start is possible (e.g. drift was found)
+        fold_cache_dir: directory the shared CV folds are materialized in (needs a `cv_folds` block in model.yaml)
+        search_cache_file_path: sqlite file of cached candidate scores, every candidate is fitted when not given
+        cpu_budget: cpus of this run, overrides `resources.cpu_budget` of model.yaml and caps the search n_jobs
+        search_queue_file_path: sqlite task queue of the worker pool, used when `distributed_search` is enabled
+        """
         try:
             self.config: dict = ModelFactory.read_params(model_config_path)
 
@@ -165,14 +250,515 @@ class ModelFactory:
             self.grid_search_class_name: str = self.config[GRID_SEARCH_KEY][CLASS_KEY]
             self.grid_search_property_data: dict = dict(self.config[GRID_SEARCH_KEY][PARAM_KEY])
 
+            self.cpu_budget: int = cpu_budget or (self.config.get(RESOURCES_KEY) or {}).get(CPU_BUDGET_KEY)
+            if cpu_budget is not None:
+                # concurrent runs share the machine: the parallel fits of one search stay within its budget
+                search_jobs = self.grid_search_property_data.get("n_jobs") or 1
+                self.grid_search_property_data["n_jobs"] = cpu_budget if search_jobs < 0 else min(search_jobs,
+                                                                                                  cpu_budget)
+
             self.models_initialization_config: dict = dict(self.config[MODEL_SELECTION_KEY])
 
+            # out-of-core mode: the estimators of `out_of_core.model_selection` stream the training data
+            self.out_of_core_config: dict = dict(self.config.get(OUT_OF_CORE_KEY) or {})
+            self.is_out_of_core: bool = self.out_of_core_config.get(OUT_OF_CORE_ENABLED_KEY, False)
+            self.chunk_rows: int = None
+            if self.is_out_of_core:
+                self.models_initialization_config = dict(self.out_of_core_config[MODEL_SELECTION_KEY])
+                self.chunk_rows = self.out_of_core_config.get(OUT_OF_CORE_CHUNK_ROWS_KEY, 100000)
+            self.fold_cache_dir = fold_cache_dir
+
+            self.warm_start_config: dict = dict(self.config.get(WARM_START_KEY) or {})
+            self.warm_start_state_file_path = warm_start_state_file_path
+            self.warm_start_state: dict = self.read_warm_start_state()
+            self.is_warm_start: bool = self.get_is_warm_start(force_full_search=force_full_search)
+            logging.info("Warm start: %s", self.is_warm_start)
+
+            self.fold_cache: CVFoldCache = None
+            if fold_cache_dir is not None and self.config.get(CV_FOLDS_KEY) is not None:
+                cv_folds_config = self.config[CV_FOLDS_KEY]
+                self.fold_cache = CVFoldCache(cache_dir=fold_cache_dir,
+                                              n_splits=self.grid_search_property_data.get("cv", 5),
+                                              shuffle=cv_folds_config.get(CV_FOLDS_SHUFFLE_KEY, True),
+                                              random_state=cv_folds_config.get(CV_FOLDS_RANDOM_STATE_KEY, 42),
+                                              memory_map=cv_folds_config.get(CV_FOLDS_MEMORY_MAP_KEY, True))
+
+            self.search_cache: SearchResultCache = None
+            if search_cache_file_path is not None:
+                self.search_cache = SearchResultCache(cache_file_path=search_cache_file_path)
+            self.data_hash: str = None
+
+            self.distributed_search: DistributedSearch = None
+            distributed_search_config = self.config.get(DISTRIBUTED_SEARCH_KEY) or {}
+            if distributed_search_config.get(DISTRIBUTED_SEARCH_ENABLED_KEY, False):
+                if search_queue_file_path is None or self.fold_cache is None or not self.fold_cache.memory_map:
+                    raise Exception("distributed_search shares the training data through the fold cache: it needs "
+                                    "a search queue file, a cv_fold_dir and `cv_folds.memory_map: true`")
+                self.distributed_search = DistributedSearch(
+                    queue_file_path=search_queue_file_path,
+                    local_workers=distributed_search_config.get(DISTRIBUTED_SEARCH_LOCAL_WORKERS_KEY, 0),
+                    max_attempts=distributed_search_config.get(DISTRIBUTED_SEARCH_MAX_ATTEMPTS_KEY, 3),
+                    lease_seconds=distributed_search_config.get(DISTRIBUTED_SEARCH_LEASE_SECONDS_KEY, 600),
+                    poll_interval=distributed_search_config.get(DISTRIBUTED_SEARCH_POLL_INTERVAL_KEY, 1.0),
+                    timeout=distributed_search_config.get(DISTRIBUTED_SEARCH_TIMEOUT_KEY))
+
             self.initialized_model_list = None
             self.grid_searched_best_model_list = None
 
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def read_warm_start_state(self) -> dict:
+        try:
+            if self.warm_start_state_file_path is None or not os.path.exists(self.warm_start_state_file_path):
+                return {}
+            return ModelFactory.read_params(self.warm_start_state_file_path) or {}
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_is_warm_start(self, force_full_search: bool = False) -> bool:
+        """
+        Warm start runs only when enabled in model.yaml, a previous run left its best parameters
+        and the scheduled full search (every `full_search_every_n_runs` runs) is not due.
+        """
+        try:
+            if force_full_search or not self.warm_start_config.get(WARM_START_ENABLED_KEY, False):
+                return False
+            if not self.warm_start_state.get(STATE_MODELS_KEY):
+                return False
+            full_search_every_n_runs = self.warm_start_config.get(WARM_START_FULL_SEARCH_EVERY_N_RUNS_KEY)
+            runs_since_full_search = self.warm_start_state.get(RUNS_SINCE_FULL_SEARCH_KEY, 0)
+            return not full_search_every_n_runs or runs_since_full_search + 1 < full_search_every_n_runs
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_previous_model_state(self, model_serial_number: str, model_name: str) -> dict:
+        """
+        return: warm start state of the model block, None if the block changed its estimator since the last run
+        """
+        previous_model_state = self.warm_start_state.get(STATE_MODELS_KEY, {}).get(model_serial_number)
+        if previous_model_state is None or previous_model_state.get(MODEL_NAME_KEY) != model_name:
+            return None
+        return previous_model_state
+
+    def get_continued_model(self, initialized_model: InitializedModelDetail, best_parameters: dict,
+                            input_feature, output_feature):
+        """
+        Continues training of the previous best estimator when the search picked the same parameters:
+        XGBoost boosts `incremental_estimators` more rounds on top of the previous booster,
+        sklearn ensembles supporting `warm_start` (RandomForest, ...) add `incremental_estimators` trees.
+        return: fitted estimator, None when the previous estimator can not be continued
+        """
+        try:
+            previous_model_state = self.get_previous_model_state(initialized_model.model_serial_number,
+                                                                 initialized_model.model_name)
+            incremental_estimators = self.warm_start_config.get(WARM_START_INCREMENTAL_ESTIMATORS_KEY)
+            if (previous_model_state is None or not incremental_estimators
+                    or previous_model_state.get(BEST_PARAMETERS_KEY) != best_parameters
+                    or not os.path.exists(previous_model_state.get(MODEL_FILE_PATH_KEY) or "")):
+                return None
+
+            from tourism.utils.main_utils import load_object
+
+            previous_model = load_object(previous_model_state[MODEL_FILE_PATH_KEY])
+            if getattr(previous_model, "n_features_in_", None) != input_feature.shape[1]:
+                logging.info("Feature space changed since the previous run, previous model can not be continued")
+                return None
+
+            if hasattr(previous_model, "get_booster"):
+                continued_model = previous_model.set_params(n_estimators=incremental_estimators)
+                continued_model.fit(input_feature, output_feature, xgb_model=previous_model.get_booster())
+            elif "warm_start" in previous_model.get_params() and hasattr(previous_model, "n_estimators"):
+                continued_model = previous_model.set_params(
+                    warm_start=True, n_estimators=previous_model.n_estimators + incremental_estimators)
+                continued_model.fit(input_feature, output_feature)
+                continued_model.set_params(warm_start=False)
+            else:
+                return None
+            logging.info("Continued training of previous %s with %s more estimators",
+                         type(previous_model).__name__, incremental_estimators)
+            return continued_model
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def fit_best_model(self, initialized_model: InitializedModelDetail, best_parameters: dict,
+                       input_feature, output_feature):
+        """
+        Final fit of the best parameters on the whole training data, continuing the previous run's
+        estimator when warm start allows it.
+        """
+        try:
+            best_model = None
+            if self.is_warm_start:
+                best_model = self.get_continued_model(initialized_model, best_parameters,
+                                                      input_feature, output_feature)
+            if best_model is None:
+                from sklearn.base import clone
+
+                best_model = clone(initialized_model.model).set_params(**best_parameters)
+                best_model.fit(input_feature, output_feature)
+            return best_model
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_model_thread_count(self) -> int:
+        """
+        Threads per estimator fit: the cpu budget of the run or `resources.cpu_budget` of model.yaml
+        (all cpus when unset) shared by the parallel fits of the search (`grid_search.params.n_jobs`).
+        """
+        cpu_budget = self.cpu_budget or os.cpu_count() or 1
+        search_jobs = self.grid_search_property_data.get("n_jobs") or 1
+        if search_jobs < 0:
+            search_jobs = cpu_budget
+        return max(1, cpu_budget // search_jobs)
+
+    def get_cv_folds(self, input_feature, output_feature) -> list:
+        """
+        return: list of (x_train, y_train, x_validation, y_validation), the shared fold cache when available
+        """
+        try:
+            if self.fold_cache is not None:
+                return [self.fold_cache.get_fold(fold_number) for fold_number in range(self.fold_cache.n_splits)]
+            from sklearn.model_selection import StratifiedKFold
+
+            splitter = StratifiedKFold(n_splits=self.grid_search_property_data.get("cv", 5))
+            return [(input_feature[train_index], output_feature[train_index],
+                     input_feature[test_index], output_feature[test_index])
+                    for train_index, test_index in splitter.split(input_feature, output_feature)]
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def execute_early_stopping_search_operation(self, initialized_model: InitializedModelDetail, input_feature,
+                                                output_feature) -> GridSearchedBestModel:
+        """
+        Parameter search for boosting estimators (XGBoost).
+        The boosting round parameter is taken out of the grid: every remaining combination is fitted once per
+        CV fold with the largest round count and early stopping on a validation_fraction of the training fold,
+        then every round count of the grid is scored on the validation fold from that single fit by predicting
+        with the rounds up to the early stopping point only. The validation fold never picks the stopping
+        point, so the score is not optimistic.
+        The best candidate is refitted the way it was scored: early stopped on a held out part of the training
+        data, then fitted on all of it with the rounds kept.
+        ================================================================================
+        return: GridSearchedBestModel, best_score is the mean validation accuracy like GridSearchCV
+        """
+        try:
+            import numpy as np
+            from sklearn.metrics import accuracy_score
+            from sklearn.model_selection import ParameterGrid
+
+            early_stopping_config = initialized_model.early_stopping_config
+            round_param = early_stopping_config.get(EARLY_STOPPING_ROUND_PARAM_KEY, "n_estimators")
+            early_stopping_rounds = early_stopping_config.get(EARLY_STOPPING_ROUNDS_KEY, 10)
+            validation_fraction = early_stopping_config.get(EARLY_STOPPING_VALIDATION_FRACTION_KEY, 0.1)
+
+            param_grid = dict(initialized_model.param_grid_search)
+            round_values = sorted(param_grid.pop(round_param, [getattr(initialized_model.model, round_param)]))
+            max_rounds = max(round_values)
+
+            message = f'{">>" * 30} Early stopping search {type(initialized_model.model).__name__} Started. {"<<" * 30}'
+            logging.info(message)
+            folds = self.get_cv_folds(input_feature, output_feature)
+            if self.search_cache is not None:
+                estimator_name = get_estimator_name(initialized_model.model)
+                cv_spec = self.get_cv_spec(early_stopping_rounds=early_stopping_rounds,
+                                           validation_fraction=validation_fraction)
+                data_hash = self.get_data_hash(input_feature, output_feature)
+            candidates = []
+            fitted_models = 0
+            for params in ParameterGrid(param_grid):
+                if self.search_cache is not None:
+                    cache_params = [ModelFactory.get_search_cache_params(initialized_model.model,
+                                                                         {**params, round_param: n_rounds})
+                                    for n_rounds in round_values]
+                    cached = self.search_cache.get_many(estimator_name, cache_params, cv_spec, data_hash)
+                    if len(cached) == len(round_values):
+                        candidates.extend((cached[round_index].mean_score, {**params, round_param: n_rounds})
+                                          for round_index, n_rounds in enumerate(round_values))
+                        continue
+
+                fold_scores = np.zeros((len(folds), len(round_values)))
+                for fold_number, (x_train, y_train, x_validation, y_validation) in enumerate(folds):
+                    model = ModelFactory.fit_early_stopped_model(
+                        initialized_model.model, {**params, round_param: max_rounds}, x_train, y_train,
+                        early_stopping_rounds, validation_fraction)
+                    fitted_models += 1
+                    stopped_rounds = model.best_iteration + 1
+                    for round_index, n_rounds in enumerate(round_values):
+                        # rounds past the early stopping point score like the stopping point
+                        y_pred = model.predict(x_validation, iteration_range=(0, min(n_rounds, stopped_rounds)))
+                        fold_scores[fold_number, round_index] = accuracy_score(y_validation, y_pred)
+                for round_index, n_rounds in enumerate(round_values):
+                    candidates.append((float(fold_scores[:, round_index].mean()), {**params, round_param: n_rounds}))
+                    if self.search_cache is not None:
+                        self.search_cache.put(estimator_name, cache_params[round_index], cv_spec, data_hash,
+                                              fold_scores=fold_scores[:, round_index].tolist())
+                logging.info("Early stopping search %s: %s", params, fold_scores.mean(axis=0).tolist())
+
+            best_score, best_parameters = max(candidates, key=lambda candidate: candidate[0])
+            logging.info("Early stopping search fitted %s models for %s grid fits, best: %s [%s]",
+                         fitted_models, len(candidates) * len(folds), best_parameters, best_score)
+
+            # the rounds the best candidate stops at on the whole training data, then a plain fit on all of it
+            stopped_model = ModelFactory.fit_early_stopped_model(initialized_model.model, best_parameters,
+                                                                 input_feature, output_feature,
+                                                                 early_stopping_rounds, validation_fraction)
+            best_parameters = {**best_parameters,
+                               round_param: min(best_parameters[round_param], stopped_model.best_iteration + 1)}
+            logging.info("Early stopping search refit with %s rounds", best_parameters[round_param])
+
+            best_model = self.fit_best_model(initialized_model, best_parameters, input_feature, output_feature)
+            return GridSearchedBestModel(model_serial_number=initialized_model.model_serial_number,
+                                         model=initialized_model.model,
+                                         best_model=best_model,
+                                         best_parameters=best_parameters,
+                                         best_score=best_score
+                                         )
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def fit_early_stopped_model(model, params: dict, input_feature, output_feature, early_stopping_rounds: int,
+                                validation_fraction: float):
+        """
+        Fits a clone of model on input_feature, stopping early on a stratified validation_fraction held out of it.
+        return: fitted model, best_iteration is the last round before the validation score stopped improving
+        """
+        from sklearn.base import clone
+        from sklearn.model_selection import train_test_split
+
+        x_fit, x_eval, y_fit, y_eval = train_test_split(input_feature, output_feature,
+                                                        test_size=validation_fraction, stratify=output_feature,
+                                                        random_state=42)
+        model = clone(model).set_params(**params, early_stopping_rounds=early_stopping_rounds)
+        model.fit(x_fit, y_fit, eval_set=[(x_eval, y_eval)], verbose=False)
+        return model
+
+    def get_cv_spec(self, **extra) -> str:
+        """
+        Text identifying how candidates are scored: the materialized splits (or the splitter) and the scoring.
+        extra: additional search settings changing the scores, e.g. early_stopping_rounds
+        """
+        if self.fold_cache is not None and self.fold_cache.fold_spec is not None:
+            splits = f"split_hash={self.fold_cache.fold_spec.split_hash}"
+        else:
+            splits = f"StratifiedKFold(n_splits={self.grid_search_property_data.get('cv', 5)})"
+        cv_spec = {"splits": splits, "scoring": self.grid_search_property_data.get("scoring") or "accuracy"}
+        cv_spec.update(extra)
+        return json.dumps(cv_spec, sort_keys=True, default=str)
+
+    def get_data_hash(self, input_feature, output_feature) -> str:
+        if self.fold_cache is not None and self.fold_cache.fold_spec is not None:
+            return self.fold_cache.fold_spec.data_hash
+        if self.data_hash is None:
+            self.data_hash = compute_data_hash(input_feature, output_feature)
+        return self.data_hash
+
+    @staticmethod
+    def get_search_cache_params(model, params: dict) -> dict:
+        """
+        return: the full parameter set of the candidate (fixed model.yaml params included) used in the cache key
+        """
+        from sklearn.base import clone
+
+        candidate_params = clone(model).set_params(**params).get_params(deep=False)
+        return {key: value for key, value in candidate_params.items() if key not in SEARCH_CACHE_IGNORED_PARAMS}
+
+    def score_candidates_locally(self, initialized_model: InitializedModelDetail, candidate_params: List[dict],
+                                 input_feature, output_feature) -> List[tuple]:
+        """
+        return: (fold_scores, fit_seconds) per candidate, scored by the model.yaml search class in this process,
+                None for every candidate when all of their fits failed
+        """
+        # one single point grid per candidate, cv_results_ keeps this order
+        grid_search_cv = self.get_grid_search_cv(
+            initialized_model, param_grid=[{key: [value] for key, value in params.items()}
+                                           for params in candidate_params])
+        grid_search_cv.refit = False
+        try:
+            grid_search_cv.fit(input_feature, output_feature)
+        except ValueError as e:
+            # failed candidates are not cached: a run left with failing candidates only gets here every time
+            if "fits failed" not in str(e):
+                raise
+            logging.info("Every fit of the %s candidates failed: %s", len(candidate_params), e)
+            return [None] * len(candidate_params)
+        cv_results = grid_search_cv.cv_results_
+        n_splits = grid_search_cv.n_splits_
+        return [([cv_results[f"split{fold_number}_test_score"][position] for fold_number in range(n_splits)],
+                 cv_results["mean_fit_time"][position] * n_splits)
+                for position in range(len(candidate_params))]
+
+    def score_candidates_distributed(self, initialized_model: InitializedModelDetail,
+                                     candidate_params: List[dict]) -> List[Optional[tuple]]:
+        """
+        return: (fold_scores, fit_seconds) per candidate, None for candidates lost after every retry
+        """
+        from sklearn.base import clone
+
+        estimators = [clone(initialized_model.model).set_params(**params) for params in candidate_params]
+        model_initialization_config = self.models_initialization_config[initialized_model.model_serial_number]
+        local_workers = self.distributed_search.local_workers
+        if THREAD_PARAM_KEY in model_initialization_config and local_workers > 0:
+            # the local workers fit side by side: each gets its share of the cpu budget, not all of it
+            worker_thread_count = max(1, (self.cpu_budget or os.cpu_count() or 1) // local_workers)
+            estimators = [estimator.set_params(**{model_initialization_config[THREAD_PARAM_KEY]: worker_thread_count})
+                          for estimator in estimators]
+        fold_spec = self.fold_cache.fold_spec
+        return self.distributed_search.score_candidates(
+            estimators=estimators,
+            data_path=self.fold_cache.input_feature_file_path,
+            target_path=self.fold_cache.output_feature_file_path,
+            splits_path=fold_spec.fold_index_file_path,
+            n_splits=fold_spec.n_splits,
+            scoring=self.grid_search_property_data.get("scoring"))
+
+    def execute_candidate_search_operation(self, initialized_model: InitializedModelDetail, input_feature,
+                                           output_feature) -> GridSearchedBestModel:
+        """
+        Grid search scoring candidate by candidate: cached scores are reused, the missing candidates are
+        scored by the worker pool when distributed search is enabled, in this process otherwise.
+        Scores are merged and the best candidate is picked the way GridSearchCV does
+        (highest mean CV score, first in grid order on ties) before the final fit. Candidates whose fit failed
+        (NaN fold scores) are left out of the pick and never cached, they are fitted again on the next run.
+        """
+        try:
+            from sklearn.model_selection import ParameterGrid
+
+            estimator_name = get_estimator_name(initialized_model.model)
+            candidate_params = list(ParameterGrid(initialized_model.param_grid_search))
+
+            scores = {}
+            if self.search_cache is not None:
+                cache_params = [ModelFactory.get_search_cache_params(initialized_model.model, params)
+                                for params in candidate_params]
+                cv_spec = self.get_cv_spec()
+                data_hash = self.get_data_hash(input_feature, output_feature)
+                scores = {index: result.mean_score for index, result in
+                          self.search_cache.get_many(estimator_name, cache_params, cv_spec, data_hash).items()
+                          if result.mean_score is not None and math.isfinite(result.mean_score)}
+            missing = [index for index in range(len(candidate_params)) if index not in scores]
+            logging.info("Candidate search %s: %s cached, %s to fit out of %s candidates",
+                         estimator_name, len(scores), len(missing), len(candidate_params))
+
+            if missing:
+                missing_params = [candidate_params[index] for index in missing]
+                if self.distributed_search is not None:
+                    candidate_results = self.score_candidates_distributed(initialized_model, missing_params)
+                else:
+                    candidate_results = self.score_candidates_locally(initialized_model, missing_params,
+                                                                      input_feature, output_feature)
+                for index, candidate_result in zip(missing, candidate_results):
+                    if candidate_result is None:
+                        continue
+                    fold_scores, fit_seconds = candidate_result
+                    if not all(math.isfinite(score) for score in fold_scores):
+                        logging.info("Candidate search %s: %s failed to fit on some folds %s, left out",
+                                     estimator_name, candidate_params[index], fold_scores)
+                        continue
+                    scores[index] = sum(fold_scores) / len(fold_scores)
+                    if self.search_cache is not None:
+                        self.search_cache.put(estimator_name, cache_params[index], cv_spec, data_hash,
+                                              fold_scores=fold_scores, fit_seconds=fit_seconds)
+            if not scores:
+                raise Exception(f"None of the {len(candidate_params)} candidates of {estimator_name} was scored")
+
+            best_index = max(scores, key=lambda index: (scores[index], -index))
+            best_parameters = candidate_params[best_index]
+            best_model = self.fit_best_model(initialized_model, best_parameters, input_feature, output_feature)
+            return GridSearchedBestModel(model_serial_number=initialized_model.model_serial_number,
+                                         model=initialized_model.model,
+                                         best_model=best_model,
+                                         best_parameters=best_parameters,
+                                         best_score=scores[best_index]
+                                         )
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def execute_out_of_core_search_operation(self, initialized_model_list: List[InitializedModelDetail],
+                                             input_feature, output_feature) -> List[GridSearchedBestModel]:
+        """
+        Parameter search streaming the (memory mapped) training data chunk by chunk: XGBoost blocks from
+        external memory, the other blocks with partial_fit, all of their candidates fitted in shared passes.
+        ================================================================================
+        return: GridSearchedBestModel per block in model.yaml order, best_score is the held out accuracy
+        """
+        try:
+            validation_every = self.out_of_core_config.get(OUT_OF_CORE_VALIDATION_EVERY_KEY, 5)
+            external_memory_models = [model for model in initialized_model_list
+                                      if hasattr(model.model, "get_booster")]
+            incremental_models = [model for model in initialized_model_list
+                                  if not hasattr(model.model, "get_booster")]
+            for initialized_model in incremental_models:
+                if not hasattr(initialized_model.model, "partial_fit"):
+                    raise Exception(f"{initialized_model.model_name} has no partial_fit, "
+                                    f"it can not be trained out-of-core")
+
+            search_results = {}
+            if incremental_models:
+                with profile_step("search_out_of_core_incremental", rows=len(output_feature)):
+                    search_results.update(zip(
+                        [model.model_serial_number for model in incremental_models],
+                        search_incremental_models(
+                            incremental_models, input_feature, output_feature, chunk_rows=self.chunk_rows,
+                            epochs=self.out_of_core_config.get(OUT_OF_CORE_EPOCHS_KEY, 1),
+                            validation_every=validation_every,
+                            random_state=self.out_of_core_config.get(OUT_OF_CORE_RANDOM_STATE_KEY, 42))))
+            for initialized_model in external_memory_models:
+                early_stopping_config = initialized_model.early_stopping_config or {}
+                search_name = f"search_{initialized_model.model_serial_number}_external_memory"
+                with profile_step(search_name, rows=len(output_feature)):
+                    search_results[initialized_model.model_serial_number] = search_external_memory_model(
+                        initialized_model, input_feature, output_feature, chunk_rows=self.chunk_rows,
+                        validation_every=validation_every, cache_dir=self.fold_cache_dir,
+                        round_param=early_stopping_config.get(EARLY_STOPPING_ROUND_PARAM_KEY, "n_estimators"),
+                        early_stopping_rounds=early_stopping_config.get(EARLY_STOPPING_ROUNDS_KEY))
+
+            self.grid_searched_best_model_list = []
+            for initialized_model in initialized_model_list:
+                best_parameters, best_score, best_model = search_results[initialized_model.model_serial_number]
+                self.grid_searched_best_model_list.append(
+                    GridSearchedBestModel(model_serial_number=initialized_model.model_serial_number,
+                                          model=initialized_model.model,
+                                          best_model=best_model,
+                                          best_parameters=best_parameters,
+                                          best_score=best_score))
+            return self.grid_searched_best_model_list
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def save_warm_start_state(self, model_dir: str):
+        """
+        Persists best parameters, score and fitted estimator of every searched model block for the next run.
+        model_dir: directory the per block estimators are written to
+        """
+        try:
+            if self.warm_start_state_file_path is None or self.grid_searched_best_model_list is None:
+                return
+            from tourism.utils.main_utils import save_object, write_yaml_file
+
+            models_state = {}
+            for grid_searched_best_model in self.grid_searched_best_model_list:
+                model_serial_number = grid_searched_best_model.model_serial_number
+                model_file_path = os.path.join(model_dir, f"{model_serial_number}.pkl")
+                save_object(file_path=model_file_path, obj=grid_searched_best_model.best_model,
+                            serialization_format="auto")
+                initialized_model = ModelFactory.get_model_detail(self.initialized_model_list, model_serial_number)
+                models_state[model_serial_number] = {
+                    MODEL_NAME_KEY: initialized_model.model_name,
+                    BEST_PARAMETERS_KEY: dict(grid_searched_best_model.best_parameters),
+                    BEST_SCORE_KEY: float(grid_searched_best_model.best_score),
+                    MODEL_FILE_PATH_KEY: model_file_path,
+                }
+
+            runs_since_full_search = self.warm_start_state.get(RUNS_SINCE_FULL_SEARCH_KEY, 0) + 1 \
+                if self.is_warm_start else 0
+            warm_start_state = {RUNS_SINCE_FULL_SEARCH_KEY: runs_since_full_search, STATE_MODELS_KEY: models_state}
+            write_yaml_file(file_path=self.warm_start_state_file_path, data=warm_start_state)
+            logging.info("Warm start state saved: [%s]", self.warm_start_state_file_path)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     @staticmethod
     def update_property_of_class(instance_ref: object, property_data: dict):
         try:
@@ -180,7 +766,7 @@ class ModelFactory:
                 raise Exception("property_data parameter required to dictionary")
             print(property_data)
             for key, value in property_data.items():
-                logging.info(f"Executing:$ {str(instance_ref)}.{key}={value}")
+                logging.info("Executing:$ %s.%s=%s", instance_ref, key, value)
                 setattr(instance_ref, key, value)
             return instance_ref
         except Exception as e:
@@ -201,12 +787,33 @@ class ModelFactory:
             # load the module, will raise ImportError if module cannot be loaded
             module = importlib.import_module(module_name)
             # get the class, will raise AttributeError if class cannot be found
-            logging.info(f"Executing command: from {module} import {class_name}")
+            logging.info("Executing command: from %s import %s", module, class_name)
             class_ref = getattr(module, class_name)
             return class_ref
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def get_grid_search_cv(self, initialized_model: InitializedModelDetail, param_grid):
+        """
+        return: the model.yaml search class (GridSearchCV) configured for the initialized model
+        """
+        try:
+            # instantiating GridSearchCV class
+            grid_search_cv_ref = ModelFactory.class_for_name(module_name=self.grid_search_cv_module,
+                                                             class_name=self.grid_search_class_name
+                                                             )
+
+            grid_search_cv = grid_search_cv_ref(estimator=initialized_model.model,
+                                                param_grid=param_grid)
+            grid_search_cv = ModelFactory.update_property_of_class(grid_search_cv,
+                                                                   self.grid_search_property_data)
+            if self.fold_cache is not None:
+                # the same materialized splits for every model block, instead of re-splitting per search
+                grid_search_cv.cv = self.fold_cache.splits
+            return grid_search_cv
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def execute_grid_search_operation(self, initialized_model: InitializedModelDetail, input_feature,
                                       output_feature) -> GridSearchedBestModel:
         """
@@ -220,23 +827,30 @@ class ModelFactory:
         return: Function will return GridSearchOperation object
         """
         try:
-            # instantiating GridSearchCV class
-            grid_search_cv_ref = ModelFactory.class_for_name(module_name=self.grid_search_cv_module,
-                                                             class_name=self.grid_search_class_name
-                                                             )
+            if self.search_cache is not None or self.distributed_search is not None:
+                return self.execute_candidate_search_operation(initialized_model=initialized_model,
+                                                               input_feature=input_feature,
+                                                               output_feature=output_feature)
 
-            grid_search_cv = grid_search_cv_ref(estimator=initialized_model.model,
-                                                param_grid=initialized_model.param_grid_search)
-            grid_search_cv = ModelFactory.update_property_of_class(grid_search_cv,
-                                                                   self.grid_search_property_data)
+            grid_search_cv = self.get_grid_search_cv(initialized_model, param_grid=initialized_model.param_grid_search)
+            if self.is_warm_start:
+                # the final fit is done below, either continuing the previous estimator or from scratch
+                grid_search_cv.refit = False
 
             message = f'{">>" * 30} f"Training {type(initialized_model.model).__name__} Started." {"<<" * 30}'
             logging.info(message)
             grid_search_cv.fit(input_feature, output_feature)
             message = f'{">>" * 30} f"Training {type(initialized_model.model).__name__}" completed {"<<" * 30}'
+
+            if self.is_warm_start:
+                best_model = self.fit_best_model(initialized_model, grid_search_cv.best_params_,
+                                                 input_feature, output_feature)
+            else:
+                best_model = grid_search_cv.best_estimator_
+
             grid_searched_best_model = GridSearchedBestModel(model_serial_number=initialized_model.model_serial_number,
                                                              model=initialized_model.model,
-                                                             best_model=grid_search_cv.best_estimator_,
+                                                             best_model=best_model,
                                                              best_parameters=grid_search_cv.best_params_,
                                                              best_score=grid_search_cv.best_score_
                                                              )
@@ -265,13 +879,29 @@ class ModelFactory:
                     model1 = ModelFactory.update_property_of_class(instance_ref=model1,
                                                                    property_data=model_obj_property_data)
 
+                if THREAD_PARAM_KEY in model_initialization_config:
+                    model1 = ModelFactory.update_property_of_class(
+                        instance_ref=model1,
+                        property_data={model_initialization_config[THREAD_PARAM_KEY]: self.get_model_thread_count()})
+
                 param_grid_search = model_initialization_config[SEARCH_PARAM_GRID_KEY]
                 model_name = f"{model_initialization_config[MODULE_KEY]}.{model_initialization_config[CLASS_KEY]}"
 
+                previous_model_state = self.get_previous_model_state(model_serial_number, model_name)
+                if self.is_warm_start and previous_model_state is not None:
+                    param_grid_search = get_neighbourhood_param_grid(
+                        param_grid=param_grid_search,
+                        best_parameters=previous_model_state[BEST_PARAMETERS_KEY],
+                        neighbourhood_size=self.warm_start_config.get(WARM_START_NEIGHBOURHOOD_SIZE_KEY, 1))
+                    logging.info("Warm start search grid for %s: %s", model_name, param_grid_search)
+
+                early_stopping_config = model_initialization_config.get(EARLY_STOPPING_KEY)
+
                 model_initialization_config = InitializedModelDetail(model_serial_number=model_serial_number,
                                                                      model=model1,
                                                                      param_grid_search=param_grid_search,
-                                                                     model_name=model_name
+                                                                     model_name=model_name,
+                                                                     early_stopping_config=early_stopping_config
                                                                      )
 
                 initialized_model_list.append(model_initialization_config)
@@ -295,9 +925,15 @@ class ModelFactory:
         return: Function will return a GridSearchOperation
         """
         try:
-            return self.execute_grid_search_operation(initialized_model=initialized_model,
-                                                      input_feature=input_feature,
-                                                      output_feature=output_feature)
+            search_name = f"search_{initialized_model.model_serial_number}_{type(initialized_model.model).__name__}"
+            with profile_step(search_name, rows=len(output_feature)):
+                if initialized_model.early_stopping_config and hasattr(initialized_model.model, "get_booster"):
+                    return self.execute_early_stopping_search_operation(initialized_model=initialized_model,
+                                                                        input_feature=input_feature,
+                                                                        output_feature=output_feature)
+                return self.execute_grid_search_operation(initialized_model=initialized_model,
+                                                          input_feature=input_feature,
+                                                          output_feature=output_feature)
         except Exception as e:
             raise CustomException(e, sys) from e
 
@@ -340,13 +976,13 @@ class ModelFactory:
             best_model = None
             for grid_searched_best_model in grid_searched_best_model_list:
                 if base_accuracy < grid_searched_best_model.best_score:
-                    logging.info(f"Acceptable model found:{grid_searched_best_model}")
+                    logging.info("Acceptable model found:%s", grid_searched_best_model)
                     base_accuracy = grid_searched_best_model.best_score
 
                     best_model = grid_searched_best_model
             if not best_model:
                 raise Exception(f"None of Model has base accuracy: {base_accuracy}")
-            logging.info(f"Best model: {best_model}")
+            logging.info("Best model: %s", best_model)
             return best_model
         except Exception as e:
             raise CustomException(e, sys) from e
@@ -355,7 +991,15 @@ class ModelFactory:
         try:
             logging.info("Started Initializing model from config file")
             initialized_model_list = self.get_initialized_model_list()
-            logging.info(f"Initialized model: {initialized_model_list}")
+            logging.info("Initialized model: %s", initialized_model_list)
+            if self.is_out_of_core:
+                grid_searched_best_model_list = self.execute_out_of_core_search_operation(
+                    initialized_model_list=initialized_model_list, input_feature=X, output_feature=y)
+                return ModelFactory.get_best_model_from_grid_searched_best_model_list(grid_searched_best_model_list,
+                                                                                      base_accuracy=base_accuracy)
+            if self.fold_cache is not None:
+                self.fold_cache.materialize(X, y)
+                X, y = self.fold_cache.input_feature, self.fold_cache.output_feature
             grid_searched_best_model_list = self.initiate_best_parameter_search_for_initialized_models(
                 initialized_model_list=initialized_model_list,
                 input_feature=X,
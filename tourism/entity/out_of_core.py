@@ -0,0 +1,260 @@
+"""
+Out-of-core model search on the memory mapped transformation arrays.
+
+The transformed train array is never loaded as a whole: it is read chunk_rows rows at a time and every chunk
+is released before the next one is read. Every validation_every-th row is held out for candidate scoring,
+the other rows are trained on.
+
+Estimators with partial_fit (SGDClassifier, GaussianNB, ...) of every model block are fitted together: each
+epoch reads the chunks once (in a shuffled order, rows shuffled inside the chunk) and hands every chunk to
+every candidate of the grid. The best candidate of each block is refitted on all rows the same way.
+
+XGBClassifier blocks are trained from external memory: a DataIter streams the chunks into a paged DMatrix
+whose pages are cached on disk, built once and shared by every candidate. The boosting round parameter is
+scored from a single training per candidate with early stopping on the held out rows, like
+execute_early_stopping_search_operation.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from typing import Iterator, List, Tuple, TYPE_CHECKING
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+
+if TYPE_CHECKING:
+    import numpy as np
+
+OUT_OF_CORE_KEY = "out_of_core"
+OUT_OF_CORE_ENABLED_KEY = "enabled"
+OUT_OF_CORE_CHUNK_ROWS_KEY = "chunk_rows"
+OUT_OF_CORE_EPOCHS_KEY = "epochs"
+OUT_OF_CORE_VALIDATION_EVERY_KEY = "validation_every"
+OUT_OF_CORE_RANDOM_STATE_KEY = "random_state"
+
+
+def iter_chunks(input_feature, output_feature, chunk_rows: int,
+                random_state=None) -> Iterator[Tuple[int, "np.ndarray", "np.ndarray", "np.ndarray"]]:
+    """
+    random_state: shuffles the chunk order and the rows inside every chunk when given
+    return: (first row index, x, y, row permutation or None) per chunk, rows copied out of the memory map
+    """
+    import numpy as np
+
+    starts = np.arange(0, len(output_feature), chunk_rows)
+    rng = None if random_state is None else np.random.default_rng(random_state)
+    if rng is not None:
+        starts = rng.permutation(starts)
+    for start in starts.tolist():
+        x = np.asarray(input_feature[start:start + chunk_rows])
+        y = np.asarray(output_feature[start:start + chunk_rows])
+        if rng is not None:
+            order = rng.permutation(len(y))
+            x, y = x[order], y[order]
+            yield start, x, y, order
+        else:
+            yield start, x, y, None
+
+
+def get_validation_mask(start: int, n_rows: int, validation_every: int, order=None) -> "np.ndarray":
+    """
+    return: True for the held out rows of the chunk starting at row `start`
+    order: row permutation applied to the chunk by iter_chunks
+    """
+    import numpy as np
+
+    row_index = np.arange(start, start + n_rows)
+    if order is not None:
+        row_index = row_index[order]
+    return row_index % validation_every == 0
+
+
+def get_classes(output_feature, chunk_rows: int) -> "np.ndarray":
+    import numpy as np
+
+    classes = set()
+    for start in range(0, len(output_feature), chunk_rows):
+        classes.update(np.unique(np.asarray(output_feature[start:start + chunk_rows])).tolist())
+    return np.array(sorted(classes))
+
+
+def get_streamed_classification_scores(model, input_feature, output_feature, chunk_rows: int,
+                                       positive_label=1) -> Tuple[float, float]:
+    """
+    return: (accuracy, f1 of the positive label) predicted chunk by chunk, the f1_score of a binary target
+    """
+    correct = true_positive = false_positive = false_negative = 0
+    for _, x, y, _ in iter_chunks(input_feature, output_feature, chunk_rows):
+        y_pred = model.predict(x)
+        correct += int((y_pred == y).sum())
+        true_positive += int(((y_pred == positive_label) & (y == positive_label)).sum())
+        false_positive += int(((y_pred == positive_label) & (y != positive_label)).sum())
+        false_negative += int(((y_pred != positive_label) & (y == positive_label)).sum())
+    f1_denominator = 2 * true_positive + false_positive + false_negative
+    return correct / max(len(output_feature), 1), 2 * true_positive / f1_denominator if f1_denominator else 0.0
+
+
+def fit_incremental_models(models: list, input_feature, output_feature, classes, chunk_rows: int, epochs: int,
+                           validation_every: int = None, random_state=None):
+    """
+    partial_fit of every model on every chunk, the held out rows left out when validation_every is given.
+    """
+    for epoch in range(epochs):
+        seed = None if random_state is None else random_state + epoch
+        for start, x, y, order in iter_chunks(input_feature, output_feature, chunk_rows, random_state=seed):
+            if validation_every:
+                train_mask = ~get_validation_mask(start, len(y), validation_every, order)
+                x, y = x[train_mask], y[train_mask]
+            if not len(y):
+                continue
+            for model in models:
+                model.partial_fit(x, y, classes=classes)
+
+
+def search_incremental_models(initialized_models: list, input_feature, output_feature, chunk_rows: int,
+                              epochs: int, validation_every: int, random_state=None) -> List[tuple]:
+    """
+    initialized_models: InitializedModelDetail of estimators with partial_fit
+    return: (best_parameters, best_score, best_model) per initialized model
+    """
+    try:
+        import numpy as np
+        from sklearn.base import clone
+        from sklearn.model_selection import ParameterGrid
+
+        classes = get_classes(output_feature, chunk_rows)
+        candidates = [(model_index, params, clone(initialized_model.model).set_params(**params))
+                      for model_index, initialized_model in enumerate(initialized_models)
+                      for params in ParameterGrid(initialized_model.param_grid_search)]
+        logging.info("Out-of-core search of %s incremental candidates, %s epochs over chunks of %s rows",
+                     len(candidates), epochs, chunk_rows)
+        fit_incremental_models([model for _, _, model in candidates], input_feature, output_feature, classes,
+                               chunk_rows=chunk_rows, epochs=epochs, validation_every=validation_every,
+                               random_state=random_state)
+
+        correct, held_out = np.zeros(len(candidates)), 0
+        for start, x, y, _ in iter_chunks(input_feature, output_feature, chunk_rows):
+            validation_mask = get_validation_mask(start, len(y), validation_every)
+            x, y = x[validation_mask], y[validation_mask]
+            held_out += len(y)
+            for candidate_index, (_, _, model) in enumerate(candidates):
+                correct[candidate_index] += (model.predict(x) == y).sum() if len(y) else 0
+        scores = correct / max(held_out, 1)
+
+        best_candidates = []
+        for model_index, initialized_model in enumerate(initialized_models):
+            # highest held out accuracy, first in grid order on ties like GridSearchCV
+            candidate_index = max((index for index, candidate in enumerate(candidates) if candidate[0] == model_index),
+                                  key=lambda index: (scores[index], -index))
+            best_parameters = candidates[candidate_index][1]
+            logging.info("Out-of-core search %s: best %s [%s]",
+                         initialized_model.model_name, best_parameters, scores[candidate_index])
+            best_candidates.append((best_parameters, float(scores[candidate_index]),
+                                    clone(initialized_model.model).set_params(**best_parameters)))
+
+        fit_incremental_models([model for _, _, model in best_candidates], input_feature, output_feature, classes,
+                               chunk_rows=chunk_rows, epochs=epochs, random_state=random_state)
+        return best_candidates
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def get_external_memory_dmatrix(input_feature, output_feature, chunk_rows: int, cache_prefix: str,
+                                validation_every: int = None, validation: bool = False):
+    """
+    return: xgboost DMatrix paged from the chunks, only the held out (validation) or the other rows
+            when validation_every is given
+    """
+    import numpy as np
+    import xgboost
+
+    class ChunkIter(xgboost.DataIter):
+
+        def __init__(self):
+            self._start = 0
+            super().__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data) -> int:
+            while self._start < len(output_feature):
+                start, self._start = self._start, self._start + chunk_rows
+                x = np.asarray(input_feature[start:self._start])
+                y = np.asarray(output_feature[start:self._start])
+                if validation_every:
+                    mask = get_validation_mask(start, len(y), validation_every)
+                    x, y = (x[mask], y[mask]) if validation else (x[~mask], y[~mask])
+                if len(y):
+                    input_data(data=x, label=y)
+                    return 1
+            return 0
+
+        def reset(self):
+            self._start = 0
+
+    return xgboost.DMatrix(ChunkIter())
+
+
+def get_booster_params(model, n_classes: int) -> dict:
+    params = {key: value for key, value in model.get_xgb_params().items() if value is not None}
+    if n_classes > 2:
+        params.update(objective="multi:softprob", num_class=n_classes)
+    params["eval_metric"] = "merror" if n_classes > 2 else "error"
+    return params
+
+
+def search_external_memory_model(initialized_model, input_feature, output_feature, chunk_rows: int,
+                                 validation_every: int, cache_dir: str = None, round_param: str = "n_estimators",
+                                 early_stopping_rounds: int = None) -> tuple:
+    """
+    initialized_model: InitializedModelDetail of an XGBClassifier
+    return: (best_parameters, best_score, best_model)
+    """
+    try:
+        import xgboost
+        from sklearn.base import clone
+        from sklearn.model_selection import ParameterGrid
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        page_dir = tempfile.mkdtemp(prefix="xgboost_pages_", dir=cache_dir)
+        try:
+            n_classes = len(get_classes(output_feature, chunk_rows))
+            train_matrix = get_external_memory_dmatrix(input_feature, output_feature, chunk_rows,
+                                                       cache_prefix=os.path.join(page_dir, "train"),
+                                                       validation_every=validation_every)
+            validation_matrix = get_external_memory_dmatrix(input_feature, output_feature, chunk_rows,
+                                                            cache_prefix=os.path.join(page_dir, "validation"),
+                                                            validation_every=validation_every, validation=True)
+
+            param_grid = dict(initialized_model.param_grid_search)
+            round_values = sorted(param_grid.pop(round_param, [getattr(initialized_model.model, round_param)]))
+            candidates = []
+            for params in ParameterGrid(param_grid):
+                evals_result = {}
+                xgboost.train(get_booster_params(clone(initialized_model.model).set_params(**params), n_classes),
+                              train_matrix, num_boost_round=max(round_values),
+                              evals=[(validation_matrix, "validation")], evals_result=evals_result,
+                              early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+                errors = list(evals_result["validation"].values())[0]
+                for n_rounds in round_values:
+                    # rounds past the early stopping point score like the last trained round
+                    candidates.append((1 - errors[min(n_rounds, len(errors)) - 1], {**params, round_param: n_rounds}))
+                logging.info("External memory search %s: %s", params,
+                             [score for score, _ in candidates[-len(round_values):]])
+
+            best_score, best_parameters = max(candidates, key=lambda candidate: candidate[0])
+            logging.info("External memory search %s: best %s [%s]",
+                         initialized_model.model_name, best_parameters, best_score)
+
+            full_matrix = get_external_memory_dmatrix(input_feature, output_feature, chunk_rows,
+                                                      cache_prefix=os.path.join(page_dir, "full"))
+            best_model = clone(initialized_model.model).set_params(**best_parameters)
+            booster = xgboost.train(get_booster_params(best_model, n_classes), full_matrix,
+                                    num_boost_round=best_parameters[round_param])
+            # the sklearn wrapper restores n_classes_ / n_features_in_ from the booster config
+            best_model.load_model(bytearray(booster.save_raw()))
+            return best_parameters, float(best_score), best_model
+        finally:
+            shutil.rmtree(page_dir, ignore_errors=True)
+    except Exception as e:
+        raise CustomException(e, sys) from e
@@ -0,0 +1,210 @@
+"""
+Prediction cache in front of TourismPredictor.predict_proba.
+
+Rows are keyed by a canonical hash of their schema columns: every column is cast to its schema.yaml type
+(numbers to float64, categories to str) before pd.util.hash_pandas_object, so 3, 3.0 and "3.0" read from
+different sources share an entry while the column order of the caller does not matter. Keys also hold the
+model version, the export dir the saved_models current pointer targets: after a model push the pointer is
+seen on the next call, the new model is loaded and the entries of the old one are dropped.
+
+Entries are evicted least recently used first beyond max_entries and expire ttl_seconds after they were
+computed. A batch is deduplicated before the cache lookup, only the distinct missed rows reach the model.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import List, TYPE_CHECKING
+
+from tourism.constant.training_pipeline import DATASET_SCHEMA_COLUMNS_KEY, SCHEMA_FILE_PATH, TARGET_COLUMN_KEY
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.utils.main_utils import read_yaml_file, load_object, resolve_current_pointer
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+CacheMetrics = namedtuple("CacheMetrics", ["hits", "misses", "batch_duplicates", "evictions", "expirations",
+                                           "invalidations", "size", "hit_rate"])
+
+NUMERIC_TYPES = ("int", "float")
+
+
+class PredictionCache:
+    """
+    Thread safe LRU map of key -> probability row with a time to live.
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl_seconds: float = 3600, clock=time.monotonic):
+        """
+        ttl_seconds: None keeps entries until they are evicted
+        clock: seconds source, time.monotonic unless a test moves time
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.batch_duplicates = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        return: cached probability row, None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, row):
+        expires_at = None if self.ttl_seconds is None else self.clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (row, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def metrics(self) -> CacheMetrics:
+        lookups = self.hits + self.misses
+        return CacheMetrics(hits=self.hits, misses=self.misses, batch_duplicates=self.batch_duplicates,
+                            evictions=self.evictions, expirations=self.expirations,
+                            invalidations=self.invalidations, size=len(self._entries),
+                            hit_rate=self.hits / lookups if lookups else 0.0)
+
+
+class CachedPredictor:
+    """
+    predict / predict_proba of a TourismPredictor, served from a PredictionCache.
+    """
+
+    def __init__(self, predictor=None, cache: PredictionCache = None, schema_file_path: str = SCHEMA_FILE_PATH,
+                 current_pointer_path: str = None, model_file_name: str = "model.pkl", model_version: str = None):
+        """
+        predictor: loaded TourismPredictor, loaded from current_pointer_path / model_file_name when None
+        current_pointer_path: saved_models current pointer, followed on every call to pick up model pushes
+        model_version: version of a given predictor, part of the cache keys
+        """
+        try:
+            if predictor is None and current_pointer_path is None:
+                raise Exception("Either a predictor or the current model pointer path is required")
+            schema = read_yaml_file(schema_file_path)
+            self.column_types = {column: column_type
+                                 for column, column_type in schema[DATASET_SCHEMA_COLUMNS_KEY].items()
+                                 if column != schema.get(TARGET_COLUMN_KEY)}
+            self.cache = cache or PredictionCache()
+            self.current_pointer_path = current_pointer_path
+            self.model_file_name = model_file_name
+            self.predictor = predictor
+            self.model_version = model_version
+            self._lock = threading.Lock()
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_model(self):
+        """
+        return: (model version, predictor), reloaded when the current pointer moved
+        """
+        if self.current_pointer_path is None:
+            return self.model_version, self.predictor
+        export_dir = resolve_current_pointer(self.current_pointer_path)
+        if export_dir is None:
+            raise Exception(f"No model was pushed to [{self.current_pointer_path}] yet")
+        model_version = os.path.basename(export_dir)
+        with self._lock:
+            if model_version != self.model_version or self.predictor is None:
+                logging.info("Loading model version [%s], prediction cache invalidated", model_version)
+                self.predictor = load_object(file_path=os.path.join(export_dir, self.model_file_name),
+                                             mmap_mode="r")
+                self.model_version = model_version
+                self.cache.clear()
+            return self.model_version, self.predictor
+
+    def get_row_keys(self, X: "pd.DataFrame") -> "np.ndarray":
+        """
+        return: uint64 canonical hash of every row over the schema columns
+        """
+        import pandas as pd
+
+        canonical = {}
+        for column, column_type in self.column_types.items():
+            values = X[column] if column in X.columns else pd.Series(None, index=X.index, dtype=object)
+            if column_type in NUMERIC_TYPES:
+                canonical[column] = pd.to_numeric(values, errors="coerce").astype("float64")
+            else:
+                # missing values hash alike whatever their representation (None, NaN, pd.NA)
+                canonical[column] = values.astype(str).where(values.notna(), "\x00")
+        return pd.util.hash_pandas_object(pd.DataFrame(canonical, index=X.index), index=False).to_numpy()
+
+    def _predict_proba(self, X):
+        """
+        return: (predictor, probabilities), the predictor that served the rows not found in the cache
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X)
+        model_version, predictor = self.get_model()
+        unique_keys, first_index, inverse = np.unique(self.get_row_keys(X), return_index=True, return_inverse=True)
+        self.cache.batch_duplicates += len(X) - len(unique_keys)
+
+        rows: List = [self.cache.get((model_version, key)) for key in unique_keys.tolist()]
+        missed = [position for position, row in enumerate(rows) if row is None]
+        if missed:
+            probability = predictor.predict_proba(X.iloc[first_index[missed]])
+            for position, row in zip(missed, probability):
+                # a copy: a view would keep the whole batch result alive
+                rows[position] = row.copy()
+                self.cache.put((model_version, unique_keys[position].item()), rows[position])
+        if not rows:
+            return predictor, np.empty((0, len(predictor.trained_model_object.classes_)))
+        return predictor, np.vstack(rows)[inverse.reshape(-1)]
+
+    def predict_proba(self, X) -> "np.ndarray":
+        try:
+            return self._predict_proba(X)[1]
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def predict(self, X) -> "np.ndarray":
+        """
+        Labels from the cached probabilities, the decision rule of TourismPredictor.predict.
+        """
+        try:
+            import numpy as np
+
+            predictor, probability = self._predict_proba(X)
+            classes = predictor.trained_model_object.classes_
+            threshold = getattr(predictor, "threshold", None)
+            if threshold is None:
+                return classes[probability.argmax(axis=1)]
+            return np.where(probability[:, -1] >= threshold, classes[-1], classes[0])
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def metrics(self) -> CacheMetrics:
+        return self.cache.metrics()
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import math
+import hashlib
+import sqlite3
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from tourism.exception import CustomException
+
+CachedSearchResult = namedtuple("CachedSearchResult", ["cache_key", "estimator", "params", "cv_spec", "data_hash",
+                                                       "fold_scores", "mean_score", "fit_seconds", "created_at"])
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS search_results (
+    cache_key TEXT PRIMARY KEY,
+    estimator TEXT NOT NULL,
+    params TEXT NOT NULL,
+    cv_spec TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    fold_scores TEXT NOT NULL,
+    mean_score REAL NOT NULL,
+    fit_seconds REAL,
+    created_at TEXT NOT NULL
+)
+"""
+_CREATE_INDEX = "CREATE INDEX IF NOT EXISTS search_results_lookup ON search_results (estimator, data_hash)"
+
+
+def canonical_params(params: dict) -> str:
+    """
+    Stable text form of an estimator parameter set, used both as cache key input and for reporting.
+    """
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def get_estimator_name(estimator) -> str:
+    return f"{type(estimator).__module__}.{type(estimator).__name__}"
+
+
+class SearchResultCache:
+    """
+    Persistent per-candidate cross validation scores, keyed by
+    (estimator class, full parameter set, CV spec, training data hash).
+
+    A candidate is only fitted when no score exists for that key, so adding one value to a
+    model.yaml grid costs the new combinations only. Changing the data, the folds or any fixed
+    parameter of the estimator changes the key and invalidates the cached scores.
+    """
+
+    def __init__(self, cache_file_path: str):
+        try:
+            self.cache_file_path = cache_file_path
+            os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+            with self._connect() as connection:
+                connection.execute(_CREATE_TABLE)
+                connection.execute(_CREATE_INDEX)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @contextmanager
+    def _connect(self):
+        # several training runs may share the cache file, writers wait for each other
+        connection = sqlite3.connect(self.cache_file_path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def get_cache_key(estimator_name: str, params: dict, cv_spec: str, data_hash: str) -> str:
+        key_text = json.dumps([estimator_name, canonical_params(params), cv_spec, data_hash])
+        return hashlib.sha256(key_text.encode()).hexdigest()
+
+    def get(self, estimator_name: str, params: dict, cv_spec: str, data_hash: str) -> Optional[CachedSearchResult]:
+        try:
+            cache_key = SearchResultCache.get_cache_key(estimator_name, params, cv_spec, data_hash)
+            with self._connect() as connection:
+                row = connection.execute("SELECT * FROM search_results WHERE cache_key = ?", (cache_key,)).fetchone()
+            return None if row is None else SearchResultCache._to_result(row)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_many(self, estimator_name: str, params_list: List[dict], cv_spec: str,
+                 data_hash: str) -> Dict[int, CachedSearchResult]:
+        """
+        return: {position in params_list: cached result} for the candidates found in the cache
+        """
+        try:
+            keys = {SearchResultCache.get_cache_key(estimator_name, params, cv_spec, data_hash): index
+                    for index, params in enumerate(params_list)}
+            cached = {}
+            with self._connect() as connection:
+                for row in connection.execute("SELECT * FROM search_results WHERE estimator = ? AND data_hash = ?",
+                                              (estimator_name, data_hash)):
+                    if row[0] in keys:
+                        cached[keys[row[0]]] = SearchResultCache._to_result(row)
+            return cached
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def put(self, estimator_name: str, params: dict, cv_spec: str, data_hash: str, fold_scores: List[float],
+            fit_seconds: float = None) -> CachedSearchResult:
+        try:
+            fold_scores = [float(score) for score in fold_scores]
+            if not fold_scores or not all(math.isfinite(score) for score in fold_scores):
+                # a failed fit (GridSearchCV error_score=nan) is retried by the next search, not remembered
+                raise Exception(f"Fold scores {fold_scores} are not finite and can not be cached")
+            result = CachedSearchResult(
+                cache_key=SearchResultCache.get_cache_key(estimator_name, params, cv_spec, data_hash),
+                estimator=estimator_name,
+                params=canonical_params(params),
+                cv_spec=cv_spec,
+                data_hash=data_hash,
+                fold_scores=json.dumps(fold_scores),
+                mean_score=sum(fold_scores) / len(fold_scores),
+                fit_seconds=None if fit_seconds is None else float(fit_seconds),
+                created_at=datetime.now().isoformat(timespec="seconds"))
+            with self._connect() as connection:
+                connection.execute("INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", result)
+            return result
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def query(self, estimator: str = None, data_hash: str = None, cv_spec: str = None, min_score: float = None,
+              limit: int = None) -> List[CachedSearchResult]:
+        """
+        Reporting access to the cached scores, best first.
+        estimator: substring of the estimator name, e.g. "XGBClassifier"
+        """
+        try:
+            conditions, values = [], []
+            if estimator is not None:
+                conditions.append("estimator LIKE ?")
+                values.append(f"%{estimator}%")
+            if data_hash is not None:
+                conditions.append("data_hash = ?")
+                values.append(data_hash)
+            if cv_spec is not None:
+                conditions.append("cv_spec = ?")
+                values.append(cv_spec)
+            if min_score is not None:
+                conditions.append("mean_score >= ?")
+                values.append(min_score)
+            statement = "SELECT * FROM search_results"
+            if conditions:
+                statement = f"{statement} WHERE {' AND '.join(conditions)}"
+            statement = f"{statement} ORDER BY mean_score DESC"
+            if limit is not None:
+                statement = f"{statement} LIMIT {int(limit)}"
+            with self._connect() as connection:
+                return [SearchResultCache._to_result(row) for row in connection.execute(statement, values)]
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_report_dataframe(self, **filters):
+        """
+        filters: keyword arguments accepted by query()
+        return: pandas DataFrame of the cached scores
+        """
+        import pandas as pd
+
+        return pd.DataFrame([result._asdict() for result in self.query(**filters)],
+                            columns=CachedSearchResult._fields)
+
+    @staticmethod
+    def _to_result(row) -> CachedSearchResult:
+        return CachedSearchResult(*row)
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
@@ -0,0 +1,208 @@
+"""
+Operating point selection on cached predicted probabilities.
+
+predict_proba is computed once per model and dataset (ProbabilityCache). A threshold sweep sorts the scores
+once and reads precision, recall, F1 and accuracy at every distinct cut point from cumulative true / false
+positive counts, O(n log n) for all thresholds together instead of one predict per threshold.
+
+Thresholds and calibration maps are fitted on out-of-fold probabilities of the training data, never on the
+test set that selects and accepts the model: the test set only reports the metrics at the chosen threshold.
+
+The chosen threshold and the optional isotonic calibration map are stored in the exported TourismPredictor,
+so a new operating point is a TourismPredictor.set_threshold() call on a loaded model, not a training run.
+"""
+import sys
+from collections import namedtuple
+from typing import Dict, Optional, TYPE_CHECKING
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+
+if TYPE_CHECKING:
+    import numpy as np
+
+THRESHOLD_METRICS = ["f1", "accuracy", "precision", "recall"]
+DEFAULT_THRESHOLD = 0.5
+
+# metrics at every distinct score, a row is predicted positive when its score >= threshold
+ThresholdSweep = namedtuple("ThresholdSweep", ["thresholds", "precision", "recall", "f1", "accuracy"])
+
+OperatingPoint = namedtuple("OperatingPoint", ["threshold", "precision", "recall", "f1", "accuracy"])
+
+
+def get_positive_scores(model, input_feature) -> "np.ndarray":
+    """
+    return: probability of the positive (last) class
+    """
+    return model.predict_proba(input_feature)[:, -1]
+
+
+class ProbabilityCache:
+    """
+    Positive class probabilities keyed by (model key, dataset name), each predict_proba runs once.
+    """
+
+    def __init__(self):
+        self._scores: Dict[tuple, "np.ndarray"] = {}
+
+    def get_scores(self, model_key, model, dataset_name: str, input_feature) -> "np.ndarray":
+        key = (model_key, dataset_name)
+        if key not in self._scores:
+            self._scores[key] = get_positive_scores(model, input_feature)
+        return self._scores[key]
+
+    def clear(self):
+        self._scores.clear()
+
+
+def get_out_of_fold_scores(model, folds: list):
+    """
+    Positive class probabilities of every training row predicted by a clone of model fitted without its fold.
+    folds: list of (x_train, y_train, x_validation, y_validation), ModelFactory.get_cv_folds
+    return: (targets, scores) of the validation rows, fold after fold
+    """
+    import numpy as np
+    from sklearn.base import clone
+
+    targets, scores = [], []
+    for x_fold_train, y_fold_train, x_validation, y_validation in folds:
+        fold_model = clone(model).fit(x_fold_train, y_fold_train)
+        scores.append(get_positive_scores(fold_model, x_validation))
+        targets.append(np.asarray(y_validation))
+    return np.concatenate(targets), np.concatenate(scores)
+
+
+def get_operating_point(target_feature, scores, threshold: float, positive_label=1) -> OperatingPoint:
+    """
+    return: metrics of the rows predicted positive from threshold on, e.g. on a set the threshold was not
+    chosen on
+    """
+    import numpy as np
+
+    is_positive = np.asarray(target_feature) == positive_label
+    is_predicted = np.asarray(scores, dtype=float) >= threshold
+    true_positives = int((is_predicted & is_positive).sum())
+    false_positives = int((is_predicted & ~is_positive).sum())
+    false_negatives = int((~is_predicted & is_positive).sum())
+    f1_denominator = 2 * true_positives + false_positives + false_negatives
+    return OperatingPoint(threshold=float(threshold),
+                          precision=true_positives / (true_positives + false_positives)
+                          if true_positives + false_positives else 0.0,
+                          recall=true_positives / (true_positives + false_negatives)
+                          if true_positives + false_negatives else 0.0,
+                          f1=2 * true_positives / f1_denominator if f1_denominator else 0.0,
+                          accuracy=float((is_predicted == is_positive).mean()) if len(is_positive) else 0.0)
+
+
+def threshold_sweep(target_feature, scores, positive_label=1) -> ThresholdSweep:
+    import numpy as np
+
+    is_positive = np.asarray(target_feature) == positive_label
+    scores = np.asarray(scores, dtype=float)
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores = scores[order]
+    true_positives = np.cumsum(is_positive[order])
+    false_positives = np.arange(1, len(scores) + 1) - true_positives
+
+    # last row of every run of equal scores: all of them are on the same side of a threshold
+    cut_points = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(scores) - 1]
+    true_positives, false_positives = true_positives[cut_points], false_positives[cut_points]
+    positives, n_rows = int(is_positive.sum()), len(scores)
+
+    precision = true_positives / (true_positives + false_positives)
+    recall = true_positives / positives if positives else np.zeros(len(cut_points))
+    false_negatives = positives - true_positives
+    f1 = 2 * true_positives / np.maximum(2 * true_positives + false_positives + false_negatives, 1)
+    accuracy = (true_positives + (n_rows - positives - false_positives)) / n_rows
+    return ThresholdSweep(thresholds=sorted_scores[cut_points], precision=precision, recall=recall, f1=f1,
+                          accuracy=accuracy)
+
+
+def choose_operating_point(sweep: ThresholdSweep, metric: str = "f1", min_precision: float = None,
+                           min_recall: float = None) -> Optional[OperatingPoint]:
+    """
+    return: cut point maximizing metric under the precision / recall constraints (the highest threshold on
+    ties), None when no cut point satisfies them
+    """
+    import numpy as np
+
+    if metric not in THRESHOLD_METRICS:
+        raise Exception(f"Unknown threshold metric [{metric}], expected one of {THRESHOLD_METRICS}")
+    allowed = np.ones(len(sweep.thresholds), dtype=bool)
+    if min_precision is not None:
+        allowed &= sweep.precision >= min_precision
+    if min_recall is not None:
+        allowed &= sweep.recall >= min_recall
+    if not allowed.any():
+        return None
+    values = np.where(allowed, getattr(sweep, metric), -np.inf)
+    index = int(np.argmax(values))
+    return OperatingPoint(threshold=float(sweep.thresholds[index]), precision=float(sweep.precision[index]),
+                          recall=float(sweep.recall[index]), f1=float(sweep.f1[index]),
+                          accuracy=float(sweep.accuracy[index]))
+
+
+class CalibrationMap:
+    """
+    Piecewise linear isotonic map from model scores to calibrated probabilities.
+    """
+
+    def __init__(self, score_points: "np.ndarray", probability_points: "np.ndarray"):
+        self.score_points = score_points
+        self.probability_points = probability_points
+
+    @classmethod
+    def fit(cls, target_feature, scores, positive_label=1) -> "CalibrationMap":
+        import numpy as np
+        from sklearn.isotonic import IsotonicRegression
+
+        isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip")
+        isotonic.fit(np.asarray(scores, dtype=float), (np.asarray(target_feature) == positive_label).astype(float))
+        return cls(score_points=isotonic.X_thresholds_, probability_points=isotonic.y_thresholds_)
+
+    def transform(self, scores) -> "np.ndarray":
+        import numpy as np
+
+        return np.interp(scores, self.score_points, self.probability_points)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(n_points={len(self.score_points)})"
+
+
+def tune_threshold(target_feature, scores, metric: str = "f1", min_precision: float = None,
+                   min_recall: float = None, calibrate: bool = False):
+    """
+    return: (OperatingPoint, CalibrationMap or None, OperatingPoint at the default threshold).
+    The operating point falls back to the default threshold when no cut point meets the constraints.
+    """
+    try:
+        import numpy as np
+
+        calibration_map = CalibrationMap.fit(target_feature, scores) if calibrate else None
+        if calibration_map is not None:
+            scores = calibration_map.transform(scores)
+        sweep = threshold_sweep(target_feature, scores)
+
+        # the last cut point at or above the default threshold
+        default_index = int(np.searchsorted(-sweep.thresholds, -DEFAULT_THRESHOLD, side="right")) - 1
+        if default_index >= 0:
+            default_point = OperatingPoint(threshold=DEFAULT_THRESHOLD,
+                                           precision=float(sweep.precision[default_index]),
+                                           recall=float(sweep.recall[default_index]),
+                                           f1=float(sweep.f1[default_index]),
+                                           accuracy=float(sweep.accuracy[default_index]))
+        else:
+            # nothing predicted positive
+            positives = int((np.asarray(target_feature) == 1).sum())
+            default_point = OperatingPoint(threshold=DEFAULT_THRESHOLD, precision=0.0, recall=0.0, f1=0.0,
+                                           accuracy=1 - positives / len(scores))
+
+        operating_point = choose_operating_point(sweep, metric=metric, min_precision=min_precision,
+                                                 min_recall=min_recall)
+        if operating_point is None:
+            logging.info("No threshold meets min_precision=%s min_recall=%s, keeping %s",
+                         min_precision, min_recall, DEFAULT_THRESHOLD)
+            operating_point = default_point
+        return operating_point, calibration_map, default_point
+    except Exception as e:
+        raise CustomException(e, sys) from e
@@ -1,37 +1,204 @@
+import atexit
+import copy
+import json
 import logging
-from datetime import datetime
+import logging.handlers
+import multiprocessing
 import os
-import pandas as pd
-from tourism.constant.training_pipeline import get_current_time_stamp 
+import queue
+import threading
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Union
+
+from tourism.constant.training_pipeline import get_current_time_stamp
 LOG_DIR="logs"
 
 def get_log_file_name():
+    # spawned processes (search workers) import this module in the same second as their siblings
+    if multiprocessing.parent_process() is not None:
+        return f"log_{get_current_time_stamp()}_{os.getpid()}.log"
     return f"log_{get_current_time_stamp()}.log"
 
 LOG_FILE_NAME=get_log_file_name()
 
-os.makedirs(LOG_DIR,exist_ok=True)
-
 LOG_FILE_PATH = os.path.join(LOG_DIR,LOG_FILE_NAME)
 
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    Formats a log record as a single JSON object per line.
+    `stage` defaults to the emitting module name (data_ingestion, model_factory, ...)
+    and can be overridden with logging.info(..., extra={"stage": "..."})
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        log_record = {
+            "time": datetime.fromtimestamp(record.created).strftime(LOG_TIME_FORMAT),
+            "created": record.created,
+            "level": record.levelname,
+            "stage": getattr(record, "stage", record.module),
+            "file_name": record.filename,
+            "line_number": record.lineno,
+            "function_name": record.funcName,
+            "thread_name": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # formatted by SnapshotQueueHandler in the logging thread
+            log_record["exception"] = record.exc_text
+        return json.dumps(log_record, default=str)
+
+
+class DelayedFileHandler(logging.FileHandler):
+    """
+    FileHandler which creates the log directory and file on the first emitted record,
+    so importing tourism.logger has no filesystem side effect.
+    """
+
+    def __init__(self, filename: str, mode: str = "w"):
+        super().__init__(filename, mode=mode, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class SnapshotQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler which renders the message and the exception in the logging thread and enqueues a copy.
+    The %s arguments are formatted before the caller can mutate them (e.g. a dict logged, then updated)
+    and never on the listener thread; JsonLineFormatter still writes the exception as its own field,
+    which the default QueueHandler.prepare() folds into the message.
+    listener: started on the first enqueued record, so importing tourism.logger starts no thread
+    """
+
+    def __init__(self, queue, listener: logging.handlers.QueueListener = None):
+        super().__init__(queue)
+        self.listener = listener
+        self._listener_started = listener is None
+        self._start_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord):
+        if not self._listener_started:
+            with self._start_lock:
+                if not self._listener_started:
+                    start_logging(self.listener)
+                    self._listener_started = True
+        super().enqueue(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
 
+_EXCEPTION_FORMATTER = logging.Formatter()
 
-logging.basicConfig(filename=LOG_FILE_PATH,
-filemode="w",
-format='[%(asctime)s]^;%(levelname)s^;%(lineno)d^;%(filename)s^;%(funcName)s()^;%(message)s',
-level=logging.INFO
-)
+# listeners started by start_logging and not stopped yet
+_running_listeners = set()
+
+
+def configure_logging(log_file_path: str = LOG_FILE_PATH,
+                      level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Attaches a queue based handler to the root logger. The background listener thread which writes
+    JSON lines into log_file_path is started by the first record, a process which never logs starts none.
+    return: QueueListener, stopped (and flushed) automatically at interpreter exit once started
+    """
+    log_queue = queue.SimpleQueue()
+
+    file_handler = DelayedFileHandler(log_file_path, mode="w")
+    file_handler.setFormatter(JsonLineFormatter())
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(SnapshotQueueHandler(log_queue, listener=listener))
+    return listener
+
+
+def start_logging(listener: logging.handlers.QueueListener):
+    """
+    Starts the listener thread, stopped at interpreter exit.
+    """
+    listener.start()
+    _running_listeners.add(listener)
+    atexit.register(stop_logging, listener)
+
+
+def stop_logging(listener: logging.handlers.QueueListener):
+    """
+    Flushes the queued records and stops the listener thread, safe to call more than once.
+    """
+    if listener in _running_listeners:
+        _running_listeners.discard(listener)
+        listener.stop()
+
+
+LOG_LISTENER = configure_logging()
+
+
+def _to_epoch(value: Union[datetime, float, int, str, None]) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.strptime(value, LOG_TIME_FORMAT)
+    return value.timestamp()
+
+
+def iter_log_records(file_path: str,
+                     level: Union[int, str, None] = None,
+                     stage: Union[str, Iterable[str], None] = None,
+                     start_time: Union[datetime, float, str, None] = None,
+                     end_time: Union[datetime, float, str, None] = None) -> Iterator[dict]:
+    """
+    Streams log records from a JSON lines log file one line at a time.
+    file_path: log file path
+    level: minimum log level (e.g. "WARNING" or logging.WARNING)
+    stage: stage name or collection of stage names to keep
+    start_time, end_time: inclusive time window (datetime, epoch seconds or "%Y-%m-%d %H:%M:%S")
+    return: generator of record dicts
+    """
+    min_level = logging.getLevelName(level) if isinstance(level, str) else level
+    stages = {stage} if isinstance(stage, str) else (set(stage) if stage is not None else None)
+    start_epoch = _to_epoch(start_time)
+    end_epoch = _to_epoch(end_time)
 
-def get_log_dataframe(file_path):
-    data=[]
     with open(file_path) as log_file:
-        for line in log_file.readlines():
-            data.append(line.split("^;"))
+        for line in log_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # partially written last line or a foreign line, nothing to report
+                continue
+            if min_level is not None and logging.getLevelName(record["level"]) < min_level:
+                continue
+            if stages is not None and record["stage"] not in stages:
+                continue
+            if start_epoch is not None and record["created"] < start_epoch:
+                continue
+            if end_epoch is not None and record["created"] > end_epoch:
+                continue
+            yield record
+
+
+def get_log_dataframe(file_path, **filters):
+    """
+    file_path: log file path
+    filters: keyword arguments accepted by iter_log_records (level, stage, start_time, end_time)
+    return: dataframe with a single `log_message` column
+    """
+    import pandas as pd
 
-    log_df = pd.DataFrame(data)
-    columns=["Time stamp","Log Level","line number","file name","function name","message"]
-    log_df.columns=columns
-    
-    log_df["log_message"] = log_df['Time stamp'].astype(str) +":$"+ log_df["message"]
+    log_messages = [f"{record['time']}:${record['message']}"
+                    for record in iter_log_records(file_path, **filters)]
 
-    return log_df[["log_message"]]
\ No newline at end of file
+    return pd.DataFrame({"log_message": log_messages})
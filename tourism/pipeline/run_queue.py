@@ -0,0 +1,180 @@
+"""
+Concurrent training runs of several variants (e.g. regional models) in one process.
+
+Every run gets its own Configuration: a namespace isolating artifacts/<namespace>, saved_models/<namespace>
+and the experiment history, and a time stamp taken when the run starts. At most max_concurrent_runs
+pipelines run at the same time and at most one per namespace, since the runs of a namespace share its warm
+start state, search cache and model history. When a slot frees up the namespace that started a run the
+longest time ago goes first, so a tenant submitting many runs can not starve the others. Each run gets an
+equal share of total_cpus as the cpu budget of its model search.
+"""
+import sys
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from itertools import count
+from threading import Condition, Thread
+from typing import Dict, List
+
+from tourism.configuration.configuration_file import Configuration
+from tourism.constant.training_pipeline import CONFIG_FILE_PATH, get_current_time_stamp
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.pipeline.training_pipeline import Pipeline
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+RunRequest = namedtuple("RunRequest", ["run_id", "namespace", "config_file_path", "sequence_number"])
+
+RunStatus = namedtuple("RunStatus", ["run_id", "namespace", "state", "submitted_at", "started_at", "finished_at",
+                                     "time_stamp", "cpu_budget", "experiment_id", "error"])
+
+
+class PipelineRunQueue:
+
+    def __init__(self, max_concurrent_runs: int = None, total_cpus: int = None,
+                 config_file_path: str = CONFIG_FILE_PATH):
+        """
+        max_concurrent_runs, total_cpus: run_queue_config of config.yaml when None
+        """
+        try:
+            if max_concurrent_runs is None or total_cpus is None:
+                run_queue_config = Configuration(config_file_path=config_file_path).get_run_queue_config()
+                max_concurrent_runs = max_concurrent_runs or run_queue_config.max_concurrent_runs
+                total_cpus = total_cpus or run_queue_config.total_cpus
+            self.max_concurrent_runs = max(1, int(max_concurrent_runs))
+            self.cpu_budget = max(1, int(total_cpus) // self.max_concurrent_runs)
+            self.config_file_path = config_file_path
+
+            self._condition = Condition()
+            self._sequence = count()
+            self._pending: List[RunRequest] = []
+            self._runs: Dict[str, RunStatus] = {}
+            self._running_namespaces = set()
+            # sequence number of the last started run per namespace
+            self._last_started: Dict[str, int] = {}
+            self._last_time_stamp: Dict[str, str] = {}
+            self._is_closed = False
+            logging.info("Run queue: %s concurrent runs, %s cpus per run", self.max_concurrent_runs, self.cpu_budget)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def submit(self, namespace: str, config_file_path: str = None) -> str:
+        """
+        namespace: run variant, e.g. a region name
+        config_file_path: config.yaml of the variant, the queue's one when None
+        return: run id
+        """
+        try:
+            with self._condition:
+                if self._is_closed:
+                    raise Exception("Run queue is shut down")
+                run_id = f"{namespace}-{uuid.uuid4().hex[:8]}"
+                self._pending.append(RunRequest(run_id=run_id, namespace=namespace,
+                                                config_file_path=config_file_path or self.config_file_path,
+                                                sequence_number=next(self._sequence)))
+                self._runs[run_id] = RunStatus(run_id=run_id, namespace=namespace, state=QUEUED,
+                                               submitted_at=datetime.now(), started_at=None, finished_at=None,
+                                               time_stamp=None, cpu_budget=self.cpu_budget, experiment_id=None,
+                                               error=None)
+                logging.info("Run [%s] queued", run_id)
+                self._dispatch()
+            return run_id
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def _next_request(self) -> RunRequest:
+        runnable = [request for request in self._pending if request.namespace not in self._running_namespaces]
+        if not runnable:
+            return None
+        return min(runnable, key=lambda request: (self._last_started.get(request.namespace, -1),
+                                                  request.sequence_number))
+
+    def _get_time_stamp(self, namespace: str) -> str:
+        # two runs of a namespace within the same second would share their artifact dirs
+        time_stamp = get_current_time_stamp()
+        previous_time_stamp = self._last_time_stamp.get(namespace, "")
+        if previous_time_stamp.startswith(time_stamp):
+            suffix = previous_time_stamp[len(time_stamp) + 1:]
+            time_stamp = f"{time_stamp}-{int(suffix or 0) + 1}"
+        self._last_time_stamp[namespace] = time_stamp
+        return time_stamp
+
+    def _dispatch(self):
+        """
+        Starts queued runs while slots are free, called with the condition held.
+        """
+        while len(self._running_namespaces) < self.max_concurrent_runs:
+            request = self._next_request()
+            if request is None:
+                return
+            self._pending.remove(request)
+            self._running_namespaces.add(request.namespace)
+            self._last_started[request.namespace] = next(self._sequence)
+            time_stamp = self._get_time_stamp(request.namespace)
+            self._runs[request.run_id] = self._runs[request.run_id]._replace(state=RUNNING,
+                                                                             started_at=datetime.now(),
+                                                                             time_stamp=time_stamp)
+            Thread(target=self._execute, args=(request, time_stamp), name=f"run-{request.run_id}",
+                   daemon=False).start()
+
+    def _execute(self, request: RunRequest, time_stamp: str):
+        state, experiment_id, error = SUCCEEDED, None, None
+        try:
+            logging.info("Run [%s] started", request.run_id)
+            config = Configuration(config_file_path=request.config_file_path, current_time_stamp=time_stamp,
+                                   namespace=request.namespace)
+            pipeline = Pipeline(config=config, cpu_budget=self.cpu_budget,
+                                shared_process=self.max_concurrent_runs > 1)
+            experiment = pipeline.run_pipeline()
+            experiment_id = experiment.experiment_id
+        except Exception as e:
+            state, error = FAILED, str(e).strip().splitlines()[-1]
+            logging.exception("Run [%s] failed", request.run_id)
+        finally:
+            with self._condition:
+                self._runs[request.run_id] = self._runs[request.run_id]._replace(
+                    state=state, finished_at=datetime.now(), experiment_id=experiment_id, error=error)
+                self._running_namespaces.discard(request.namespace)
+                logging.info("Run [%s] %s", request.run_id, state)
+                self._dispatch()
+                self._condition.notify_all()
+
+    def get_status(self, run_id: str) -> RunStatus:
+        with self._condition:
+            return self._runs[run_id]
+
+    def list_runs(self, namespace: str = None) -> List[RunStatus]:
+        with self._condition:
+            return [status for status in self._runs.values() if namespace is None or status.namespace == namespace]
+
+    def wait(self, run_ids: List[str] = None, timeout: float = None) -> bool:
+        """
+        Blocks until the given runs (all submitted runs when None) are finished.
+        return: False when the timeout expired first
+        """
+        def is_done():
+            ids = run_ids if run_ids is not None else list(self._runs)
+            return all(self._runs[run_id].state not in (QUEUED, RUNNING) for run_id in ids)
+
+        with self._condition:
+            return self._condition.wait_for(is_done, timeout=timeout)
+
+    def shutdown(self, cancel_pending: bool = False, wait: bool = True):
+        """
+        Stops accepting runs. Queued runs are cancelled with cancel_pending, otherwise they still run.
+        """
+        with self._condition:
+            self._is_closed = True
+            if cancel_pending:
+                for request in self._pending:
+                    self._runs[request.run_id] = self._runs[request.run_id]._replace(state=CANCELLED,
+                                                                                     finished_at=datetime.now())
+                self._pending.clear()
+            self._condition.notify_all()
+        if wait:
+            self.wait()
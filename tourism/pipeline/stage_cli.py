@@ -0,0 +1,342 @@
+"""
+Runs, times and profiles one pipeline stage at a time.
+
+    tourism ingest [--raw-file travel_data.csv]
+    tourism validate [--train-file ... --test-file ...]
+    tourism transform [--train-file ... --test-file ... --schema-file ...]
+    tourism train [--train-array ... --test-array ... --preprocessor-file ...] [--full-search]
+    tourism evaluate [--train-file ... --test-file ... --model-file ...]
+    tourism push [--model-file ...]
+    tourism predict --input-file rows.csv [--model-file ...] [--output-file predictions.csv] [--validate]
+    tourism bench <pipeline|search|serialization|tree_inference|import_time|logging> [benchmark args]
+
+Every input artifact can be given as a path. Inputs left out are taken from a cached upstream run: the
+--upstream time stamp (the most recent run of the upstream stage by default) gives the artifact paths the
+pipeline wrote for that run. `ingest --raw-file` splits a local file instead of downloading from S3.
+
+A stage runs with its own artifact time stamp (--time-stamp), prints its artifact as one JSON document on
+stdout and a summary of every timed step on stderr: wall and CPU seconds, peak RSS, rows and bytes read /
+written (see tourism.utils.profiling). Whatever the components and libraries print while the stage runs
+(e.g. GridSearchCV verbose output) goes to stderr as well, so `tourism <stage> | jq` reads the artifact only.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import sys
+
+from tourism.components.artifact_retention import RUN_DIR_PATTERN, get_run_dir_sort_key
+from tourism.configuration.configuration_file import Configuration
+from tourism.constant.training_pipeline import (CONFIG_FILE_PATH, TARGET_COLUMN_KEY, BEST_MODEL_KEY, MODEL_PATH_KEY,
+                                                DATA_INGESTION_ARTIFACT_DIR, DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                                MODEL_TRAINER_ARTIFACT_DIR)
+from tourism.entity.artifact_entity import (DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact,
+                                            ModelTrainerArtifact, ModelEvaluationArtifact)
+from tourism.entity.prediction_cache import CachedPredictor, PredictionCache
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.pipeline.training_pipeline import Pipeline
+from tourism.utils.main_utils import read_yaml_file, load_object, promote_file, resolve_current_pointer
+from tourism.utils.profiling import PROFILERS, NO_PROFILER, StageProfiler, profile_step
+
+LATEST_UPSTREAM = "latest"
+
+BENCHMARKS = ["pipeline", "search", "serialization", "tree_inference", "import_time", "logging"]
+
+
+def get_upstream_configuration(args, stage_dir: str) -> Configuration:
+    """
+    return: configuration of the cached run of stage_dir, its artifact paths are the ones that run wrote
+    """
+    time_stamp = args.upstream
+    if time_stamp == LATEST_UPSTREAM:
+        stage_path = os.path.join(Configuration(config_file_path=args.config, namespace=args.namespace)
+                                  .training_pipeline_config.artifact_dir, stage_dir)
+        run_dirs = sorted((name for name in (os.listdir(stage_path) if os.path.isdir(stage_path) else [])
+                           if RUN_DIR_PATTERN.match(name)), key=get_run_dir_sort_key)
+        if not run_dirs:
+            raise Exception(f"No cached run in [{stage_path}]: run the upstream stage first or pass the input paths")
+        time_stamp = run_dirs[-1]
+    logging.info("Reusing the [%s] artifacts of run [%s]", stage_dir, time_stamp)
+    return Configuration(config_file_path=args.config, current_time_stamp=time_stamp, namespace=args.namespace)
+
+
+def get_data_ingestion_artifact(args) -> DataIngestionArtifact:
+    if args.train_file and args.test_file:
+        return DataIngestionArtifact(train_file_path=args.train_file, test_file_path=args.test_file,
+                                     is_ingested=True, message="Given by path.")
+    data_ingestion_config = get_upstream_configuration(args, DATA_INGESTION_ARTIFACT_DIR).get_data_ingestion_config()
+    if data_ingestion_config.object_prefix:
+        train_dir = os.path.join(data_ingestion_config.incremental_dir, "train")
+        test_dir = os.path.join(data_ingestion_config.incremental_dir, "test")
+    else:
+        train_dir, test_dir = data_ingestion_config.ingested_train_dir, data_ingestion_config.ingested_test_dir
+    return DataIngestionArtifact(train_file_path=args.train_file or os.path.join(train_dir,
+                                                                                 data_ingestion_config.local_file_name),
+                                 test_file_path=args.test_file or os.path.join(test_dir,
+                                                                               data_ingestion_config.local_file_name),
+                                 is_ingested=True, message="Reused from a cached run.")
+
+
+def get_data_validation_artifact(args, config: Configuration) -> DataValidationArtifact:
+    """
+    The schema of the run (no drift report): a drift found upstream is given with --full-search.
+    """
+    data_validation_config = config.get_data_validation_config()
+    return DataValidationArtifact(schema_file_path=args.schema_file or data_validation_config.schema_file_path,
+                                  report_file_path=None, report_page_file_path=None, is_validated=True,
+                                  message="Schema given by path.",
+                                  is_drift_found=bool(getattr(args, "full_search", False)))
+
+
+def get_data_transformation_artifact(args) -> DataTransformationArtifact:
+    if args.train_array and args.test_array and args.preprocessor_file:
+        return DataTransformationArtifact(transformed_train_file_path=args.train_array,
+                                          transformed_test_file_path=args.test_array,
+                                          preprocessed_object_file_path=args.preprocessor_file,
+                                          is_transformed=True, message="Given by path.",
+                                          input_validator_file_path=args.input_validator_file)
+    upstream_config = get_upstream_configuration(args, DATA_TRANSFORMATION_ARTIFACT_DIR)
+    data_transformation_config = upstream_config.get_data_transformation_config()
+    # DataTransformation names the arrays after the ingested csv
+    array_file_name = upstream_config.get_data_ingestion_config().local_file_name.replace(".csv", ".npz")
+    input_validator_file_path = args.input_validator_file or data_transformation_config.input_validator_file_path
+    if input_validator_file_path is not None and not os.path.exists(input_validator_file_path):
+        input_validator_file_path = None
+    return DataTransformationArtifact(
+        transformed_train_file_path=args.train_array or os.path.join(data_transformation_config.transformed_train_dir,
+                                                                     array_file_name),
+        transformed_test_file_path=args.test_array or os.path.join(data_transformation_config.transformed_test_dir,
+                                                                   array_file_name),
+        preprocessed_object_file_path=args.preprocessor_file or data_transformation_config.preprocessed_object_file_path,
+        is_transformed=True, message="Reused from a cached run.", input_validator_file_path=input_validator_file_path)
+
+
+def get_model_trainer_artifact(args, config: Configuration) -> ModelTrainerArtifact:
+    """
+    model_accuracy: --model-accuracy, the base accuracy of config.yaml by default
+    """
+    model_file_path = args.model_file
+    if model_file_path is None:
+        model_file_path = get_upstream_configuration(args, MODEL_TRAINER_ARTIFACT_DIR) \
+            .get_model_trainer_config().trained_model_file_path
+    model_accuracy = args.model_accuracy
+    if model_accuracy is None:
+        model_accuracy = config.get_model_trainer_config().base_accuracy
+    return ModelTrainerArtifact(is_trained=True, message="Given by path.", trained_model_file_path=model_file_path,
+                                train_f1=None, test_f1=None, train_accuracy=None, test_accuracy=None,
+                                model_accuracy=model_accuracy, serialization_format=None)
+
+
+def get_model_evaluation_artifact(args, config: Configuration) -> ModelEvaluationArtifact:
+    """
+    The best model of model_evaluation.yaml unless --model-file is given.
+    """
+    model_file_path = args.model_file
+    if model_file_path is None:
+        model_evaluation_file_path = config.get_model_evaluation_config().model_evaluation_file_path
+        if not os.path.exists(model_evaluation_file_path):
+            raise Exception(f"No [{model_evaluation_file_path}]: run evaluate first or pass --model-file")
+        model_file_path = read_yaml_file(file_path=model_evaluation_file_path)[BEST_MODEL_KEY][MODEL_PATH_KEY]
+    return ModelEvaluationArtifact(is_model_accepted=True, evaluated_model_path=model_file_path)
+
+
+def ingest(args, pipeline: Pipeline):
+    if args.raw_file is None:
+        return pipeline.start_data_ingestion()
+    from tourism.components.data_ingestion import DataIngestion
+
+    data_ingestion_config = pipeline.config.get_data_ingestion_config()
+    # in place of the S3 download, hardlinked where the filesystem allows it
+    promote_file(args.raw_file, os.path.join(data_ingestion_config.raw_data_dir,
+                                             data_ingestion_config.local_file_name))
+    return DataIngestion(data_ingestion_config=data_ingestion_config).split_data_as_train_test()
+
+
+def validate(args, pipeline: Pipeline):
+    return pipeline.start_data_validation(data_ingestion_artifact=get_data_ingestion_artifact(args))
+
+
+def transform(args, pipeline: Pipeline):
+    return pipeline.start_data_transformation(
+        data_ingestion_artifact=get_data_ingestion_artifact(args),
+        data_validation_artifact=get_data_validation_artifact(args, pipeline.config))
+
+
+def train(args, pipeline: Pipeline):
+    return pipeline.start_model_trainer(
+        data_transformation_artifact=get_data_transformation_artifact(args),
+        data_validation_artifact=get_data_validation_artifact(args, pipeline.config))
+
+
+def evaluate(args, pipeline: Pipeline):
+    return pipeline.start_model_evaluation(
+        data_ingestion_artifact=get_data_ingestion_artifact(args),
+        data_validation_artifact=get_data_validation_artifact(args, pipeline.config),
+        model_trainer_artifact=get_model_trainer_artifact(args, pipeline.config))
+
+
+def push(args, pipeline: Pipeline):
+    return pipeline.start_model_pusher(model_eval_artifact=get_model_evaluation_artifact(args, pipeline.config))
+
+
+def predict(args, pipeline: Pipeline) -> dict:
+    import pandas as pd
+
+    config = pipeline.config
+    model_file_path = args.model_file
+    if model_file_path is None:
+        model_pusher_config = config.get_model_pusher_config()
+        current_pointer_path = os.path.join(model_pusher_config.export_root_dir,
+                                            model_pusher_config.current_pointer_name)
+        export_dir = resolve_current_pointer(current_pointer_path)
+        if export_dir is None:
+            raise Exception(f"No model was pushed to [{current_pointer_path}] yet: run push or pass --model-file")
+        model_file_path = os.path.join(export_dir, os.path.basename(
+            config.get_model_trainer_config().trained_model_file_path))
+
+    schema_file_path = config.get_data_validation_config().schema_file_path
+    prediction_cache_config = config.get_prediction_cache_config()
+    # predict_validated is served by the predictor itself, the cache only fronts predict
+    use_cache = prediction_cache_config.enabled and not args.validate
+    with profile_step("load_model"):
+        if not use_cache:
+            predictor = load_object(file_path=model_file_path, mmap_mode="r")
+        else:
+            cache = PredictionCache(max_entries=prediction_cache_config.max_entries,
+                                    ttl_seconds=prediction_cache_config.ttl_seconds)
+            if args.model_file is None:
+                # follows the current pointer: the model is reloaded and the cache dropped after a push
+                predictor = CachedPredictor(cache=cache, schema_file_path=schema_file_path,
+                                            current_pointer_path=prediction_cache_config.current_pointer_path,
+                                            model_file_name=prediction_cache_config.model_file_name)
+                predictor.get_model()
+            else:
+                predictor = CachedPredictor(predictor=load_object(file_path=model_file_path, mmap_mode="r"), cache=cache,
+                                            schema_file_path=schema_file_path, model_version=model_file_path)
+    with profile_step("read_csv") as step:
+        input_df = pd.read_csv(args.input_file, index_col=False)
+        step.rows = len(input_df)
+    target_column = read_yaml_file(file_path=schema_file_path)[TARGET_COLUMN_KEY]
+    input_df = input_df.drop(columns=[target_column], errors="ignore")
+
+    invalid_rows = None
+    with profile_step("predict", rows=len(input_df)):
+        if args.validate:
+            validated_prediction = predictor.predict_validated(input_df)
+            prediction = validated_prediction.prediction
+            invalid_rows = int((~validated_prediction.validation.valid_mask).sum())
+        else:
+            prediction = predictor.predict(input_df)
+    if args.output_file:
+        with profile_step("write_csv", rows=len(input_df)):
+            input_df.assign(prediction=prediction).to_csv(args.output_file, index=False)
+    return {"model_file_path": model_file_path, "rows": len(input_df), "invalid_rows": invalid_rows,
+            "output_file_path": args.output_file,
+            "prediction_cache": predictor.metrics()._asdict() if use_cache else None}
+
+
+def bench(args):
+    module = importlib.import_module(f"tourism.benchmark.{args.benchmark}_benchmark")
+    sys.argv = [f"tourism bench {args.benchmark}", *args.benchmark_args]
+    module.main()
+
+
+STAGES = {"ingest": ingest, "validate": validate, "transform": transform, "train": train, "evaluate": evaluate,
+          "push": push, "predict": predict}
+
+
+def print_stage_metrics(stage_profiler: StageProfiler):
+    """
+    One line per timed step in start order, sub steps indented under their stage.
+    """
+    print(f"{'step':<40}{'wall s':>10}{'cpu s':>10}{'peak rss MiB':>14}{'rows':>12}{'read MiB':>11}"
+          f"{'written MiB':>13}")
+    for metric in sorted(stage_profiler.metrics, key=lambda metric: (metric.start_time, metric.depth)):
+        mib = {field: "" if getattr(metric, field) is None else f"{getattr(metric, field) / 2 ** 20:.1f}"
+               for field in ("peak_rss_bytes", "bytes_read", "bytes_written")}
+        step = f"{'  ' * metric.depth}{metric.stage}" + (" (failed)" if metric.error else "")
+        print(f"{step:<40}{metric.wall_seconds:>10.3f}{metric.cpu_seconds:>10.3f}{mib['peak_rss_bytes']:>14}"
+              f"{'' if metric.rows is None else metric.rows:>12}{mib['bytes_read']:>11}{mib['bytes_written']:>13}")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="tourism", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", default=CONFIG_FILE_PATH, help="config.yaml path")
+    common.add_argument("--namespace", help="run variant, artifacts under artifacts/<namespace>")
+    common.add_argument("--time-stamp", help="artifact time stamp of this stage, a new one by default")
+    common.add_argument("--upstream", default=LATEST_UPSTREAM,
+                        help="time stamp of the cached run missing inputs are taken from, the most recent by default")
+    common.add_argument("--profiler", default=NO_PROFILER, choices=PROFILERS,
+                        help="cProfile or sampling profile of the stage, written next to the experiment profiles")
+    common.add_argument("--metrics-file", help="optional yaml file the step metrics are saved to")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", parents=[common], help="download and split the raw data")
+    ingest_parser.add_argument("--raw-file", help="local raw csv split in place of the download")
+
+    for command, help_text in (("validate", "schema and drift checks"), ("transform", "fit the preprocessor"),
+                               ("train", "model search"), ("evaluate", "compare with the best model"),
+                               ("push", "export a model"), ("predict", "score a csv")):
+        stage_parser = subparsers.add_parser(command, parents=[common], help=help_text)
+        if command in ("validate", "transform", "evaluate"):
+            stage_parser.add_argument("--train-file", help="ingested train csv")
+            stage_parser.add_argument("--test-file", help="ingested test csv")
+        if command in ("transform", "train", "evaluate"):
+            stage_parser.add_argument("--schema-file", help="schema.yaml of config.yaml by default")
+        if command == "train":
+            stage_parser.add_argument("--train-array", help="transformed train .npz")
+            stage_parser.add_argument("--test-array", help="transformed test .npz")
+            stage_parser.add_argument("--preprocessor-file", help="fitted preprocessor")
+            stage_parser.add_argument("--input-validator-file", help="compiled input validator")
+            stage_parser.add_argument("--full-search", action="store_true",
+                                      help="search the full grids, as after a data drift")
+        if command in ("evaluate", "push", "predict"):
+            stage_parser.add_argument("--model-file", help="model to evaluate / push / predict with")
+        if command == "evaluate":
+            stage_parser.add_argument("--model-accuracy", type=float,
+                                      help="test accuracy of the trained model, base accuracy by default")
+        if command == "predict":
+            stage_parser.add_argument("--input-file", required=True, help="csv of the rows to score")
+            stage_parser.add_argument("--output-file", help="csv of the rows with their prediction")
+            stage_parser.add_argument("--validate", action="store_true",
+                                      help="check the rows against the input validator, invalid rows are not scored")
+
+    bench_parser = subparsers.add_parser("bench", help="run a benchmark of tourism.benchmark")
+    bench_parser.add_argument("benchmark", choices=BENCHMARKS)
+    bench_parser.add_argument("benchmark_args", nargs=argparse.REMAINDER, help="arguments of the benchmark")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    if args.command == "bench":
+        return bench(args)
+    try:
+        config = Configuration(config_file_path=args.config, current_time_stamp=args.time_stamp,
+                               namespace=args.namespace)
+        pipeline = Pipeline(config=config)
+        profile_dir = None
+        if args.profiler != NO_PROFILER:
+            profile_dir = os.path.join(pipeline.profiling_config.profile_dir, f"{args.command}-{config.time_stamp}")
+        stage_profiler = StageProfiler(profiler=args.profiler, profile_dir=profile_dir,
+                                       sampling_interval=pipeline.profiling_config.sampling_interval)
+        # stdout is kept for the artifact JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                with stage_profiler.activate(), profile_step(args.command):
+                    artifact = STAGES[args.command](args, pipeline)
+            finally:
+                print_stage_metrics(stage_profiler)
+                if args.metrics_file:
+                    stage_profiler.save(args.metrics_file)
+        print(json.dumps(artifact if isinstance(artifact, dict) else artifact._asdict(), default=str))
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+if __name__ == "__main__":
+    main()
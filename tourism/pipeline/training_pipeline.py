@@ -4,46 +4,94 @@ import uuid
 from tourism.configuration.configuration_file import Configuration
 from tourism.logger import logging, get_log_file_name
 from tourism.exception import CustomException
-from threading import Thread
-from typing import List
+from threading import Thread, Lock
+from contextlib import nullcontext
+from typing import List, TYPE_CHECKING
 
-from multiprocessing import Process
 from tourism.entity.artifact_entity import ModelPusherArtifact, DataIngestionArtifact, ModelEvaluationArtifact
 from tourism.entity.artifact_entity import DataValidationArtifact, DataTransformationArtifact, ModelTrainerArtifact
-from tourism.components.data_ingestion import DataIngestion
-from tourism.components.data_validation import DataValidation
-from tourism.components.data_transformation import DataTransformation
-from tourism.components.model_trainer import ModelTrainer
-from tourism.components.model_evaluation import ModelEvaluation
-from tourism.components.model_pusher import ModelPusher
 import os, sys
 from collections import namedtuple
 from datetime import datetime
-import pandas as pd
-from tourism.constant.training_pipeline import EXPERIMENT_DIR_NAME, EXPERIMENT_FILE_NAME
+from tourism.constant.training_pipeline import (EXPERIMENT_DIR_NAME, EXPERIMENT_FILE_NAME, DATA_INGESTION_ARTIFACT_DIR,
+                                                DATA_VALIDATION_ARTIFACT_DIR_NAME, DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                                MODEL_TRAINER_ARTIFACT_DIR, MODEL_EVALUATION_ARTIFACT_DIR)
+from tourism.utils.profiling import (StageProfiler, StageMetric, profile_step, read_stage_metrics,
+                                     STAGE_METRICS_FILE_NAME, PROMETHEUS_FILE_NAME)
+
+# Components are imported inside the start_* methods: each stage only pays for its own
+# heavy dependencies (evidently, imblearn, sklearn, xgboost, boto3) when it actually runs.
+if TYPE_CHECKING:
+    import pandas as pd
 
 Experiment = namedtuple("Experiment", ["experiment_id", "initialization_timestamp", "artifact_time_stamp",
                                        "running_status", "start_time", "stop_time", "execution_time", "message",
                                        "experiment_file_path", "accuracy", "is_model_accepted"])
 
 
+# artifact dirs of the runs in progress in this process, one run per artifact namespace at a time
+_running_artifact_dirs = set()
+_running_artifact_dirs_lock = Lock()
+
+
 class Pipeline(Thread):
-    experiment: Experiment = Experiment(*([None] * 11))
-    experiment_file_path = None
 
-    def __init__(self, config: Configuration) -> None:
+    def __init__(self, config: Configuration, cpu_budget: int = None, shared_process: bool = False) -> None:
+        """
+        config: run scoped configuration, its namespace and time stamp decide where the artifacts go
+        cpu_budget: cpus the model search of this run may use, model.yaml decides when None
+        shared_process: other pipelines run concurrently in this process, stage peak RSS is then
+                        reported as the process peak (the per stage reset would disturb the other runs)
+        """
         try:
             os.makedirs(config.training_pipeline_config.artifact_dir, exist_ok=True)
-            Pipeline.experiment_file_path = os.path.join(config.training_pipeline_config.artifact_dir,
-                                                         EXPERIMENT_DIR_NAME,
-                                                         EXPERIMENT_FILE_NAME)
-            super().__init__(daemon=False, name="pipeline")
+            self.experiment_file_path = Pipeline.get_experiment_file_path(config)
+            self.experiment: Experiment = Experiment(*([None] * 11))
+            name = "pipeline" if config.namespace is None else f"pipeline-{config.namespace}"
+            super().__init__(daemon=False, name=name)
             self.config = config
+            self.cpu_budget = cpu_budget
+            self.shared_process = shared_process
+            self.profiling_config = config.get_profiling_config()
+            self.artifact_sync_config = config.get_artifact_sync_config()
+            self.artifact_sync_service = None
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def get_artifact_sync_service(self):
+        """
+        return: background uploader of this run, None when artifact sync is disabled in config.yaml
+        """
+        if not self.artifact_sync_config.enabled:
+            return None
+        from tourism.cloud_storage.aws_operations import ArtifactSync, ArtifactSyncService
+        from tourism.utils.s3_operation import get_object_store
+
+        object_store = get_object_store(self.artifact_sync_config.bucket_name,
+                                        max_workers=self.artifact_sync_config.max_workers,
+                                        multipart_threshold=self.artifact_sync_config.multipart_threshold,
+                                        multipart_chunksize=self.artifact_sync_config.multipart_chunksize)
+        return ArtifactSyncService(ArtifactSync(object_store=object_store, prefix=self.artifact_sync_config.prefix,
+                                                local_root=self.artifact_sync_config.local_root,
+                                                max_workers=self.artifact_sync_config.max_workers))
+
+    def sync_artifacts(self, *local_dirs: str):
+        """
+        Queues the upload of stage outputs, the stage does not wait for it.
+        """
+        if self.artifact_sync_service is None:
+            return
+        for local_dir in local_dirs:
+            self.artifact_sync_service.submit_dir(local_dir)
+
+    def sync_stage_artifacts(self, stage_artifact_dir: str):
+        self.sync_artifacts(os.path.join(self.config.training_pipeline_config.artifact_dir, stage_artifact_dir,
+                                         self.config.time_stamp))
+
     def start_data_ingestion(self) -> DataIngestionArtifact:
         try:
+            from tourism.components.data_ingestion import DataIngestion
+
             data_ingestion = DataIngestion(data_ingestion_config=self.config.get_data_ingestion_config())
             return data_ingestion.initiate_data_ingestion()
         except Exception as e:
@@ -51,6 +99,8 @@ class Pipeline(Thread):
 
     def start_data_validation(self, data_ingestion_artifact: DataIngestionArtifact) -> DataValidationArtifact:
         try:
+            from tourism.components.data_validation import DataValidation
+
             data_validation = DataValidation(data_validation_config=self.config.get_data_validation_config(),
                                              data_ingestion_artifact=data_ingestion_artifact
                                              )
@@ -63,19 +113,29 @@ class Pipeline(Thread):
                                   data_validation_artifact: DataValidationArtifact
                                   ) -> DataTransformationArtifact:
         try:
+            from tourism.components.data_transformation import DataTransformation
+
             data_transformation = DataTransformation(
                 data_transformation_config=self.config.get_data_transformation_config(),
                 data_ingestion_artifact=data_ingestion_artifact,
-                data_validation_artifact=data_validation_artifact
+                data_validation_artifact=data_validation_artifact,
+                feature_selection_config=self.config.get_feature_selection_config()
             )
             return data_transformation.initiate_data_transformation()
         except Exception as e:
             raise CustomException(e, sys) from e
 
-    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
+    def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact,
+                            data_validation_artifact: DataValidationArtifact = None) -> ModelTrainerArtifact:
         try:
+            from tourism.components.model_trainer import ModelTrainer
+
+            force_full_search = bool(data_validation_artifact is not None and data_validation_artifact.is_drift_found)
             model_trainer = ModelTrainer(model_trainer_config=self.config.get_model_trainer_config(),
-                                         data_transformation_artifact=data_transformation_artifact
+                                         data_transformation_artifact=data_transformation_artifact,
+                                         force_full_search=force_full_search,
+                                         cpu_budget=self.cpu_budget,
+                                         threshold_tuning_config=self.config.get_threshold_tuning_config()
                                          )
             return model_trainer.initiate_model_trainer()
         except Exception as e:
@@ -85,6 +145,8 @@ class Pipeline(Thread):
                                data_validation_artifact: DataValidationArtifact,
                                model_trainer_artifact: ModelTrainerArtifact) -> ModelEvaluationArtifact:
         try:
+            from tourism.components.model_evaluation import ModelEvaluation
+
             model_eval = ModelEvaluation(
                 model_evaluation_config=self.config.get_model_evaluation_config(),
                 data_ingestion_artifact=data_ingestion_artifact,
@@ -96,6 +158,8 @@ class Pipeline(Thread):
 
     def start_model_pusher(self, model_eval_artifact: ModelEvaluationArtifact) -> ModelPusherArtifact:
         try:
+            from tourism.components.model_pusher import ModelPusher
+
             model_pusher = ModelPusher(
                 model_pusher_config=self.config.get_model_pusher_config(),
                 model_evaluation_artifact=model_eval_artifact
@@ -105,68 +169,149 @@ class Pipeline(Thread):
             raise CustomException(e, sys) from e
 
     def run_pipeline(self):
+        artifact_dir = self.config.training_pipeline_config.artifact_dir
+        with _running_artifact_dirs_lock:
+            if artifact_dir in _running_artifact_dirs:
+                logging.info("Pipeline is already running in [%s]", artifact_dir)
+                return self.experiment
+            _running_artifact_dirs.add(artifact_dir)
+        try:
+            self.artifact_sync_service = self.get_artifact_sync_service()
+            self._run_pipeline()
+            return self.experiment
+        finally:
+            with _running_artifact_dirs_lock:
+                _running_artifact_dirs.discard(artifact_dir)
+            if self.artifact_sync_service is not None:
+                self.sync_artifacts(os.path.join(artifact_dir, EXPERIMENT_DIR_NAME))
+                if not self.artifact_sync_service.close(timeout=self.artifact_sync_config.flush_timeout):
+                    logging.warning("Artifact sync still running after %ss", self.artifact_sync_config.flush_timeout)
+                if self.artifact_sync_service.errors:
+                    logging.warning("Artifact sync errors: %s", self.artifact_sync_service.errors)
+                self.artifact_sync_service = None
+
+    def _run_pipeline(self):
         try:
-            if Pipeline.experiment.running_status:
-                logging.info("Pipeline is already running")
-                return Pipeline.experiment
             # data ingestion
             logging.info("Pipeline starting.")
 
             experiment_id = str(uuid.uuid4())
 
-            Pipeline.experiment = Experiment(experiment_id=experiment_id,
-                                             initialization_timestamp=self.config.time_stamp,
-                                             artifact_time_stamp=self.config.time_stamp,
-                                             running_status=True,
-                                             start_time=datetime.now(),
-                                             stop_time=None,
-                                             execution_time=None,
-                                             experiment_file_path=Pipeline.experiment_file_path,
-                                             is_model_accepted=None,
-                                             message="Pipeline has been started.",
-                                             accuracy=None,
-                                             )
-            logging.info(f"Pipeline experiment: {Pipeline.experiment}")
+            self.experiment = Experiment(experiment_id=experiment_id,
+                                         initialization_timestamp=self.config.time_stamp,
+                                         artifact_time_stamp=self.config.time_stamp,
+                                         running_status=True,
+                                         start_time=datetime.now(),
+                                         stop_time=None,
+                                         execution_time=None,
+                                         experiment_file_path=self.experiment_file_path,
+                                         is_model_accepted=None,
+                                         message="Pipeline has been started.",
+                                         accuracy=None,
+                                         )
+            logging.info("Pipeline experiment: %s", self.experiment)
 
             self.save_experiment()
 
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(
-                data_ingestion_artifact=data_ingestion_artifact,
-                data_validation_artifact=data_validation_artifact
-            )
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+            stage_profiler = self.get_stage_profiler(experiment_id)
+            try:
+                with stage_profiler.activate() if stage_profiler is not None else nullcontext():
+                    with profile_step("data_ingestion"):
+                        data_ingestion_artifact = self.start_data_ingestion()
+                    self.sync_stage_artifacts(DATA_INGESTION_ARTIFACT_DIR)
+                    with profile_step("data_validation"):
+                        data_validation_artifact = self.start_data_validation(
+                            data_ingestion_artifact=data_ingestion_artifact)
+                    self.sync_stage_artifacts(DATA_VALIDATION_ARTIFACT_DIR_NAME)
+                    with profile_step("data_transformation"):
+                        data_transformation_artifact = self.start_data_transformation(
+                            data_ingestion_artifact=data_ingestion_artifact,
+                            data_validation_artifact=data_validation_artifact
+                        )
+                    self.sync_stage_artifacts(DATA_TRANSFORMATION_ARTIFACT_DIR)
+                    with profile_step("model_trainer"):
+                        model_trainer_artifact = self.start_model_trainer(
+                            data_transformation_artifact=data_transformation_artifact,
+                            data_validation_artifact=data_validation_artifact)
+                    self.sync_stage_artifacts(MODEL_TRAINER_ARTIFACT_DIR)
 
-            model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
-                                                                    data_validation_artifact=data_validation_artifact,
-                                                                    model_trainer_artifact=model_trainer_artifact)
+                    with profile_step("model_evaluation"):
+                        model_evaluation_artifact = self.start_model_evaluation(
+                            data_ingestion_artifact=data_ingestion_artifact,
+                            data_validation_artifact=data_validation_artifact,
+                            model_trainer_artifact=model_trainer_artifact)
+                    self.sync_artifacts(os.path.join(self.config.training_pipeline_config.artifact_dir,
+                                                     MODEL_EVALUATION_ARTIFACT_DIR))
 
-            if model_evaluation_artifact.is_model_accepted:
-                model_pusher_artifact = self.start_model_pusher(model_eval_artifact=model_evaluation_artifact)
-                logging.info(f'Model pusher artifact: {model_pusher_artifact}')
-            else:
-                logging.info("Trained model rejected.")
+                    if model_evaluation_artifact.is_model_accepted:
+                        with profile_step("model_pusher"):
+                            model_pusher_artifact = self.start_model_pusher(
+                                model_eval_artifact=model_evaluation_artifact)
+                        self.sync_artifacts(os.path.dirname(model_pusher_artifact.export_model_file_path))
+                        if self.artifact_sync_service is not None:
+                            # after the export dir in the queue: the pointer never targets a missing upload
+                            self.artifact_sync_service.submit_pointer(model_pusher_artifact.current_pointer_path)
+                        logging.info("Model pusher artifact: %s", model_pusher_artifact)
+                    else:
+                        logging.info("Trained model rejected.")
+            finally:
+                # stages completed before a failure are kept as well
+                if stage_profiler is not None:
+                    self.save_stage_metrics(stage_profiler, experiment_id)
             logging.info("Pipeline completed.")
 
             stop_time = datetime.now()
-            Pipeline.experiment = Experiment(experiment_id=Pipeline.experiment.experiment_id,
-                                             initialization_timestamp=self.config.time_stamp,
-                                             artifact_time_stamp=self.config.time_stamp,
-                                             running_status=False,
-                                             start_time=Pipeline.experiment.start_time,
-                                             stop_time=stop_time,
-                                             execution_time=stop_time - Pipeline.experiment.start_time,
-                                             message="Pipeline has been completed.",
-                                             experiment_file_path=Pipeline.experiment_file_path,
-                                             is_model_accepted=model_evaluation_artifact.is_model_accepted,
-                                             accuracy=model_trainer_artifact.model_accuracy
-                                             )
-            logging.info(f"Pipeline experiment: {Pipeline.experiment}")
+            self.experiment = Experiment(experiment_id=self.experiment.experiment_id,
+                                         initialization_timestamp=self.config.time_stamp,
+                                         artifact_time_stamp=self.config.time_stamp,
+                                         running_status=False,
+                                         start_time=self.experiment.start_time,
+                                         stop_time=stop_time,
+                                         execution_time=stop_time - self.experiment.start_time,
+                                         message="Pipeline has been completed.",
+                                         experiment_file_path=self.experiment_file_path,
+                                         is_model_accepted=model_evaluation_artifact.is_model_accepted,
+                                         accuracy=model_trainer_artifact.model_accuracy
+                                         )
+            logging.info("Pipeline experiment: %s", self.experiment)
             self.save_experiment()
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    def get_stage_profiler(self, experiment_id: str) -> StageProfiler:
+        """
+        return: the profiler of this experiment run, None when profiling is disabled in config.yaml
+        """
+        if not self.profiling_config.enabled:
+            return None
+        return StageProfiler(profiler=self.profiling_config.profiler,
+                             profile_dir=os.path.join(self.profiling_config.profile_dir, experiment_id),
+                             sampling_interval=self.profiling_config.sampling_interval,
+                             reset_peak=not self.shared_process)
+
+    def save_stage_metrics(self, stage_profiler: StageProfiler, experiment_id: str):
+        """
+        Persists the stage metrics next to the experiment: yaml and prometheus text format.
+        """
+        try:
+            experiment_profile_dir = os.path.join(self.profiling_config.profile_dir, experiment_id)
+            stage_profiler.save(os.path.join(experiment_profile_dir, STAGE_METRICS_FILE_NAME))
+            with open(os.path.join(experiment_profile_dir, PROMETHEUS_FILE_NAME), "w") as prometheus_file:
+                prometheus_file.write(stage_profiler.to_prometheus_text(labels={"experiment_id": experiment_id}))
+            logging.info("Stage metrics saved in [%s]", experiment_profile_dir)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_experiment_stage_metrics(self, experiment_id: str) -> List[StageMetric]:
+        try:
+            stage_metrics_file_path = os.path.join(self.profiling_config.profile_dir, experiment_id,
+                                                   STAGE_METRICS_FILE_NAME)
+            if not os.path.exists(stage_metrics_file_path):
+                return []
+            return read_stage_metrics(stage_metrics_file_path)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
     def run(self):
         try:
             self.run_pipeline()
@@ -175,32 +320,44 @@ class Pipeline(Thread):
 
     def save_experiment(self):
         try:
-            if Pipeline.experiment.experiment_id is not None:
-                experiment = Pipeline.experiment
+            if self.experiment.experiment_id is not None:
+                experiment = self.experiment
                 experiment_dict = experiment._asdict()
                 experiment_dict: dict = {key: [value] for key, value in experiment_dict.items()}
 
                 experiment_dict.update({
                     "created_time_stamp": [datetime.now()],
-                    "experiment_file_path": [os.path.basename(Pipeline.experiment.experiment_file_path)]})
+                    "experiment_file_path": [os.path.basename(self.experiment.experiment_file_path)]})
+
+                import pandas as pd
 
                 experiment_report = pd.DataFrame(experiment_dict)
 
-                os.makedirs(os.path.dirname(Pipeline.experiment_file_path), exist_ok=True)
-                if os.path.exists(Pipeline.experiment_file_path):
-                    experiment_report.to_csv(Pipeline.experiment_file_path, index=False, header=False, mode="a")
+                os.makedirs(os.path.dirname(self.experiment_file_path), exist_ok=True)
+                if os.path.exists(self.experiment_file_path):
+                    experiment_report.to_csv(self.experiment_file_path, index=False, header=False, mode="a")
                 else:
-                    experiment_report.to_csv(Pipeline.experiment_file_path, mode="w", index=False, header=True)
+                    experiment_report.to_csv(self.experiment_file_path, mode="w", index=False, header=True)
             else:
                 print("First start experiment")
         except Exception as e:
             raise CustomException(e, sys) from e
 
+    @staticmethod
+    def get_experiment_file_path(config: Configuration) -> str:
+        return os.path.join(config.training_pipeline_config.artifact_dir, EXPERIMENT_DIR_NAME, EXPERIMENT_FILE_NAME)
+
     @classmethod
-    def get_experiments_status(cls, limit: int = 5) -> pd.DataFrame:
+    def get_experiments_status(cls, limit: int = 5, config: Configuration = None) -> "pd.DataFrame":
+        """
+        config: configuration of the artifact namespace to report, config.yaml without namespace when None
+        """
         try:
-            if os.path.exists(Pipeline.experiment_file_path):
-                df = pd.read_csv(Pipeline.experiment_file_path)
+            import pandas as pd
+
+            experiment_file_path = cls.get_experiment_file_path(config or Configuration())
+            if os.path.exists(experiment_file_path):
+                df = pd.read_csv(experiment_file_path)
                 limit = -1 * int(limit)
                 return df[limit:].drop(columns=["experiment_file_path", "initialization_timestamp"], axis=1)
             else:
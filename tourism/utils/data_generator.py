@@ -0,0 +1,384 @@
+"""
+Schema driven synthetic travel data for load and scale testing.
+
+SyntheticDataGenerator learns a profile from a seed file (e.g. notebooks/Travel_Data.csv): the target class
+frequencies and, per target class, the distribution of every schema.yaml column (quantiles of continuous
+columns, value frequencies of discrete and categorical columns) plus its missing value rate. Rows are sampled
+class by class, so the class imbalance and the per class marginals of the seed are kept at any size.
+Without a seed file a generic profile is built from the schema column groups only.
+
+Chunks are generated from independent seeds spawned from random_state: the output is the same whatever
+the chunk size split over workers is. Drift is injected per column at generation time:
+    {"Age": {"shift": 0.5},               # continuous: shift by 0.5 standard deviations
+     "Occupation": {"mix": 0.3},          # discrete / categorical: blend 30% uniform into the frequencies
+     "MonthlyIncome": {"missing_rate": 0.2},
+     "ProdTaken": {"rate": 0.4}}          # target: positive class rate
+
+usage: python -m tourism.utils.data_generator --seed-file notebooks/Travel_Data.csv --rows 1000000 \
+           --jobs 4 --output artifacts/synthetic/travel_data.csv [--drift drift.yaml]
+"""
+import os
+import sys
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, TYPE_CHECKING
+
+from tourism.constant.training_pipeline import (SCHEMA_FILE_PATH, DATASET_SCHEMA_COLUMNS_KEY, TARGET_COLUMN_KEY,
+                                                CATEGORICAL_COLUMN_KEY, CONTINUOUS_COLUMN_KEY, DISCRETE_COLUMN_KEY)
+from tourism.exception import CustomException
+from tourism.logger import logging
+from tourism.utils.main_utils import read_yaml_file, write_yaml_file
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+CSV_FORMAT = "csv"
+PARQUET_FORMAT = "parquet"
+
+CONTINUOUS_KIND = "continuous"
+DISCRETE_KIND = "discrete"
+IDENTIFIER_KIND = "identifier"
+
+# quantile grid of continuous columns, sampled by inverse CDF interpolation
+N_QUANTILES = 101
+
+DRIFT_SHIFT_KEY = "shift"
+DRIFT_MIX_KEY = "mix"
+DRIFT_MISSING_RATE_KEY = "missing_rate"
+DRIFT_RATE_KEY = "rate"
+
+
+def _frequencies(values) -> dict:
+    import pandas as pd
+
+    counts = pd.Series(values).dropna().value_counts(normalize=True, sort=False)
+    return {"values": [value.item() if hasattr(value, "item") else value for value in counts.index],
+            "frequencies": [float(frequency) for frequency in counts.values]}
+
+
+def _quantiles(values) -> dict:
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    return {"quantiles": [float(value) for value in np.quantile(values, np.linspace(0, 1, N_QUANTILES))]}
+
+
+def get_column_kind(schema: dict, column: str) -> str:
+    if column in schema[CONTINUOUS_COLUMN_KEY]:
+        return CONTINUOUS_KIND
+    if column in schema[CATEGORICAL_COLUMN_KEY] or column in schema[DISCRETE_COLUMN_KEY]:
+        return DISCRETE_KIND
+    return IDENTIFIER_KIND
+
+
+def build_schema_profile(schema: dict, positive_rate: float = 0.19, missing_rate: float = 0.02) -> dict:
+    """
+    Generic profile from the schema column groups only: 4 levels per categorical column, values 0-4 for
+    discrete columns, a gamma shaped distribution for continuous columns, same for both classes.
+    """
+    import numpy as np
+
+    target_column = schema[TARGET_COLUMN_KEY]
+    gamma_quantiles = np.sort(np.random.default_rng(0).gamma(shape=4.0, scale=10.0, size=10000))
+    columns = {}
+    for column, dtype in schema[DATASET_SCHEMA_COLUMNS_KEY].items():
+        if column == target_column:
+            continue
+        kind = get_column_kind(schema, column)
+        if kind == CONTINUOUS_KIND:
+            distribution = _quantiles(gamma_quantiles)
+        elif column in schema[CATEGORICAL_COLUMN_KEY]:
+            distribution = {"values": [f"{column}_{level}" for level in range(4)], "frequencies": [0.25] * 4}
+        elif kind == DISCRETE_KIND:
+            distribution = {"values": list(range(5)), "frequencies": [0.2] * 5}
+        else:
+            distribution = {"start": 0}
+        columns[column] = {"kind": kind, "dtype": dtype,
+                           "missing_rate": missing_rate if dtype == "float" else 0.0,
+                           "by_target": {0: distribution, 1: distribution}}
+    return {"seed_rows": None,
+            "column_order": list(schema[DATASET_SCHEMA_COLUMNS_KEY]),
+            "target_column": target_column,
+            "target": {"values": [0, 1], "frequencies": [1 - positive_rate, positive_rate]},
+            "columns": columns}
+
+
+def _sample_column(random, column_profile: dict, n_rows: int, target_value, drift: dict):
+    import numpy as np
+
+    distribution = column_profile["by_target"][target_value]
+    if column_profile["kind"] == CONTINUOUS_KIND:
+        quantiles = np.asarray(distribution["quantiles"])
+        values = np.interp(random.random(n_rows), np.linspace(0, 1, len(quantiles)), quantiles)
+        if DRIFT_SHIFT_KEY in drift:
+            # standard deviation estimated from the 16th and 84th percentile
+            std = (np.interp(0.84, np.linspace(0, 1, len(quantiles)), quantiles)
+                   - np.interp(0.16, np.linspace(0, 1, len(quantiles)), quantiles)) / 2
+            values = values + drift[DRIFT_SHIFT_KEY] * std
+        return values
+    frequencies = np.asarray(distribution["frequencies"], dtype=float)
+    if DRIFT_MIX_KEY in drift:
+        frequencies = (1 - drift[DRIFT_MIX_KEY]) * frequencies + drift[DRIFT_MIX_KEY] / len(frequencies)
+    return random.choice(np.asarray(distribution["values"], dtype=object), size=n_rows,
+                         p=frequencies / frequencies.sum())
+
+
+def generate_chunk(profile: dict, n_rows: int, seed, start_index: int = 0, drift: dict = None) -> "pd.DataFrame":
+    """
+    seed: anything np.random.default_rng accepts, a spawned SeedSequence for parallel chunks
+    start_index: position of the first row in the whole output, identifiers continue from it
+    """
+    import numpy as np
+    import pandas as pd
+
+    drift = drift or {}
+    random = np.random.default_rng(seed)
+    target_column = profile["target_column"]
+
+    target_values = np.asarray(profile["target"]["values"])
+    target_frequencies = np.asarray(profile["target"]["frequencies"], dtype=float)
+    if DRIFT_RATE_KEY in drift.get(target_column, {}):
+        positive_rate = drift[target_column][DRIFT_RATE_KEY]
+        target_frequencies = np.where(target_values == target_values.max(), positive_rate, 1 - positive_rate)
+    target = random.choice(target_values, size=n_rows, p=target_frequencies / target_frequencies.sum())
+
+    data = {target_column: target}
+    for column, column_profile in profile["columns"].items():
+        column_drift = drift.get(column, {})
+        if column_profile["kind"] == IDENTIFIER_KIND:
+            start = column_profile["by_target"][target_values[0].item()].get("start", 0)
+            data[column] = np.arange(start + start_index, start + start_index + n_rows)
+            continue
+
+        values = np.empty(n_rows, dtype=object if column_profile["dtype"] == "category" else float)
+        for target_value in target_values:
+            mask = target == target_value
+            values[mask] = _sample_column(random, column_profile, int(mask.sum()), target_value.item(), column_drift)
+
+        missing_rate = column_drift.get(DRIFT_MISSING_RATE_KEY, column_profile["missing_rate"])
+        if missing_rate:
+            values[random.random(n_rows) < missing_rate] = np.nan if values.dtype == float else None
+        if column_profile["dtype"] == "int" and not missing_rate:
+            values = values.astype(np.int64)
+        data[column] = values
+    return pd.DataFrame(data, columns=profile["column_order"])
+
+
+def get_arrow_schema(profile: dict, drift: dict = None) -> "pa.Schema":
+    """
+    Arrow schema of the chunks generate_chunk returns, fixed from the profile dtypes instead of inferred per chunk:
+    a chunk whose categorical column is all None would otherwise get the null type and not match the other parts.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    drift = drift or {}
+    target_column = profile["target_column"]
+    fields = []
+    for column in profile["column_order"]:
+        if column == target_column:
+            arrow_type = pa.from_numpy_dtype(np.asarray(profile["target"]["values"]).dtype)
+        else:
+            column_profile = profile["columns"][column]
+            missing_rate = drift.get(column, {}).get(DRIFT_MISSING_RATE_KEY, column_profile["missing_rate"])
+            if column_profile["kind"] == IDENTIFIER_KIND:
+                arrow_type = pa.int64()
+            elif column_profile["dtype"] == "category":
+                arrow_type = pa.string()
+            elif column_profile["dtype"] == "int" and not missing_rate:
+                arrow_type = pa.int64()
+            else:
+                arrow_type = pa.float64()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+def _write_chunk(profile: dict, n_rows: int, seed, start_index: int, drift: dict, file_path: str, file_format: str,
+                 header: bool) -> str:
+    chunk = generate_chunk(profile, n_rows=n_rows, seed=seed, start_index=start_index, drift=drift)
+    if file_format == PARQUET_FORMAT:
+        chunk.to_parquet(file_path, index=False, schema=get_arrow_schema(profile, drift))
+    else:
+        chunk.to_csv(file_path, index=False, header=header)
+    return file_path
+
+
+class SyntheticDataGenerator:
+
+    def __init__(self, schema_file_path: str = SCHEMA_FILE_PATH, profile: dict = None, random_state: int = 42):
+        """
+        profile: a profile learnt by fit() (or loaded with read_profile), the generic schema profile when None
+        """
+        try:
+            self.schema = read_yaml_file(schema_file_path)
+            self.profile = profile if profile is not None else build_schema_profile(self.schema)
+            self.random_state = random_state
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def fit(self, seed_file_path: str) -> dict:
+        """
+        Learns the target frequencies and the per class distribution of every schema column from the seed file.
+        """
+        try:
+            import pandas as pd
+
+            seed_df = pd.read_csv(seed_file_path)
+            target_column = self.schema[TARGET_COLUMN_KEY]
+            target_values = sorted(seed_df[target_column].dropna().unique().tolist())
+
+            columns = {}
+            for column, dtype in self.schema[DATASET_SCHEMA_COLUMNS_KEY].items():
+                if column == target_column or column not in seed_df.columns:
+                    continue
+                kind = get_column_kind(self.schema, column)
+                by_target = {}
+                for target_value in target_values:
+                    values = seed_df.loc[seed_df[target_column] == target_value, column]
+                    if kind == CONTINUOUS_KIND:
+                        by_target[target_value] = _quantiles(values)
+                    elif kind == DISCRETE_KIND:
+                        by_target[target_value] = _frequencies(values)
+                    else:
+                        by_target[target_value] = {"start": int(seed_df[column].max()) + 1}
+                columns[column] = {"kind": kind, "dtype": dtype,
+                                   "missing_rate": float(seed_df[column].isna().mean()),
+                                   "by_target": by_target}
+
+            self.profile = {"seed_rows": int(len(seed_df)),
+                            "column_order": [column for column in seed_df.columns
+                                             if column == target_column or column in columns],
+                            "target_column": target_column,
+                            "target": _frequencies(seed_df[target_column]),
+                            "columns": columns}
+            logging.info("Synthetic data profile learnt from [%s]: %s rows", seed_file_path, len(seed_df))
+            return self.profile
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def save_profile(self, file_path: str):
+        write_yaml_file(file_path=file_path, data=self.profile)
+
+    @staticmethod
+    def read_profile(file_path: str) -> dict:
+        return read_yaml_file(file_path)
+
+    def get_chunk_plan(self, n_rows: int, chunk_size: int) -> List[tuple]:
+        """
+        return: (start_index, n_rows, seed) per chunk, seeds are spawned from random_state
+        """
+        import numpy as np
+
+        starts = list(range(0, n_rows, chunk_size))
+        seeds = np.random.SeedSequence(self.random_state).spawn(len(starts))
+        return [(start, min(chunk_size, n_rows - start), seed) for start, seed in zip(starts, seeds)]
+
+    def iter_chunks(self, n_rows: int, chunk_size: int = 100000, drift: dict = None) -> Iterator["pd.DataFrame"]:
+        for start_index, chunk_rows, seed in self.get_chunk_plan(n_rows, chunk_size):
+            yield generate_chunk(self.profile, n_rows=chunk_rows, seed=seed, start_index=start_index, drift=drift)
+
+    def generate(self, n_rows: int, drift: dict = None) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.concat(list(self.iter_chunks(n_rows, drift=drift)), ignore_index=True)
+
+    def write(self, output_file_path: str, n_rows: int, chunk_size: int = 100000, n_jobs: int = 1,
+              drift: dict = None, file_format: str = None) -> str:
+        """
+        Generates the chunks in n_jobs worker processes and appends them to output_file_path in chunk order
+        while later chunks are still being generated, memory stays bounded by n_jobs chunks.
+        file_format: csv or parquet (one row group per chunk, needs pyarrow), taken from the extension when None
+        """
+        try:
+            if file_format is None:
+                file_format = PARQUET_FORMAT if output_file_path.endswith(".parquet") else CSV_FORMAT
+            os.makedirs(os.path.dirname(output_file_path) or ".", exist_ok=True)
+            parts_dir = f"{output_file_path}.parts-{os.getpid()}"
+            os.makedirs(parts_dir, exist_ok=True)
+
+            chunk_plan = self.get_chunk_plan(n_rows, chunk_size)
+            arguments = [(self.profile, chunk_rows, seed, start_index, drift,
+                          os.path.join(parts_dir, f"part-{chunk_number:05d}.{file_format}"), file_format,
+                          chunk_number == 0)
+                         for chunk_number, (start_index, chunk_rows, seed) in enumerate(chunk_plan)]
+
+            schema = get_arrow_schema(self.profile, drift) if file_format == PARQUET_FORMAT else None
+            tmp_file_path = f"{output_file_path}.tmp-{os.getpid()}"
+            try:
+                if n_jobs == 1:
+                    part_file_paths = (_write_chunk(*argument) for argument in arguments)
+                    self._merge_parts(part_file_paths, tmp_file_path, file_format, schema)
+                else:
+                    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                        part_file_paths = executor.map(_write_chunk, *zip(*arguments))
+                        self._merge_parts(part_file_paths, tmp_file_path, file_format, schema)
+                os.replace(tmp_file_path, output_file_path)
+            finally:
+                shutil.rmtree(parts_dir, ignore_errors=True)
+                if os.path.exists(tmp_file_path):
+                    os.remove(tmp_file_path)
+            logging.info("Synthetic data: %s rows in %s chunks written to [%s]",
+                         n_rows, len(chunk_plan), output_file_path)
+            return output_file_path
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @staticmethod
+    def _merge_parts(part_file_paths, output_file_path: str, file_format: str, schema: "pa.Schema" = None):
+        """
+        schema: arrow schema of the parquet parts (get_arrow_schema), every part is cast to it
+        """
+        if file_format == PARQUET_FORMAT:
+            import pyarrow.parquet as pq
+
+            writer = None
+            try:
+                for part_file_path in part_file_paths:
+                    table = pq.read_table(part_file_path)
+                    if schema is not None:
+                        table = table.cast(schema)
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_file_path, table.schema)
+                    writer.write_table(table)
+                    os.remove(part_file_path)
+            finally:
+                if writer is not None:
+                    writer.close()
+            return
+        with open(output_file_path, "wb") as output_file:
+            for part_file_path in part_file_paths:
+                with open(part_file_path, "rb") as part_file:
+                    shutil.copyfileobj(part_file, output_file)
+                os.remove(part_file_path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default=SCHEMA_FILE_PATH)
+    parser.add_argument("--seed-file", help="csv to learn the distributions from, generic schema profile when absent")
+    parser.add_argument("--profile", help="profile yaml saved by an earlier run, used instead of --seed-file")
+    parser.add_argument("--profile-output", help="optional path to save the learnt profile to")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--drift", help="yaml file of per column drift settings")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--output", required=True, help=".csv or .parquet file")
+    args = parser.parse_args()
+
+    profile = SyntheticDataGenerator.read_profile(args.profile) if args.profile else None
+    generator = SyntheticDataGenerator(schema_file_path=args.schema, profile=profile, random_state=args.random_state)
+    if args.seed_file and profile is None:
+        generator.fit(args.seed_file)
+    if args.profile_output:
+        generator.save_profile(args.profile_output)
+    drift = read_yaml_file(args.drift) if args.drift else None
+    generator.write(args.output, n_rows=args.rows, chunk_size=args.chunk_size, n_jobs=args.jobs, drift=drift)
+
+
+if __name__ == "__main__":
+    main()
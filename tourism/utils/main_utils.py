@@ -1,10 +1,16 @@
 import os, sys
+import shutil
+from typing import TYPE_CHECKING
 import yaml
 from tourism.exception import CustomException
-import dill
-import numpy as np
-import pandas as pd
 from tourism.constant.training_pipeline import *
+from tourism.utils import serialization
+
+# numpy and pandas (and serializers) are imported inside the functions using them,
+# importing this module must stay cheap for the CLI and prediction workers
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 
 def read_yaml_file(file_path: str) -> dict:
@@ -32,26 +38,57 @@ def write_yaml_file(file_path:str,data:dict=None):
     except Exception as e:
         raise CustomException(e,sys) from e
  
-def save_object(file_path:str,obj):
+def save_object(file_path:str,obj, serialization_format: str = serialization.DILL_FORMAT, compress=0) -> dict:
     """
     file_path: str
     obj: Any sort of object
+    serialization_format: dill, joblib, xgboost or auto (see tourism.utils.serialization)
+    compress: joblib compression level or (method, level)
+    return: dict metadata written next to the object in <file_path>.meta.yaml
     """
     try:
+        serialization_format = serialization.resolve_serialization_format(obj, serialization_format)
+
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
-        with open(file_path, "wb") as file_obj:
-            dill.dump(obj, file_obj)
+        # written next to the target and renamed: readers never see a half written object
+        # and hardlinked exports of the previous version are left untouched
+        tmp_file_path = f"{file_path}.tmp-{os.getpid()}"
+        with open(tmp_file_path, "wb") as file_obj:
+            serialization.dump(obj, file_obj, serialization_format=serialization_format, compress=compress)
+
+        metadata = serialization.get_object_metadata(tmp_file_path, obj, serialization_format=serialization_format,
+                                                     compress=compress)
+        metadata_file_path = serialization.get_metadata_file_path(file_path)
+        write_yaml_file(file_path=f"{metadata_file_path}.tmp-{os.getpid()}", data=metadata)
+        os.replace(f"{metadata_file_path}.tmp-{os.getpid()}", metadata_file_path)
+        os.replace(tmp_file_path, file_path)
+        return metadata
     except Exception as e:
         raise CustomException(e,sys) from e
 
-def save_numpy_array_data(file_path: str, array: np.array):
+def read_object_metadata(file_path: str) -> dict:
+    """
+    file_path: str serialized object path
+    return: dict metadata of the object, objects written before the metadata existed are dill pickles
+    """
+    try:
+        metadata_file_path = serialization.get_metadata_file_path(file_path)
+        if not os.path.exists(metadata_file_path):
+            return {serialization.SERIALIZATION_FORMAT_KEY: serialization.DILL_FORMAT, serialization.COMPRESS_KEY: 0}
+        return read_yaml_file(metadata_file_path)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+def save_numpy_array_data(file_path: str, array: "np.ndarray"):
     """
     Save numpy array data to file
     file_path: str location of file to save
     array: np.array data to save
     """
     try:
+        import numpy as np
+
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
         with open(file_path, 'wb') as file_obj:
@@ -59,30 +96,42 @@ def save_numpy_array_data(file_path: str, array: np.array):
     except Exception as e:
         raise CustomException(e, sys) from e
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> "np.ndarray":
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: e.g. "r" to memory map the array instead of reading it in memory
     return: np.array data loaded
     """
     try:
+        import numpy as np
+
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
         raise CustomException(e, sys) from e
 
-def load_object(file_path:str):
+def load_object(file_path:str, mmap_mode: str = None):
     """
     file_path: str
+    mmap_mode: "r" to memory map numpy arrays of uncompressed joblib objects, only for objects that are not
+               modified after loading (serving); None reads them in memory
     """
     try:
-        with open(file_path, "rb") as file_obj:
-            return dill.load(file_obj)
+        metadata = read_object_metadata(file_path)
+        return serialization.load(file_path,
+                                  serialization_format=metadata[serialization.SERIALIZATION_FORMAT_KEY],
+                                  compress=metadata.get(serialization.COMPRESS_KEY, 0),
+                                  mmap_mode=mmap_mode)
     except Exception as e:
         raise CustomException(e,sys) from e
 
-def load_data(file_path: str, schema_file_path: str) -> pd.DataFrame:
+def load_data(file_path: str, schema_file_path: str) -> "pd.DataFrame":
     try:
+        import pandas as pd
+
         datatset_schema = read_yaml_file(schema_file_path)
 
         schema = datatset_schema[DATASET_SCHEMA_COLUMNS_KEY]
@@ -102,4 +151,80 @@ def load_data(file_path: str, schema_file_path: str) -> pd.DataFrame:
         return dataframe
 
     except Exception as e:
-        raise CustomException(e,sys) from e
\ No newline at end of file
+        raise CustomException(e,sys) from e
+
+# Linux ioctl request number to share the extents of a file (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+def _reflink_file(src: str, dst: str):
+    import fcntl
+
+    with open(src, "rb") as src_obj, open(dst, "wb") as dst_obj:
+        fcntl.ioctl(dst_obj.fileno(), FICLONE, src_obj.fileno())
+
+def promote_file(src: str, dst: str) -> str:
+    """
+    Publishes src at dst without duplicating data where the filesystem allows it.
+    Tries a hardlink, then a reflink, then falls back to a full copy.
+    The file is staged under a temporary name and renamed, so dst is either absent or complete.
+    src: str file to publish
+    dst: str destination file path
+    return: str method used ("hardlink", "reflink" or "copy")
+    """
+    try:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp_dst = f"{dst}.tmp-{os.getpid()}"
+        if os.path.lexists(tmp_dst):
+            os.remove(tmp_dst)
+
+        for method, link in (("hardlink", os.link), ("reflink", _reflink_file), ("copy", shutil.copyfile)):
+            try:
+                link(src, tmp_dst)
+                break
+            except (OSError, ImportError):
+                if os.path.lexists(tmp_dst):
+                    os.remove(tmp_dst)
+                if method == "copy":
+                    raise
+        os.replace(tmp_dst, dst)
+        return method
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+def update_current_pointer(pointer_path: str, target_dir: str):
+    """
+    Atomically points pointer_path to target_dir.
+    A relative symlink is used where supported, otherwise a text file holding the directory name.
+    pointer_path: str e.g. saved_models/current
+    target_dir: str directory living next to pointer_path
+    """
+    try:
+        target_name = os.path.relpath(target_dir, os.path.dirname(pointer_path))
+        tmp_pointer_path = f"{pointer_path}.tmp-{os.getpid()}"
+        if os.path.lexists(tmp_pointer_path):
+            os.remove(tmp_pointer_path)
+        try:
+            os.symlink(target_name, tmp_pointer_path, target_is_directory=True)
+        except (OSError, NotImplementedError):
+            with open(tmp_pointer_path, "w") as pointer_file:
+                pointer_file.write(target_name)
+        os.replace(tmp_pointer_path, pointer_path)
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+def resolve_current_pointer(pointer_path: str) -> str:
+    """
+    pointer_path: str pointer written by update_current_pointer
+    return: str absolute path of the directory it points to, None if nothing was promoted yet
+    """
+    try:
+        if not os.path.lexists(pointer_path):
+            return None
+        if os.path.islink(pointer_path):
+            target_name = os.readlink(pointer_path)
+        else:
+            with open(pointer_path) as pointer_file:
+                target_name = pointer_file.read().strip()
+        return os.path.abspath(os.path.join(os.path.dirname(pointer_path), target_name))
+    except Exception as e:
+        raise CustomException(e, sys) from e
@@ -0,0 +1,319 @@
+"""
+Per stage resource instrumentation of the training pipeline.
+
+Pipeline.run_pipeline opens a StageProfiler for every experiment. Pipeline stages and the sub steps inside
+the components are timed with profile_step(), which is a no-op when no profiler is active:
+
+    with profile_step("smoteenn_train", rows=len(input_feature_train_arr)):
+        ...
+
+For each stage: wall time, CPU time (this process plus reaped child processes), peak RSS, rows processed
+and bytes read / written (/proc/self/io, all file and socket I/O of the process). Peak RSS is per stage on
+linux: the kernel high-water mark is reset when a stage starts (/proc/self/clear_refs) and folded into the
+enclosing stages before every reset. Elsewhere it is the process maximum so far.
+
+Top level stages can additionally be captured with cProfile (<stage>.prof, for pstats / snakeviz) or with
+a sampling profiler (<stage>.collapsed, flamegraph.pl / speedscope format).
+"""
+import os
+import sys
+import time
+import resource
+import threading
+import cProfile
+from collections import namedtuple, Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from tourism.exception import CustomException
+from tourism.logger import logging
+
+NO_PROFILER = "none"
+CPROFILE_PROFILER = "cprofile"
+SAMPLING_PROFILER = "sampling"
+PROFILERS = [NO_PROFILER, CPROFILE_PROFILER, SAMPLING_PROFILER]
+
+STAGE_METRICS_FILE_NAME = "stage_metrics.yaml"
+PROMETHEUS_FILE_NAME = "stage_metrics.prom"
+PROMETHEUS_METRIC_PREFIX = "tourism_stage"
+
+StageMetric = namedtuple("StageMetric", ["stage", "parent", "depth", "start_time", "wall_seconds", "cpu_seconds",
+                                         "peak_rss_bytes", "rows", "bytes_read", "bytes_written",
+                                         "profile_file_path", "error"])
+
+# (StageMetric field, help text) exported as prometheus gauges, summed over the runs of a (stage, parent)
+PROMETHEUS_METRICS = [("wall_seconds", "Wall clock time of the stage in seconds."),
+                      ("cpu_seconds", "CPU time of the stage in seconds."),
+                      ("peak_rss_bytes", "Peak resident set size during the stage in bytes, max over its runs."),
+                      ("rows", "Rows processed by the stage."),
+                      ("bytes_read", "Bytes read by the process during the stage."),
+                      ("bytes_written", "Bytes written by the process during the stage.")]
+
+# fields aggregated with max instead of sum
+PROMETHEUS_MAX_METRICS = {"peak_rss_bytes"}
+
+_active_profiler: ContextVar = ContextVar("stage_profiler", default=None)
+
+
+def _read_proc_file(file_path: str) -> dict:
+    try:
+        with open(file_path) as proc_file:
+            return dict(line.split(":", 1) for line in proc_file if ":" in line)
+    except OSError:
+        return {}
+
+
+def get_peak_rss_bytes() -> int:
+    vm_hwm = _read_proc_file("/proc/self/status").get("VmHWM")
+    if vm_hwm is not None:
+        # "  123456 kB"
+        return int(vm_hwm.split()[0]) * 1024
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+    Resets the VmHWM high-water mark to the current RSS (linux >= 4.0).
+    return: False when the platform does not allow it
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_io_bytes():
+    """
+    return: (bytes read, bytes written) of the process, (None, None) without /proc/self/io
+    """
+    io_counters = _read_proc_file("/proc/self/io")
+    if not io_counters:
+        return None, None
+    return int(io_counters["rchar"]), int(io_counters["wchar"])
+
+
+def get_cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread every interval seconds and counts identical stacks.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.01):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stack_counts = Counter()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="stack-sampler", daemon=True)
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stack_counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def save(self, file_path: str):
+        with open(file_path, "w") as collapsed_file:
+            for stack, count in self.stack_counts.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+
+class StageFrame:
+    """
+    A stage in progress, the instrumented code may set rows once it is known.
+    """
+
+    def __init__(self, stage: str, parent: Optional[str], depth: int, rows: int = None):
+        self.stage = stage
+        self.parent = parent
+        self.depth = depth
+        self.rows = rows
+        self.peak_rss_bytes = 0
+
+
+class StageProfiler:
+
+    def __init__(self, profiler: str = NO_PROFILER, profile_dir: str = None, sampling_interval: float = 0.01,
+                 reset_peak: bool = True):
+        """
+        profiler: none, cprofile or sampling, applied to top level stages
+        profile_dir: where cProfile / sampling output is written, required with a profiler
+        reset_peak: measure peak RSS per stage, turn off when several pipelines share the process
+        """
+        try:
+            if profiler not in PROFILERS:
+                raise Exception(f"Unknown profiler [{profiler}], expected one of {PROFILERS}")
+            if profiler != NO_PROFILER and profile_dir is None:
+                raise Exception(f"profile_dir is required with the [{profiler}] profiler")
+            self.profiler = profiler
+            self.profile_dir = profile_dir
+            self.sampling_interval = sampling_interval
+            self.reset_peak = reset_peak
+            self.metrics: List[StageMetric] = []
+            self._frames: List[StageFrame] = []
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes this profiler the target of profile_step() in the current thread / context.
+        """
+        token = _active_profiler.set(self)
+        try:
+            yield self
+        finally:
+            _active_profiler.reset(token)
+
+    def _fold_peak_rss(self):
+        peak_rss_bytes = get_peak_rss_bytes()
+        for frame in self._frames:
+            frame.peak_rss_bytes = max(frame.peak_rss_bytes, peak_rss_bytes)
+
+    @contextmanager
+    def stage(self, stage: str, rows: int = None):
+        parent = self._frames[-1].stage if self._frames else None
+        frame = StageFrame(stage=stage, parent=parent, depth=len(self._frames), rows=rows)
+        if self.reset_peak:
+            # the enclosing stages keep what they peaked at so far
+            self._fold_peak_rss()
+            reset_peak_rss()
+        self._frames.append(frame)
+
+        code_profiler, sampler, profile_file_path = self._start_code_profiler(frame)
+        start_time = datetime.now()
+        bytes_read, bytes_written = get_io_bytes()
+        cpu_start = get_cpu_seconds()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield frame
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}".strip().splitlines()[0]
+            raise
+        finally:
+            wall_seconds = time.perf_counter() - start
+            cpu_seconds = get_cpu_seconds() - cpu_start
+            bytes_read_end, bytes_written_end = get_io_bytes()
+            self._stop_code_profiler(code_profiler, sampler, profile_file_path)
+            self._fold_peak_rss()
+            self._frames.pop()
+
+            metric = StageMetric(stage=stage, parent=parent, depth=frame.depth, start_time=start_time.isoformat(),
+                                 wall_seconds=wall_seconds, cpu_seconds=cpu_seconds,
+                                 peak_rss_bytes=frame.peak_rss_bytes, rows=frame.rows,
+                                 bytes_read=None if bytes_read is None else bytes_read_end - bytes_read,
+                                 bytes_written=None if bytes_written is None else bytes_written_end - bytes_written,
+                                 profile_file_path=profile_file_path, error=error)
+            self.metrics.append(metric)
+            logging.info("Stage metric: %s", metric)
+
+    def _start_code_profiler(self, frame: StageFrame):
+        # one profiler at a time: cProfile cannot be nested
+        if self.profiler == NO_PROFILER or frame.depth > 0:
+            return None, None, None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        if self.profiler == CPROFILE_PROFILER:
+            code_profiler = cProfile.Profile()
+            code_profiler.enable()
+            return code_profiler, None, os.path.join(self.profile_dir, f"{frame.stage}.prof")
+        sampler = StackSampler(thread_id=threading.get_ident(), interval=self.sampling_interval)
+        sampler.start()
+        return None, sampler, os.path.join(self.profile_dir, f"{frame.stage}.collapsed")
+
+    @staticmethod
+    def _stop_code_profiler(code_profiler, sampler, profile_file_path):
+        if code_profiler is not None:
+            code_profiler.disable()
+            code_profiler.dump_stats(profile_file_path)
+        if sampler is not None:
+            sampler.stop()
+            sampler.save(profile_file_path)
+
+    def save(self, file_path: str):
+        from tourism.utils.main_utils import write_yaml_file
+
+        write_yaml_file(file_path=file_path, data={"stages": [dict(metric._asdict()) for metric in self.metrics]})
+
+    def to_prometheus_text(self, labels: dict = None) -> str:
+        return to_prometheus_text(self.metrics, labels=labels)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def to_prometheus_text(metrics: List[StageMetric], labels: dict = None) -> str:
+    """
+    Prometheus text exposition format, one gauge per StageMetric field with stage and parent labels.
+    A stage run several times under the same parent (e.g. per model or per fold) is one sample: times, rows and
+    bytes are summed, the peak RSS is the max, and the count gauge holds the number of runs.
+    labels: extra labels of every sample, e.g. {"experiment_id": ...}
+    """
+    runs = {}
+    for metric in metrics:
+        runs.setdefault((metric.stage, metric.parent or ""), []).append(metric)
+
+    lines = []
+    for field, help_text in PROMETHEUS_METRICS + [("count", "Runs of the stage.")]:
+        metric_name = f"{PROMETHEUS_METRIC_PREFIX}_{field}"
+        lines.append(f"# HELP {metric_name} {help_text}")
+        lines.append(f"# TYPE {metric_name} gauge")
+        for (stage, parent), stage_metrics in runs.items():
+            if field == "count":
+                value = len(stage_metrics)
+            else:
+                values = [getattr(metric, field) for metric in stage_metrics if getattr(metric, field) is not None]
+                if not values:
+                    continue
+                value = max(values) if field in PROMETHEUS_MAX_METRICS else sum(values)
+            sample_labels = {**(labels or {}), "stage": stage, "parent": parent}
+            label_text = ",".join(f'{key}="{_escape_label_value(label_value)}"'
+                                  for key, label_value in sample_labels.items())
+            lines.append(f"{metric_name}{{{label_text}}} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def read_stage_metrics(file_path: str) -> List[StageMetric]:
+    from tourism.utils.main_utils import read_yaml_file
+
+    return [StageMetric(**stage) for stage in read_yaml_file(file_path)["stages"]]
+
+
+def get_active_profiler() -> Optional[StageProfiler]:
+    return _active_profiler.get()
+
+
+@contextmanager
+def profile_step(stage: str, rows: int = None):
+    """
+    Times the block as a stage of the active profiler, the enclosing stage becomes its parent.
+    Yields the StageFrame (rows can be set inside the block), a detached one without active profiler.
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield StageFrame(stage=stage, parent=None, depth=0, rows=rows)
+        return
+    with profiler.stage(stage, rows=rows) as frame:
+        yield frame
@@ -1,13 +1,171 @@
-import boto3
+import os
 import sys
+import hashlib
+import threading
+from collections import namedtuple
+from typing import List
 from tourism.exception import CustomException
 from tourism.logger import logging
 
+# bucket names with this prefix are directories on the local file system (tests, offline runs)
+LOCAL_BUCKET_PREFIX = "file://"
+
+ObjectInfo = namedtuple("ObjectInfo", ["key", "etag", "size"])
+
+
 def download_from_s3(bucket_name, object_name, filename):
     try:
-        logging.info("Downloading from S3 bucket: %s" % bucket_name)
+        import boto3
+
+        logging.info("Downloading from S3 bucket: %s", bucket_name)
         s3 = boto3.client('s3')
         s3.download_file(bucket_name, object_name, filename)
-        logging.info("Downloaded from S3 bucket: %s" % bucket_name)
+        logging.info("Downloaded from S3 bucket: %s", bucket_name)
     except Exception as e:
-        raise CustomException(e, sys) from e
\ No newline at end of file
+        raise CustomException(e, sys) from e
+
+
+class S3ObjectStore:
+
+    def __init__(self, bucket_name: str, client=None, max_workers: int = 8, multipart_threshold: int = 64 << 20,
+                 multipart_chunksize: int = 16 << 20):
+        """
+        client: boto3 S3 client, e.g. one bound to a moto mock or a MinIO endpoint; a default client when None
+        max_workers: parallel parts of one multipart transfer, the pool of the default client
+                     holds connections for two such transfers
+        multipart_threshold, multipart_chunksize: bytes, larger files are transferred in parts of chunksize
+        """
+        try:
+            from boto3.s3.transfer import TransferConfig
+
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                client = boto3.client('s3', config=Config(max_pool_connections=2 * max_workers,
+                                                          retries={"max_attempts": 5, "mode": "adaptive"}))
+            self.bucket_name = bucket_name
+            self.client = client
+            self.transfer_config = TransferConfig(multipart_threshold=multipart_threshold,
+                                                  multipart_chunksize=multipart_chunksize,
+                                                  max_concurrency=max_workers, use_threads=True)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def list_objects(self, prefix: str) -> List[ObjectInfo]:
+        try:
+            paginator = self.client.get_paginator("list_objects_v2")
+            objects = []
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                objects.extend(ObjectInfo(key=content["Key"], etag=content["ETag"].strip('"'), size=content["Size"])
+                               for content in page.get("Contents", []) if not content["Key"].endswith("/"))
+            return sorted(objects, key=lambda object_info: object_info.key)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def download(self, key: str, file_path: str):
+        # boto3 clients are thread safe, concurrent downloads share this one
+        self.client.download_file(self.bucket_name, key, file_path, Config=self.transfer_config)
+
+    def upload(self, file_path: str, key: str):
+        self.client.upload_file(file_path, self.bucket_name, key, Config=self.transfer_config)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put_bytes(self, key: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=data)
+
+    def get_bytes(self, key: str):
+        """
+        return: object content, None when the key does not exist
+        """
+        try:
+            return self.client.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+
+class LocalObjectStore:
+    """
+    S3 stand-in over a local directory: keys are relative paths, ETags are MD5 digests like the ones of
+    single part S3 uploads.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    @staticmethod
+    def get_etag(file_path: str) -> str:
+        digest = hashlib.md5()
+        with open(file_path, "rb") as object_file:
+            for block in iter(lambda: object_file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def list_objects(self, prefix: str) -> List[ObjectInfo]:
+        try:
+            objects = []
+            for dir_path, _, file_names in os.walk(self.root_dir):
+                for file_name in file_names:
+                    file_path = os.path.join(dir_path, file_name)
+                    key = os.path.relpath(file_path, self.root_dir).replace(os.sep, "/")
+                    if key.startswith(prefix):
+                        objects.append(ObjectInfo(key=key, etag=self.get_etag(file_path),
+                                                  size=os.path.getsize(file_path)))
+            return sorted(objects, key=lambda object_info: object_info.key)
+        except Exception as e:
+            raise CustomException(e, sys) from e
+
+    def get_file_path(self, key: str) -> str:
+        return os.path.join(self.root_dir, *key.split("/"))
+
+    def download(self, key: str, file_path: str):
+        import shutil
+
+        shutil.copyfile(self.get_file_path(key), file_path)
+
+    def upload(self, file_path: str, key: str):
+        import shutil
+
+        object_file_path = self.get_file_path(key)
+        os.makedirs(os.path.dirname(object_file_path), exist_ok=True)
+        tmp_file_path = f"{object_file_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.copyfile(file_path, tmp_file_path)
+        os.replace(tmp_file_path, object_file_path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.get_file_path(key))
+
+    def put_bytes(self, key: str, data: bytes):
+        object_file_path = self.get_file_path(key)
+        os.makedirs(os.path.dirname(object_file_path), exist_ok=True)
+        tmp_file_path = f"{object_file_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_file_path, "wb") as object_file:
+            object_file.write(data)
+        os.replace(tmp_file_path, object_file_path)
+
+    def get_bytes(self, key: str):
+        object_file_path = self.get_file_path(key)
+        if not os.path.exists(object_file_path):
+            return None
+        with open(object_file_path, "rb") as object_file:
+            return object_file.read()
+
+
+def get_object_store(bucket_name: str, **s3_options):
+    """
+    s3_options: transfer settings of S3ObjectStore
+    return: LocalObjectStore for file://<dir> bucket names, S3ObjectStore otherwise
+    """
+    if bucket_name.startswith(LOCAL_BUCKET_PREFIX):
+        return LocalObjectStore(root_dir=bucket_name[len(LOCAL_BUCKET_PREFIX):])
+    return S3ObjectStore(bucket_name=bucket_name, **s3_options)
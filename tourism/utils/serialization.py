@@ -0,0 +1,142 @@
+import os, sys
+import copy
+import importlib
+from tourism.exception import CustomException
+
+DILL_FORMAT = "dill"
+JOBLIB_FORMAT = "joblib"
+XGBOOST_FORMAT = "xgboost"
+AUTO_FORMAT = "auto"
+SERIALIZATION_FORMATS = [DILL_FORMAT, JOBLIB_FORMAT, XGBOOST_FORMAT]
+
+METADATA_FILE_SUFFIX = ".meta.yaml"
+SERIALIZATION_FORMAT_KEY = "serialization_format"
+COMPRESS_KEY = "compress"
+OBJECT_TYPE_KEY = "object_type"
+FILE_SIZE_KEY = "file_size_bytes"
+
+# attribute of TourismPredictor holding the fitted estimator
+TRAINED_MODEL_ATTRIBUTE = "trained_model_object"
+
+
+def get_metadata_file_path(file_path: str) -> str:
+    return f"{file_path}{METADATA_FILE_SUFFIX}"
+
+
+def is_xgboost_model(obj) -> bool:
+    return type(obj).__module__.split(".")[0] == "xgboost" and hasattr(obj, "get_booster")
+
+
+class NativeXGBoostModel:
+    """
+    Picklable stand-in for a fitted xgboost sklearn estimator.
+    The booster is kept in xgboost's own UBJSON format instead of a pickled python object,
+    which is smaller, faster to load and readable by any xgboost version >= the one that wrote it.
+    """
+
+    def __init__(self, model):
+        self.module_name = type(model).__module__
+        self.class_name = type(model).__name__
+        self.params = model.get_params()
+        self.raw_booster = bytes(model.get_booster().save_raw(raw_format="ubj"))
+
+    def restore(self):
+        model_class = getattr(importlib.import_module(self.module_name), self.class_name)
+        model = model_class(**self.params)
+        model.load_model(bytearray(self.raw_booster))
+        return model
+
+
+def resolve_serialization_format(obj, serialization_format: str) -> str:
+    """
+    `auto` picks xgboost's native format for xgboost models (or predictors wrapping one), joblib otherwise.
+    """
+    if serialization_format != AUTO_FORMAT:
+        if serialization_format not in SERIALIZATION_FORMATS:
+            raise Exception(f"Unknown serialization format [{serialization_format}], "
+                            f"expected one of {SERIALIZATION_FORMATS + [AUTO_FORMAT]}")
+        return serialization_format
+    if is_xgboost_model(obj) or is_xgboost_model(getattr(obj, TRAINED_MODEL_ATTRIBUTE, None)):
+        return XGBOOST_FORMAT
+    return JOBLIB_FORMAT
+
+
+def _to_native_xgboost(obj):
+    if is_xgboost_model(obj):
+        return NativeXGBoostModel(obj)
+    if is_xgboost_model(getattr(obj, TRAINED_MODEL_ATTRIBUTE, None)):
+        obj = copy.copy(obj)
+        setattr(obj, TRAINED_MODEL_ATTRIBUTE, NativeXGBoostModel(getattr(obj, TRAINED_MODEL_ATTRIBUTE)))
+    return obj
+
+
+def _from_native_xgboost(obj):
+    if isinstance(obj, NativeXGBoostModel):
+        return obj.restore()
+    if isinstance(getattr(obj, TRAINED_MODEL_ATTRIBUTE, None), NativeXGBoostModel):
+        setattr(obj, TRAINED_MODEL_ATTRIBUTE, getattr(obj, TRAINED_MODEL_ATTRIBUTE).restore())
+    return obj
+
+
+def dump(obj, file_obj, serialization_format: str, compress=0):
+    """
+    obj: object to serialize
+    file_obj: binary file object opened for writing
+    serialization_format: one of SERIALIZATION_FORMATS
+    compress: joblib compress argument (0-9 or a (method, level) tuple), ignored by dill
+    """
+    try:
+        if serialization_format == DILL_FORMAT:
+            import dill
+
+            dill.dump(obj, file_obj)
+        elif serialization_format in (JOBLIB_FORMAT, XGBOOST_FORMAT):
+            import joblib
+
+            if serialization_format == XGBOOST_FORMAT:
+                obj = _to_native_xgboost(obj)
+            joblib.dump(obj, file_obj, compress=compress)
+        else:
+            raise Exception(f"Unknown serialization format [{serialization_format}]")
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def load(file_path: str, serialization_format: str, compress=0, mmap_mode: str = None):
+    """
+    file_path: serialized object path
+    serialization_format: format the object was written with
+    compress: compress argument used at write time, memory mapping is only possible without compression
+    mmap_mode: numpy memmap mode for joblib arrays, None to read them in memory
+    """
+    try:
+        if serialization_format == DILL_FORMAT:
+            import dill
+
+            with open(file_path, "rb") as file_obj:
+                return dill.load(file_obj)
+        if serialization_format in (JOBLIB_FORMAT, XGBOOST_FORMAT):
+            import joblib
+
+            obj = joblib.load(file_path, mmap_mode=None if compress else mmap_mode)
+            return _from_native_xgboost(obj) if serialization_format == XGBOOST_FORMAT else obj
+        raise Exception(f"Unknown serialization format [{serialization_format}]")
+    except Exception as e:
+        raise CustomException(e, sys) from e
+
+
+def get_object_type(obj) -> str:
+    obj_type = f"{type(obj).__module__}.{type(obj).__name__}"
+    trained_model_object = getattr(obj, TRAINED_MODEL_ATTRIBUTE, None)
+    if trained_model_object is not None:
+        obj_type = f"{obj_type}[{type(trained_model_object).__module__}.{type(trained_model_object).__name__}]"
+    return obj_type
+
+
+def get_object_metadata(file_path: str, obj, serialization_format: str, compress=0) -> dict:
+    return {
+        SERIALIZATION_FORMAT_KEY: serialization_format,
+        COMPRESS_KEY: list(compress) if isinstance(compress, tuple) else compress,
+        OBJECT_TYPE_KEY: get_object_type(obj),
+        FILE_SIZE_KEY: os.path.getsize(file_path),
+    }